@@ -0,0 +1,175 @@
+#!/usr/bin/python
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Measure qemu-img convert throughput for convert profiles.
+
+The source image is created in tmpfs, half data and half zeroes, and copied
+using every profile to a file in tmpfs, and to a loop device if --loop is
+specified (requires root).
+
+By default, the profiles configured in vdsm.conf are measured. Profiles can
+be specified on the command line using the vdsm.conf format, for example:
+
+    convert-bench.py --loop coroutines=1 coroutines=8 coroutines=16
+
+tmpfs does not support direct I/O, so cache modes are always "writeback"
+when reading or writing to tmpfs.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from vdsm.storage import convertprofile
+from vdsm.storage import qemuimg
+
+MiB = 1024**2
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure qemu-img convert throughput for profiles")
+    parser.add_argument(
+        "--size", type=int, default=1024,
+        help="Size of source image in MiB (default 1024)")
+    parser.add_argument(
+        "--tmpdir", default="/dev/shm",
+        help="tmpfs directory for test images (default /dev/shm)")
+    parser.add_argument(
+        "--loop", action="store_true",
+        help="Copy also to a loop device (requires root)")
+    parser.add_argument(
+        "--runs", type=int, default=3,
+        help="Number of runs for every profile (default 3)")
+    parser.add_argument(
+        "profiles", nargs="*",
+        help="Profiles to measure (default: profiles from vdsm.conf)")
+    args = parser.parse_args()
+
+    if args.profiles:
+        profiles = [(p, convertprofile.parse(p)) for p in args.profiles]
+    else:
+        profiles = [(kind, convertprofile.profile(kind))
+                    for kind in convertprofile.KINDS]
+
+    workdir = tempfile.mkdtemp(prefix="convert-bench-", dir=args.tmpdir)
+    try:
+        src = os.path.join(workdir, "src")
+        create_source(src, args.size * MiB)
+        targets = [("tmpfs", TmpfsTarget(workdir))]
+        if args.loop:
+            targets.append(("loop", LoopTarget(workdir, args.size * MiB)))
+        try:
+            print("%-40s %-6s %10s %10s" % ("profile", "target", "seconds",
+                                            "MiB/s"))
+            for name, profile in profiles:
+                for target_name, target in targets:
+                    elapsed = min(run(src, target, profile)
+                                  for i in range(args.runs))
+                    print("%-40s %-6s %10.2f %10.2f" % (
+                        name, target_name, elapsed, args.size / elapsed))
+        finally:
+            for _, target in targets:
+                target.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+def create_source(path, size):
+    with open(path, "wb") as f:
+        chunk = os.urandom(MiB)
+        for offset in range(0, size // 2, MiB):
+            f.write(chunk)
+        f.truncate(size)
+
+
+def run(src, target, profile):
+    dst = target.prepare()
+    op = qemuimg.convert(
+        src,
+        dst,
+        srcFormat=qemuimg.FORMAT.RAW,
+        dstFormat=qemuimg.FORMAT.RAW,
+        create=target.create,
+        cache=target.cache(profile.cache),
+        src_cache="writeback",
+        coroutines=profile.coroutines,
+        sparse_size=profile.sparse_size)
+    start = time.time()
+    op.run()
+    return time.time() - start
+
+
+class TmpfsTarget(object):
+
+    create = True
+
+    def __init__(self, workdir):
+        self._path = os.path.join(workdir, "dst")
+
+    def prepare(self):
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        return self._path
+
+    def cache(self, mode):
+        return "writeback"
+
+    def close(self):
+        pass
+
+
+class LoopTarget(object):
+
+    create = False
+
+    def __init__(self, workdir, size):
+        # The backing file must not be in tmpfs, or the loop device will not
+        # support direct I/O.
+        self._backing = tempfile.NamedTemporaryFile(
+            prefix="convert-bench-", dir="/var/tmp")
+        self._backing.truncate(size)
+        self._backing.flush()
+        self._device = subprocess.check_output(
+            ["losetup", "--find", "--show", "--direct-io=on",
+             self._backing.name]).decode().strip()
+
+    def prepare(self):
+        subprocess.check_call(["blkdiscard", self._device])
+        return self._device
+
+    def cache(self, mode):
+        return mode
+
+    def close(self):
+        subprocess.check_call(["losetup", "--detach", self._device])
+        self._backing.close()
+
+
+if __name__ == "__main__":
+    main()
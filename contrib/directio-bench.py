@@ -0,0 +1,149 @@
+#!/usr/bin/python
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Measure directio.DirectFile throughput for read, readinto, write and
+writefrom.
+
+The device is a loop device backed by a file in tmpfs (requires root), so
+the benchmark measures the cost of the direct I/O path in vdsm and not the
+storage. Every operation reads or writes the entire device using blocks of
+every block size, for example:
+
+    directio-bench.py --size 256 512 4096 1048576
+
+read and write copy the data from or to Python bytes, using buffers from
+the directio buffer pool. readinto and writefrom use one aligned buffer and
+do not copy the data.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from vdsm.storage import directio
+
+MiB = 1024**2
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure directio.DirectFile throughput")
+    parser.add_argument(
+        "--size", type=int, default=256,
+        help="Size of the loop device in MiB (default 256)")
+    parser.add_argument(
+        "--tmpdir", default="/dev/shm",
+        help="tmpfs directory for the backing file (default /dev/shm)")
+    parser.add_argument(
+        "--runs", type=int, default=3,
+        help="Number of runs for every operation (default 3)")
+    parser.add_argument(
+        "block_sizes", nargs="*", type=int,
+        default=[512, 4096, 64 * 1024, MiB],
+        help="Block sizes in bytes (default 512 4096 65536 1048576)")
+    args = parser.parse_args()
+
+    size = args.size * MiB
+    workdir = tempfile.mkdtemp(prefix="directio-bench-", dir=args.tmpdir)
+    try:
+        device = LoopDevice(os.path.join(workdir, "backing"), size)
+        try:
+            print("%-10s %10s %10s %10s" % ("operation", "block size",
+                                            "seconds", "MiB/s"))
+            for block_size in args.block_sizes:
+                for name, op in OPERATIONS:
+                    elapsed = min(op(device.path, size, block_size)
+                                  for i in range(args.runs))
+                    print("%-10s %10d %10.2f %10.2f" % (
+                        name, block_size, elapsed, args.size / elapsed))
+        finally:
+            device.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+def read(path, size, block_size):
+    with directio.DirectFile(path, "r") as f:
+        start = time.time()
+        for offset in range(0, size, block_size):
+            f.read(block_size)
+        return time.time() - start
+
+
+def readinto(path, size, block_size):
+    with directio.DirectFile(path, "r") as f, \
+            directio.aligned_buffer(block_size) as buf:
+        start = time.time()
+        for offset in range(0, size, block_size):
+            f.readinto(buf)
+        return time.time() - start
+
+
+def write(path, size, block_size):
+    data = b"x" * block_size
+    with directio.DirectFile(path, "r+") as f:
+        start = time.time()
+        for offset in range(0, size, block_size):
+            f.write(data)
+        return time.time() - start
+
+
+def writefrom(path, size, block_size):
+    with directio.DirectFile(path, "r+") as f, \
+            directio.aligned_buffer(block_size) as buf:
+        buf.write(b"x" * block_size)
+        start = time.time()
+        for offset in range(0, size, block_size):
+            f.writefrom(buf)
+        return time.time() - start
+
+
+OPERATIONS = [
+    ("read", read),
+    ("readinto", readinto),
+    ("write", write),
+    ("writefrom", writefrom),
+]
+
+
+class LoopDevice(object):
+
+    def __init__(self, backing, size):
+        # tmpfs does not support direct I/O, but the loop device does, using
+        # buffered I/O on the backing file.
+        with open(backing, "wb") as f:
+            f.truncate(size)
+        self.path = subprocess.check_output(
+            ["losetup", "--find", "--show", backing]).decode().strip()
+
+    def close(self):
+        subprocess.check_call(["losetup", "--detach", self.path])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/python
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Measure latency and peak memory of parsing gluster volume profile info.
+
+The output is built from the volume profile info test fixture, repeating
+the fixture bricks until the output contains the requested number of
+bricks, and piped to the parser using cat, like the output of the gluster
+command.
+
+The output is parsed by reading the entire output and parsing the complete
+tree ("tree"), and by parsing the output while it is read ("stream"). Every
+run is done in a new process, reporting the growth of the process maximum
+resident set size.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+import xml.etree.cElementTree as etree
+
+from vdsm.gluster import cli
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "tests",
+                       "glusterVolumeProfileInfo.xml")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure gluster volume profile info parsing")
+    parser.add_argument(
+        "--fixture", default=FIXTURE,
+        help="Volume profile info XML (default %s)" % FIXTURE)
+    parser.add_argument(
+        "--runs", type=int, default=3,
+        help="Number of runs for every parser (default 3)")
+    parser.add_argument(
+        "bricks", nargs="*", type=int, default=[100, 1000, 5000],
+        help="Number of bricks in the output (default 100 1000 5000)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="gluster-parse-bench-")
+    try:
+        print("%-8s %8s %10s %10s %12s" % (
+            "parser", "bricks", "MiB", "seconds", "peak MiB"))
+        for bricks in args.bricks:
+            path = os.path.join(workdir, "profile-%d.xml" % bricks)
+            create_output(args.fixture, path, bricks)
+            size = os.path.getsize(path) / 1024**2
+            for name, func in PARSERS:
+                results = [run(func, path) for i in range(args.runs)]
+                elapsed = min(r[0] for r in results)
+                peak = min(r[1] for r in results)
+                print("%-8s %8d %10.2f %10.3f %12.2f" % (
+                    name, bricks, size, elapsed, peak))
+    finally:
+        shutil.rmtree(workdir)
+
+
+def create_output(fixture, path, count):
+    tree = etree.parse(fixture)
+    profile = tree.find("volProfile")
+    bricks = profile.findall("brick")
+    for brick in bricks:
+        profile.remove(brick)
+    for i in range(count):
+        profile.append(bricks[i % len(bricks)])
+    profile.find("brickCount").text = str(count)
+    tree.write(path)
+
+
+def parse_tree(path):
+    out = subprocess.check_output(["cat", path])
+    return cli._parseVolumeProfileInfo(etree.fromstring(out), False)
+
+
+def parse_stream(path):
+    proc = subprocess.Popen(["cat", path], stdout=subprocess.PIPE)
+    try:
+        return cli._volumeProfileInfo(False).stream(proc.stdout)
+    finally:
+        proc.wait()
+
+
+PARSERS = [
+    ("tree", parse_tree),
+    ("stream", parse_stream),
+]
+
+
+def run(func, path):
+    """
+    Run func(path) in a new process, and return the elapsed time and the
+    growth of the process maximum resident set size in MiB.
+    """
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=measure, args=(func, path, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def measure(func, path, queue):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    func(path)
+    elapsed = time.time() - start
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, (after - before) / 1024))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/python
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Measure kvm2ovirt throughput when copying multiple disks.
+
+Source storage volumes are local files, downloaded through a fake libvirt
+connection instead of a remote libvirt. Every read from a source volume
+waits --latency milliseconds, simulating a round trip to the remote libvirt.
+
+Destination disks are written using direct I/O, so --tmpdir must support
+direct I/O (tmpfs does not).
+
+For example, measure copying 4 disks of 512 MiB with 1, 2 and 4 jobs:
+
+    kvm2ovirt-bench.py --disks 4 --size 512 1 2 4
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from vdsm import kvm2ovirt
+from vdsm.common import libvirtconnection
+
+MiB = 1024**2
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure kvm2ovirt throughput for number of jobs")
+    parser.add_argument(
+        "--disks", type=int, default=4,
+        help="Number of disks to copy (default 4)")
+    parser.add_argument(
+        "--size", type=int, default=256,
+        help="Size of every disk in MiB (default 256)")
+    parser.add_argument(
+        "--latency", type=float, default=1.0,
+        help="Latency of every source read in milliseconds (default 1)")
+    parser.add_argument(
+        "--bufsize", type=int, default=MiB,
+        help="kvm2ovirt buffer size in bytes (default 1048576)")
+    parser.add_argument(
+        "--tmpdir", default="/var/tmp",
+        help="Directory for test disks (default /var/tmp)")
+    parser.add_argument(
+        "--runs", type=int, default=3,
+        help="Number of runs for every number of jobs (default 3)")
+    parser.add_argument(
+        "jobs", type=int, nargs="*", default=[1, 2, 4],
+        help="Numbers of jobs to measure (default 1 2 4)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="kvm2ovirt-bench-", dir=args.tmpdir)
+    try:
+        sources = []
+        for i in range(args.disks):
+            path = os.path.join(workdir, "src%d" % i)
+            create_source(path, args.size * MiB)
+            sources.append(path)
+        dests = [os.path.join(workdir, "dst%d" % i)
+                 for i in range(args.disks)]
+
+        conn = FakeConnection(args.latency / 1000)
+        libvirtconnection.open_connection = lambda *a: conn
+
+        total = args.disks * args.size
+        print("%-6s %10s %10s" % ("jobs", "seconds", "MiB/s"))
+        for jobs in args.jobs:
+            elapsed = min(run(sources, dests, jobs, args.bufsize)
+                          for i in range(args.runs))
+            print("%-6d %10.2f %10.2f" % (jobs, elapsed, total / elapsed))
+    finally:
+        shutil.rmtree(workdir)
+
+
+def create_source(path, size):
+    with open(path, "wb") as f:
+        chunk = os.urandom(MiB)
+        for offset in range(0, size, MiB):
+            f.write(chunk)
+
+
+def run(sources, dests, jobs, bufsize):
+    for path in dests:
+        open(path, "wb").close()
+    argv = ["kvm2ovirt", "--uri", "qemu+tcp://bench"]
+    argv.append("--source")
+    argv.extend(sources)
+    argv.append("--dest")
+    argv.extend(dests)
+    argv.append("--storage-type")
+    argv.extend(["volume"] * len(sources))
+    argv.extend(["--vm-name", "bench",
+                 "--allocation", "preallocated",
+                 "--bufsize", str(bufsize),
+                 "--jobs", str(jobs)])
+    # Drop kvm2ovirt progress output.
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        start = time.time()
+        kvm2ovirt.main(argv)
+        return time.time() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+class FakeConnection(object):
+
+    def __init__(self, latency):
+        self._latency = latency
+
+    def storageVolLookupByPath(self, path):
+        return FakeVolume(path)
+
+    def newStream(self):
+        return FakeStream(self._latency)
+
+    def getLibVersion(self):
+        # Before sparse streams
+        return 3000000
+
+
+class FakeVolume(object):
+
+    def __init__(self, path):
+        self._path = path
+
+    def info(self):
+        size = os.path.getsize(self._path)
+        # type, capacity, allocation
+        return [0, size, size]
+
+    def download(self, stream, offset, length, flags):
+        stream.open(self._path)
+
+
+class FakeStream(object):
+
+    def __init__(self, latency):
+        self._latency = latency
+        self._file = None
+
+    def open(self, path):
+        self._file = open(path, "rb")
+
+    def recv(self, nbytes):
+        time.sleep(self._latency)
+        return self._file.read(nbytes)
+
+    def finish(self):
+        self._file.close()
+
+
+if __name__ == "__main__":
+    main()
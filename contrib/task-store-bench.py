@@ -0,0 +1,112 @@
+#!/usr/bin/python
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Measure persist and recover times of SPM tasks for every task store format.
+
+Tasks are persisted in a temporary directory in the specified directory,
+which should be on the storage used for the master domain, for example an
+NFS mount:
+
+    task-store-bench.py --tasks 1000 /rhev/data-center/mnt/server:_export
+
+Every task has one job and two recoveries, and is persisted like a
+copyImage task, once for every state change. Recovering loads all the tasks
+from the store, like the task manager when starting the SPM.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from vdsm.config import config
+from vdsm.storage import task
+
+# States persisted by a task running one job.
+STATES = (
+    task.State.preparing,
+    task.State.acquiring,
+    task.State.queued,
+    task.State.running,
+    task.State.finished,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure persist and recover times of SPM tasks")
+    parser.add_argument(
+        "--tasks", type=int, default=1000,
+        help="Number of tasks (default 1000)")
+    parser.add_argument(
+        "dir",
+        help="Directory for the task store")
+    args = parser.parse_args()
+
+    print("%-6s %8s %12s %12s" % ("format", "tasks", "persist (s)",
+                                  "recover (s)"))
+    for fmt in (task.STORE_FORMAT_DIR, task.STORE_FORMAT_FILE):
+        store = tempfile.mkdtemp(prefix="task-store-bench-", dir=args.dir)
+        try:
+            persist = run_persist(store, fmt, args.tasks)
+            recover = run_recover(store)
+            print("%-6s %8d %12.2f %12.2f" % (fmt, args.tasks, persist,
+                                              recover))
+        finally:
+            shutil.rmtree(store)
+
+
+def run_persist(store, fmt, count):
+    tasks = []
+    for i in range(count):
+        t = task.Task(None, name="copyImage")
+        t.jobs.append(task.Job("copyImage", None))
+        for n in range(2):
+            t.recoveries.append(
+                task.Recovery("rollback", "image", "Image",
+                              "createImageRollback", ["pool-id", "image-id"]))
+        tasks.append(t)
+
+    config.set("irs", "task_store_format", fmt)
+    start = time.time()
+    for t in tasks:
+        t.setPersistence(store, cleanPolicy=task.TaskCleanType.manual)
+        for state in STATES:
+            t.state.moveto(state, force=True)
+            t.persist()
+    return time.time() - start
+
+
+def run_recover(store):
+    start = time.time()
+    ids = set(name.split(".", 1)[0] for name in os.listdir(store))
+    for taskid in ids:
+        task.Task.loadTask(store, taskid)
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -1066,6 +1066,9 @@ class StorageDomain(APIBase):
     def getFileStats(self, pattern, caseSensitive):
         return self._irs.getFileStats(self._UUID, pattern, caseSensitive)
 
+    def dumpVolumeChains(self):
+        return self._irs.dumpVolumeChains(self._UUID)
+
     def getImages(self):
         return self._irs.getImagesList(self._UUID)
 
@@ -1624,8 +1627,10 @@ class Global(APIBase):
     def getLVMVolumeGroups(self, storageType=None):
         return self._irs.getVGList(storageType)
 
-    def getDeviceList(self, storageType=None, guids=(), checkStatus=True):
-        return self._irs.getDeviceList(storageType, guids, checkStatus)
+    def getDeviceList(self, storageType=None, guids=(), checkStatus=True,
+                      refresh=True):
+        return self._irs.getDeviceList(storageType, guids, checkStatus,
+                                       refresh)
 
     def getDevicesVisibility(self, guidList):
         return self._irs.getDevicesVisibility(guidList)
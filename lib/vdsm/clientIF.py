@@ -69,6 +69,19 @@ try:
 except ImportError:
     _glusterEnabled = False
 
+# Verbs served during recovery, once all the domains were found.
+_RECOVERY_VERBS = frozenset([
+    'Host.confirmConnectivity',
+    'Host.ping2',
+])
+
+# Verbs reporting VMs, served during recovery once all the VMs were
+# registered, so they never report a partial list of VMs.
+_RECOVERY_VM_VERBS = frozenset([
+    'Host.getVMFullList',
+    'Host.getVMList',
+])
+
 
 class clientIF(object):
     """
@@ -97,6 +110,8 @@ class clientIF(object):
             self.irs.registerDomainStateChangeCallback(self._contEIOVmsCB)
         self.log = log
         self._recovery = True
+        self._vm_list_known = False
+        self._vms_registered = False
         # TODO: The guest agent related code spreads around too much. There is
         # QemuGuestAgentPoller and ChannelListner here and then many instances
         # of GuestAgent per VM in vm.py. This should be refactored and
@@ -191,6 +206,21 @@ class clientIF(object):
     def ready(self):
         return (self.irs is None or self.irs.ready) and not self._recovery
 
+    def serves_in_recovery(self, method):
+        """
+        Return True if method can be served before recovery is completed.
+
+        Lightweight verbs that do not depend on storage or on the state of
+        the recovered VMs are served once all the domains were found. Verbs
+        listing the VMs are served once all the VMs were registered.
+        """
+        if method in _RECOVERY_VM_VERBS:
+            return self._vms_registered
+        return self._vm_list_known and method in _RECOVERY_VERBS
+
+    def _domains_listed(self):
+        self._vm_list_known = True
+
     def notify(self, event_id, params=None):
         """
         Send notification using provided subscription id as
@@ -549,6 +579,8 @@ class clientIF(object):
         return {'status': doneCode, 'alignment': aligning}
 
     def createVm(self, vmParams, vmRecover=False):
+        if vmRecover:
+            return self._recoverVm(vmParams)
         with self.vmContainerLock:
             if not vmRecover:
                 if vmParams['vmId'] in self.vmContainer:
@@ -559,6 +591,16 @@ class clientIF(object):
                 self.vmContainer[vm.id] = vm
             return ret
 
+    def _recoverVm(self, vmParams):
+        # VMs are recovered concurrently, and recovering a VM may take
+        # some time, so we must not hold the container lock while running it.
+        vm = Vm(self, vmParams, True)
+        ret = vm.run()
+        if not response.is_error(ret):
+            with self.vmContainerLock:
+                self.vmContainer[vm.id] = vm
+        return ret
+
     def getAllVmStats(self):
         return [v.getStats() for v in self.vmContainer.values()]
 
@@ -596,7 +638,10 @@ class clientIF(object):
                       numa.cpu_topology().cores)
             migration.SourceThread.ongoingMigrations.bound = mog
 
-            recovery.all_domains(self)
+            recovery.all_domains(self, on_listed=self._domains_listed)
+            self._vms_registered = True
+            self.log.info('recovery: found all VMs in %.2fs',
+                          vdsm.common.time.monotonic_time() - start_time)
 
             # recover stage 3: waiting for domains to go up
             self._waitForDomainsUp()
@@ -676,10 +721,16 @@ class clientIF(object):
             elif eventid == libvirt.VIR_DOMAIN_EVENT_ID_DEVICE_REMOVED:
                 device_alias, = args[:-1]
                 v.onDeviceRemoved(device_alias)
+            elif eventid == libvirt.VIR_DOMAIN_EVENT_ID_DEVICE_ADDED:
+                device_alias, = args[:-1]
+                v.onDeviceAdded(device_alias)
             elif eventid == libvirt.VIR_DOMAIN_EVENT_ID_BLOCK_THRESHOLD:
                 dev, path, threshold, excess = args[:-1]
                 v.drive_monitor.on_block_threshold(
                     dev, path, threshold, excess)
+            elif eventid == libvirt.VIR_DOMAIN_EVENT_ID_MIGRATION_ITERATION:
+                iteration, = args[:-1]
+                v.onMigrationIteration(iteration)
             else:
                 v.log.debug('unhandled libvirt event (event_name=%s, args=%s)',
                             events.event_name(eventid), args)
@@ -140,19 +140,41 @@ class Barrier(object):
 Result = namedtuple("Result", ["succeeded", "value"])
 
 
-def tmap(func, iterable):
+def tmap(func, iterable, max_workers=None):
+    """
+    Run func with every item in iterable in separate threads, and return a
+    list of Result, in the order of iterable.
+
+    If max_workers is specified, use at most max_workers threads, each
+    running func with the next item until all items are processed.
+
+    Raises ValueError if max_workers is smaller than 1.
+    """
+    if max_workers is not None and max_workers < 1:
+        raise ValueError("Invalid max_workers: %r" % max_workers)
     args = list(iterable)
     results = [None] * len(args)
-
-    def worker(i, f, arg):
-        try:
-            results[i] = Result(True, f(arg))
-        except Exception as e:
-            results[i] = Result(False, e)
+    if max_workers is None:
+        max_workers = len(args)
+
+    # Protects indexes.
+    lock = threading.Lock()
+    indexes = iter(range(len(args)))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(indexes, None)
+            if i is None:
+                return
+            try:
+                results[i] = Result(True, func(args[i]))
+            except Exception as e:
+                results[i] = Result(False, e)
 
     threads = []
-    for i, arg in enumerate(args):
-        t = thread(worker, args=(i, func, arg), name="tmap/%d" % i)
+    for i in range(min(max_workers, len(args))):
+        t = thread(worker, name="tmap/%d" % i)
         t.start()
         threads.append(t)
 
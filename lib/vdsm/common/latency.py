@@ -0,0 +1,133 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Latency histograms for internal operations.
+
+Usage::
+
+    timings = latency.Registry()
+
+    with timings.timer("getScsiSerial"):
+        ...
+
+    timings.info()
+    {'getScsiSerial': {'count': 1, 'errors': 0, 'total': 0.01, ...}}
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+import threading
+
+from contextlib import contextmanager
+
+from vdsm.common.time import monotonic_time
+
+# Upper bounds of histogram buckets, in seconds. Values larger than the last
+# bucket are counted in the "inf" bucket.
+BUCKETS = (0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+
+class Histogram(object):
+    """
+    Thread safe histogram of operation durations.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self._lock = threading.Lock()
+        self._bounds = tuple(buckets)
+        self._buckets = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._errors = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    def add(self, value, error=False):
+        with self._lock:
+            self._count += 1
+            if error:
+                self._errors += 1
+            self._total += value
+            self._max = max(self._max, value)
+            self._buckets[self._bucket(value)] += 1
+
+    def info(self):
+        with self._lock:
+            buckets = {}
+            for bound, count in zip(self._bounds, self._buckets):
+                buckets[str(bound)] = count
+            buckets["inf"] = self._buckets[-1]
+            return {
+                "count": self._count,
+                "errors": self._errors,
+                "total": self._total,
+                "max": self._max,
+                "avg": self._total / self._count if self._count else 0.0,
+                "buckets": buckets,
+            }
+
+    def _bucket(self, value):
+        for i, bound in enumerate(self._bounds):
+            if value <= bound:
+                return i
+        return len(self._bounds)
+
+
+class Registry(object):
+    """
+    Collection of histograms keyed by operation name, created on demand.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self._histograms = {}
+
+    def add(self, name, value, error=False):
+        self._histogram(name).add(value, error=error)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Time the managed block, counting an error if it raises.
+        """
+        start = monotonic_time()
+        try:
+            yield
+        except:
+            self.add(name, monotonic_time() - start, error=True)
+            raise
+        self.add(name, monotonic_time() - start)
+
+    def info(self):
+        with self._lock:
+            items = list(self._histograms.items())
+        return {name: hist.info() for name, hist in items}
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def _histogram(self, name):
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram(self._buckets)
+            return hist
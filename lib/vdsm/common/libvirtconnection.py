@@ -186,7 +186,9 @@ def get(target=None, killOnFailure=True):
                            libvirt.VIR_DOMAIN_EVENT_ID_WATCHDOG,
                            libvirt.VIR_DOMAIN_EVENT_ID_JOB_COMPLETED,
                            libvirt.VIR_DOMAIN_EVENT_ID_DEVICE_REMOVED,
-                           libvirt.VIR_DOMAIN_EVENT_ID_BLOCK_THRESHOLD):
+                           libvirt.VIR_DOMAIN_EVENT_ID_DEVICE_ADDED,
+                           libvirt.VIR_DOMAIN_EVENT_ID_BLOCK_THRESHOLD,
+                           libvirt.VIR_DOMAIN_EVENT_ID_MIGRATION_ITERATION):
                     conn.domainEventRegisterAny(None,
                                                 ev,
                                                 target.dispatchLibvirtEvents,
@@ -0,0 +1,397 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Multiplexed RPC over a UNIX socket.
+
+A client keeps one persistent connection to the server, and any number of
+threads can have requests in flight on it at the same time. Every request
+carries an id, and the server sends the reply with the same id when the call
+completes, so replies may arrive in any order.
+
+On the server side, requests are read by one thread per connection and
+executed by a shared pool of worker threads, so a slow call does not block
+other calls on the same connection.
+
+Messages are pickled tuples, prefixed by their length:
+
+    request:    (id, name, args, kwargs)
+    response:   (id, success, value)
+
+When success is False, value is the exception raised by the call.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+import errno
+import itertools
+import logging
+import os
+import socket
+import struct
+import threading
+
+from six.moves import queue
+
+from vdsm.common import concurrent
+from vdsm.common import latency
+from vdsm.common import osutils
+from vdsm.common.compat import pickle
+
+PICKLE_PROTOCOL = 2
+
+_HEADER = struct.Struct("!I")
+
+# Do not accept insane messages from a broken peer.
+MAX_MESSAGE_SIZE = 256 * 1024**2
+
+_STOP = object()
+
+
+class Error(Exception):
+    """ Base class for muxrpc errors """
+
+
+class ConnectionClosed(Error):
+    """ The connection was closed while waiting for a reply """
+
+
+class Timeout(Error):
+    """ Timeout waiting for a reply """
+
+
+class RemoteError(Error):
+    """ Raised when the remote exception cannot be sent as is """
+
+
+class Client(object):
+    """
+    Connection to a muxrpc server, safe for use from multiple threads.
+    """
+
+    log = logging.getLogger("muxrpc.Client")
+
+    def __init__(self, address):
+        self._address = address
+        self._sock = None
+        self._reader = None
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._ids = itertools.count()
+        self._closed = True
+        self.timings = latency.Registry()
+
+    def connect(self):
+        """
+        Connect to the server. Raises socket.error if the server is not
+        available.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._address)
+        except:
+            sock.close()
+            raise
+        self._sock = sock
+        self._closed = False
+        self._reader = concurrent.thread(
+            self._read_replies, name="muxrpc/reader", log=self.log)
+        self._reader.start()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def call(self, name, args=(), kwargs=None, timeout=None):
+        """
+        Call function name on the server and wait for the result.
+
+        Raises the exception raised by the remote function, ConnectionClosed
+        if the connection was closed before a reply was received, and Timeout
+        if timeout is specified and the reply did not arrive in time.
+        """
+        if kwargs is None:
+            kwargs = {}
+        with self.timings.timer(name):
+            call = _Call()
+            with self._lock:
+                if self._closed:
+                    raise ConnectionClosed("Connection to %s is closed"
+                                           % self._address)
+                call_id = next(self._ids)
+                self._pending[call_id] = call
+            try:
+                data = pickle.dumps((call_id, name, args, kwargs),
+                                    PICKLE_PROTOCOL)
+                try:
+                    with self._send_lock:
+                        _send_message(self._sock, data)
+                except (socket.error, OSError) as e:
+                    self._abort(e)
+                    raise ConnectionClosed("Error sending %s: %s" % (name, e))
+                return call.wait(timeout)
+            finally:
+                with self._lock:
+                    self._pending.pop(call_id, None)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self._reader.join()
+        self._sock.close()
+
+    def _read_replies(self):
+        try:
+            while True:
+                data = _recv_message(self._sock)
+                if data is None:
+                    self._abort("connection closed by server")
+                    return
+                call_id, success, value = pickle.loads(data)
+                with self._lock:
+                    call = self._pending.get(call_id)
+                if call is None:
+                    self.log.warning("Dropping reply for unknown call %s",
+                                     call_id)
+                    continue
+                call.set_reply(success, value)
+        except Exception as e:
+            self._abort(e)
+
+    def _abort(self, reason):
+        with self._lock:
+            was_closed = self._closed
+            self._closed = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+        if not was_closed:
+            self.log.warning("Connection to %s aborted: %s",
+                             self._address, reason)
+        error = ConnectionClosed("Connection to %s aborted: %s"
+                                 % (self._address, reason))
+        for call in pending:
+            call.set_reply(False, error)
+
+
+class _Call(object):
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._success = None
+        self._value = None
+
+    def set_reply(self, success, value):
+        self._success = success
+        self._value = value
+        self._done.set()
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise Timeout("Timeout waiting for reply")
+        if not self._success:
+            raise self._value
+        return self._value
+
+
+class Server(object):
+    """
+    Serve the public methods of obj on a UNIX socket at address.
+    """
+
+    log = logging.getLogger("muxrpc.Server")
+
+    def __init__(self, address, obj, workers=8, max_queued=1000):
+        self._address = address
+        self._obj = obj
+        self._workers_count = workers
+        self._queue = queue.Queue(max_queued)
+        self._sock = None
+        self._accept_thread = None
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._running = False
+        self.timings = latency.Registry()
+
+    def start(self):
+        if os.path.exists(self._address):
+            os.unlink(self._address)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self._address)
+        self._sock.listen(16)
+        self._running = True
+
+        for i in range(self._workers_count):
+            t = concurrent.thread(self._run_worker,
+                                  name="muxrpc/worker/%d" % i, log=self.log)
+            t.start()
+
+        self._accept_thread = concurrent.thread(
+            self._serve, name="muxrpc/accept", log=self.log)
+        self._accept_thread.start()
+
+    def stop(self):
+        self._running = False
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self._sock.close()
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            conn.close()
+        self._accept_thread.join()
+        # Workers may be blocked in a stuck call; they exit after completing
+        # the current call.
+        for _ in range(self._workers_count):
+            self._queue.put(_STOP)
+        if os.path.exists(self._address):
+            os.unlink(self._address)
+
+    @property
+    def address(self):
+        return self._address
+
+    def _serve(self):
+        while self._running:
+            try:
+                sock, _ = osutils.uninterruptible(self._sock.accept)
+            except socket.error as e:
+                if not self._running:
+                    return
+                if e.errno in (errno.EMFILE, errno.ENFILE):
+                    self.log.error("Cannot accept connection: %s", e)
+                    continue
+                raise
+            conn = _Connection(self, sock)
+            with self._lock:
+                self._connections.add(conn)
+            conn.start()
+
+    def _run_worker(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            conn, call_id, name, args, kwargs = item
+            conn.send_reply(call_id, *self._dispatch(name, args, kwargs))
+
+    def _dispatch(self, name, args, kwargs):
+        with self.timings.timer(name):
+            try:
+                if name.startswith("_"):
+                    raise AttributeError("Method %r is not exposed" % name)
+                func = getattr(self._obj, name)
+                return True, func(*args, **kwargs)
+            except Exception as e:
+                return False, e
+
+    def _submit(self, conn, call_id, name, args, kwargs):
+        self._queue.put((conn, call_id, name, args, kwargs))
+
+    def _remove_connection(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+
+
+class _Connection(object):
+
+    def __init__(self, server, sock):
+        self._server = server
+        self._sock = sock
+        self._send_lock = threading.Lock()
+        self._reader = None
+
+    def start(self):
+        self._reader = concurrent.thread(
+            self._read_requests, name="muxrpc/conn", log=self._server.log)
+        self._reader.start()
+
+    def close(self):
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+    def send_reply(self, call_id, success, value):
+        try:
+            data = pickle.dumps((call_id, success, value), PICKLE_PROTOCOL)
+        except Exception as e:
+            data = pickle.dumps(
+                (call_id, False, RemoteError("Cannot send reply %r: %s"
+                                             % (value, e))),
+                PICKLE_PROTOCOL)
+        try:
+            with self._send_lock:
+                _send_message(self._sock, data)
+        except (socket.error, OSError) as e:
+            self._server.log.warning("Cannot send reply %s: %s", call_id, e)
+
+    def _read_requests(self):
+        try:
+            while True:
+                data = _recv_message(self._sock)
+                if data is None:
+                    return
+                call_id, name, args, kwargs = pickle.loads(data)
+                self._server._submit(self, call_id, name, args, kwargs)
+        finally:
+            self._server._remove_connection(self)
+            self._sock.close()
+
+
+def _send_message(sock, data):
+    osutils.uninterruptible(sock.sendall, _HEADER.pack(len(data)) + data)
+
+
+def _recv_message(sock):
+    """
+    Return the next message, or None if the peer closed the connection.
+    """
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    size, = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise Error("Message too large: %d bytes" % size)
+    data = _recv_exactly(sock, size)
+    if data is None:
+        raise Error("Connection closed in the middle of a message")
+    return data
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = osutils.uninterruptible(sock.recv, min(size, 1024**2))
+        if not chunk:
+            if chunks:
+                raise Error("Connection closed in the middle of a message")
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
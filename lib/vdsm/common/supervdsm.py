@@ -29,6 +29,8 @@ import threading
 
 from vdsm.common import constants
 from vdsm.common import function
+from vdsm.common import muxrpc
+from vdsm.common.config import config
 from vdsm.common.panic import panic
 
 _g_singletonSupervdsmInstance = None
@@ -36,6 +38,7 @@ _g_singletonSupervdsmInstance_lock = threading.Lock()
 
 
 ADDRESS = os.path.join(constants.P_VDSM_RUN, "svdsm.sock")
+MUX_ADDRESS = os.path.join(constants.P_VDSM_RUN, "svdsm-mux.sock")
 
 
 class _SuperVdsmManager(BaseManager):
@@ -49,6 +52,16 @@ class ProxyCaller(object):
         self._supervdsmProxy = supervdsmProxy
 
     def __call__(self, *args, **kwargs):
+        channel = self._supervdsmProxy._channel
+        if channel is not None:
+            try:
+                return channel.call(self._funcName, args, kwargs)
+            except muxrpc.ConnectionClosed:
+                self._supervdsmProxy._reconnect(channel)
+                raise RuntimeError(
+                    "Broken communication with supervdsm. Failed call to %s"
+                    % self._funcName)
+
         callMethod = lambda: \
             getattr(self._supervdsmProxy._svdsm, self._funcName)(*args,
                                                                  **kwargs)
@@ -68,15 +81,55 @@ class SuperVdsmProxy(object):
     _log = logging.getLogger("SuperVdsmProxy")
 
     def __init__(self):
+        self._lock = threading.Lock()
         self._manager = None
         self._svdsm = None
+        self._channel = None
         self._connect()
 
     def open(self, *args, **kwargs):
         # pylint: disable=no-member
         return self._manager.open(*args, **kwargs)
 
+    def timings(self):
+        """
+        Return latency histograms of calls sent on the multiplexed channel,
+        keyed by function name.
+        """
+        channel = self._channel
+        if channel is None:
+            return {}
+        return channel.timings.info()
+
+    def _reconnect(self, channel):
+        """
+        Reconnect after a call on channel failed with ConnectionClosed.
+
+        All calls in flight on the channel fail together; only the first
+        caller reconnects, so a new channel is not closed by callers that
+        failed on the old one.
+        """
+        with self._lock:
+            if self._channel is channel:
+                self._connect()
+
     def _connect(self):
+        if self._channel is not None:
+            self._channel.close()
+            self._channel = None
+
+        if config.getboolean('supervdsm', 'multiplexed_channel'):
+            channel = muxrpc.Client(MUX_ADDRESS)
+            self._log.debug("Trying to connect to Super Vdsm channel")
+            try:
+                channel.connect()
+            except EnvironmentError as e:
+                self._log.warning(
+                    "Cannot connect to supervdsm channel, using legacy "
+                    "connection: %s", e)
+            else:
+                self._channel = channel
+
         self._manager = _SuperVdsmManager(address=ADDRESS, authkey=b'')
         self._manager.register('instance')
         self._manager.register('open')
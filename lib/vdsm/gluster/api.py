@@ -493,6 +493,10 @@ class GlusterApi(object):
     def hostUUIDGet(self, options=None):
         return {'uuid': self.svdsmProxy.glusterHostUUIDGet()}
 
+    @exportAsVerb
+    def cliStats(self, options=None):
+        return {'cliStats': self.svdsmProxy.glusterCliStats()}
+
     @exportAsVerb
     def servicesAction(self, serviceNames, action, options=None):
         status = self.svdsmProxy.glusterServicesAction(serviceNames,
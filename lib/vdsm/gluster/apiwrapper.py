@@ -68,6 +68,9 @@ class GlusterHost(GlusterApiBase):
     def uuid(self):
         return self._gluster.hostUUIDGet()
 
+    def cliStats(self):
+        return self._gluster.cliStats()
+
     def add(self, hostName):
         return self._gluster.hostAdd(hostName)
 
@@ -1,5 +1,5 @@
 #
-# Copyright 2012-2017 Red Hat, Inc.
+# Copyright 2012-2019 Red Hat, Inc.
 #
 # This program is free software; you can redistribute it and/or modify
 # it under the terms of the GNU General Public License as published by
@@ -22,15 +22,22 @@ from __future__ import absolute_import
 from __future__ import division
 
 import calendar
+import copy
+import functools
 import logging
 import os
 import socket
+import tempfile
+import threading
 import time
 import xml.etree.cElementTree as etree
 
 from vdsm.common import cmdutils
 from vdsm.common import commands
+from vdsm.common import latency
 from vdsm.common.compat import subprocess
+from vdsm.common.time import monotonic_time
+from vdsm.config import config
 from vdsm.gluster import exception as ge
 from vdsm.network.netinfo import addresses
 from . import gluster_mgmt_api, gluster_api
@@ -104,7 +111,16 @@ class SnapshotStatus:
 
 
 def _execGluster(cmd):
-    return commands.execCmd(cmd)
+    try:
+        return _runGluster(cmd)
+    finally:
+        # The command may have modified the cluster.
+        _cache.invalidate()
+
+
+def _runGluster(cmd):
+    with _commandTime.timer(_commandName(cmd)):
+        return commands.execCmd(cmd)
 
 
 def _getTree(rc, out, err):
@@ -112,25 +128,126 @@ def _getTree(rc, out, err):
         raise ge.GlusterCmdExecFailedException(rc, out, err)
     try:
         tree = etree.fromstring(out)
+    except _etreeExceptions:
+        raise ge.GlusterXmlErrorException(err=out)
+    _checkTree(tree, out)
+    return tree
+
+
+def _checkTree(tree, out=None):
+    """
+    Raise GlusterCmdFailedException if the command failed. out is the
+    command output reported if tree is not valid gluster output, by default
+    the serialized tree.
+    """
+    try:
         rv = int(tree.find('opRet').text)
         msg = tree.find('opErrstr').text
         errNo = int(tree.find('opErrno').text)
     except _etreeExceptions:
+        if out is None:
+            out = [etree.tostring(tree)]
         raise ge.GlusterXmlErrorException(err=out)
-    if rv == 0:
-        return tree
-    else:
+    if rv != 0:
         if errNo != 0:
             rv = errNo
         raise ge.GlusterCmdFailedException(rc=rv, err=[msg])
 
 
+class _Elements(object):
+    """
+    Parser of gluster XML output with many similar elements, such as the
+    bricks of a volume.
+
+    Every element at path is parsed using parse(element), and the result is
+    built from the document and the list of parsed elements using
+    build(tree, results).
+
+    The parser can parse a complete tree, or stream the output of a running
+    command. When streaming, every element is parsed as soon as it is
+    complete and then cleared, so the entire document is never kept in
+    memory. Tracking the path of every element would make streaming much
+    slower, so elements are matched only by the last tag in path, which must
+    not be used by other elements in the document.
+    """
+
+    def __init__(self, path, parse, build):
+        self._path = path
+        self._parse = parse
+        self._build = build
+
+    def __call__(self, tree):
+        elements = tree.findall('/'.join(self._path))
+        return self._build(tree, [self._parse(el) for el in elements])
+
+    def stream(self, source):
+        """
+        Parse XML read from file object source.
+
+        Raises GlusterCmdFailedException if the command failed.
+        """
+        results = []
+        tag = self._path[-1]
+        context = etree.iterparse(source)
+        for event, el in context:
+            if el.tag == tag:
+                results.append(self._parse(el))
+                el.clear()
+        root = context.root
+        _checkTree(root)
+        return self._build(root, results)
+
+
 def _execGlusterXml(cmd):
+    try:
+        return _runGlusterXml(cmd)
+    finally:
+        # The command may have modified the cluster.
+        _cache.invalidate()
+
+
+def _runGlusterXml(cmd):
     cmd.append('--xml')
-    rc, out, err = commands.execCmd(cmd, raw=True)
+    with _commandTime.timer(_commandName(cmd)):
+        rc, out, err = commands.execCmd(cmd, raw=True)
     return _getTree(rc, out, err)
 
 
+def _streamGlusterXml(cmd, elements):
+    """
+    Run gluster command cmd, parsing the output using elements.stream()
+    while the command is running.
+    """
+    cmd.append('--xml')
+    name = _commandName(cmd)
+    cmd = cmdutils.wrap_command(cmd)
+    logging.debug(cmdutils.command_log_line(cmd))
+    with _commandTime.timer(name), tempfile.TemporaryFile() as errfile:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errfile)
+        with commands.terminating(proc):
+            error = None
+            try:
+                result = elements.stream(proc.stdout)
+            except ge.GlusterCmdFailedException as e:
+                error = e
+            except _etreeExceptions as e:
+                error = ge.GlusterXmlErrorException(err=[str(e)])
+            # Let the command exit if parsing stopped before the end.
+            proc.stdout.read()
+            proc.wait()
+
+        errfile.seek(0)
+        err = errfile.read()
+        logging.debug(cmdutils.retcode_log_line(proc.returncode, err))
+        if proc.returncode != 0:
+            err = err.decode('utf-8', 'replace').splitlines()
+            raise ge.GlusterCmdExecFailedException(proc.returncode, [], err)
+
+    if error is not None:
+        raise error
+    return result
+
+
 def _execGlusterXmlWithTimeout(cmd, timeout=_DEFAULT_TIMEOUT):
     cmd.append('--xml')
     cmd = cmdutils.wrap_command(cmd)
@@ -151,6 +268,189 @@ def _execGlusterXmlWithTimeout(cmd, timeout=_DEFAULT_TIMEOUT):
     return _getTree(proc.returncode, out, err)
 
 
+class _QueryCache(object):
+    """
+    Cache of read only gluster command results.
+
+    Results are kept for ttl seconds. Concurrent calls of the same command
+    wait for the running command instead of running it again. Errors are
+    not cached, but are returned to all the waiting callers.
+
+    invalidate() drops all results, including results of commands that are
+    running now, so results are never older than the last command modifying
+    the cluster.
+    """
+
+    def __init__(self, ttl, clock=monotonic_time):
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._generation = 0
+        # _Query keyed by command, including running commands.
+        self._queries = {}
+        self._hits = {}
+        self._coalesced = {}
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    def get(self, name, key, func):
+        """
+        Return the result of func() for key, calling func only if there is
+        no running query or fresh result for key. name is used to count
+        cache hits and coalesced calls in stats().
+        """
+        if self._ttl <= 0:
+            return func()
+
+        with self._lock:
+            query = self._queries.get(key)
+            if query is not None and query.expired(self._clock()):
+                query = None
+            if query is None:
+                query = self._queries[key] = _Query(self._generation)
+                owner = True
+            else:
+                counters = self._coalesced if query.running else self._hits
+                counters[name] = counters.get(name, 0) + 1
+                owner = False
+
+        if owner:
+            self._run(key, query, func)
+        return query.wait()
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._queries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": dict(self._hits),
+                    "coalesced": dict(self._coalesced)}
+
+    def _run(self, key, query, func):
+        try:
+            result = func()
+        except Exception as e:
+            with self._lock:
+                if self._queries.get(key) is query:
+                    del self._queries[key]
+            query.fail(e)
+            raise
+        with self._lock:
+            if query.generation != self._generation:
+                # Invalidated while running, must not be used by new calls.
+                if self._queries.get(key) is query:
+                    del self._queries[key]
+            deadline = self._clock() + self._ttl
+        query.finish(result, deadline)
+
+
+class _Query(object):
+
+    def __init__(self, generation):
+        self.generation = generation
+        self._done = threading.Event()
+        self._deadline = None
+        self._result = None
+        self._error = None
+
+    @property
+    def running(self):
+        return not self._done.is_set()
+
+    def expired(self, now):
+        return self._done.is_set() and now >= self._deadline
+
+    def finish(self, result, deadline):
+        self._result = result
+        self._deadline = deadline
+        self._done.set()
+
+    def fail(self, error):
+        self._error = error
+        self._deadline = 0
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+_cache = _QueryCache(config.getfloat("gluster", "cli_cache_ttl"))
+
+# Duration of gluster commands and of parsing their output, keyed by command
+# name.
+_commandTime = latency.Registry()
+_parseTime = latency.Registry()
+
+
+def _commandName(cmd):
+    """
+    Return the name of a gluster command for stats, e.g. "volume status".
+    """
+    words = [w for w in cmd[1:] if not w.startswith("--")]
+    return " ".join(words[:2])
+
+
+def _query(cmd, parse):
+    """
+    Run read only gluster command cmd, and return a copy of the result of
+    parsing the output with parse(xmltree), using the query cache.
+    """
+    return copy.deepcopy(_cachedQuery(cmd, parse))
+
+
+def _cachedQuery(cmd, parse):
+    """
+    Like _query(), but return the cached result, which must not be
+    modified.
+
+    If parse is an _Elements parser, the output is parsed while the command
+    is running.
+    """
+    name = _commandName(cmd)
+
+    def run():
+        if isinstance(parse, _Elements):
+            return _streamGlusterXml(list(cmd), parse)
+        xmltree = _runGlusterXml(list(cmd))
+        try:
+            with _parseTime.timer(name):
+                return parse(xmltree)
+        except _etreeExceptions:
+            raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
+
+    return _cache.get(name, tuple(cmd), run)
+
+
+@gluster_mgmt_api
+def cliStats():
+    """
+    Returns:
+        {'ttl': CACHE_TTL,
+         'hits': {NAME: COUNT, ...},
+         'coalesced': {NAME: COUNT, ...},
+         'commands': {NAME: LATENCY_HISTOGRAM, ...},
+         'parse': {NAME: LATENCY_HISTOGRAM, ...}}
+
+    hits is the number of calls returning a cached result, coalesced is the
+    number of calls waiting for the same running command, commands are the
+    gluster commands run, and parse is parsing of read only commands output,
+    all keyed by the command name, e.g. "volume status". Output parsed while
+    the command is running is included in the commands time.
+    """
+    stats = _cache.stats()
+    stats["ttl"] = _cache.ttl
+    stats["commands"] = _commandTime.info()
+    stats["parse"] = _parseTime.info()
+    return stats
+
+
 def _getLocalIpAddress():
     for ip in addresses.getIpAddresses():
         if not ip.startswith('127.'):
@@ -169,7 +469,8 @@ def _getGlusterHostName():
 @gluster_mgmt_api
 def hostUUIDGet():
     command = _getGlusterSystemCmd() + ["uuid", "get"]
-    rc, out, err = _execGluster(command)
+    rc, out, err = _cache.get(_commandName(command), tuple(command),
+                              lambda: _runGluster(command))
     if rc == 0:
         for line in out:
             if line.startswith('UUID: '):
@@ -179,12 +480,17 @@ def hostUUIDGet():
 
 
 def _parseVolumeStatus(tree):
-    status = {'name': tree.find('volStatus/volumes/volume/volName').text,
+    volume = tree.find('volStatus/volumes/volume')
+    return _parseVolumeStatusVolume(volume)
+
+
+def _parseVolumeStatusVolume(volume):
+    status = {'name': volume.find('volName').text,
               'bricks': [],
               'nfs': [],
               'shd': []}
     hostname = _getLocalIpAddress() or _getGlusterHostName()
-    for el in tree.findall('volStatus/volumes/volume/node'):
+    for el in volume.findall('node'):
         value = {}
 
         for ch in el.getchildren():
@@ -226,9 +532,14 @@ def _parseVolumeStatus(tree):
 
 
 def _parseVolumeStatusDetail(tree):
-    status = {'name': tree.find('volStatus/volumes/volume/volName').text,
+    volume = tree.find('volStatus/volumes/volume')
+    return _parseVolumeStatusDetailVolume(volume)
+
+
+def _parseVolumeStatusDetailVolume(volume):
+    status = {'name': volume.find('volName').text,
               'bricks': []}
-    for el in tree.findall('volStatus/volumes/volume/node'):
+    for el in volume.findall('node'):
         value = {}
 
         for ch in el.getchildren():
@@ -250,50 +561,58 @@ def _parseVolumeStatusDetail(tree):
     return status
 
 
-def _parseVolumeStatusClients(tree):
-    status = {'name': tree.find('volStatus/volumes/volume/volName').text,
-              'bricks': []}
-    for el in tree.findall('volStatus/volumes/volume/node'):
-        hostname = el.find('hostname').text
-        path = el.find('path').text
-        hostuuid = el.find('peerid').text
-
-        clientsStatus = []
-        for c in el.findall('clientsStatus/client'):
-            clientValue = {}
-            for ch in c.getchildren():
-                clientValue[ch.tag] = ch.text or ''
-            clientsStatus.append({'hostname': clientValue['hostname'],
-                                  'bytesRead': clientValue['bytesRead'],
-                                  'bytesWrite': clientValue['bytesWrite']})
-
-        status['bricks'].append({'brick': '%s:%s' % (hostname, path),
-                                 'hostuuid': hostuuid,
-                                 'clientsStatus': clientsStatus})
-    return status
+def _parseVolumeStatusClientsNode(el):
+    hostname = el.find('hostname').text
+    path = el.find('path').text
+    hostuuid = el.find('peerid').text
 
+    clientsStatus = []
+    for c in el.findall('clientsStatus/client'):
+        clientValue = {}
+        for ch in c.getchildren():
+            clientValue[ch.tag] = ch.text or ''
+        clientsStatus.append({'hostname': clientValue['hostname'],
+                              'bytesRead': clientValue['bytesRead'],
+                              'bytesWrite': clientValue['bytesWrite']})
+
+    return {'brick': '%s:%s' % (hostname, path),
+            'hostuuid': hostuuid,
+            'clientsStatus': clientsStatus}
+
+
+def _parseVolumeStatusMemNode(el):
+    brick = {'brick': '%s:%s' % (el.find('hostname').text,
+                                 el.find('path').text),
+             'hostuuid': el.find('peerid').text,
+             'mallinfo': {},
+             'mempool': []}
+
+    for ch in el.find('memStatus/mallinfo').getchildren():
+        brick['mallinfo'][ch.tag] = ch.text or ''
+
+    for c in el.findall('memStatus/mempool/pool'):
+        mempool = {}
+        for ch in c.getchildren():
+            mempool[ch.tag] = ch.text or ''
+        brick['mempool'].append(mempool)
+
+    return brick
 
-def _parseVolumeStatusMem(tree):
-    status = {'name': tree.find('volStatus/volumes/volume/volName').text,
-              'bricks': []}
-    for el in tree.findall('volStatus/volumes/volume/node'):
-        brick = {'brick': '%s:%s' % (el.find('hostname').text,
-                                     el.find('path').text),
-                 'hostuuid': el.find('peerid').text,
-                 'mallinfo': {},
-                 'mempool': []}
-
-        for ch in el.find('memStatus/mallinfo').getchildren():
-            brick['mallinfo'][ch.tag] = ch.text or ''
-
-        for c in el.findall('memStatus/mempool/pool'):
-            mempool = {}
-            for ch in c.getchildren():
-                mempool[ch.tag] = ch.text or ''
-            brick['mempool'].append(mempool)
-
-        status['bricks'].append(brick)
-    return status
+
+def _volumeStatusBricks(tree, bricks):
+    return {'name': tree.find('volStatus/volumes/volume/volName').text,
+            'bricks': bricks}
+
+
+_VOLUME_STATUS_NODE = ('volStatus', 'volumes', 'volume', 'node')
+
+# The clients and memory status may be huge, so they are parsed while the
+# command is running.
+_parseVolumeStatusClients = _Elements(
+    _VOLUME_STATUS_NODE, _parseVolumeStatusClientsNode, _volumeStatusBricks)
+
+_parseVolumeStatusMem = _Elements(
+    _VOLUME_STATUS_NODE, _parseVolumeStatusMemNode, _volumeStatusBricks)
 
 
 @gluster_mgmt_api
@@ -368,26 +687,67 @@ def volumeStatus(volumeName, brick=None, option=None):
                                    'padddedSizeOf': int,
                                    'poolMisses': int},...]}, ...]}
     """
+    if not brick and option in _ALL_VOLUMES_STATUS:
+        volumes = _allVolumesStatus(option)
+        if volumeName in volumes:
+            return copy.deepcopy(volumes[volumeName])
+
     command = _getGlusterVolCmd() + ["status", volumeName]
     if brick:
         command.append(brick)
     if option:
         command.append(option)
+    parse = _VOLUME_STATUS_PARSERS.get(option, _parseVolumeStatus)
     try:
-        xmltree = _execGlusterXml(command)
+        return _query(command, parse)
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterVolumeStatusFailedException(rc=e.rc, err=e.err)
-    try:
-        if option == 'detail':
-            return _parseVolumeStatusDetail(xmltree)
-        elif option == 'clients':
-            return _parseVolumeStatusClients(xmltree)
-        elif option == 'mem':
-            return _parseVolumeStatusMem(xmltree)
-        else:
-            return _parseVolumeStatus(xmltree)
-    except _etreeExceptions:
-        raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
+
+
+_VOLUME_STATUS_PARSERS = {
+    'detail': _parseVolumeStatusDetail,
+    'clients': _parseVolumeStatusClients,
+    'mem': _parseVolumeStatusMem,
+}
+
+# Parsers of volume status options answered from the status of all volumes.
+# Getting clients or memory status of all volumes is much more expensive than
+# getting the status of one volume, so these are not included.
+_ALL_VOLUMES_STATUS = {
+    None: _parseVolumeStatusVolume,
+    'detail': _parseVolumeStatusDetailVolume,
+}
+
+
+def _allVolumesStatus(option):
+    """
+    Return the status of all started volumes keyed by volume name, parsed
+    once and shared by all volumeStatus calls until the query cache expires.
+    Return an empty dict if the status of all volumes is not available.
+
+    A failure is cached like a result, so volumeStatus calls do not run the
+    failing command again before querying their volume.
+
+    The returned dict is shared and must not be modified.
+    """
+    command = _getGlusterVolCmd() + ["status", "all"]
+    if option:
+        command.append(option)
+    parse = _ALL_VOLUMES_STATUS[option]
+
+    def build(tree, volumes):
+        return {volume['name']: volume for volume in volumes}
+
+    elements = _Elements(('volStatus', 'volumes', 'volume'), parse, build)
+
+    def run():
+        try:
+            return _streamGlusterXml(list(command), elements)
+        except ge.GlusterException as e:
+            logging.debug("Cannot get status of all volumes: %s", e)
+            return {}
+
+    return _cache.get(_commandName(command), tuple(command), run)
 
 
 def _parseVolumeInfo(tree):
@@ -452,58 +812,68 @@ def _parseVolumeInfo(tree):
 
 
 def _parseVolumeProfileInfo(tree, nfs):
-    bricks = []
-    if nfs:
-        brickKey = 'nfs'
-        bricksKey = 'nfsServers'
-    else:
-        brickKey = 'brick'
-        bricksKey = 'bricks'
-    for brick in tree.findall('volProfile/brick'):
-        fopCumulative = []
-        blkCumulative = []
-        fopInterval = []
-        blkInterval = []
-        brickName = brick.find('brickName').text
-        if brickName == 'localhost':
-            brickName = _getLocalIpAddress() or _getGlusterHostName()
-        for block in brick.findall('cumulativeStats/blockStats/block'):
-            blkCumulative.append({'size': block.find('size').text,
-                                  'read': block.find('reads').text,
-                                  'write': block.find('writes').text})
-        for fop in brick.findall('cumulativeStats/fopStats/fop'):
-            fopCumulative.append({'name': fop.find('name').text,
-                                  'hits': fop.find('hits').text,
-                                  'latencyAvg': fop.find('avgLatency').text,
-                                  'latencyMin': fop.find('minLatency').text,
-                                  'latencyMax': fop.find('maxLatency').text})
-        for block in brick.findall('intervalStats/blockStats/block'):
-            blkInterval.append({'size': block.find('size').text,
-                                'read': block.find('reads').text,
-                                'write': block.find('writes').text})
-        for fop in brick.findall('intervalStats/fopStats/fop'):
-            fopInterval.append({'name': fop.find('name').text,
-                                'hits': fop.find('hits').text,
-                                'latencyAvg': fop.find('avgLatency').text,
-                                'latencyMin': fop.find('minLatency').text,
-                                'latencyMax': fop.find('maxLatency').text})
-        bricks.append(
-            {brickKey: brickName,
-             'cumulativeStats': {
-                 'blockStats': blkCumulative,
-                 'fopStats': fopCumulative,
-                 'duration': brick.find('cumulativeStats/duration').text,
-                 'totalRead': brick.find('cumulativeStats/totalRead').text,
-                 'totalWrite': brick.find('cumulativeStats/totalWrite').text},
-             'intervalStats': {
-                 'blockStats': blkInterval,
-                 'fopStats': fopInterval,
-                 'duration': brick.find('intervalStats/duration').text,
-                 'totalRead': brick.find('intervalStats/totalRead').text,
-                 'totalWrite': brick.find('intervalStats/totalWrite').text}})
-    status = {'volumeName': tree.find("volProfile/volname").text,
-              bricksKey: bricks}
-    return status
+    return _volumeProfileInfo(nfs)(tree)
+
+
+def _volumeProfileInfo(nfs):
+    """
+    Return parser of volume profile info output. The output may be huge,
+    so it is parsed while the command is running.
+    """
+    return _Elements(('volProfile', 'brick'),
+                     functools.partial(_parseVolumeProfileBrick, nfs=nfs),
+                     functools.partial(_volumeProfile, nfs=nfs))
+
+
+def _volumeProfile(tree, bricks, nfs):
+    bricksKey = 'nfsServers' if nfs else 'bricks'
+    return {'volumeName': tree.find("volProfile/volname").text,
+            bricksKey: bricks}
+
+
+def _parseVolumeProfileBrick(brick, nfs):
+    brickKey = 'nfs' if nfs else 'brick'
+    fopCumulative = []
+    blkCumulative = []
+    fopInterval = []
+    blkInterval = []
+    brickName = brick.find('brickName').text
+    if brickName == 'localhost':
+        brickName = _getLocalIpAddress() or _getGlusterHostName()
+    for block in brick.findall('cumulativeStats/blockStats/block'):
+        blkCumulative.append({'size': block.find('size').text,
+                              'read': block.find('reads').text,
+                              'write': block.find('writes').text})
+    for fop in brick.findall('cumulativeStats/fopStats/fop'):
+        fopCumulative.append({'name': fop.find('name').text,
+                              'hits': fop.find('hits').text,
+                              'latencyAvg': fop.find('avgLatency').text,
+                              'latencyMin': fop.find('minLatency').text,
+                              'latencyMax': fop.find('maxLatency').text})
+    for block in brick.findall('intervalStats/blockStats/block'):
+        blkInterval.append({'size': block.find('size').text,
+                            'read': block.find('reads').text,
+                            'write': block.find('writes').text})
+    for fop in brick.findall('intervalStats/fopStats/fop'):
+        fopInterval.append({'name': fop.find('name').text,
+                            'hits': fop.find('hits').text,
+                            'latencyAvg': fop.find('avgLatency').text,
+                            'latencyMin': fop.find('minLatency').text,
+                            'latencyMax': fop.find('maxLatency').text})
+    return {
+        brickKey: brickName,
+        'cumulativeStats': {
+            'blockStats': blkCumulative,
+            'fopStats': fopCumulative,
+            'duration': brick.find('cumulativeStats/duration').text,
+            'totalRead': brick.find('cumulativeStats/totalRead').text,
+            'totalWrite': brick.find('cumulativeStats/totalWrite').text},
+        'intervalStats': {
+            'blockStats': blkInterval,
+            'fopStats': fopInterval,
+            'duration': brick.find('intervalStats/duration').text,
+            'totalRead': brick.find('intervalStats/totalRead').text,
+            'totalWrite': brick.find('intervalStats/totalWrite').text}}
 
 
 @gluster_api
@@ -523,16 +893,21 @@ def volumeInfo(volumeName=None, remoteServer=None):
     command = _getGlusterVolCmd() + ["info"]
     if remoteServer:
         command += ['--remote-host=%s' % remoteServer]
+    elif volumeName:
+        # Answer from the info of all volumes, shared by all volumes.
+        try:
+            volumes = _cachedQuery(list(command), _parseVolumeInfo)
+        except ge.GlusterException as e:
+            logging.debug("Cannot get info of all volumes: %s", e)
+            volumes = {}
+        if volumeName in volumes:
+            return {volumeName: copy.deepcopy(volumes[volumeName])}
     if volumeName:
         command.append(volumeName)
     try:
-        xmltree = _execGlusterXml(command)
+        return _query(command, _parseVolumeInfo)
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterVolumesListFailedException(rc=e.rc, err=e.err)
-    try:
-        return _parseVolumeInfo(xmltree)
-    except _etreeExceptions:
-        raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
 
 
 @gluster_mgmt_api
@@ -619,7 +994,7 @@ def _parseVolumeSetHelpXml(out):
 
 @gluster_mgmt_api
 def volumeSetHelpXml():
-    rc, out, err = _execGluster(_getGlusterVolCmd() + ["set", 'help-xml'])
+    rc, out, err = _runGluster(_getGlusterVolCmd() + ["set", 'help-xml'])
     if rc:
         raise ge.GlusterVolumeSetHelpXmlFailedException(rc, out, err)
     else:
@@ -754,7 +1129,7 @@ def _parseVolumeRebalanceRemoveBrickStatus(xmltree, mode):
 def volumeRebalanceStatus(volumeName):
     command = _getGlusterVolCmd() + ["rebalance", volumeName, "status"]
     try:
-        xmltree = _execGlusterXml(command)
+        xmltree = _runGlusterXml(command)
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterVolumeRebalanceStatusFailedException(rc=e.rc,
                                                              err=e.err)
@@ -819,7 +1194,7 @@ def volumeRemoveBrickStatus(volumeName, brickList, replicaCount=0):
         command += ["replica", "%s" % replicaCount]
     command += brickList + ["status"]
     try:
-        xmltree = _execGlusterXml(command)
+        xmltree = _runGlusterXml(command)
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterVolumeRemoveBrickStatusFailedException(rc=e.rc,
                                                                err=e.err)
@@ -908,16 +1283,16 @@ def peerStatus():
         [{'hostname': HOSTNAME, 'uuid': UUID, 'status': STATE}, ...]
     """
     command = _getGlusterPeerCmd() + ["status"]
+
+    def parse(tree):
+        return _parsePeerStatus(tree,
+                                _getLocalIpAddress() or _getGlusterHostName(),
+                                hostUUIDGet(), HostStatus.CONNECTED)
+
     try:
-        xmltree = _execGlusterXml(command)
+        return _query(command, parse)
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterHostsListFailedException(rc=e.rc, err=e.err)
-    try:
-        return _parsePeerStatus(xmltree,
-                                _getLocalIpAddress() or _getGlusterHostName(),
-                                hostUUIDGet(), HostStatus.CONNECTED)
-    except _etreeExceptions:
-        raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
 
 
 @gluster_mgmt_api
@@ -1002,13 +1377,9 @@ def volumeProfileInfo(volumeName, nfs=False):
     if nfs:
         command += ["nfs"]
     try:
-        xmltree = _execGlusterXml(command)
+        return _streamGlusterXml(command, _volumeProfileInfo(nfs))
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterVolumeProfileInfoFailedException(rc=e.rc, err=e.err)
-    try:
-        return _parseVolumeProfileInfo(xmltree, nfs)
-    except _etreeExceptions:
-        raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
 
 
 def _parseVolumeTasks(tree):
@@ -1050,13 +1421,9 @@ def _parseVolumeTasks(tree):
 def volumeTasks(volumeName="all"):
     command = _getGlusterVolCmd() + ["status", volumeName, "tasks"]
     try:
-        xmltree = _execGlusterXml(command)
+        return _query(command, _parseVolumeTasks)
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterVolumeTasksFailedException(rc=e.rc, err=e.err)
-    try:
-        return _parseVolumeTasks(xmltree)
-    except _etreeExceptions:
-        raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
 
 
 @gluster_mgmt_api
@@ -1192,13 +1559,9 @@ def volumeGeoRepStatus(volumeName=None, remoteHost=None,
     command.append("status")
 
     try:
-        xmltree = _execGlusterXml(command)
+        return _query(command, _parseGeoRepStatus)
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterGeoRepStatusFailedException(rc=e.rc, err=e.err)
-    try:
-        return _parseGeoRepStatus(xmltree)
-    except _etreeExceptions:
-        raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
 
 
 @gluster_mgmt_api
@@ -1533,7 +1896,7 @@ def snapshotInfo(volumeName=None):
     if volumeName:
         command += ["volume", volumeName]
     try:
-        xmltree = _execGlusterXml(command)
+        xmltree = _runGlusterXml(command)
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterSnapshotInfoFailedException(rc=e.rc, err=e.err)
     try:
@@ -30,6 +30,7 @@ from vdsm import metrics
 from vdsm.common import hooks
 from vdsm.common.define import Kbytes, Mbytes
 from vdsm.config import config
+from vdsm.virt import migration
 from vdsm.virt import vmstatus
 
 haClient = None
@@ -61,6 +62,20 @@ def get_stats(cif, sample, multipath=False):
     for var in decStats:
         ret[var] = utils.convertToStr(decStats[var])
 
+    if cif.irs:
+        pools = cif.irs.thread_pool_stats()
+        del pools['status']
+        ret['storageThreadPools'] = pools
+        cache = cif.irs.sd_cache_stats()
+        del cache['status']
+        ret['storageDomainCache'] = cache
+        copies = cif.irs.copy_scheduler_stats()
+        del copies['status']
+        ret['storageCopies'] = copies
+
+    ret['qemuGuestAgent'] = cif.qga_poller.stats()
+    ret['migrationBandwidth'] = migration.bandwidth_allocator.stats()
+
     avail, commit = _memUsageInfo(cif)
     ret['memAvailable'] = avail // Mbytes
     ret['memCommitted'] = commit // Mbytes
@@ -95,6 +110,7 @@ def send_metrics(hoststats):
             dom_info = hoststats['storageDomains'][dom]
             data[storage_prefix + '.delay'] = dom_info['delay']
             data[storage_prefix + '.last_check'] = dom_info['lastCheck']
+            data[storage_prefix + '.check_delay'] = dom_info['checkDelay']
 
         metrics.send(data)
     except KeyError:
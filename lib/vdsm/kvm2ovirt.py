@@ -18,15 +18,18 @@
 #
 
 from __future__ import absolute_import
+from __future__ import division
 
 import argparse
-from contextlib import contextmanager
+import collections
 import itertools
 import libvirt
 import sys
 import os
 import threading
 
+import six
+
 from ovirt_imageio_common import directio
 
 from vdsm.common import concurrent
@@ -34,8 +37,20 @@ from vdsm.common import libvirtconnection
 from vdsm.common import time
 from vdsm.common.password import ProtectedPassword
 
+MiB = 1024**2
+
+# Buffers are aligned to the storage block size for direct I/O.
+BUFFER_ALIGNMENT = 4096
+
+# Largest buffer used for copying large disks. libvirt limits blockPeek to 4
+# MiB.
+MAX_BUFFER_SIZE = 4 * MiB
+
 _start = None
 
+# Serializes output from the main thread and the copy threads.
+_output_lock = threading.Lock()
+
 
 class VMAdapter(object):
     def __init__(self, vm, src):
@@ -62,21 +77,49 @@ class StreamAdapter(object):
 
 
 class Sparseness(object):
-    def __init__(self, opaque, estimated_size):
+    def __init__(self, opaque):
         self.done = 0
         self.opaque = opaque
-        self.estimated_size = estimated_size
+
+
+class DiskCopy(object):
+    """
+    Copy of one source disk, run by a copy thread and reported by the main
+    thread.
+    """
+
+    def __init__(self, diskno, src, dst, fmt):
+        self.diskno = diskno
+        self.src = src
+        self.dst = dst
+        self.fmt = fmt
+        # Set when the copy starts; op.done is the number of bytes copied.
+        self.op = None
+        self.estimated_size = None
+        self.done = threading.Event()
+        self.error = None
+
+    @property
+    def copied(self):
+        op = self.op
+        return 0 if op is None else op.done
+
+    @property
+    def progress(self):
+        if not self.estimated_size:
+            return 0
+        return min(99, self.copied * 100 // self.estimated_size)
 
 
 def bytesWriteHandler(stream, buf, opaque):
     fd = opaque.opaque
-    return os.write(fd, buf)
+    written = os.write(fd, buf)
+    opaque.done += written
+    return written
 
 
 def recvSkipHandler(stream, length, opaque):
     opaque.done += length
-    progress = min(99, opaque.done * 100 // opaque.estimated_size)
-    write_progress(progress)
     fd = opaque.opaque
     cur = os.lseek(fd, length, os.SEEK_CUR)
     return os.ftruncate(fd, cur)
@@ -102,6 +145,9 @@ def arguments(args):
     parser.add_argument('--bufsize', dest='bufsize', default=1048576,
                         type=int, help='Size of packets in bytes, default'
                         '1048676')
+    parser.add_argument('--jobs', dest='jobs', default=1, type=int,
+                        help='Number of disks copied concurrently, '
+                        'default 1')
     parser.add_argument('--verbose', action='store_true',
                         help='verbose output')
     parser.add_argument('--allocation', dest='allocation', default='',
@@ -111,54 +157,60 @@ def arguments(args):
 
 
 def write_output(msg):
-    sys.stdout.write('[%7.1f] %s\n' % (time.monotonic_time() - _start, msg))
-    sys.stdout.flush()
+    with _output_lock:
+        sys.stdout.write('[%7.1f] %s\n' %
+                         (time.monotonic_time() - _start, msg))
+        sys.stdout.flush()
 
 
 def write_error(e):
     write_output("ERROR: %s" % e)
 
 
-def write_progress(progress):
-    sys.stdout.write('    (%d/100%%)\r' % progress)
-    sys.stdout.flush()
-
-
-def volume_progress(op, done, estimated_size):
-    while op.done < estimated_size:
-        progress = min(99, op.done * 100 // estimated_size)
-        write_progress(progress)
-        if done.wait(1):
-            break
-    write_progress(100)
-
-
-@contextmanager
-def progress(op, estimated_size):
-    done = threading.Event()
-    th = concurrent.thread(volume_progress, args=(op, done, estimated_size))
-    th.start()
-    try:
-        yield th
-    finally:
-        done.set()
-        th.join()
-
-
-def download_disk(adapter, estimated_size, size, dest, bufsize):
+def write_progress(progress, throughput=None):
+    """
+    Write disk progress, parsed by v2v.OutputParser. throughput is the
+    throughput of all disks in MiB/s.
+    """
+    if throughput is None:
+        msg = '    (%d/100%%)\r' % progress
+    else:
+        msg = '    (%d/100%%, %.1f MiB/s)\r' % (progress, throughput)
+    with _output_lock:
+        sys.stdout.write(msg)
+        sys.stdout.flush()
+
+
+def buffer_size(bufsize, size):
+    """
+    Return the aligned buffer size for copying a disk of size bytes.
+
+    Large disks are copied using larger buffers, 1 MiB per GiB up to
+    MAX_BUFFER_SIZE, using less reads and writes. Small disks are copied
+    using a buffer not larger than the disk.
+    """
+    if size:
+        bufsize = max(bufsize, min(size // 1024, MAX_BUFFER_SIZE))
+        bufsize = min(bufsize, size)
+    return (bufsize + BUFFER_ALIGNMENT - 1) // BUFFER_ALIGNMENT * \
+        BUFFER_ALIGNMENT
+
+
+def download_disk(copy, adapter, size, dest, bufsize):
     op = directio.Receive(dest, adapter, size=size, buffersize=bufsize)
-    with progress(op, estimated_size):
-        op.run()
+    copy.op = op
+    op.run()
     adapter.finish()
 
 
-def download_disk_sparse(stream, estimated_size, size, dest, bufsize):
+def download_disk_sparse(copy, stream, dest):
     fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
-    op = Sparseness(fd, estimated_size)
-    with progress(op, estimated_size):
-        stream.sparseRecvAll(bytesWriteHandler, recvSkipHandler, op)
-    stream.finish()
-    os.close(fd)
+    try:
+        copy.op = Sparseness(fd)
+        stream.sparseRecvAll(bytesWriteHandler, recvSkipHandler, copy.op)
+        stream.finish()
+    finally:
+        os.close(fd)
 
 
 def get_password(options):
@@ -171,16 +223,14 @@ def get_password(options):
         return ProtectedPassword(f.read())
 
 
-def handle_volume(con, diskno, src, dst, options):
-    write_output('Copying disk %d/%d to %s' % (diskno, len(options.source),
-                                               dst))
-    vol = con.storageVolLookupByPath(src)
+def handle_volume(con, copy, options):
+    vol = con.storageVolLookupByPath(copy.src)
     _, capacity, allocation = vol.info()
     if options.verbose:
         write_output('>>> disk %d, capacity: %d allocation %d' %
-                     (diskno, capacity, allocation))
+                     (copy.diskno, capacity, allocation))
 
-    estimated_size = capacity
+    copy.estimated_size = capacity
     stream = con.newStream()
     preallocated = True
 
@@ -192,8 +242,7 @@ def handle_volume(con, diskno, src, dst, options):
                          libvirt.VIR_STORAGE_VOL_DOWNLOAD_SPARSE_STREAM)
             # No need to pass the size, volume download will return -1
             # when the stream finishes
-            download_disk_sparse(stream, estimated_size, None, dst,
-                                 options.bufsize)
+            download_disk_sparse(copy, stream, copy.dst)
         except libvirt.libvirtError:
             preallocated = True
             write_output('WARN: sparseness is not supported')
@@ -203,22 +252,83 @@ def handle_volume(con, diskno, src, dst, options):
         sr = StreamAdapter(stream)
         # No need to pass the size, volume download will return -1
         # when the stream finishes
-        download_disk(sr, estimated_size, None, dst, options.bufsize)
+        download_disk(copy, sr, None, copy.dst,
+                      buffer_size(options.bufsize, capacity))
 
 
-def handle_path(con, diskno, src, dst, options):
-    write_output('Copying disk %d/%d to %s' % (diskno, len(options.source),
-                                               dst))
+def handle_path(con, copy, options):
     vm = con.lookupByName(options.vmname)
-    info = vm.blockInfo(src)
+    info = vm.blockInfo(copy.src)
     physical = info[2]
     if options.verbose:
         capacity = info[0]
         write_output('>>> disk %d, capacity: %d physical %d' %
-                     (diskno, capacity, physical))
-
-    vmAdapter = VMAdapter(vm, src)
-    download_disk(vmAdapter, physical, physical, dst, options.bufsize)
+                     (copy.diskno, capacity, physical))
+
+    copy.estimated_size = physical
+    vmAdapter = VMAdapter(vm, copy.src)
+    download_disk(copy, vmAdapter, physical, copy.dst,
+                  buffer_size(options.bufsize, physical))
+
+
+def copy_disks(con, copies, options):
+    """
+    Copy disks using up to options.jobs copy threads, and report the
+    progress of every disk, one disk after another, as expected by
+    v2v.OutputParser. Every progress report includes the throughput of all
+    disks.
+    """
+    pending = collections.deque(copies)
+    failed = threading.Event()
+
+    def run():
+        while not failed.is_set():
+            try:
+                copy = pending.popleft()
+            except IndexError:
+                return
+            try:
+                if copy.fmt == 'volume':
+                    handle_volume(con, copy, options)
+                elif copy.fmt == 'path':
+                    handle_path(con, copy, options)
+            except Exception:
+                copy.error = sys.exc_info()
+                failed.set()
+            finally:
+                copy.done.set()
+
+    threads = [concurrent.thread(run, name='kvm2ovirt/%d' % i)
+               for i in range(min(options.jobs, len(copies)))]
+    start = time.monotonic_time()
+    for t in threads:
+        t.start()
+
+    def throughput():
+        elapsed = time.monotonic_time() - start
+        if elapsed <= 0:
+            return 0.0
+        return sum(c.copied for c in copies) / elapsed / MiB
+
+    def check_errors():
+        # Fail as soon as any disk failed; other copy threads are not
+        # waited for.
+        if failed.is_set():
+            for c in copies:
+                if c.error is not None:
+                    six.reraise(*c.error)
+
+    for copy in copies:
+        write_output('Copying disk %d/%d to %s' % (copy.diskno, len(copies),
+                                                   copy.dst))
+        while not copy.done.wait(1):
+            check_errors()
+            write_progress(copy.progress, throughput())
+        check_errors()
+        write_progress(100, throughput())
+
+    for t in threads:
+        t.join()
 
 
 def validate_disks(options):
@@ -235,6 +345,9 @@ def validate_disks(options):
         write_output('>>> unsupported allocation policy. (supported: sparse, '
                      'preallocated)')
         sys.exit(1)
+    elif options.jobs < 1:
+        write_output('>>> jobs must be at least 1')
+        sys.exit(1)
 
 
 def main(argv=None):
@@ -250,10 +363,7 @@ def main(argv=None):
 
     write_output('preparing for copy')
     disks = itertools.izip(options.source, options.dest, options.storagetype)
-    for diskno, (src, dst, fmt) in enumerate(disks, start=1):
-        if fmt == 'volume':
-            handle_volume(con, diskno, src, dst, options)
-        elif fmt == 'path':
-            handle_path(con, diskno, src, dst, options)
-        diskno = diskno + 1
+    copies = [DiskCopy(diskno, src, dst, fmt)
+              for diskno, (src, dst, fmt) in enumerate(disks, start=1)]
+    copy_disks(con, copies, options)
     write_output('Finishing off')
@@ -633,6 +633,31 @@ class BufferedReader(asyncore.file_dispatcher):
         return False
 
 
+class LineReader(BufferedReader):
+    """
+    Read lines from file until file is closed, invoking a callback for every
+    complete line, and notify when the file was closed.
+    """
+
+    def __init__(self, fd, handle_line, complete, bufsize=4096, map=None):
+        BufferedReader.__init__(self, fd, complete, bufsize=bufsize, map=map)
+        self._handle_line = handle_line
+
+    def handle_read(self):
+        chunk = self.socket.read(self._bufsize)
+        if not chunk:
+            self.handle_close()
+            return
+        self._data += chunk
+        if b"\n" not in chunk:
+            return
+        lines = self._data.split(b"\n")
+        # The last item is an incomplete line, or empty.
+        self._data = lines.pop()
+        for line in lines:
+            self._handle_line(bytes(line))
+
+
 class Reaper(object):
     """
     Wait for process and notify when it has terminated.
@@ -22,6 +22,7 @@ from __future__ import absolute_import
 
 import os
 import logging
+import threading
 
 from vdsm import constants
 from vdsm import utils
@@ -34,8 +35,9 @@ from vdsm.storage import constants as sc
 from vdsm.storage import directio
 from vdsm.storage import exception as se
 from vdsm.storage import lvm
-from vdsm.storage import misc
+from vdsm.storage import mdcache
 from vdsm.storage import qemuimg
+from vdsm.storage import resourceFactories
 from vdsm.storage import resourceManager as rm
 from vdsm.storage import task
 from vdsm.storage import volume
@@ -52,6 +54,9 @@ QCOW_OVERHEAD_FACTOR = 1.1
 # Minimal padding to be added to internal volume optimal size.
 MIN_PADDING = constants.MEGAB
 
+# Set while the current thread is preparing a chain.
+_preparing = threading.local()
+
 log = logging.getLogger('storage.Volume')
 
 
@@ -104,9 +109,8 @@ class BlockVolumeManifest(volume.VolumeManifest):
         _, offs = metaId
         sd = sdCache.produce_manifest(self.sdUUID)
         try:
-            lines = misc.readblock(sd.metadata_volume_path(),
-                                   offs * sc.METADATA_SIZE,
-                                   sc.METADATA_SIZE)
+            lines = mdcache.read_slot(self.sdUUID, sd.metadata_volume_path(),
+                                      offs)
         except Exception as e:
             self.log.error(e, exc_info=True)
             raise se.VolumeMetadataReadError("%s: %s" % (metaId, e))
@@ -245,9 +249,12 @@ class BlockVolumeManifest(volume.VolumeManifest):
 
         sd = sdCache.produce_manifest(vgname)
         metavol = sd.metadata_volume_path()
-        with directio.DirectFile(metavol, "r+") as f:
-            f.seek(offs * sc.METADATA_SIZE)
-            f.write(data)
+        try:
+            with directio.DirectFile(metavol, "r+") as f:
+                f.seek(offs * sc.METADATA_SIZE)
+                f.write(data)
+        finally:
+            mdcache.invalidate(vgname, offs)
 
     def changeVolumeTag(self, tagPrefix, uuid):
 
@@ -366,6 +373,50 @@ class BlockVolumeManifest(volume.VolumeManifest):
 
         return alloc_size
 
+    def prepare(self, rw=True, justme=False,
+                chainrw=False, setrw=False, force=False):
+        """
+        Prepare volume for use by consumer.
+        If justme is false, the entire COW chain is prepared.
+
+        The LVs of the chain are activated together after acquiring all the
+        chain activation resources, and the chain metadata is read from the
+        metadata cache.
+        """
+        if getattr(_preparing, "chain", False):
+            # Preparing the parent of a volume; the chain is ready.
+            return volume.VolumeManifest.prepare(
+                self, rw=rw, justme=justme, chainrw=chainrw, setrw=setrw,
+                force=force)
+
+        _preparing.chain = True
+        try:
+            with mdcache.cached(self.sdUUID), \
+                    utils.stopwatch("Prepared volume %s/%s"
+                                    % (self.sdUUID, self.volUUID),
+                                    log=self.log):
+                with resourceFactories.activation_batch(self.sdUUID):
+                    res = volume.VolumeManifest.prepare(
+                        self, rw=rw, justme=justme, chainrw=chainrw,
+                        setrw=setrw, force=force)
+                    try:
+                        resourceFactories.activate_pending(self.sdUUID)
+                    except Exception:
+                        self.teardown(self.sdUUID, self.volUUID,
+                                      justme=justme)
+                        raise
+                    return res
+        finally:
+            _preparing.chain = False
+
+    def updateInvalidatedSize(self):
+        # Inside a chain preparation the LV is activated after acquiring the
+        # resources of the entire chain, but reading the size requires an
+        # active LV.
+        if int(self.getMetaParam(sc.SIZE)) < 1:
+            resourceFactories.activate_pending(self.sdUUID)
+        volume.VolumeManifest.updateInvalidatedSize(self)
+
     def llPrepare(self, rw=False, setrw=False):
         """
         Perform low level volume use preparation
@@ -381,6 +432,9 @@ class BlockVolumeManifest(volume.VolumeManifest):
         activation = rm.acquireResource(self.lvmActivationNamespace,
                                         self.volUUID, access)
         activation.autoRelease = False
+        # The resource may have been created by another thread preparing a
+        # chain, before activating the LV.
+        activation.activate()
 
     @classmethod
     def teardown(cls, sdUUID, volUUID, justme=False):
@@ -389,6 +443,11 @@ class BlockVolumeManifest(volume.VolumeManifest):
         Volume deactivation occurs as part of resource releasing.
         If justme is false, the entire COW chain should be torn down.
         """
+        with resourceFactories.deactivation_batch(sdUUID):
+            cls._teardown(sdUUID, volUUID, justme)
+
+    @classmethod
+    def _teardown(cls, sdUUID, volUUID, justme):
         cls.log.info("Tearing down volume %s/%s justme %s"
                      % (sdUUID, volUUID, justme))
         lvmActivationNamespace = rm.getNamespace(sc.LVM_ACTIVATION_NAMESPACE,
@@ -406,7 +465,7 @@ class BlockVolumeManifest(volume.VolumeManifest):
                              % (sdUUID, volUUID, e))
 
             if pvolUUID != sc.BLANK_UUID:
-                cls.teardown(sdUUID=sdUUID, volUUID=pvolUUID, justme=False)
+                cls._teardown(sdUUID, pvolUUID, False)
 
     def optimal_size(self):
         """
@@ -27,18 +27,25 @@ CheckService     entry point for starting and stopping path checkers.
 DirectioChecker  checker using dd process for file or block based
                  volumes.
 
+HelperChecker    checker using the check helper process, shared by all
+                 checkers.
+
 CheckResult      result object provided to user callback on each check.
 """
 
 from __future__ import absolute_import
 
+import itertools
 import logging
+import os
 import re
+import sys
 import threading
 
 from vdsm.common import constants
 from vdsm.common import cmdutils
 from vdsm.common import concurrent
+from vdsm.common import osutils
 from vdsm.common.compat import subprocess
 from vdsm.storage import asyncevent
 from vdsm.storage import asyncutils
@@ -75,14 +82,17 @@ class CheckService(object):
 
         service.stop()
 
+    If use_helper is True, all paths are checked by one long lived helper
+    process, instead of starting a dd process for every check.
     """
 
-    def __init__(self):
+    def __init__(self, use_helper=False):
         self._lock = threading.Lock()
         self._loop = asyncevent.EventLoop()
         self._thread = concurrent.thread(self._loop.run_forever,
                                          name="check/loop")
         self._checkers = {}
+        self._helper = CheckHelper(self._loop) if use_helper else None
 
     def start(self):
         """
@@ -106,6 +116,8 @@ class CheckService(object):
             for checker in self._checkers.values():
                 self._loop.call_soon_threadsafe(checker.stop)
             self._checkers.clear()
+            if self._helper:
+                self._loop.call_soon_threadsafe(self._helper.stop)
             self._loop.call_soon_threadsafe(self._loop.stop)
             self._thread.join()
             self._loop.close()
@@ -122,8 +134,12 @@ class CheckService(object):
         with self._lock:
             if path in self._checkers:
                 raise RuntimeError("Already checking path %r" % path)
-            checker = DirectioChecker(self._loop, path, complete,
-                                      interval=interval)
+            if self._helper:
+                checker = HelperChecker(self._loop, self._helper, path,
+                                        complete, interval=interval)
+            else:
+                checker = DirectioChecker(self._loop, path, complete,
+                                          interval=interval)
             self._checkers[path] = checker
         self._loop.call_soon_threadsafe(checker.start)
 
@@ -373,6 +389,128 @@ class DirectioChecker(object):
         return "<%s at 0x%x>" % (" ".join(info), id(self))
 
 
+class HelperChecker(DirectioChecker):
+    """
+    Check path availability using direct I/O in the check helper process.
+
+    Works exactly like DirectioChecker, but instead of starting a dd process
+    for every check, sends a request to the helper process shared by all
+    checkers. When the helper process is busy, self._proc holds the id of
+    the pending request.
+    """
+
+    def __init__(self, loop, helper, path, complete, interval=10.0):
+        super(HelperChecker, self).__init__(loop, path, complete,
+                                            interval=interval)
+        self._helper = helper
+
+    def _start_process(self):
+        self._proc = self._helper.submit(self._path, self._reply_received)
+
+    def _reply_received(self, rc, err):
+        assert self._state is not IDLE
+        self._err = err
+        self._check_completed(rc)
+
+
+class CheckHelper(object):
+    """
+    Manage the check helper process (see vdsm.storage.checkhelper).
+
+    The helper is started on the first request, and started again on the
+    next request if it has terminated.
+
+    Not thread safe; must be used only from the event loop thread.
+    """
+
+    HELPER_MODULE = "vdsm.storage.checkhelper"
+
+    log = logging.getLogger("storage.checkhelper")
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._proc = None
+        self._reader = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+
+    def submit(self, path, complete):
+        """
+        Send a request to check path. When the check completes, complete is
+        invoked with the exit code and error output, as dd would report.
+
+        Returns the request id (int > 0).
+        """
+        if self._proc is None:
+            self._start()
+        req_id = next(self._ids)
+        line = "%d %s\n" % (req_id, path)
+        osutils.uninterruptible(os.write, self._proc.stdin.fileno(),
+                                line.encode("utf-8"))
+        self._pending[req_id] = complete
+        return req_id
+
+    def stop(self):
+        """
+        Stop the helper process without waiting for it, since pending reads
+        may be blocked on inaccessible storage. The helper exits when its
+        stdin is closed. Fail all pending requests.
+        """
+        if self._proc is None:
+            return
+        self.log.debug("Stopping check helper (pid=%s)", self._proc.pid)
+        self._reader.close()
+        self._reader = None
+        self._proc.stdout.close()
+        self._proc.stdin.close()
+        self._proc = None
+        self._fail_pending(b"Check helper stopped")
+
+    def _start(self):
+        cmd = [sys.executable, "-m", self.HELPER_MODULE]
+        cmd = cmdutils.wrap_command(cmd)
+        self._proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=None)
+        self._reader = self._loop.create_dispatcher(
+            asyncevent.LineReader, self._proc.stdout, self._line_received,
+            self._helper_exited)
+        self.log.info("Check helper started (pid=%s)", self._proc.pid)
+
+    def _line_received(self, line):
+        req_id, rc, err = line.split(b" ", 2)
+        complete = self._pending.pop(int(req_id), None)
+        if complete is None:
+            self.log.warning("Dropping reply for unknown request %s", req_id)
+            return
+        complete(int(rc), err)
+
+    def _helper_exited(self, data):
+        """
+        Called when the helper closed stdout. Fail all pending requests; the
+        helper will be started again on the next request.
+        """
+        proc = self._proc
+        self.log.warning("Check helper terminated (pid=%s)", proc.pid)
+        self._proc = None
+        self._reader = None
+        proc.stdout.close()
+        proc.stdin.close()
+        asyncevent.Reaper(self._loop, proc, self._helper_reaped)
+        self._fail_pending(b"Check helper terminated")
+
+    def _fail_pending(self, err):
+        pending = self._pending
+        self._pending = {}
+        for complete in pending.values():
+            try:
+                complete(EXEC_ERROR, err)
+            except Exception:
+                self.log.exception("Unhandled error in complete callback")
+
+    def _helper_reaped(self, rc):
+        self.log.debug("Check helper exited with rc=%s", rc)
+
+
 class CheckResult(object):
 
     _PATTERN = re.compile(br".*, ([\de\-.]+) s,[^,]+")
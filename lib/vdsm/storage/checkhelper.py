@@ -0,0 +1,167 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Helper process checking storage paths using direct I/O.
+
+The helper is started by check.CheckHelper and serves all the checkers,
+instead of starting a dd process for every check.
+
+Requests are read from stdin, one per line:
+
+    <id> <path>
+
+For every request, the helper reads the first block of path using direct I/O
+and writes a reply to stdout:
+
+    <id> <rc> <message>
+
+On success rc is 0, and message reports the read statistics in the format
+used by dd, so check.CheckResult can parse it. On failure rc is 1, and
+message describes the error.
+
+Every path is read by its own thread, so a read blocked on inaccessible
+storage does not delay reads from other paths. The helper exits when stdin is
+closed.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+import io
+import mmap
+import os
+import sys
+import threading
+import time
+
+from contextlib import closing
+
+from six.moves import queue
+
+from vdsm.common import concurrent
+from vdsm.common import osutils
+
+BLOCK_SIZE = 4096
+
+# A reader thread for a path that was not checked for this time exits.
+IDLE_TIMEOUT = 300
+
+
+def main():
+    Helper(sys.stdin, sys.stdout).run()
+
+
+class Helper(object):
+
+    def __init__(self, input, output, idle_timeout=IDLE_TIMEOUT):
+        self._input = input
+        self._output = output
+        self._idle_timeout = idle_timeout
+        self._output_lock = threading.Lock()
+        # Protects self._readers.
+        self._lock = threading.Lock()
+        self._readers = {}
+
+    def run(self):
+        # Iterating over a file in python 2 reads ahead, blocking until the
+        # read-ahead buffer is full.
+        for line in iter(self._input.readline, ""):
+            req_id, path = line.rstrip("\n").split(" ", 1)
+            self._submit(req_id, path)
+
+    def _submit(self, req_id, path):
+        with self._lock:
+            reader = self._readers.get(path)
+            if reader is None:
+                reader = _Reader(self, path)
+                self._readers[path] = reader
+                reader.start()
+            reader.queue.put(req_id)
+
+    def _reader_idle(self, reader):
+        """
+        Called by an idle reader. Returns True if the reader should exit.
+        """
+        with self._lock:
+            if not reader.queue.empty():
+                return False
+            del self._readers[reader.path]
+            return True
+
+    def _send_reply(self, req_id, rc, message):
+        line = "%s %d %s\n" % (req_id, rc, message.replace("\n", " "))
+        with self._output_lock:
+            self._output.write(line)
+            self._output.flush()
+
+
+class _Reader(object):
+
+    def __init__(self, helper, path):
+        self.helper = helper
+        self.path = path
+        self.queue = queue.Queue()
+        # A daemon thread, so we do not wait for readers blocked on
+        # inaccessible storage on exit.
+        self._thread = concurrent.thread(self._run, name="check/reader")
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                req_id = self.queue.get(timeout=self.helper._idle_timeout)
+            except queue.Empty:
+                if self.helper._reader_idle(self):
+                    return
+                continue
+            try:
+                message = read_stats(self.path)
+            except EnvironmentError as e:
+                self.helper._send_reply(
+                    req_id, 1, "error reading %r: %s" % (self.path, e))
+            else:
+                self.helper._send_reply(req_id, 0, message)
+
+
+def read_stats(path):
+    """
+    Read the first block of path using direct I/O, and return the read
+    statistics in the format used by dd.
+    """
+    # mmap buffer is page aligned, as required for direct I/O.
+    buf = mmap.mmap(-1, BLOCK_SIZE)
+    with closing(buf):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECT)
+        with io.FileIO(fd, "r", closefd=True) as f:
+            # monotonic_time() resolution is too low for timing a read.
+            start = time.time()
+            nread = osutils.uninterruptible(f.readinto, buf)
+            elapsed = time.time() - start
+    if elapsed > 0:
+        rate = "%.1f MB/s" % (nread / elapsed / 1000**2)
+    else:
+        rate = "Infinity B/s"
+    return "%d bytes copied, %.6f s, %s" % (nread, elapsed, rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+qemu-img convert profiles for storage domain types.
+
+The best qemu-img convert options depend on the storage. Block storage
+benefits from many concurrent requests, while file storage may need less.
+A profile is configured in vdsm.conf for every kind of storage domain,
+using the [irs] convert_profile_<kind> options:
+
+    [irs]
+    convert_profile_block = coroutines=16
+    convert_profile_nfs = coroutines=8,cache=none,src_cache=none
+
+Supported profile keys:
+
+    coroutines      Number of parallel coroutines (qemu-img convert -m), 1-16.
+    cache           Cache mode of the destination (qemu-img convert -t).
+    src_cache       Cache mode of the source (qemu-img convert -T).
+    sparse_size     Minimal size of zeroed data considered as sparse
+                    (qemu-img convert -S), for example 4k.
+
+When copying between domains, coroutines, cache and sparse_size are taken
+from the destination domain profile, and src_cache from the source domain
+profile.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+import logging
+import re
+
+from collections import namedtuple
+
+from vdsm.config import config
+from vdsm.storage import sd
+
+BLOCK = "block"
+NFS = "nfs"
+GLUSTER = "gluster"
+LOCAL = "local"
+POSIX = "posix"
+
+KINDS = (BLOCK, NFS, GLUSTER, LOCAL, POSIX)
+
+CACHE_MODES = ("none", "writeback", "writethrough", "directsync", "unsafe")
+
+MAX_COROUTINES = 16
+
+_SPARSE_SIZE = re.compile(r"^\d+[kKmM]?$")
+
+log = logging.getLogger("storage.convertprofile")
+
+Profile = namedtuple("Profile", "coroutines, cache, src_cache, sparse_size")
+
+DEFAULT = Profile(coroutines=None, cache="none", src_cache="none",
+                  sparse_size=None)
+
+
+def convert_options(src_dom, dst_dom):
+    """
+    Return dict of qemuimg.convert() keyword arguments for copying from
+    src_dom to dst_dom.
+    """
+    src = profile(domain_kind(src_dom))
+    dst = profile(domain_kind(dst_dom))
+    return {
+        "coroutines": dst.coroutines,
+        "cache": dst.cache,
+        "src_cache": src.src_cache,
+        "sparse_size": dst.sparse_size,
+    }
+
+
+def domain_kind(dom):
+    """
+    Return the profile kind of storage domain dom.
+    """
+    dom_type = dom.getStorageType()
+    if dom_type in sd.BLOCK_DOMAIN_TYPES:
+        return BLOCK
+    if dom_type == sd.NFS_DOMAIN:
+        return NFS
+    if dom_type == sd.GLUSTERFS_DOMAIN:
+        return GLUSTER
+    if dom_type == sd.LOCALFS_DOMAIN:
+        return LOCAL
+    return POSIX
+
+
+def profile(kind):
+    """
+    Return the configured profile for kind. If the configuration is invalid,
+    log an error and return the default profile.
+    """
+    value = config.get("irs", "convert_profile_" + kind)
+    try:
+        return parse(value)
+    except ValueError as e:
+        log.error("Invalid convert profile %s %r, using defaults: %s",
+                  kind, value, e)
+        return DEFAULT
+
+
+def parse(value):
+    """
+    Parse profile string "key=value,..." and return a Profile. Keys missing
+    in value are taken from the default profile.
+
+    Raises ValueError if value is invalid.
+    """
+    params = DEFAULT._asdict()
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, sep, val = item.partition("=")
+        key = key.strip()
+        val = val.strip()
+        if not sep or not val:
+            raise ValueError("Invalid item %r" % item)
+        if key not in params:
+            raise ValueError("Unknown key %r" % key)
+        params[key] = _validate(key, val)
+    return Profile(**params)
+
+
+def _validate(key, val):
+    if key == "coroutines":
+        n = int(val)
+        if not 1 <= n <= MAX_COROUTINES:
+            raise ValueError("Invalid coroutines %d, expecting value between "
+                             "1 and %d" % (n, MAX_COROUTINES))
+        return n
+    if key in ("cache", "src_cache"):
+        if val not in CACHE_MODES:
+            raise ValueError("Invalid %s %r, expecting one of %s"
+                             % (key, val, ", ".join(CACHE_MODES)))
+        return val
+    if key == "sparse_size":
+        if not _SPARSE_SIZE.match(val):
+            raise ValueError("Invalid sparse_size %r" % val)
+        return val
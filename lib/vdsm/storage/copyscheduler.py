@@ -0,0 +1,227 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Host wide scheduling of storage copy operations.
+
+Moving and copying images and sdm copy_data jobs run qemu-img processes
+sharing the same storage links. When many copies are started at the same
+time, they compete with each other and with running VMs.
+
+The scheduler limits the number of concurrent copies and the total bandwidth
+they may use. Every copy has a weight; a copy with weight 2 uses 2 copy
+slots, and gets twice the bandwidth of a copy with weight 1. The bandwidth
+is enforced by pausing qemu-img when a copy is ahead of its share.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+import logging
+import threading
+import time
+
+from contextlib import contextmanager
+
+from vdsm.common import exception
+from vdsm.common.time import monotonic_time
+from vdsm.config import config
+
+# Recompute the delay of a paused copy at least every MAX_PAUSE seconds, so
+# changes in the number of active copies are noticed quickly.
+MAX_PAUSE = 1.0
+
+log = logging.getLogger("storage.copyscheduler")
+
+_lock = threading.Lock()
+_scheduler = None
+
+
+def scheduler():
+    """
+    Return the host scheduler, configured by vdsm.conf.
+    """
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(
+                config.getint("irs", "copy_max_slots"),
+                bandwidth=config.getint("irs", "copy_max_bandwidth") * 1024**2)
+        return _scheduler
+
+
+class Scheduler(object):
+
+    def __init__(self, max_slots, bandwidth=0, clock=monotonic_time):
+        """
+        Arguments:
+            max_slots (int): Maximum number of copy slots, 0 for unlimited.
+            bandwidth (int): Total bandwidth of all copies in bytes per
+                second, 0 for unlimited.
+            clock (callable): Returns current time in seconds.
+        """
+        self._max_slots = max_slots
+        self._bandwidth = bandwidth
+        self._clock = clock
+        self._cond = threading.Condition(threading.Lock())
+        self._used_slots = 0
+        self._waiting = 0
+        self._active = set()
+        self._copied = 0
+
+    @contextmanager
+    def copy(self, name, size, weight=1, aborted=None):
+        """
+        Wait until weight copy slots are available, and yield a Copy for
+        running the copy operation.
+
+        Arguments:
+            name (str): Name of the copy for logging.
+            size (int): Number of bytes the operation will copy.
+            weight (int): Relative weight of the copy.
+            aborted (callable): Returns True if the copy was aborted. The
+                caller must call wakeup() after aborting a waiting copy.
+
+        Raises:
+            `exception.ActionStopped` if the copy was aborted while waiting
+            for copy slots.
+        """
+        if self._max_slots:
+            weight = min(weight, self._max_slots)
+        c = Copy(self, name, size, weight)
+        with self._cond:
+            self._waiting += 1
+            try:
+                while (self._max_slots and
+                       self._used_slots + weight > self._max_slots):
+                    if aborted is not None and aborted():
+                        log.info("Copy %s aborted while waiting", name)
+                        raise exception.ActionStopped
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+            self._used_slots += weight
+            self._active.add(c)
+            c.start = self._clock()
+        log.debug("Starting copy %s (size=%d, weight=%d)",
+                  name, size, weight)
+        try:
+            yield c
+        finally:
+            with self._cond:
+                self._active.discard(c)
+                self._used_slots -= weight
+                self._copied += c.done
+                self._cond.notify_all()
+            elapsed = self._clock() - c.start
+            log.info("Finished copy %s: %d bytes in %.2f seconds (%s)",
+                     name, c.done, elapsed, _rate(c.done, elapsed))
+
+    def wakeup(self):
+        """
+        Wake up copies waiting for copy slots, so aborted copies can stop
+        waiting.
+        """
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self):
+        """
+        Return a dict describing the current state of the scheduler.
+
+        throughput is the total rate of all active copies in bytes per
+        second.
+        """
+        now = self._clock()
+        with self._cond:
+            active = list(self._active)
+            waiting = self._waiting
+            copied = self._copied
+        throughput = 0
+        for c in active:
+            elapsed = now - c.start
+            if elapsed > 0:
+                throughput += c.done / elapsed
+        return {
+            "active": len(active),
+            "waiting": waiting,
+            "copied": copied + sum(c.done for c in active),
+            "throughput": int(throughput),
+        }
+
+    def _share(self, c):
+        """
+        Return copy c share of the bandwidth in bytes per second, or 0 if the
+        bandwidth is unlimited.
+        """
+        if not self._bandwidth:
+            return 0
+        with self._cond:
+            total_weight = sum(a.weight for a in self._active)
+        return self._bandwidth * c.weight / max(total_weight, c.weight)
+
+
+class Copy(object):
+
+    def __init__(self, scheduler, name, size, weight):
+        self._scheduler = scheduler
+        self.name = name
+        self.size = size
+        self.weight = weight
+        self.start = None
+        self.done = 0
+
+    def run(self, operation):
+        """
+        Run qemuimg.ProgressCommand operation, pausing it when the copy is
+        ahead of its bandwidth share.
+        """
+        operation.run(on_progress=self._progress)
+
+    def delay(self):
+        """
+        Return the time in seconds this copy should pause to stay within its
+        bandwidth share.
+        """
+        rate = self._scheduler._share(self)
+        if not rate:
+            return 0
+        elapsed = self._scheduler._clock() - self.start
+        return min(max(self.done / rate - elapsed, 0), MAX_PAUSE)
+
+    def _progress(self, operation, progress):
+        self.done = int(self.size * progress / 100)
+        delay = self.delay()
+        if not delay:
+            return
+        operation.pause()
+        try:
+            # Our share may change while we wait, and the operation may be
+            # aborted.
+            while delay and operation.running:
+                time.sleep(delay)
+                delay = self.delay()
+        finally:
+            operation.resume()
+
+
+def _rate(size, elapsed):
+    if elapsed > 0:
+        return "%.2f MiB/s" % (size / elapsed / 1024**2)
+    return "Infinity MiB/s"
@@ -1,4 +1,4 @@
-# Copyright 2012-2016 Red Hat, Inc.
+# Copyright 2012-2019 Red Hat, Inc.
 #
 # This program is free software; you can redistribute it and/or modify
 # it under the terms of the GNU General Public License as published by
@@ -22,7 +22,9 @@ from __future__ import absolute_import
 import ctypes
 import io
 import logging
+import mmap
 import os
+import threading
 
 from contextlib import closing
 from contextlib import contextmanager
@@ -30,10 +32,81 @@ from contextlib import contextmanager
 log = logging.getLogger('storage.directio')
 
 libc = ctypes.CDLL("libc.so.6", use_errno=True)
-CharPointer = ctypes.POINTER(ctypes.c_char)
 
-_PC_REC_XFER_ALIGN = 17
-_PC_REC_MIN_XFER_SIZE = 16
+# Size of chunks read by DirectFile.readall().
+READALL_CHUNK_SIZE = 128 * 1024
+
+
+class BufferPool(object):
+    """
+    Pool of reusable page aligned mmap buffers for direct I/O.
+
+    Allocating an aligned buffer for every read or write is expensive
+    compared with the I/O of small blocks, and most direct I/O users read and
+    write the same sizes again and again. Buffers returned to the pool are
+    kept for the next caller asking for the same size, up to max_buffers
+    buffers; when the pool is full, the least recently returned buffer is
+    closed.
+    """
+
+    def __init__(self, max_buffers=8):
+        self._max_buffers = max_buffers
+        self._lock = threading.Lock()
+        # Free buffers, least recently returned first.
+        self._free = []
+
+    @contextmanager
+    def buffer(self, size):
+        """
+        Borrow a page aligned mmap of size bytes, returned to the pool when
+        the context exits. The buffer content is undefined.
+        """
+        buf = self._get(size)
+        try:
+            yield buf
+        finally:
+            self._put(buf)
+
+    def clear(self):
+        """
+        Close all free buffers.
+        """
+        with self._lock:
+            free, self._free = self._free, []
+        for buf in free:
+            buf.close()
+
+    def _get(self, size):
+        with self._lock:
+            for i, buf in enumerate(self._free):
+                if len(buf) == size:
+                    return self._free.pop(i)
+        return mmap.mmap(-1, size, mmap.MAP_SHARED)
+
+    def _put(self, buf):
+        with self._lock:
+            self._free.append(buf)
+            if len(self._free) <= self._max_buffers:
+                return
+            buf = self._free.pop(0)
+        buf.close()
+
+
+_pool = BufferPool()
+
+
+def aligned_buffer(size):
+    """
+    Borrow a page aligned buffer of size bytes from the module buffer pool,
+    for use with DirectFile.readinto() and DirectFile.writefrom().
+
+    Usage:
+
+        with directio.aligned_buffer(4096) as buf:
+            n = f.readinto(buf)
+            process(buf[:n])
+    """
+    return _pool.buffer(size)
 
 
 class DirectFile(object):
@@ -96,29 +169,6 @@ class DirectFile(object):
     def tell(self):
         return self.seek(0, os.SEEK_CUR)
 
-    @contextmanager
-    def _createAlignedBuffer(self, size):
-        pbuff = ctypes.c_char_p(0)
-        ppbuff = ctypes.pointer(pbuff)
-        # Because we usually have fixed sizes for our reads, caching
-        # buffers might give a slight performance boost.
-        alignment = libc.fpathconf(self.fileno(), _PC_REC_XFER_ALIGN)
-        minXferSize = libc.fpathconf(self.fileno(), _PC_REC_MIN_XFER_SIZE)
-        chunks, remainder = divmod(size, minXferSize)
-        if remainder > 0:
-            chunks += 1
-
-        size = chunks * minXferSize
-
-        rc = libc.posix_memalign(ppbuff, alignment, size)
-        if rc:
-            raise OSError(rc, "Could not allocate aligned buffer")
-        try:
-            ctypes.memset(pbuff, 0, size)
-            yield pbuff
-        finally:
-            libc.free(pbuff)
-
     def read(self, n=-1):
         if (n < 0):
             return self.readall()
@@ -126,39 +176,77 @@ class DirectFile(object):
         if (n % 512):
             raise ValueError("You can only read in 512 multiplies")
 
-        with self._createAlignedBuffer(n) as pbuff:
-            numRead = libc.read(self._fd, pbuff, n)
+        if n == 0:
+            return b""
+
+        with aligned_buffer(n) as buf:
+            numRead = self.readinto(buf)
+            return buf[:numRead]
+
+    def readinto(self, buf):
+        """
+        Read up to len(buf) bytes into page aligned mmap buf, without
+        copying.
+
+        Returns:
+            The number of bytes read (int), 0 at end of file.
+        """
+        if len(buf) % 512:
+            raise ValueError("You can only read in 512 multiplies")
+
+        ptr = ctypes.c_char.from_buffer(buf)
+        try:
+            numRead = libc.read(self._fd, ctypes.byref(ptr), len(buf))
             if numRead < 0:
-                err = ctypes.get_errno()
-                if err != 0:
-                    msg = os.strerror(err)
-                    raise OSError(err, msg)
-            ptr = CharPointer.from_buffer(pbuff)
-            return ptr[:numRead]
+                _raise_errno()
+            return numRead
+        finally:
+            # Release the buffer export, so buf can be closed.
+            del ptr
 
     def readall(self):
-        buffsize = 1024
         res = io.BytesIO()
-        with closing(res):
+        with closing(res), aligned_buffer(READALL_CHUNK_SIZE) as buf:
             while True:
-                buff = self.read(buffsize)
-                res.write(buff)
-                if len(buff) < buffsize:
+                numRead = self.readinto(buf)
+                res.write(buf[:numRead])
+                if numRead < len(buf):
                     return res.getvalue()
 
     def write(self, data):
         length = len(data)
         if length % 512:
             raise ValueError("You can only write in 512 multiplies")
-        pdata = ctypes.c_char_p(data)
-        with self._createAlignedBuffer(length) as pbuff:
-            ctypes.memmove(pbuff, pdata, len(data))
-            numWritten = libc.write(self._fd, pbuff, length)
+        if length == 0:
+            return
+        with aligned_buffer(length) as buf:
+            buf[:] = data
+            self.writefrom(buf)
+
+    def writefrom(self, buf, length=None):
+        """
+        Write the first length bytes of page aligned mmap buf, or the entire
+        buffer if length is None, without copying.
+
+        Returns:
+            The number of bytes written (int).
+        """
+        if length is None:
+            length = len(buf)
+        if length % 512:
+            raise ValueError("You can only write in 512 multiplies")
+        if length > len(buf):
+            raise ValueError("Length %d exceeds buffer size %d"
+                             % (length, len(buf)))
+
+        ptr = ctypes.c_char.from_buffer(buf)
+        try:
+            numWritten = libc.write(self._fd, ctypes.byref(ptr), length)
             if numWritten < 0:
-                err = ctypes.get_errno()
-                if err != 0:
-                    msg = os.strerror(err)
-                    raise OSError(err, msg)
+                _raise_errno()
+            return numWritten
+        finally:
+            del ptr
 
     def seek(self, offset, whence=os.SEEK_SET):
         return os.lseek(self._fd, offset, whence)
@@ -176,3 +264,8 @@ class DirectFile(object):
 
         if not self.closed:
             self.close()
+
+
+def _raise_errno():
+    err = ctypes.get_errno()
+    raise OSError(err, os.strerror(err))
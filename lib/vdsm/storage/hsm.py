@@ -41,6 +41,7 @@ from six.moves import map
 
 from vdsm import constants
 from vdsm import jobs
+from vdsm import utils
 from vdsm.common import concurrent
 from vdsm.common import function
 from vdsm.common.threadlocal import vars
@@ -53,6 +54,7 @@ from vdsm.config import config
 from vdsm.storage import blockSD
 from vdsm.storage import clusterlock
 from vdsm.storage import constants as sc
+from vdsm.storage import copyscheduler
 from vdsm.storage import devicemapper
 from vdsm.storage import dispatcher
 from vdsm.storage import exception as se
@@ -65,6 +67,7 @@ from vdsm.storage import localFsSD
 from vdsm.storage import lvm
 from vdsm.storage import merge
 from vdsm.storage import mpathhealth
+from vdsm.storage import mpathinventory
 from vdsm.storage import misc
 from vdsm.storage import monitor
 from vdsm.storage import mount
@@ -78,6 +81,7 @@ from vdsm.storage import sd
 from vdsm.storage import sp
 from vdsm.storage import storageServer
 from vdsm.storage import taskManager
+from vdsm.storage import threadPool
 from vdsm.storage import types
 from vdsm.storage import udev
 from vdsm.storage.constants import STORAGE
@@ -400,6 +404,8 @@ class HSM(object):
         self.multipathListener = udev.MultipathListener()
         self.mpathhealth_monitor = mpathhealth.Monitor()
         self.multipathListener.register(self.mpathhealth_monitor)
+        self.mpath_inventory = mpathinventory.Inventory()
+        self.multipathListener.register(self.mpath_inventory)
         self.multipathListener.start()
 
         def storageRefresh():
@@ -1945,7 +1951,7 @@ class HSM(object):
 
     @public
     def getDeviceList(self, storageType=None, guids=(), checkStatus=True,
-                      options={}):
+                      refresh=True, options={}):
         """
         List all Block Devices.
 
@@ -1959,6 +1965,10 @@ class HSM(object):
                             using the guids argument.The default is True for
                             backward compatibility.
         :type checkStatus: bool
+        :param refresh: if true, rescan storage connections and all devices
+                        before reporting. Otherwise report the devices known
+                        to the device inventory, updated by udev events.
+        :type refresh: bool
         :param options: ?
 
         :returns: Dict containing a list of all the devices of the storage
@@ -1977,11 +1987,14 @@ class HSM(object):
                 "checkStatus=False when getting all devices.")
 
         devices = self._getDeviceList(storageType=storageType, guids=guids,
-                                      checkStatus=checkStatus)
+                                      checkStatus=checkStatus,
+                                      refresh=refresh)
         return dict(devList=devices)
 
-    def _getDeviceList(self, storageType=None, guids=(), checkStatus=True):
-        sdCache.refreshStorage()
+    def _getDeviceList(self, storageType=None, guids=(), checkStatus=True,
+                       refresh=True):
+        if refresh:
+            sdCache.refreshStorage()
         typeFilter = lambda dev: True
         if storageType:
             if sd.storageType(storageType) == sd.type2name(sd.ISCSI_DOMAIN):
@@ -1994,8 +2007,10 @@ class HSM(object):
         devices = []
         pvs = {os.path.basename(pv.name): pv for pv in lvm.getAllPVs()}
 
+        mpath_devices = self.mpath_inventory.devices(guids, rescan=refresh)
+
         # FIXME: pathListIter() should not return empty records
-        for dev in multipath.pathListIter(guids):
+        for dev in multipath.pathListIter(guids, devices=mpath_devices):
             if not typeFilter(dev):
                 continue
 
@@ -2887,7 +2902,8 @@ class HSM(object):
             vgGuids[vg.uuid] = i
 
         pathDict = {}
-        for dev in multipath.pathListIter(devNames):
+        mpath_devices = self.mpath_inventory.devices(devNames)
+        for dev in multipath.pathListIter(devNames, devices=mpath_devices):
             pathDict[dev["guid"]] = dev
 
         self.__processVGInfos(vgInfos, pathDict, getGuid)
@@ -3183,21 +3199,27 @@ class HSM(object):
         if leafUUID not in imgVolumes:
             raise se.VolumeDoesNotExist(leafUUID)
 
-        for volUUID in imgVolumes:
-            legality = dom.produceVolume(imgUUID, volUUID).getLegality()
-            if legality == sc.ILLEGAL_VOL:
-                if allowIllegal:
-                    self.log.info("Preparing illegal volume %s", leafUUID)
-                else:
-                    raise se.prepareIllegalVolumeError(volUUID)
+        with utils.stopwatch("Checked legality of image %s volumes" % imgUUID,
+                             log=self.log):
+            for volUUID in imgVolumes:
+                legality = dom.produceVolume(imgUUID, volUUID).getLegality()
+                if legality == sc.ILLEGAL_VOL:
+                    if allowIllegal:
+                        self.log.info("Preparing illegal volume %s", leafUUID)
+                    else:
+                        raise se.prepareIllegalVolumeError(volUUID)
 
-        imgPath = dom.activateVolumes(imgUUID, imgVolumes)
-        if spUUID and spUUID != sd.BLANK_UUID:
-            runImgPath = dom.linkBCImage(imgPath, imgUUID)
-        else:
-            runImgPath = imgPath
+        with utils.stopwatch("Activated image %s volumes" % imgUUID,
+                             log=self.log):
+            imgPath = dom.activateVolumes(imgUUID, imgVolumes)
+            if spUUID and spUUID != sd.BLANK_UUID:
+                runImgPath = dom.linkBCImage(imgPath, imgUUID)
+            else:
+                runImgPath = imgPath
 
-        leafInfo = dom.produceVolume(imgUUID, leafUUID).getVmVolumeInfo()
+        with utils.stopwatch("Read image %s leaf info" % imgUUID,
+                             log=self.log):
+            leafInfo = dom.produceVolume(imgUUID, leafUUID).getVmVolumeInfo()
 
         leafPath = os.path.join(runImgPath, leafUUID)
         for volUUID in imgVolumes:
@@ -3279,6 +3301,23 @@ class HSM(object):
         images = dom.getAllImages()
         return dict(imageslist=list(images))
 
+    @public
+    def dumpVolumeChains(self, sdUUID):
+        """
+        Gets the info of all the volumes of all the images of specific
+        domain.
+
+        :param sdUUID: The UUID of the storage domain you want to query.
+        :type sdUUID: UUID.
+
+        :returns: a dict with the info of every volume, keyed by image UUID
+                  and volume UUID.
+        :rtype: dict
+        """
+        vars.task.getSharedLock(STORAGE, sdUUID)
+        dom = sdCache.produce_manifest(sdUUID)
+        return dict(volumes=dom.dumpVolumeChains())
+
     @deprecated
     @public
     def getImageDomainsList(self, spUUID, imgUUID, options=None):
@@ -3337,7 +3376,7 @@ class HSM(object):
             try:
                 if self._pool.spmMailer:
                     self._pool.spmMailer.stop()
-                    self._pool.spmMailer.tp.joinAll(waitForTasks=False)
+                    self._pool.spmMailer.tp.stop(wait=False)
 
                 if self._pool.hsmMailer:
                     self._pool.hsmMailer.stop()
@@ -3492,6 +3531,7 @@ class HSM(object):
                     'code': code,
                     'lastCheck': lastcheck,
                     'delay': str(domStatus.readDelay),
+                    'checkDelay': '%.3f' % domStatus.checkDelay,
                     'valid': (domStatus.error is None),
                     'version': domStatus.version,
                     # domStatus.hasHostId can also be None
@@ -3539,6 +3579,18 @@ class HSM(object):
     def multipath_health(self):
         return self.mpathhealth_monitor.status()
 
+    @public
+    def thread_pool_stats(self):
+        return threadPool.stats()
+
+    @public
+    def sd_cache_stats(self):
+        return sdCache.stats()
+
+    @public
+    def copy_scheduler_stats(self):
+        return copyscheduler.scheduler().stats()
+
     @deprecated
     @public
     def startMonitoringDomain(self, sdUUID, hostID, options=None):
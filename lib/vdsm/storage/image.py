@@ -31,11 +31,15 @@ from vdsm import utils
 from vdsm import virtsparsify
 from vdsm.config import config
 from vdsm.common import cmdutils
+from vdsm.common import concurrent
 from vdsm.common import logutils
 from vdsm.common.threadlocal import vars
 from vdsm.storage import constants as sc
+from vdsm.storage import convertprofile
+from vdsm.storage import copyscheduler
 from vdsm.storage import exception as se
 from vdsm.storage import imageSharing
+from vdsm.storage import mdcache
 from vdsm.storage import misc
 from vdsm.storage import qemuimg
 from vdsm.storage import resourceManager as rm
@@ -107,10 +111,21 @@ class Image:
     def repoPath(self):
         return self._repoPath
 
-    def _run_qemuimg_operation(self, operation):
+    def _run_qemuimg_operation(self, operation, name, size):
+        """
+        Run a qemu-img copy operation, scheduled by the host copy scheduler.
+        """
         self.log.debug('running qemu-img operation')
-        with vars.task.abort_callback(operation.abort):
-            operation.run()
+        scheduler = copyscheduler.scheduler()
+
+        def abort():
+            operation.abort()
+            scheduler.wakeup()
+
+        with vars.task.abort_callback(abort):
+            with scheduler.copy(name, size,
+                                aborted=lambda: operation.aborted) as copy:
+                copy.run(operation)
         self.log.debug('qemu-img operation has completed')
 
     def deletedVolumeName(self, uuid):
@@ -181,6 +196,11 @@ class Image:
         Return the chain of volumes of image as a sorted list
         (not including a shared base (template) if any)
         """
+        # Read block volumes metadata once for the entire chain.
+        with mdcache.cached(sdUUID):
+            return self._getChain(sdUUID, imgUUID, volUUID)
+
+    def _getChain(self, sdUUID, imgUUID, volUUID):
         chain = []
         volclass = sdCache.produce(sdUUID).getVolumeClass()
 
@@ -445,61 +465,83 @@ class Image:
             raise
 
         try:
-            for srcVol in chains['srcChain']:
-                # Do the actual copy
-                try:
-                    dstVol = destDom.produceVolume(imgUUID=imgUUID,
-                                                   volUUID=srcVol.volUUID)
+            # Every volume is copied into its own destination volume, so the
+            # volumes of the chain can be copied concurrently.
+            task = vars.task
+
+            def copy_volume(srcVol):
+                vars.task = task
+                self._copyChainVolume(destDom, srcSdUUID, imgUUID, srcVol)
+
+            results = concurrent.tmap(
+                copy_volume, chains['srcChain'],
+                max_workers=config.getint("irs", "copy_chain_workers"))
+            errors = [r.value for r in results if not r.succeeded]
+            # If the operation was aborted, report it instead of the errors
+            # caused by the abort.
+            for e in errors:
+                if isinstance(e, ActionStopped):
+                    raise e
+            if errors:
+                raise errors[0]
+        finally:
+            # teardown volumes
+            self.__cleanupMove(srcLeafVol, dstLeafVol)
 
-                    if workarounds.invalid_vm_conf_disk(srcVol):
-                        srcFormat = dstFormat = qemuimg.FORMAT.RAW
-                    else:
-                        srcFormat = sc.fmt2str(srcVol.getFormat())
-                        dstFormat = sc.fmt2str(dstVol.getFormat())
+    def _copyChainVolume(self, destDom, srcSdUUID, imgUUID, srcVol):
+        try:
+            dstVol = destDom.produceVolume(imgUUID=imgUUID,
+                                           volUUID=srcVol.volUUID)
 
-                    parentVol = dstVol.getParentVolume()
+            if workarounds.invalid_vm_conf_disk(srcVol):
+                srcFormat = dstFormat = qemuimg.FORMAT.RAW
+            else:
+                srcFormat = sc.fmt2str(srcVol.getFormat())
+                dstFormat = sc.fmt2str(dstVol.getFormat())
 
-                    if parentVol is not None:
-                        backing = volume.getBackingVolumePath(
-                            imgUUID, parentVol.volUUID)
-                        backingFormat = sc.fmt2str(parentVol.getFormat())
-                    else:
-                        backing = None
-                        backingFormat = None
+            parentVol = dstVol.getParentVolume()
 
-                    if (destDom.supportsSparseness and
-                            dstVol.getType() == sc.PREALLOCATED_VOL):
-                        preallocation = qemuimg.PREALLOCATION.FALLOC
-                    else:
-                        preallocation = None
+            if parentVol is not None:
+                backing = volume.getBackingVolumePath(
+                    imgUUID, parentVol.volUUID)
+                backingFormat = sc.fmt2str(parentVol.getFormat())
+            else:
+                backing = None
+                backingFormat = None
 
-                    operation = qemuimg.convert(
-                        srcVol.getVolumePath(),
-                        dstVol.getVolumePath(),
-                        srcFormat=srcFormat,
-                        dstFormat=dstFormat,
-                        dstQcow2Compat=destDom.qcow2_compat(),
-                        backing=backing,
-                        backingFormat=backingFormat,
-                        preallocation=preallocation,
-                        unordered_writes=destDom.recommends_unordered_writes(
-                            dstVol.getFormat()))
-                    with utils.stopwatch("Copy volume %s"
-                                         % srcVol.volUUID):
-                        self._run_qemuimg_operation(operation)
-                except ActionStopped:
-                    raise
-                except se.StorageException:
-                    self.log.error("Unexpected error", exc_info=True)
-                    raise
-                except Exception:
-                    self.log.error("Copy image error: image=%s, src domain=%s,"
-                                   " dst domain=%s", imgUUID, srcSdUUID,
-                                   destDom.sdUUID, exc_info=True)
-                    raise se.CopyImageError()
-        finally:
-            # teardown volumes
-            self.__cleanupMove(srcLeafVol, dstLeafVol)
+            if (destDom.supportsSparseness and
+                    dstVol.getType() == sc.PREALLOCATED_VOL):
+                preallocation = qemuimg.PREALLOCATION.FALLOC
+            else:
+                preallocation = None
+
+            operation = qemuimg.convert(
+                srcVol.getVolumePath(),
+                dstVol.getVolumePath(),
+                srcFormat=srcFormat,
+                dstFormat=dstFormat,
+                dstQcow2Compat=destDom.qcow2_compat(),
+                backing=backing,
+                backingFormat=backingFormat,
+                preallocation=preallocation,
+                unordered_writes=destDom.recommends_unordered_writes(
+                    dstVol.getFormat()),
+                **convertprofile.convert_options(
+                    sdCache.produce(srcSdUUID), destDom))
+            with utils.stopwatch("Copy volume %s" % srcVol.volUUID):
+                self._run_qemuimg_operation(
+                    operation, "volume %s" % srcVol.volUUID,
+                    srcVol.getSize() * sc.BLOCK_SIZE)
+        except ActionStopped:
+            raise
+        except se.StorageException:
+            self.log.error("Unexpected error", exc_info=True)
+            raise
+        except Exception:
+            self.log.error("Copy image error: image=%s, src domain=%s,"
+                           " dst domain=%s", imgUUID, srcSdUUID,
+                           destDom.sdUUID, exc_info=True)
+            raise se.CopyImageError()
 
     def _finalizeDestinationImage(self, destDom, imgUUID, chains, force):
         for srcVol in chains['srcChain']:
@@ -824,10 +866,14 @@ class Image:
                         dstQcow2Compat=destDom.qcow2_compat(),
                         preallocation=preallocation,
                         unordered_writes=destDom.recommends_unordered_writes(
-                            dstVolFormat))
+                            dstVolFormat),
+                        **convertprofile.convert_options(
+                            sdCache.produce(sdUUID), destDom))
                     with utils.stopwatch("Copy volume %s"
                                          % srcVol.volUUID):
-                        self._run_qemuimg_operation(operation)
+                        self._run_qemuimg_operation(
+                            operation, "volume %s" % srcVol.volUUID,
+                            volParams['size'] * sc.BLOCK_SIZE)
                 except ActionStopped:
                     raise
                 except cmdutils.Error as e:
@@ -1115,10 +1161,13 @@ class Image:
                         dstFormat=sc.fmt2str(volParams['volFormat']),
                         dstQcow2Compat=sdDom.qcow2_compat(),
                         unordered_writes=sdDom.recommends_unordered_writes(
-                            volParams['volFormat']))
+                            volParams['volFormat']),
+                        **convertprofile.convert_options(sdDom, sdDom))
                     with utils.stopwatch("Copy volume %s"
                                          % srcVol.volUUID):
-                        self._run_qemuimg_operation(operation)
+                        self._run_qemuimg_operation(
+                            operation, "volume %s" % srcVol.volUUID,
+                            srcVolParams['size'] * sc.BLOCK_SIZE)
                 except cmdutils.Error:
                     self.log.exception('conversion failure for volume %s',
                                        srcVol.volUUID)
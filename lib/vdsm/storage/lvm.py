@@ -1325,6 +1325,8 @@ def activateLVs(vgName, lvNames, refresh=True):
     Active lvs may not reflect the current mapping on storage if the lv was
     extended or removed on another host. By default, active lvs are refreshed.
     To skip refresh, call with refresh=False.
+
+    Returns the list of lvs that were inactive and have been activated.
     """
     active = []
     inactive = []
@@ -1342,6 +1344,8 @@ def activateLVs(vgName, lvNames, refresh=True):
         log.info("Activating lvs: vg=%s lvs=%s", vgName, inactive)
         _setLVAvailability(vgName, inactive, "y")
 
+    return inactive
+
 
 def deactivateLVs(vgName, lvNames):
     toDeactivate = [lvName for lvName in lvNames
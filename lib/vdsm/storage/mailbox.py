@@ -215,7 +215,7 @@ class HSM_Mailbox:
     def stop(self):
         if self._mailman:
             self._mailman.immStop()
-            self._mailman.tp.joinAll(waitForTasks=False)
+            self._mailman.tp.stop(wait=False)
         else:
             self.log.warning("HSM_MailboxMonitor - No mail monitor object "
                              "available to stop")
@@ -229,10 +229,7 @@ class HSM_MailMonitor(object):
 
     def __init__(self, inbox, outbox, hostID, queue, monitorInterval):
         # Save arguments
-        tpSize = config.getint('irs', 'thread_pool_size') // 2
-        waitTimeout = wait_timeout(monitorInterval)
-        maxTasks = config.getint('irs', 'max_tasks')
-        self.tp = ThreadPool("mailbox-hsm", tpSize, waitTimeout, maxTasks)
+        self.tp = _thread_pool("mailbox-hsm")
         self._stop = False
         self._queue = queue
         self._activeMessages = {}
@@ -341,8 +338,12 @@ class HSM_MailMonitor(object):
                     try:
                         id = str(uuid.uuid4())
                         if not self.tp.queueTask(id, runTask, (msg.callback,
-                                                 msg.volumeData)):
-                            raise Exception()
+                                                 msg.volumeData),
+                                                 kind="reply"):
+                            self.log.error("HSM_MailMonitor: dropping "
+                                           "callback for message: %s, too "
+                                           "many queued tasks",
+                                           repr(msg.payload))
                     except:
                         self.log.error("HSM_MailMonitor: exception caught "
                                        "while running msg callback, for "
@@ -524,10 +525,7 @@ class SPM_MailMonitor:
         self._stop = False
         self._stopped = False
         self._poolID = poolID
-        tpSize = config.getint('irs', 'thread_pool_size') // 2
-        waitTimeout = wait_timeout(monitorInterval)
-        maxTasks = config.getint('irs', 'max_tasks')
-        self.tp = ThreadPool("mailbox-spm", tpSize, waitTimeout, maxTasks)
+        self.tp = _thread_pool("mailbox-spm")
         self._inbox = inbox
         if not os.path.exists(self._inbox):
             self.log.error("SPM_MailMonitor create failed - inbox %s does not "
@@ -683,10 +681,14 @@ class SPM_MailMonitor:
                         res = self.tp.queueTask(
                             id, runTask, (self._messageTypes[msgType], msgId,
                                           newMail[msgStart:
-                                                  msgStart + MESSAGE_SIZE])
-                        )
+                                                  msgStart + MESSAGE_SIZE]),
+                            kind="request")
                         if not res:
-                            raise Exception()
+                            self.log.error(
+                                "SPM_MailMonitor: dropping request: %s, too "
+                                "many queued tasks",
+                                repr(newMail[msgStart:
+                                             msgStart + MESSAGE_SIZE]))
                     else:
                         self.log.error("SPM_MailMonitor: unknown message type "
                                        "encountered: %s", msgType)
@@ -763,15 +765,20 @@ class SPM_MailMonitor:
                 time.sleep(self._monitorInterval)
         finally:
             self._stopped = True
-            self.tp.joinAll(waitForTasks=False)
+            self.tp.stop()
             self.log.info("SPM_MailMonitor - Incoming mail monitoring thread "
                           "stopped")
 
 
-def wait_timeout(monitor_interval):
+def _thread_pool(name):
     """
-    Designed to return 3 seconds wait timeout for monitor interval of 2
-    seconds, keeping the behaivor in runtime the same as it was in the last 8
-    years, while allowing shorter times for testing.
+    Create a thread pool for handling mailbox messages, using half of the
+    task manager pool size.
     """
-    return monitor_interval * 3 / 2
+    timeout = config.getint('irs', 'thread_pool_task_timeout')
+    return ThreadPool(
+        name,
+        config.getint('irs', 'thread_pool_size') // 2,
+        config.getint('irs', 'max_tasks'),
+        max_workers=config.getint('irs', 'thread_pool_max_size') // 2,
+        timeout=timeout or None)
@@ -0,0 +1,145 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Cache of block volume metadata slots.
+
+Volume metadata of block domains is stored in slots of the metadata LV.
+Reading one slot needs one direct I/O read, so walking a chain or reporting
+many volumes reads the metadata LV many times.
+
+Inside a cached() context, slots are read from an in-memory copy of the
+metadata LV region containing the slot. A region is read once, using one
+direct I/O read, and answers reads of all the slots in the region.
+
+Every region has a generation, increased when a slot in the region is
+written by this host. A cached region is read again if the region generation
+has changed since the region was read, so a thread never sees stale metadata
+written by this host.
+
+Metadata written by other hosts is not tracked; a region is cached only
+until the context exits, so the cache does not serve older metadata than a
+series of slot reads would.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+
+import logging
+import threading
+
+from contextlib import contextmanager
+
+from vdsm.storage import constants as sc
+from vdsm.storage import directio
+from vdsm.storage import misc
+
+# Size of a cached region, 2048 slots.
+REGION_SIZE = 1024**2
+
+log = logging.getLogger("storage.mdcache")
+
+# Protects _generations.
+_lock = threading.Lock()
+
+# Generation of written regions, keyed by (sdUUID, region).
+_generations = {}
+
+
+class _Local(threading.local):
+
+    def __init__(self):
+        # Cached regions of the current thread, keyed by sdUUID.
+        self.domains = None
+
+
+_local = _Local()
+
+
+@contextmanager
+def cached(sdUUID):
+    """
+    Read sdUUID volume metadata slots from cached regions in the current
+    thread until the context exits.
+
+    Nested contexts share the cache of the outer context.
+    """
+    domains = _local.domains
+    if domains is None:
+        domains = _local.domains = {}
+        outer = True
+    else:
+        outer = False
+    created = sdUUID not in domains
+    if created:
+        domains[sdUUID] = {}
+    try:
+        yield
+    finally:
+        if created:
+            del domains[sdUUID]
+        if outer:
+            _local.domains = None
+
+
+def read_slot(sdUUID, path, slot):
+    """
+    Read volume metadata slot of domain sdUUID from metadata LV path, and
+    return the slot lines.
+
+    Inside a cached() context the slot is read from the cached region, and
+    the region is read only if it was not read yet or was written since it
+    was read.
+    """
+    offset = slot * sc.METADATA_SIZE
+    regions = _local.domains.get(sdUUID) if _local.domains else None
+    if regions is None:
+        return misc.readblock(path, offset, sc.METADATA_SIZE)
+
+    region = offset // REGION_SIZE
+    generation = _generation(sdUUID, region)
+    entry = regions.get(region)
+    if entry is None or entry[0] != generation:
+        log.debug("Reading metadata region %s/%d", sdUUID, region)
+        data = _read(path, region * REGION_SIZE, REGION_SIZE)
+        entry = regions[region] = (generation, data)
+    start = offset - region * REGION_SIZE
+    return entry[1][start:start + sc.METADATA_SIZE].splitlines()
+
+
+def invalidate(sdUUID, slot):
+    """
+    Must be called after writing volume metadata slot of domain sdUUID, so
+    cached copies of the slot region are read again.
+    """
+    region = slot * sc.METADATA_SIZE // REGION_SIZE
+    key = (sdUUID, region)
+    with _lock:
+        _generations[key] = _generations.get(key, 0) + 1
+
+
+def _generation(sdUUID, region):
+    with _lock:
+        return _generations.get((sdUUID, region), 0)
+
+
+def _read(path, offset, size):
+    with directio.DirectFile(path, "r") as f:
+        f.seek(offset)
+        return f.read(size)
@@ -21,11 +21,15 @@
 from __future__ import absolute_import
 
 import logging
+import random
 import threading
 import time
 
+from vdsm import executor
+from vdsm import schedule
 from vdsm import utils
-from vdsm.common import concurrent
+from vdsm.common import exception
+from vdsm.common.time import monotonic_time
 from vdsm.config import config
 from vdsm.storage import check
 from vdsm.storage import clusterlock
@@ -34,6 +38,15 @@ from vdsm.storage.sdc import sdCache
 
 log = logging.getLogger('storage.Monitor')
 
+# Checks are delayed by a random amount of up to JITTER * interval, so
+# domains started at the same time do not check the storage at the same
+# time.
+JITTER = 0.1
+
+# Maximum number of checks waiting for a worker. Every domain has at most one
+# queued check, so this is only a safety net.
+MAX_QUEUED_CHECKS = 1000
+
 
 class Status(object):
 
@@ -112,6 +125,10 @@ class Status(object):
     def version(self):
         return self._domain_status.version
 
+    @property
+    def checkDelay(self):
+        return self._domain_status.checkDelay
+
 
 class PathStatus(object):
 
@@ -135,6 +152,7 @@ class DomainStatus(object):
         self.vgMdFreeBelowThreashold = True
         self.isoPrefix = None
         self.version = -1
+        self.checkDelay = 0
 
 
 class DomainMonitor(object):
@@ -146,8 +164,23 @@ class DomainMonitor(object):
         # the checker event loop thread.
         self.onDomainStateChange = misc.Event(
             "storage.DomainMonitor.onDomainStateChange", sync=False)
-        self._checker = check.CheckService()
+        self._checker = check.CheckService(
+            use_helper=config.getboolean("irs", "sd_health_check_helper"))
         self._checker.start()
+        # All domains are checked by a shared pool of workers, scheduled by
+        # one scheduler thread. A check stuck on inaccessible storage is
+        # detected by the executor, and the worker is replaced, so other
+        # domains are not delayed.
+        self._scheduler = schedule.Scheduler(name="monitor/sched",
+                                             clock=monotonic_time)
+        self._scheduler.start()
+        self._executor = executor.Executor(
+            name="monitor",
+            workers_count=config.getint("irs", "sd_health_check_workers"),
+            max_tasks=MAX_QUEUED_CHECKS,
+            scheduler=self._scheduler,
+            max_workers=config.getint("irs", "sd_health_check_max_workers"))
+        self._executor.start()
 
     @property
     def domains(self):
@@ -181,8 +214,9 @@ class DomainMonitor(object):
             return
 
         log.info("Start monitoring %s", sdUUID)
-        monitor = MonitorThread(sdUUID, hostId, self._interval,
-                                self.onDomainStateChange, self._checker)
+        monitor = MonitorTask(sdUUID, hostId, self._interval,
+                              self.onDomainStateChange, self._checker,
+                              self._scheduler, self._executor)
         monitor.poolDomain = poolDomain
         monitor.start()
         # The domain should be added only after it succesfully started
@@ -223,22 +257,25 @@ class DomainMonitor(object):
         log.info("Shutting down domain monitors")
         self._stopMonitors(self._monitors.values(), shutdown=True)
         self._checker.stop()
+        # Workers may be blocked on inaccessible storage, do not wait.
+        self._executor.stop(wait=False)
+        self._scheduler.stop()
 
     def _stopMonitors(self, monitors, shutdown=False):
         # The domain monitor issues events that might become raceful if
-        # you don't wait until a monitor thread exit.
+        # you don't wait until a monitor exit.
         # Eg: when a domain is detached the domain monitor is stopped and
         # the host id is released. If the monitor didn't actually exit it
         # might respawn a new acquire host id.
 
-        # First stop monitor threads - this take no time, and make the process
+        # First stop all monitors - this take no time, and make the process
         # about 7 times faster when stopping 30 monitors.
         for monitor in monitors:
             log.info("Stop monitoring %s (shutdown=%s)",
                      monitor.sdUUID, shutdown)
             monitor.stop(shutdown=shutdown)
 
-        # Now wait for threads to finish - this takes about 10 seconds with 30
+        # Now wait for monitors to finish - this takes about 10 seconds with 30
         # monitors, most of the time spent waiting for sanlock.
         for monitor in monitors:
             log.debug("Waiting for monitor %s", monitor.sdUUID)
@@ -250,11 +287,17 @@ class DomainMonitor(object):
                             monitor.sdUUID)
 
 
-class MonitorThread(object):
+class MonitorTask(object):
+    """
+    Monitor a single domain.
+
+    The monitor does not own a thread; every cycle is scheduled on the
+    domain monitor scheduler and run in the domain monitor executor. When a
+    cycle completes, the next cycle is scheduled after the monitor interval.
+    """
 
-    def __init__(self, sdUUID, hostId, interval, changeEvent, checker):
-        self.thread = concurrent.thread(self._run, log=log,
-                                        name="monitor/" + sdUUID[:7])
+    def __init__(self, sdUUID, hostId, interval, changeEvent, checker,
+                 scheduler, executor):
         self.stopEvent = threading.Event()
         self.domain = None
         self.sdUUID = sdUUID
@@ -262,6 +305,8 @@ class MonitorThread(object):
         self.interval = interval
         self.changeEvent = changeEvent
         self.checker = checker
+        self.scheduler = scheduler
+        self.executor = executor
         self.lock = threading.Lock()
         self.monitoringPath = None
         # For backward compatibility, we must present a fake status before
@@ -278,16 +323,39 @@ class MonitorThread(object):
         self.wasShutdown = False
         # Used for synchronizing during the tests
         self.cycleCallback = _NULL_CALLBACK
+        # Protects the scheduling state below.
+        self._cycleLock = threading.Lock()
+        # The next scheduled cycle.
+        self._call = None
+        # True from the time a cycle was dispatched to the executor until
+        # the cycle has completed.
+        self._busy = False
+        self._isSetUp = False
+        self._stopped = threading.Event()
 
     def start(self):
-        self.thread.start()
+        log.debug("Domain monitor for %s started", self.sdUUID)
+        self._scheduleCycle(random.uniform(0, self.interval * JITTER))
 
     def stop(self, shutdown=False):
         self.wasShutdown = shutdown
-        self.stopEvent.set()
+        with self._cycleLock:
+            self.stopEvent.set()
+            if self._busy:
+                # The running cycle will finish the monitor.
+                return
+            if self._call:
+                self._call.cancel()
+                self._call = None
+        try:
+            self.executor.dispatch(self._finish)
+        except (executor.NotRunning, exception.ResourceExhausted) as e:
+            log.warning("Cannot dispatch stop of domain monitor %s (%s), "
+                        "stopping synchronously", self.sdUUID, e)
+            self._finish()
 
     def join(self):
-        self.thread.join()
+        self._stopped.wait()
 
     def getStatus(self):
         return self.status
@@ -301,39 +369,85 @@ class MonitorThread(object):
         """ Accessed by methods decorated with @util.cancelpoint """
         return self.stopEvent.is_set()
 
-    def _run(self):
-        log.debug("Domain monitor for %s started", self.sdUUID)
+    # Scheduling
+
+    def _scheduleCycle(self, delay):
+        with self._cycleLock:
+            if self.stopEvent.is_set():
+                return
+            self._call = self.scheduler.schedule(delay, self._dispatchCycle)
+
+    def _dispatchCycle(self):
+        """
+        Called from the scheduler thread. Must not block!
+        """
+        with self._cycleLock:
+            if self.stopEvent.is_set():
+                # Stopping was handled by stop().
+                return
+            self._call = None
+            self._busy = True
         try:
-            self._setupLoop()
-            self._monitorLoop()
+            # If the cycle does not complete in time, the worker is discarded
+            # and a new worker will serve the other domains.
+            self.executor.dispatch(self._runCycle, timeout=self.interval)
+        except (executor.NotRunning, exception.ResourceExhausted) as e:
+            log.warning("Cannot dispatch check for domain %s: %s",
+                        self.sdUUID, e)
+            self._cycleDone()
+
+    def _runCycle(self):
+        try:
+            if not self._isSetUp:
+                self._setupCycle()
+            if self._isSetUp:
+                self._monitorCycle()
         except utils.Canceled:
             log.debug("Domain monitor for %s canceled", self.sdUUID)
         finally:
-            log.debug("Domain monitor for %s stopped (shutdown=%s)",
-                      self.sdUUID, self.wasShutdown)
+            self._cycleDone()
+
+    def _cycleDone(self):
+        with self._cycleLock:
+            self._busy = False
+            stopping = self.stopEvent.is_set()
+        if stopping:
+            self._finish()
+        else:
+            self._scheduleCycle(self._nextDelay())
+
+    def _nextDelay(self):
+        return self.interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def _finish(self):
+        """
+        Called once when the monitor was stopped, must not raise!
+        """
+        try:
             self._stopCheckingPath()
             if self._shouldReleaseHostId():
                 self._releaseHostId()
+        finally:
+            log.debug("Domain monitor for %s stopped (shutdown=%s)",
+                      self.sdUUID, self.wasShutdown)
+            self._stopped.set()
 
     # Setting up
 
-    def _setupLoop(self):
+    def _setupCycle(self):
         """
-        Set up the monitor, retrying on failures. Returns when the monitor is
-        ready.
+        Try to set up the monitor. On failures, the next cycle will try again.
         """
-        while True:
-            try:
-                self._setupMonitor()
-                return
-            except Exception as e:
-                log.exception("Setting up monitor for %s failed", self.sdUUID)
-                domain_status = DomainStatus(error=e)
-                status = Status(self.status._path_status, domain_status)
-                self._updateStatus(status)
-                self.cycleCallback()
-                if self.stopEvent.wait(self.interval):
-                    raise utils.Canceled
+        try:
+            self._setupMonitor()
+        except Exception as e:
+            log.exception("Setting up monitor for %s failed", self.sdUUID)
+            domain_status = DomainStatus(error=e)
+            status = Status(self.status._path_status, domain_status)
+            self._updateStatus(status)
+            self.cycleCallback()
+        else:
+            self._isSetUp = True
 
     def _setupMonitor(self):
         # Pick up changes in the domain, for example, domain upgrade.
@@ -376,19 +490,13 @@ class MonitorThread(object):
 
     # Monitoring
 
-    def _monitorLoop(self):
-        """
-        Monitor the domain peroidically until the monitor is stopped.
-        """
-        while True:
-            try:
-                self._monitorDomain()
-            except Exception:
-                log.exception("Domain monitor for %s failed", self.sdUUID)
-            finally:
-                self.cycleCallback()
-            if self.stopEvent.wait(self.interval):
-                raise utils.Canceled
+    def _monitorCycle(self):
+        try:
+            self._monitorDomain()
+        except Exception:
+            log.exception("Domain monitor for %s failed", self.sdUUID)
+        finally:
+            self.cycleCallback()
 
     def _monitorDomain(self):
         # Pick up changes in the domain, for example, domain upgrade.
@@ -400,6 +508,7 @@ class MonitorThread(object):
     @utils.cancelpoint
     def _checkDomainStatus(self):
         domain_status = DomainStatus()
+        start = monotonic_time()
         try:
             # This may trigger a refresh of lvm cache. We have seen this taking
             # up to 90 seconds on overloaded machines.
@@ -424,6 +533,7 @@ class MonitorThread(object):
         except Exception as e:
             log.exception("Error checking domain %s", self.sdUUID)
             domain_status.error = e
+        domain_status.checkDelay = monotonic_time() - start
 
         with self.lock:
             status = Status(self.status._path_status, domain_status)
@@ -0,0 +1,153 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+In-memory inventory of multipath devices.
+
+Scanning sysfs for thousands of paths and running scsi_id for every device
+is slow. The inventory keeps the static properties of multipath devices
+returned by multipath.scan(), and updates only devices reported by udev
+events.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+
+import six
+
+from vdsm.common import time
+from vdsm.storage import multipath
+from vdsm.storage import udev
+
+log = logging.getLogger("storage.mpathinventory")
+
+
+class Inventory(udev.MultipathMonitor):
+
+    def __init__(self):
+        # Protects the event state, must never be held for long time since it
+        # is used by the udev listener thread.
+        self._events_lock = threading.Lock()
+        self._stale = True
+        self._changed = set()
+        self._removed = set()
+
+        # Serializes scans and protects the devices.
+        self._lock = threading.Lock()
+        self._devices = {}
+
+    def start(self):
+        """
+        Implementation of the interface udev.MultipathMonitor.start()
+
+        The devices are scanned on the first call to devices(), so we do not
+        delay the listener.
+        """
+        self.invalidate()
+
+    def handle(self, event):
+        """
+        Implementation of the interface udev.MultipathMonitor.handle()
+        """
+        with self._events_lock:
+            if event.type == udev.MPATH_CHANGED:
+                self._changed.add(event.mpath_uuid)
+                self._removed.discard(event.mpath_uuid)
+            elif event.type == udev.MPATH_REMOVED:
+                self._removed.add(event.mpath_uuid)
+                self._changed.discard(event.mpath_uuid)
+
+    def invalidate(self):
+        """
+        Scan all devices on the next call to devices().
+        """
+        with self._events_lock:
+            self._stale = True
+
+    def devices(self, guids=(), rescan=False):
+        """
+        Return a dict mapping device guid to device info, as returned by
+        multipath.scan(). If guids is specified, return only these devices.
+
+        If the inventory was invalidated, or rescan is True and guids is not
+        specified, scan all devices. If rescan is True and guids is specified,
+        scan only these devices. Otherwise scan only the devices reported by
+        udev events since the last call.
+        """
+        with self._lock:
+            with self._events_lock:
+                stale = self._stale or (rescan and not guids)
+                changed = self._changed
+                removed = self._removed
+                self._stale = False
+                self._changed = set()
+                self._removed = set()
+
+            try:
+                if stale:
+                    self._scan_all()
+                else:
+                    if changed or removed:
+                        self._update(changed, removed)
+                    if rescan:
+                        self._rescan(guids)
+            except:
+                # Scan everything on the next call, we may have lost events.
+                self.invalidate()
+                raise
+
+            return {guid: dev for guid, dev in six.iteritems(self._devices)
+                    if not guids or guid in guids}
+
+    def _scan_all(self):
+        start = time.monotonic_time()
+        serials = {guid: dev["serial"]
+                   for guid, dev in six.iteritems(self._devices)}
+        self._devices = multipath.scan(serials=serials)
+        log.debug("Scanned %d multipath devices in %.2f seconds",
+                  len(self._devices), time.monotonic_time() - start)
+
+    def _rescan(self, guids):
+        start = time.monotonic_time()
+        devices = {guid: dev for guid, dev in six.iteritems(self._devices)
+                   if guid not in guids}
+        # A device missing in the scan was removed meanwhile.
+        serials = {guid: dev["serial"]
+                   for guid, dev in six.iteritems(self._devices)}
+        devices.update(multipath.scan(guids=guids, serials=serials))
+        self._devices = devices
+        log.debug("Rescanned multipath devices %s in %.2f seconds",
+                  sorted(guids), time.monotonic_time() - start)
+
+    def _update(self, changed, removed):
+        start = time.monotonic_time()
+        devices = {guid: dev for guid, dev in six.iteritems(self._devices)
+                   if dev["uuid"] not in removed and
+                   dev["uuid"] not in changed}
+        # A changed device missing in the scan was removed meanwhile.
+        if changed:
+            serials = {guid: dev["serial"]
+                       for guid, dev in six.iteritems(self._devices)}
+            devices.update(multipath.scan(uuids=changed, serials=serials))
+        self._devices = devices
+        log.debug("Updated multipath devices (changed=%s, removed=%s) in "
+                  "%.2f seconds", sorted(changed), sorted(removed),
+                  time.monotonic_time() - start)
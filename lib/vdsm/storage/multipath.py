@@ -30,6 +30,8 @@ import logging
 import re
 from collections import namedtuple
 
+import six
+
 from vdsm import utils
 from vdsm.common import cmdutils
 from vdsm.common import commands
@@ -45,6 +47,7 @@ DEV_ISCSI = "iSCSI"
 DEV_FCP = "FCP"
 DEV_MIXED = "MIXED"
 SYS_BLOCK = "/sys/block"
+SCSI_DEVICE = "/sys/class/scsi_device"
 QUEUE = "queue"
 
 TOXIC_CHARS = '()*+?|^$.\\'
@@ -223,98 +226,197 @@ def getHBTL(physdev):
     return HBTL(*hbtl[0].split(":"))
 
 
-def pathListIter(filterGuids=()):
-    filterLen = len(filterGuids) if filterGuids else -1
-    devsFound = 0
+def scan(guids=(), uuids=(), serials=None):
+    """
+    Scan sysfs for multipath devices and their paths in one pass.
 
-    knownSessions = {}
+    Returns a dict mapping device guid to the static properties of the device
+    and its paths. This does not include the paths state and the iSCSI
+    connections, which are added by pathListIter().
 
+    If guids or uuids are specified, only devices matching one of them are
+    scanned.
+
+    serials is an optional dict mapping guid to the device serial, from a
+    previous scan. Getting the serial requires running scsi_id as root, so we
+    do this only for new devices.
+    """
+    if serials is None:
+        serials = {}
+    hbtls = _scsi_devices()
     svdsm = supervdsm.getProxy()
-    pathStatuses = devicemapper.getPathsStatus()
+    devices = {}
 
-    for dmId, guid in getMPDevsIter():
-        if devsFound == filterLen:
-            break
+    for dmId, guid, uuid in _mpath_devices():
+        if (guids or uuids) and guid not in guids and uuid not in uuids:
+            continue
+        serial = serials.get(guid)
+        if serial is None:
+            serial = svdsm.getScsiSerial(dmId)
+        try:
+            devices[guid] = _device_info(dmId, guid, uuid, serial, hbtls)
+        except EnvironmentError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            # The device was removed while we were reading it.
+            log.warning("Device %s was removed during scan: %s", guid, e)
 
-        if filterGuids and guid not in filterGuids:
+    return devices
+
+
+def _scsi_devices():
+    """
+    Return a dict mapping SCSI block device names to their HBTL, reading
+    /sys/class/scsi_device once instead of looking up every path.
+    """
+    hbtls = {}
+    try:
+        entries = os.listdir(SCSI_DEVICE)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return hbtls
+
+    for entry in entries:
+        try:
+            blocks = os.listdir(os.path.join(SCSI_DEVICE, entry, "device",
+                                             "block"))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            # Not a block device (e.g. enclosure or tape).
+            continue
+        for name in blocks:
+            hbtls[name] = HBTL(*entry.split(":"))
+
+    return hbtls
+
+
+def _device_info(dmId, guid, uuid, serial, hbtls):
+    logical, physical = getDeviceBlockSizes(dmId)
+    size = read_int(os.path.join(SYS_BLOCK, dmId, "size"))
+
+    devInfo = {
+        "guid": guid,
+        "uuid": uuid,
+        "dm": dmId,
+        "capacity": str(logical * size),
+        "serial": serial,
+        "paths": [],
+        "vendor": "",
+        "product": "",
+        "fwrev": "",
+        "logicalblocksize": "",
+        "physicalblocksize": "",
+        "discard_max_bytes": getDeviceDiscardMaxBytes(dmId),
+    }
+
+    for slave in sorted(os.listdir(os.path.join(SYS_BLOCK, dmId, "slaves"))):
+        if not os.path.exists(os.path.join(SYS_BLOCK, slave)):
+            log.warning("No such physdev '%s' is ignored" % slave)
             continue
 
-        devsFound += 1
+        if not devInfo["vendor"]:
+            try:
+                devInfo["vendor"] = getVendor(slave)
+            except Exception:
+                log.warn("Problem getting vendor from device `%s`",
+                         slave, exc_info=True)
+
+        if not devInfo["product"]:
+            try:
+                devInfo["product"] = getModel(slave)
+            except Exception:
+                log.warn("Problem getting model name from device `%s`",
+                         slave, exc_info=True)
+
+        if not devInfo["fwrev"]:
+            try:
+                devInfo["fwrev"] = getFwRev(slave)
+            except Exception:
+                log.warn("Problem getting fwrev from device `%s`",
+                         slave, exc_info=True)
+
+        if (not devInfo["logicalblocksize"] or
+                not devInfo["physicalblocksize"]):
+            try:
+                logBlkSize, phyBlkSize = getDeviceBlockSizes(slave)
+                devInfo["logicalblocksize"] = str(logBlkSize)
+                devInfo["physicalblocksize"] = str(phyBlkSize)
+            except Exception:
+                log.warn("Problem getting blocksize from device `%s`",
+                         slave, exc_info=True)
+
+        pathInfo = {
+            "physdev": slave,
+            "capacity": str(getDeviceSize(slave)),
+        }
+
+        hbtl = hbtls.get(slave)
+        if hbtl is None:
+            log.warn("Device has no hbtl: %s", slave)
+            pathInfo["lun"] = 0
+        else:
+            pathInfo["lun"] = hbtl.lun
+
+        if iscsi.devIsiSCSI(slave):
+            pathInfo["type"] = DEV_ISCSI
+            pathInfo["session"] = iscsi.getiScsiSession(slave)
+        else:
+            pathInfo["type"] = DEV_FCP
+
+        devInfo["paths"].append(pathInfo)
+
+    return devInfo
+
+
+def pathListIter(filterGuids=(), devices=None):
+    """
+    Yield info about multipath devices and their paths.
+
+    devices is the result of scan(), possibly cached by the caller. If not
+    specified, sysfs is scanned for the devices in filterGuids, or for all
+    devices.
+    """
+    if devices is None:
+        devices = scan(filterGuids)
+
+    knownSessions = {}
+    pathStatuses = devicemapper.getPathsStatus()
+
+    for guid, dev in six.iteritems(devices):
+        if filterGuids and guid not in filterGuids:
+            continue
 
         devInfo = {
             "guid": guid,
-            "dm": dmId,
-            "capacity": str(getDeviceSize(dmId)),
-            "serial": svdsm.getScsiSerial(dmId),
+            "dm": dev["dm"],
+            "capacity": dev["capacity"],
+            "serial": dev["serial"],
             "paths": [],
             "connections": [],
             "devtypes": [],
             "devtype": "",
-            "vendor": "",
-            "product": "",
-            "fwrev": "",
-            "logicalblocksize": "",
-            "physicalblocksize": "",
-            "discard_max_bytes": getDeviceDiscardMaxBytes(dmId),
+            "vendor": dev["vendor"],
+            "product": dev["product"],
+            "fwrev": dev["fwrev"],
+            "logicalblocksize": dev["logicalblocksize"],
+            "physicalblocksize": dev["physicalblocksize"],
+            "discard_max_bytes": dev["discard_max_bytes"],
         }
 
-        for slave in devicemapper.getSlaves(dmId):
-            if not devicemapper.isBlockDevice(slave):
-                log.warning("No such physdev '%s' is ignored" % slave)
-                continue
-
-            if not devInfo["vendor"]:
-                try:
-                    devInfo["vendor"] = getVendor(slave)
-                except Exception:
-                    log.warn("Problem getting vendor from device `%s`",
-                             slave, exc_info=True)
-
-            if not devInfo["product"]:
-                try:
-                    devInfo["product"] = getModel(slave)
-                except Exception:
-                    log.warn("Problem getting model name from device `%s`",
-                             slave, exc_info=True)
-
-            if not devInfo["fwrev"]:
-                try:
-                    devInfo["fwrev"] = getFwRev(slave)
-                except Exception:
-                    log.warn("Problem getting fwrev from device `%s`",
-                             slave, exc_info=True)
-
-            if (not devInfo["logicalblocksize"] or
-                    not devInfo["physicalblocksize"]):
-                try:
-                    logBlkSize, phyBlkSize = getDeviceBlockSizes(slave)
-                    devInfo["logicalblocksize"] = str(logBlkSize)
-                    devInfo["physicalblocksize"] = str(phyBlkSize)
-                except Exception:
-                    log.warn("Problem getting blocksize from device `%s`",
-                             slave, exc_info=True)
-
-            pathInfo = {}
-            pathInfo["physdev"] = slave
-            pathInfo["state"] = pathStatuses.get(slave, "failed")
-            pathInfo["capacity"] = str(getDeviceSize(slave))
-            try:
-                hbtl = getHBTL(slave)
-            except OSError as e:
-                if e.errno == errno.ENOENT:
-                    log.warn("Device has no hbtl: %s", slave)
-                    pathInfo["lun"] = 0
-                else:
-                    log.error("Error: %s while trying to get hbtl of device: "
-                              "%s", str(e.message), slave)
-                    raise
-            else:
-                pathInfo["lun"] = hbtl.lun
-
-            if iscsi.devIsiSCSI(slave):
-                devInfo["devtypes"].append(DEV_ISCSI)
-                pathInfo["type"] = DEV_ISCSI
-                sessionID = iscsi.getiScsiSession(slave)
+        for path in dev["paths"]:
+            pathInfo = {
+                "physdev": path["physdev"],
+                "state": pathStatuses.get(path["physdev"], "failed"),
+                "capacity": path["capacity"],
+                "lun": path["lun"],
+                "type": path["type"],
+            }
+
+            devInfo["devtypes"].append(path["type"])
+            if path["type"] == DEV_ISCSI:
+                sessionID = path["session"]
                 if sessionID not in knownSessions:
                     # FIXME: This entire part is for BC. It should be moved to
                     # hsm and not preserved for new APIs. New APIs should keep
@@ -337,15 +439,10 @@ def pathListIter(filterGuids=()):
 
                     knownSessions[sessionID] = sessionInfo
                 devInfo["connections"].append(knownSessions[sessionID])
-            else:
-                devInfo["devtypes"].append(DEV_FCP)
-                pathInfo["type"] = DEV_FCP
 
+            # The device type is the type of the first path.
             if devInfo["devtype"] == "":
                 devInfo["devtype"] = pathInfo["type"]
-            elif (devInfo["devtype"] != DEV_MIXED and
-                  devInfo["devtype"] != pathInfo["type"]):
-                devInfo["devtype"] == DEV_MIXED
 
             devInfo["paths"].append(pathInfo)
 
@@ -369,6 +466,16 @@ def getMPDevsIter():
 
     Return the list of device identifiers w/o "/dev/mapper" prefix
     """
+    for dmId, guid, _ in _mpath_devices():
+        yield dmId, guid
+
+
+def _mpath_devices():
+    """
+    Yield dm id, name and multipath uuid (without the "mpath-" prefix) of
+    multipath block devices, except devices blacklisted in vdsm
+    configuration.
+    """
     for dmInfoDir in glob(SYS_BLOCK + "/dm-*/dm/"):
         uuidFile = os.path.join(dmInfoDir, "uuid")
         try:
@@ -395,7 +502,7 @@ def getMPDevsIter():
             log.info("Device with unsupported GUID %s discarded", guid)
             continue
 
-        yield dmInfoDir.split("/")[3], guid
+        yield dmInfoDir.split("/")[-3], guid, uuid[len("mpath-"):]
 
 
 def devIsiSCSI(type):
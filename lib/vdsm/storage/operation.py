@@ -22,6 +22,7 @@ from __future__ import absolute_import
 
 import errno
 import logging
+import signal
 import threading
 
 from vdsm import utils
@@ -136,6 +137,34 @@ class Command(object):
             else:
                 raise RuntimeError("Invalid state: %s" % self)
 
+    def pause(self):
+        """
+        Stop the underlying process until resume() is called.
+
+        This method is threadsafe and may be called from any thread.
+        """
+        with self._lock:
+            if self._state == RUNNING:
+                self._send_signal(signal.SIGSTOP)
+
+    def resume(self):
+        """
+        Continue the underlying process stopped by pause().
+
+        This method is threadsafe and may be called from any thread.
+        """
+        with self._lock:
+            if self._state in (RUNNING, ABORTING):
+                self._send_signal(signal.SIGCONT)
+
+    @property
+    def running(self):
+        return self._state == RUNNING
+
+    @property
+    def aborted(self):
+        return self._state in (ABORTING, ABORTED)
+
     def _start_process(self):
         """
         Start the underlying process.
@@ -194,6 +223,17 @@ class Command(object):
                 raise
             log.debug("%s has terminated", self)
 
+    def _send_signal(self, sig):
+        """
+        Must be called when holding the command lock.
+        """
+        try:
+            self._proc.send_signal(sig)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+            log.debug("%s has terminated", self)
+
     def __repr__(self):
         s = "<Command {self._cmd} {self._state}, cwd={self._cwd} at {addr:#x}>"
         return s.format(self=self, addr=id(self))
@@ -235,7 +235,8 @@ def check(image, format=None):
 def convert(srcImage, dstImage, srcFormat=None, dstFormat=None,
             dstQcow2Compat=None, backing=None, backingFormat=None,
             preallocation=None, compressed=False, unordered_writes=False,
-            create=True):
+            create=True, cache="none", src_cache="none", coroutines=None,
+            sparse_size=None):
     """
     Arguments:
         unordered_writes (bool): Allow out-of-order writes to the destination.
@@ -243,11 +244,23 @@ def convert(srcImage, dstImage, srcFormat=None, dstFormat=None,
             preallocated devices like host devices or other raw block devices.
         create (bool): If True (default) the destination image is created. Must
             be set to False when convert to NBD.
+        cache (str): Cache mode for the destination image.
+        src_cache (str): Cache mode for the source image.
+        coroutines (int): Number of parallel coroutines. If not set, use
+            qemu-img default.
+        sparse_size (str): Minimal size of consecutive zero bytes treated as
+            sparse, for example "4k". If not set, use qemu-img default.
     """
-    cmd = [_qemuimg.cmd, "convert", "-p", "-t", "none", "-T", "none"]
+    cmd = [_qemuimg.cmd, "convert", "-p", "-t", cache, "-T", src_cache]
     options = []
     cwdPath = None
 
+    if coroutines:
+        cmd.extend(("-m", str(coroutines)))
+
+    if sparse_size:
+        cmd.extend(("-S", sparse_size))
+
     if not create:
         cmd.append("-n")
 
@@ -338,11 +351,40 @@ class ProgressCommand(object):
         self._operation = operation.Command(cmd, cwd=cwd)
         self._progress = 0.0
 
-    def run(self):
+    def run(self, on_progress=None):
+        """
+        Run the operation, waiting until it completes.
+
+        If on_progress is specified, it is called with this command and the
+        new progress when the progress changes.
+        """
         out = bytearray()
         for data in self._operation.watch():
             out += data
+            progress = self._progress
             self._update_progress(out)
+            if on_progress and self._progress != progress:
+                on_progress(self, self._progress)
+
+    def pause(self):
+        """
+        Stop the underlying qemu-img process until resume() is called.
+
+        This method is threadsafe and may be called from any thread.
+        """
+        self._operation.pause()
+
+    def resume(self):
+        """
+        Continue the underlying qemu-img process stopped by pause().
+
+        This method is threadsafe and may be called from any thread.
+        """
+        self._operation.resume()
+
+    @property
+    def running(self):
+        return self._operation.running
 
     def abort(self):
         """
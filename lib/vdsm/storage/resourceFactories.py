@@ -21,7 +21,11 @@
 from __future__ import absolute_import
 
 import os
+import threading
 
+from contextlib import contextmanager
+
+from vdsm import utils
 from vdsm.config import config
 from vdsm.storage import constants as sc
 from vdsm.storage import exception as se
@@ -34,6 +38,116 @@ import logging
 log = logging.getLogger('storage.ResourcesFactories')
 
 
+class _Activation(object):
+
+    def __init__(self, vg):
+        self.vg = vg
+        # LvmActivation resources created by this thread, not activated yet.
+        self.pending = []
+
+
+class _Deactivation(object):
+
+    def __init__(self, vg):
+        self.vg = vg
+        # LVs of closed LvmActivation resources.
+        self.lvs = []
+
+
+class _Batch(threading.local):
+    """
+    LVM activation and deactivation batches of the current thread.
+    """
+
+    def __init__(self):
+        self.activation = None
+        self.deactivation = None
+
+
+_batch = _Batch()
+
+
+@contextmanager
+def activation_batch(vg):
+    """
+    Activate the LVs of LvmActivation resources created by this thread in
+    this context using one lvm.activateLVs() call, instead of one call for
+    every resource.
+
+    A resource is created by the thread acquiring it, so the batch activates
+    only LVs whose resource is held by this thread. The LVs are activated
+    when calling activate_pending(), or when exiting the context normally.
+    Until then, the LVs of the batch must not be used.
+
+    A nested batch for the same vg is merged into the outer batch.
+    """
+    if _batch.activation is not None:
+        yield
+        return
+
+    _batch.activation = _Activation(vg)
+    try:
+        yield
+        activate_pending(vg)
+    finally:
+        _batch.activation = None
+
+
+def activate_pending(vg):
+    """
+    Activate the LVs of the current thread activation batch for vg.
+    """
+    batch = _batch.activation
+    if batch is None or batch.vg != vg:
+        return
+
+    # Another thread holding the resource may have activated the LV.
+    pending = [res for res in batch.pending if not res.active]
+    batch.pending = []
+    if not pending:
+        return
+
+    lvs = [res.lv for res in pending]
+    with utils.stopwatch("Activated %d LVs in vg %s" % (len(lvs), vg),
+                         log=log):
+        lvm.activateLVs(vg, lvs)
+    for res in pending:
+        res.active = True
+
+
+@contextmanager
+def deactivation_batch(vg):
+    """
+    Deactivate LVs of LvmActivation resources closed by this thread in this
+    context using one lvm.deactivateLVs() call when exiting the context.
+
+    A nested batch is merged into the outer batch.
+    """
+    if _batch.deactivation is not None:
+        yield
+        return
+
+    deactivation = _batch.deactivation = _Deactivation(vg)
+    try:
+        yield
+    finally:
+        _batch.deactivation = None
+        if deactivation.lvs:
+            with utils.stopwatch("Deactivated %d LVs in vg %s"
+                                 % (len(deactivation.lvs), vg), log=log):
+                _deactivate(vg, deactivation.lvs)
+
+
+def _deactivate(vg, lvs):
+    try:
+        lvm.deactivateLVs(vg, lvs)
+    except Exception as e:
+        # If storage not accessible or lvm error occurred
+        # the LV deactivation will failure.
+        # We can live with it and still release the resource.
+        log.warn("Failure deactivate LVs %s/%s (%s)", vg, lvs, e)
+
+
 class LvmActivation(object):
     """
     Represents activation state of the LV.
@@ -41,21 +155,46 @@ class LvmActivation(object):
     it calls lvm.activateLVs(). When the resource is being finally released
     the close() calls lvm.deactivateLVs() to release the DM mappings
     for this volume.
+
+    Inside activation_batch() and deactivation_batch() contexts, the LV is
+    activated or deactivated together with the other LVs of the batch.
+    Since a resource created in a batch is activated later, every holder
+    must call activate() after acquiring the resource.
     """
     def __init__(self, vg, lv, lockType):
         self._vg = vg
-        self._lv = lv
+        self.lv = lv
+        self.active = False
 
-        lvm.activateLVs(self._vg, [self._lv])
+        batch = _batch.activation
+        if batch is not None and batch.vg == vg:
+            batch.pending.append(self)
+        else:
+            self.activate()
+
+    def activate(self):
+        """
+        Activate the LV, unless it is already active, or will be activated
+        by the activation batch of this thread.
+        """
+        if self.active:
+            return
+        batch = _batch.activation
+        if batch is not None and self in batch.pending:
+            return
+        lvm.activateLVs(self._vg, [self.lv])
+        self.active = True
 
     def close(self):
-        try:
-            lvm.deactivateLVs(self._vg, [self._lv])
-        except Exception as e:
-            # If storage not accessible or lvm error occurred
-            # the LV deactivation will failure.
-            # We can live with it and still release the resource.
-            log.warn("Failure deactivate LV %s/%s (%s)", self._vg, self._lv, e)
+        batch = _batch.activation
+        if batch is not None and self in batch.pending:
+            batch.pending.remove(self)
+
+        batch = _batch.deactivation
+        if batch is not None and batch.vg == self._vg:
+            batch.lvs.append(self.lv)
+        else:
+            _deactivate(self._vg, [self.lv])
 
 
 class LvmActivationFactory(rm.SimpleResourceFactory):
@@ -24,6 +24,7 @@ import threading
 import logging
 import re
 import weakref
+from contextlib import contextmanager
 from functools import partial
 from uuid import uuid4
 
@@ -382,7 +383,7 @@ class _ResourceManager(object):
         """
         self._log.debug("Unregistering namespace '%s'", namespace)
         namespaceObj = self._namespaces[namespace]
-        with namespaceObj.lock:
+        with namespaceObj.allLocks():
             if len(namespaceObj.resources) > 0:
                 raise ResourceManagerError("Cannot unregister Resource "
                                            "Factory '%s'. It has active "
@@ -401,7 +402,7 @@ class _ResourceManager(object):
                 raise ValueError("Namespace '%s' is not registered with this "
                                  "manager" % namespace)
             resources = namespaceObj.resources
-            with namespaceObj.lock:
+            with namespaceObj.lockFor(name):
                 if not namespaceObj.factory.resourceExists(name):
                     raise KeyError("No such resource '%s.%s'" % (namespace,
                                                                  name))
@@ -456,6 +457,11 @@ class _ResourceManager(object):
             except ValueError:
                 raise TypeError("'timeout' must be number")
 
+        if lockType == SHARED:
+            ref = self._acquireSharedFast(namespace, name)
+            if ref is not None:
+                return ref
+
         resource = queue.Queue()
 
         def callback(req, res):
@@ -477,6 +483,72 @@ class _ResourceManager(object):
 
         return resource.get()
 
+    def _acquireSharedFast(self, namespace, name):
+        """
+        Fast path for acquiring a shared lock when nobody is waiting for the
+        resource. The resource is granted immediately, without creating a
+        request, and without taking the manager lock.
+
+        Returns a reference to the resource, or None if the resource is
+        locked exclusively or has waiting requests, and the caller must use
+        the slow path.
+        """
+        if not self._resourceNameValidator.match(name):
+            raise ValueError("Invalid resource name '%s'" % name)
+
+        namespaceObj = self._namespaces.get(namespace)
+        if namespaceObj is None:
+            return None
+
+        with namespaceObj.lockFor(name):
+            # The namespace cannot be unregistered while we hold one of its
+            # locks, but it may have been unregistered before we took the
+            # lock.
+            if self._namespaces.get(namespace) is not namespaceObj:
+                return None
+
+            resources = namespaceObj.resources
+            resource = resources.get(name)
+            if resource is None:
+                if not namespaceObj.factory.resourceExists(name):
+                    raise KeyError("No such resource '%s.%s'" %
+                                   (namespace, name))
+                try:
+                    obj = namespaceObj.factory.createResource(name, SHARED)
+                except:
+                    self._log.warn("Resource factory failed to create resource"
+                                   " '%s.%s'", namespace, name, exc_info=True)
+                    raise se.ResourceAcqusitionFailed()
+                resource = resources[name] = ResourceInfo(obj, namespace,
+                                                          name)
+                resource.currentLock = SHARED
+            elif resource.currentLock != SHARED or resource.queue:
+                return None
+
+            resource.activeUsers += 1
+            realObj = resource.realObj
+
+        return ResourceRef(namespace, name, realObj)
+
+    def _releaseSharedFast(self, namespace, name):
+        """
+        Fast path for releasing a resource used by other users. Nobody can
+        be granted the resource now, so we only need to drop our reference.
+
+        Returns True if the resource was released, or False if the caller
+        must use the slow path.
+        """
+        namespaceObj = self._namespaces.get(namespace)
+        if namespaceObj is None:
+            return False
+
+        with namespaceObj.lockFor(name):
+            resource = namespaceObj.resources.get(name)
+            if resource is None or resource.activeUsers < 2:
+                return False
+            resource.activeUsers -= 1
+            return True
+
     def registerResource(self, namespace, name, lockType, callback):
         """
         Register to acquire a resource asynchronously.
@@ -502,7 +574,7 @@ class _ResourceManager(object):
                                  "manager" % namespace)
 
             resources = namespaceObj.resources
-            with namespaceObj.lock:
+            with namespaceObj.lockFor(name):
                 try:
                     resource = resources[name]
                 except KeyError:
@@ -530,12 +602,9 @@ class _ResourceManager(object):
                                     fullName, len(resource.queue))
                     return RequestRef(request)
 
-                # TODO : Creating the object inside the namespace lock causes
-                #        the entire namespace to lock and might cause
-                #        performance issues. As this is no currently a problem
-                #        I left it as it is to keep the code simple. If there
-                #        is a bottleneck in the resource framework, its
-                #        probably here.
+                # NOTE: The object is created inside the resource lock,
+                #       blocking other resources sharing the same lock
+                #       stripe until the object is created.
                 try:
                     obj = namespaceObj.factory.createResource(name, lockType)
                 except:
@@ -563,6 +632,9 @@ class _ResourceManager(object):
         #        object and can CANCEL THE REQUEST at any time. Always use
         #        request.grant between try and except to properly handle such
         #        a case
+        if self._releaseSharedFast(namespace, name):
+            return
+
         fullName = "%s.%s" % (namespace, name)
 
         self._log.debug("Trying to release resource '%s'", fullName)
@@ -574,7 +646,7 @@ class _ResourceManager(object):
                                  "manager", namespace)
             resources = namespaceObj.resources
 
-            with namespaceObj.lock:
+            with namespaceObj.lockFor(name):
                 try:
                     resource = resources[name]
                 except KeyError:
@@ -674,12 +746,37 @@ class _ResourceManager(object):
 class Namespace(object):
     """
     Namespace struct
+
+    Resources are protected by striped locks, so operations on different
+    resources in the same namespace do not contend on a single lock.
     """
+
+    LOCK_STRIPES = 16
+
     def __init__(self, factory):
         self.resources = {}
-        self.lock = threading.Lock()  # rwlock.RWLock()
+        self.locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
         self.factory = factory
 
+    def lockFor(self, name):
+        """
+        Return the lock protecting resource name.
+        """
+        return self.locks[hash(name) % len(self.locks)]
+
+    @contextmanager
+    def allLocks(self):
+        """
+        Lock all the resources in this namespace.
+        """
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
+
 
 class ResourceInfo(object):
     """
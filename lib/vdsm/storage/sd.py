@@ -37,6 +37,7 @@ from vdsm.storage import clusterlock
 from vdsm.storage import constants as sc
 from vdsm.storage import exception as se
 from vdsm.storage import fileUtils
+from vdsm.storage import mdcache
 from vdsm.storage import misc
 from vdsm.storage import outOfProcess as oop
 from vdsm.storage import qemuimg
@@ -451,6 +452,38 @@ class StorageDomainManifest(object):
         return self.getVolumeClass()(self.mountpoint, self.sdUUID, imgUUID,
                                      volUUID)
 
+    def dumpVolumeChains(self):
+        """
+        Return the info of all the volumes of all the images, keyed by image
+        UUID and volume UUID, as reported by getVolumeInfo.
+
+        The volumes are looked up once for the entire domain, and block
+        volumes metadata is read from cached metadata regions. The size of
+        every volume is still checked separately, and if the domain supports
+        volume leases, every volume lease is inquired.
+        """
+        self.log.info("Dumping volume chains for domain %s", self.sdUUID)
+        images = {imgUUID: [] for imgUUID in self.getAllImages()}
+        for volUUID, vol in six.iteritems(self.getAllVolumes()):
+            for imgUUID in vol.imgs:
+                if imgUUID in images:
+                    images[imgUUID].append(volUUID)
+
+        result = {}
+        with mdcache.cached(self.sdUUID):
+            for imgUUID, volUUIDs in six.iteritems(images):
+                imgVolumes = {}
+                for volUUID in volUUIDs:
+                    try:
+                        vol = self.produceVolume(imgUUID, volUUID)
+                    except se.VolumeDoesNotExist:
+                        self.log.warning("Volume %s/%s/%s was removed",
+                                         self.sdUUID, imgUUID, volUUID)
+                        continue
+                    imgVolumes[volUUID] = vol.getInfo(log_level=logging.DEBUG)
+                result[imgUUID] = imgVolumes
+        return result
+
     def isISO(self):
         return self.getMetaParam(DMDK_CLASS) == ISO_DOMAIN
 
@@ -21,12 +21,25 @@
 """
 Cache module provides general purpose (more or less) cache infrastructure
 for keeping storage related data that is expensive to harvest, but needed often
+
+Unknown domains are looked up using all the domain finders concurrently, so
+an inaccessible NFS server does not delay finding block domains. Domains that
+no finder could find are remembered for [irs] sd_cache_negative_ttl seconds,
+or until the storage is invalidated, to avoid rescanning the storage on every
+lookup. Domains are not remembered if a finder failed or is stuck.
 """
 from __future__ import absolute_import
+from __future__ import division
 
 import logging
 import threading
 
+from six.moves import queue
+
+from vdsm.common import concurrent
+from vdsm.common import latency
+from vdsm.common.time import monotonic_time
+from vdsm.config import config
 from vdsm.storage import constants as sc
 from vdsm.storage import exception as se
 from vdsm.storage import lvm
@@ -34,6 +47,13 @@ from vdsm.storage import misc
 from vdsm.storage import multipath
 
 
+class _LookupFailed(se.StorageDomainDoesNotExist):
+    """
+    Raised when a domain was not found because some finders failed or were
+    skipped. The domain may exist, so it is not remembered as missing.
+    """
+
+
 class DomainProxy(object):
     """
     Keeps domain references valid even when underlying domain object changes
@@ -63,17 +83,32 @@ class StorageDomainCache:
     STORAGE_STALE = 1
     STORAGE_REFRESHING = 2
 
-    def __init__(self, storage_repo):
+    # Maximum number of domains looked up concurrently by prefetch().
+    MAX_WORKERS = 10
+
+    # Maximum number of threads running the same finder. When a finder is
+    # stuck, for example on an inaccessible NFS server, lookups skip it
+    # until some of its threads finish.
+    MAX_FINDER_THREADS = 4
+
+    def __init__(self, storage_repo, clock=monotonic_time):
         self._syncroot = threading.Condition()
         self.__domainCache = {}
         self.__inProgress = set()
         self.__staleStatus = self.STORAGE_STALE
+        self.__missing = {}  # {sdUUID: expiration time}
+        self._clock = clock
+        self._timings = latency.Registry()
         self.storage_repo = storage_repo
         self.knownSDs = {}  # {sdUUID: mod.findDomain}
+        self._findersLock = threading.Lock()
+        self._runningFinders = {}  # {findDomain: number of threads}
 
     def invalidateStorage(self):
         with self._syncroot:
             self.__staleStatus = self.STORAGE_STALE
+            # Missing domains may be found on the new storage.
+            self.__missing.clear()
 
     @misc.samplingmethod
     def refreshStorage(self, resize=True):
@@ -90,6 +125,8 @@ class StorageDomainCache:
         with self._syncroot:
             if self.__staleStatus == self.STORAGE_REFRESHING:
                 self.__staleStatus = self.STORAGE_UPDATED
+            # Missing domains may be found on the rescanned devices.
+            self.__missing.clear()
 
     def produce_manifest(self, sdUUID):
         """
@@ -110,14 +147,56 @@ class StorageDomainCache:
         domain.getRealDomain()
         return domain
 
+    def prefetch(self, sdUUIDs):
+        """
+        Look up sdUUIDs concurrently, so the domains are cached when they are
+        produced. Errors are logged and ignored; producing a domain that
+        could not be found will fail.
+        """
+        def produce(sdUUID):
+            try:
+                self._realProduce(sdUUID)
+            except se.StorageDomainDoesNotExist:
+                self.log.warning("Storage domain %s does not exist", sdUUID)
+            except Exception:
+                self.log.exception("Error looking up domain %s", sdUUID)
+
+        sdUUIDs = list(sdUUIDs)
+        if sdUUIDs:
+            concurrent.tmap(produce, sdUUIDs,
+                            max_workers=min(len(sdUUIDs), self.MAX_WORKERS))
+
+    def stats(self):
+        """
+        Return dict with the number of cache hits, lookups, and lookups of
+        missing domains answered from the negative cache, and histograms of
+        produce latency in seconds for each kind.
+        """
+        info = self._timings.info()
+        return {
+            "hits": info.get("hit", {}).get("count", 0),
+            "lookups": info.get("lookup", {}).get("count", 0),
+            "missing": info.get("missing", {}).get("count", 0),
+            "produce": info,
+        }
+
     def _realProduce(self, sdUUID):
+        start = self._clock()
         with self._syncroot:
             while True:
                 domain = self.__domainCache.get(sdUUID)
 
                 if domain is not None:
+                    self._timings.add("hit", self._clock() - start)
                     return domain
 
+                expires = self.__missing.get(sdUUID)
+                if expires is not None:
+                    if self._clock() < expires:
+                        self._timings.add("missing", self._clock() - start)
+                        raise se.StorageDomainDoesNotExist(sdUUID)
+                    del self.__missing[sdUUID]
+
                 if sdUUID not in self.__inProgress:
                     self.__inProgress.add(sdUUID)
                     break
@@ -131,11 +210,24 @@ class StorageDomainCache:
             if self.__staleStatus != self.STORAGE_UPDATED:
                 self.refreshStorage()
 
-            domain = self._findDomain(sdUUID)
+            try:
+                domain = self._findDomain(sdUUID)
+            except _LookupFailed:
+                self._timings.add("lookup", self._clock() - start,
+                                  error=True)
+                raise
+            except se.StorageDomainDoesNotExist:
+                ttl = config.getint("irs", "sd_cache_negative_ttl")
+                with self._syncroot:
+                    self.__missing[sdUUID] = self._clock() + ttl
+                self._timings.add("lookup", self._clock() - start,
+                                  error=True)
+                raise
 
             with self._syncroot:
                 self.__domainCache[sdUUID] = domain
-                return domain
+            self._timings.add("lookup", self._clock() - start)
+            return domain
 
         finally:
             with self._syncroot:
@@ -151,29 +243,89 @@ class StorageDomainCache:
         return findMethod(sdUUID)
 
     def _findUnfetchedDomain(self, sdUUID):
+        self.log.debug("looking for domain %s", sdUUID)
+
+        # The finders run concurrently, so if an nfs mount is unavailable
+        # and the nfs finder gets stuck until it times out, block or local
+        # domains are still found quickly. The first domain found is
+        # returned; stuck finders are left running in their own threads.
+        results = queue.Queue()
+        started = 0
+        failed = False
+        for findDomain in self._finders():
+            if self._startFinder(findDomain, sdUUID, results):
+                started += 1
+            else:
+                failed = True
+
+        for _ in range(started):
+            domain, error = results.get()
+            if domain is not None:
+                return domain
+            failed = failed or error
+
+        if failed:
+            raise _LookupFailed(sdUUID)
+        raise se.StorageDomainDoesNotExist(sdUUID)
+
+    def _finders(self):
         from vdsm.storage import blockSD
         from vdsm.storage import glusterSD
         from vdsm.storage import localFsSD
         from vdsm.storage import nfsSD
 
-        self.log.debug("looking for domain %s", sdUUID)
+        return [mod.findDomain for mod in (blockSD, glusterSD, localFsSD,
+                                           nfsSD)]
 
-        # The order is somewhat important, it's ordered
-        # by how quickly get can find the domain. For instance
-        # if an nfs mount is unavailable we will get stuck
-        # until it times out, this should affect fetching
-        # of block\local domains. If for any case in the future
-        # this changes, please update the order.
-        for mod in (blockSD, glusterSD, localFsSD, nfsSD):
-            try:
-                return mod.findDomain(sdUUID)
-            except se.StorageDomainDoesNotExist:
-                pass
-            except Exception:
-                self.log.error("Error while looking for domain `%s`", sdUUID,
-                               exc_info=True)
+    def _startFinder(self, findDomain, sdUUID, results):
+        """
+        Start a thread running findDomain, unless too many threads are
+        already running it. Return True if the thread was started.
+        """
+        with self._findersLock:
+            running = self._runningFinders.get(findDomain, 0)
+            if running >= self.MAX_FINDER_THREADS:
+                self.log.warning(
+                    "Skipping finder %s looking for domain %s: %d threads "
+                    "are still running it", findDomain, sdUUID, running)
+                return False
+            self._runningFinders[findDomain] = running + 1
 
-        raise se.StorageDomainDoesNotExist(sdUUID)
+        try:
+            t = concurrent.thread(self._runFinder,
+                                  args=(findDomain, sdUUID, results),
+                                  name="sdc/find",
+                                  log=self.log)
+            t.start()
+        except Exception:
+            self._finderDone(findDomain)
+            raise
+        return True
+
+    def _finderDone(self, findDomain):
+        with self._findersLock:
+            running = self._runningFinders.pop(findDomain) - 1
+            if running:
+                self._runningFinders[findDomain] = running
+
+    def _runFinder(self, findDomain, sdUUID, results):
+        """
+        Put (domain, error) in results. domain is None if the domain was not
+        found, and error is True if findDomain failed.
+        """
+        domain = None
+        error = False
+        try:
+            domain = findDomain(sdUUID)
+        except se.StorageDomainDoesNotExist:
+            pass
+        except Exception:
+            error = True
+            self.log.error("Error while looking for domain `%s`", sdUUID,
+                           exc_info=True)
+        finally:
+            self._finderDone(findDomain)
+            results.put((domain, error))
 
     def getUUIDs(self):
         from vdsm.storage import blockSD
@@ -189,10 +341,12 @@ class StorageDomainCache:
         with self._syncroot:
             lvm.invalidateCache()
             self.__domainCache.clear()
+            self.__missing.clear()
 
     def manuallyAddDomain(self, domain):
         with self._syncroot:
             self.__domainCache[domain.sdUUID] = domain
+            self.__missing.pop(domain.sdUUID, None)
 
     def manuallyRemoveDomain(self, sdUUID):
         with self._syncroot:
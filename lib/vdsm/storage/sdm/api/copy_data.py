@@ -25,6 +25,8 @@ import logging
 from vdsm import jobs
 from vdsm.common import properties
 from vdsm.storage import constants as sc
+from vdsm.storage import convertprofile
+from vdsm.storage import copyscheduler
 from vdsm.storage import guarded
 from vdsm.storage import qemuimg
 from vdsm.storage import resourceManager as rm
@@ -55,6 +57,8 @@ class Job(base.Job):
     def _abort(self):
         if self._operation:
             self._operation.abort()
+            # The copy may be waiting for copy slots.
+            copyscheduler.scheduler().wakeup()
 
     def _run(self):
         with guarded.context(self._source.locks + self._dest.locks):
@@ -82,8 +86,15 @@ class Job(base.Job):
                         backingFormat=self._dest.backing_qemu_format,
                         preallocation=self._dest.preallocation,
                         unordered_writes=self._dest
-                            .recommends_unordered_writes)
-                    self._operation.run()
+                            .recommends_unordered_writes,
+                        **convertprofile.convert_options(
+                            self._source.domain, self._dest.domain))
+                    scheduler = copyscheduler.scheduler()
+                    with scheduler.copy(
+                            "job %s" % self.id,
+                            self._source.size,
+                            aborted=lambda: self._operation.aborted) as copy:
+                        copy.run(self._operation)
 
 
 def _create_endpoint(params, host_id, writable):
@@ -141,6 +152,14 @@ class CopyDataDivEndpoint(properties.Owner):
             return None
         return volume.getBackingVolumePath(self.img_id, parent_vol.volUUID)
 
+    @property
+    def domain(self):
+        return sdCache.produce_manifest(self.sd_id)
+
+    @property
+    def size(self):
+        return self.volume.getSize() * sc.BLOCK_SIZE
+
     @property
     def qcow2_compat(self):
         dom = sdCache.produce_manifest(self.sd_id)
@@ -1291,6 +1291,13 @@ class StoragePool(object):
                            'domains or not active', msdUUID)
             raise se.StoragePoolWrongMaster(self.spUUID, msdUUID)
 
+        # Look up the domains concurrently in the background, so they are
+        # cached when the domain monitors and the next requests produce them.
+        # Waiting here would delay connecting to the pool if some domains
+        # are not accessible.
+        concurrent.thread(sdCache.prefetch, args=(list(domUUIDs),),
+                          name="sdc/prefetch", log=self.log).start()
+
         # TODO: Consider to remove this whole block. UGLY!
         # We want to avoid looking up (vgs) of unknown block domains.
         # domUUIDs includes all the domains, file or block.
@@ -83,6 +83,18 @@ NUM_SEP = "."
 FIELD_SEP = ","
 TASK_METADATA_VERSION = 1
 
+# Sections of task metadata, see Task._metaSections().
+TASK_SECTION = "task"
+JOB_SECTION = "job"
+RECOVER_SECTION = "recover"
+RESULT_SECTION = "result"
+
+# Task store formats:
+# - "dir": task stored in directory <id>, one file per section.
+# - "file": task stored in the file <id>.task, replaced atomically.
+STORE_FORMAT_DIR = "dir"
+STORE_FORMAT_FILE = "file"
+
 ROLLBACK_SENTINEL = "rollback sentinel"
 
 
@@ -483,7 +495,11 @@ class Task:
         self.persistPolicy = TaskPersistType.none
         self.cleanPolicy = TaskCleanType.auto
         self.store = None
+        self.storeFormat = STORE_FORMAT_DIR
         self.defaultException = None
+        # Paths of persisted task file or directory, if any.
+        self._taskFile = None
+        self._taskDir = None
 
         self.state = State(State.init)
         self.result = TaskResult(0, "Task is initializing", "")
@@ -506,20 +522,24 @@ class Task:
         self.log = SimpleLogAdapter(self.log, {"Task": self.id})
 
     def __del__(self):
-        def finalize(log, owner, taskDir):
+        def finalize(log, owner, taskFile, taskDir):
             log.warn("Task was autocleaned")
             owner.releaseAll()
+            if taskFile is not None:
+                getProcPool().utils.rmFile(taskFile)
             if taskDir is not None:
                 getProcPool().fileUtils.cleanupdir(taskDir)
 
         if not self.state.isDone():
+            taskFile = None
             taskDir = None
             if (self.cleanPolicy == TaskCleanType.auto and
                     self.store is not None):
-                taskDir = os.path.join(self.store, self.id)
+                taskFile = self._taskFile
+                taskDir = self._taskDir
             t = concurrent.thread(
                 finalize,
-                args=(self.log, self.resOwner, taskDir),
+                args=(self.log, self.resOwner, taskFile, taskDir),
                 name="task/" + self.id[:8])
             t.start()
 
@@ -628,7 +648,16 @@ class Task:
     @classmethod
     def _loadMetaFile(cls, filename, obj, fields):
         try:
-            for line in getProcPool().readLines(filename):
+            lines = getProcPool().readLines(filename)
+        except Exception:
+            cls.log.error("Unexpected error", exc_info=True)
+            raise se.TaskMetaDataLoadError(filename)
+        cls._parseMetaLines(filename, lines, obj, fields)
+
+    @classmethod
+    def _parseMetaLines(cls, filename, lines, obj, fields):
+        try:
+            for line in lines:
                 # process current line
                 line = line.encode('utf8')
                 if line.find(KEY_SEPARATOR) < 0:
@@ -683,39 +712,44 @@ class Task:
             cls.log.error("Unexpected error", exc_info=True)
             raise se.TaskMetaDataSaveError(filename)
 
-    def _loadTaskMetaFile(self, taskDir):
-        taskFile = os.path.join(taskDir, self.id + TASK_EXT)
-        self._loadMetaFile(taskFile, self, Task.fields)
-
-    def _saveTaskMetaFile(self, taskDir):
-        taskFile = os.path.join(taskDir, self.id + TASK_EXT)
-        self._saveMetaFile(taskFile, self, Task.fields)
-
-    def _loadJobMetaFile(self, taskDir, n):
-        taskFile = os.path.join(taskDir, self.id + JOB_EXT + NUM_SEP + str(n))
-        self._loadMetaFile(taskFile, self.jobs[n], Job.fields)
-
-    def _saveJobMetaFile(self, taskDir, n):
-        taskFile = os.path.join(taskDir, self.id + JOB_EXT + NUM_SEP + str(n))
-        self._saveMetaFile(taskFile, self.jobs[n], Job.fields)
-
-    def _loadRecoveryMetaFile(self, taskDir, n):
-        taskFile = os.path.join(taskDir,
-                                self.id + RECOVER_EXT + NUM_SEP + str(n))
-        self._loadMetaFile(taskFile, self.recoveries[n], Recovery.fields)
-
-    def _saveRecoveryMetaFile(self, taskDir, n):
-        taskFile = os.path.join(taskDir,
-                                self.id + RECOVER_EXT + NUM_SEP + str(n))
-        self._saveMetaFile(taskFile, self.recoveries[n], Recovery.fields)
-
-    def _loadTaskResultMetaFile(self, taskDir):
-        taskFile = os.path.join(taskDir, self.id + RESULT_EXT)
-        self._loadMetaFile(taskFile, self.result, TaskResult.fields)
+    def _metaSections(self):
+        """
+        Return list of (section, obj, fields) tuples describing the task
+        metadata. In the "dir" format every section is stored in the file
+        <id>.<section> in the task directory. In the "file" format all
+        sections are stored in <id>.task, each starting with a [<section>]
+        line.
+        """
+        sections = [(TASK_SECTION, self, Task.fields)]
+        if self.state == State.finished:
+            sections.append((RESULT_SECTION, self.result, TaskResult.fields))
+        for jn, job in enumerate(self.jobs):
+            sections.append((JOB_SECTION + NUM_SEP + str(jn), job,
+                             Job.fields))
+        for rn, recovery in enumerate(self.recoveries):
+            sections.append((RECOVER_SECTION + NUM_SEP + str(rn), recovery,
+                             Recovery.fields))
+        return sections
 
-    def _saveTaskResultMetaFile(self, taskDir):
-        taskFile = os.path.join(taskDir, self.id + RESULT_EXT)
-        self._saveMetaFile(taskFile, self.result, TaskResult.fields)
+    @classmethod
+    def _readTaskFile(cls, filename):
+        """
+        Read task file and return dict of section: lines.
+        """
+        try:
+            lines = getProcPool().readLines(filename)
+        except Exception:
+            cls.log.error("Unexpected error", exc_info=True)
+            raise se.TaskMetaDataLoadError(filename)
+        sections = {}
+        current = None
+        for line in lines:
+            line = line.strip()
+            if line.startswith("[") and line.endswith("]"):
+                current = sections.setdefault(line[1:-1], [])
+            elif current is not None:
+                current.append(line)
+        return sections
 
     def _getResourcesKeyList(self, taskDir):
         keys = []
@@ -730,28 +764,85 @@ class Task:
         if self.state != State.init:
             raise se.TaskMetaDataLoadError("task %s - can't load self: "
                                            "not in init state" % self)
-        taskDir = os.path.join(storPath, str(self.id) + str(ext))
-        if not getProcPool().os.path.exists(taskDir):
-            raise se.TaskDirError("load: no such task dir '%s'" % taskDir)
+        if ext == TASK_EXT:
+            taskFile = os.path.join(storPath, self.id + TASK_EXT)
+            sections = self._readTaskFile(taskFile)
+
+            def load(section, obj, fields):
+                if section not in sections:
+                    raise se.TaskMetaDataLoadError(
+                        "%s: missing section %s" % (taskFile, section))
+                self._parseMetaLines(taskFile, sections[section], obj,
+                                     fields)
+
+            self._taskFile = taskFile
+        else:
+            taskDir = os.path.join(storPath, str(self.id) + str(ext))
+            if not getProcPool().os.path.exists(taskDir):
+                raise se.TaskDirError("load: no such task dir '%s'" %
+                                      taskDir)
+
+            def load(section, obj, fields):
+                filename = os.path.join(taskDir, self.id + "." + section)
+                self._loadMetaFile(filename, obj, fields)
+
+            self._taskDir = taskDir
         oldid = self.id
-        self._loadTaskMetaFile(taskDir)
+        load(TASK_SECTION, self, Task.fields)
         if self.id != oldid:
             raise se.TaskMetaDataLoadError("task %s: loaded file do not match"
                                            " id (%s != %s)" %
                                            (self, self.id, oldid))
         if self.state == State.finished:
-            self._loadTaskResultMetaFile(taskDir)
+            load(RESULT_SECTION, self.result, TaskResult.fields)
         for jn in range(self.njobs):
             self.jobs.append(Job("load", None))
-            self._loadJobMetaFile(taskDir, jn)
+            load(JOB_SECTION + NUM_SEP + str(jn), self.jobs[jn], Job.fields)
             self.jobs[jn].setOwnerTask(self)
         for rn in range(self.nrecoveries):
             self.recoveries.append(Recovery("load", "load",
                                             "load", "load", ""))
-            self._loadRecoveryMetaFile(taskDir, rn)
+            load(RECOVER_SECTION + NUM_SEP + str(rn), self.recoveries[rn],
+                 Recovery.fields)
             self.recoveries[rn].setOwnerTask(self)
 
     def _save(self, storPath):
+        self.njobs = len(self.jobs)
+        self.nrecoveries = len(self.recoveries)
+        if self.storeFormat == STORE_FORMAT_FILE:
+            self._saveFile(storPath)
+        else:
+            self._saveDir(storPath)
+
+    def _saveFile(self, storPath):
+        """
+        Save the task in a single file, replacing the previous file
+        atomically.
+        """
+        taskFile = os.path.join(storPath, self.id + TASK_EXT)
+        tempFile = taskFile + TEMP_EXT
+        self.log.debug("_save: file %s", taskFile)
+        lines = []
+        for section, obj, fields in self._metaSections():
+            lines.append("[%s]" % section)
+            lines.extend(self._dump(obj, fields))
+        data = "".join((l + "\n").encode("utf8") for l in lines)
+        procPool = getProcPool()
+        try:
+            procPool.writeFile(tempFile, data)
+            procPool.fileUtils.fsyncPath(tempFile)
+            procPool.os.rename(tempFile, taskFile)
+            procPool.fileUtils.fsyncPath(storPath)
+        except Exception as e:
+            self.log.error("Unexpected error", exc_info=True)
+            raise se.TaskPersistError("%s persist failed: %s" % (self, e))
+        self._taskFile = taskFile
+        # Task loaded from the old format.
+        if self._taskDir is not None:
+            self._cleanTaskDirs(storPath)
+            self._taskDir = None
+
+    def _saveDir(self, storPath):
         origTaskDir = os.path.join(storPath, self.id)
         if not getProcPool().os.path.exists(origTaskDir):
             raise se.TaskDirError("_save: no such task dir '%s'" % origTaskDir)
@@ -761,15 +852,9 @@ class Task:
             getProcPool().fileUtils.cleanupdir(taskDir)
         getProcPool().os.mkdir(taskDir)
         try:
-            self.njobs = len(self.jobs)
-            self.nrecoveries = len(self.recoveries)
-            self._saveTaskMetaFile(taskDir)
-            if self.state == State.finished:
-                self._saveTaskResultMetaFile(taskDir)
-            for jn in range(self.njobs):
-                self._saveJobMetaFile(taskDir, jn)
-            for rn in range(self.nrecoveries):
-                self._saveRecoveryMetaFile(taskDir, rn)
+            for section, obj, fields in self._metaSections():
+                filename = os.path.join(taskDir, self.id + "." + section)
+                self._saveMetaFile(filename, obj, fields)
         except Exception as e:
             self.log.error("Unexpected error", exc_info=True)
             try:
@@ -783,10 +868,31 @@ class Task:
         getProcPool().os.rename(taskDir, origTaskDir)
         getProcPool().fileUtils.cleanupdir(origTaskDir + BACKUP_EXT)
         getProcPool().fileUtils.fsyncPath(origTaskDir)
+        # Task loaded from the new format.
+        if self._taskFile is not None:
+            getProcPool().utils.rmFile(self._taskFile)
+            self._taskFile = None
 
-    def _clean(self, storPath):
+    def _cleanTaskDirs(self, storPath):
+        """
+        Remove the task directory in the old format, and the temporary and
+        backup directories left by an interrupted save.
+        """
         taskDir = os.path.join(storPath, self.id)
-        getProcPool().fileUtils.cleanupdir(taskDir)
+        for path in (taskDir, taskDir + TEMP_EXT, taskDir + BACKUP_EXT):
+            getProcPool().fileUtils.cleanupdir(path)
+
+    def _clean(self, storPath):
+        if self._taskFile is not None:
+            getProcPool().utils.rmFile(self._taskFile)
+            # Left by an interrupted save.
+            tempFile = self._taskFile + TEMP_EXT
+            if getProcPool().os.path.exists(tempFile):
+                getProcPool().utils.rmFile(tempFile)
+            self._taskFile = None
+        if self._taskDir is not None:
+            self._cleanTaskDirs(storPath)
+            self._taskDir = None
 
     def _recoverDone(self):
         # protect agains races with stop/abort
@@ -1110,13 +1216,20 @@ class Task:
         self.setCleanPolicy(cleanPolicy)
         if self.persistPolicy != TaskPersistType.none and not self.store:
             raise se.TaskPersistError("no store defined")
-        taskDir = os.path.join(self.store, self.id)
-        try:
-            getProcPool().fileUtils.createdir(taskDir)
-        except Exception as e:
-            self.log.error("Unexpected error", exc_info=True)
-            raise se.TaskPersistError("%s: cannot access/create taskdir"
-                                      " %s: %s" % (self, taskDir, e))
+        storeFormat = config.get('irs', 'task_store_format')
+        if storeFormat not in (STORE_FORMAT_DIR, STORE_FORMAT_FILE):
+            raise se.TaskPersistError("%s: invalid task_store_format %r" %
+                                      (self, storeFormat))
+        self.storeFormat = storeFormat
+        if self.storeFormat == STORE_FORMAT_DIR:
+            taskDir = os.path.join(self.store, self.id)
+            try:
+                getProcPool().fileUtils.createdir(taskDir)
+            except Exception as e:
+                self.log.error("Unexpected error", exc_info=True)
+                raise se.TaskPersistError("%s: cannot access/create taskdir"
+                                          " %s: %s" % (self, taskDir, e))
+            self._taskDir = taskDir
         if (self.persistPolicy == TaskPersistType.auto and
                 self.state != State.init):
             self.persist()
@@ -1146,7 +1259,10 @@ class Task:
     @classmethod
     def loadTask(cls, store, taskid):
         t = Task(taskid)
-        if getProcPool().os.path.exists(os.path.join(store, taskid)):
+        if getProcPool().os.path.exists(os.path.join(store,
+                                                     taskid + TASK_EXT)):
+            ext = TASK_EXT
+        elif getProcPool().os.path.exists(os.path.join(store, taskid)):
             ext = ""
         # TBD: is this the correct order (temp < backup) + should temp
         # be considered at all?
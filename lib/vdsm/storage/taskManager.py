@@ -25,7 +25,7 @@ import threading
 
 from vdsm.config import config
 from vdsm.storage import exception as se
-from vdsm.storage.task import Task, Job, TaskCleanType
+from vdsm.storage.task import Task, Job, TaskCleanType, TASK_EXT, TEMP_EXT
 from vdsm.storage.threadPool import ThreadPool
 
 
@@ -34,9 +34,12 @@ class TaskManager:
 
     def __init__(self,
                  tpSize=config.getint('irs', 'thread_pool_size'),
-                 waitTimeout=3,
-                 maxTasks=config.getint('irs', 'max_tasks')):
-        self.tp = ThreadPool("tasks", tpSize, waitTimeout, maxTasks)
+                 maxTasks=config.getint('irs', 'max_tasks'),
+                 tpMaxSize=config.getint('irs', 'thread_pool_max_size'),
+                 taskTimeout=config.getint('irs', 'thread_pool_task_timeout')):
+        self.tp = ThreadPool("tasks", tpSize, maxTasks,
+                             max_workers=tpMaxSize,
+                             timeout=taskTimeout or None)
         self._tasks = {}
         self._unqueuedTasks = []
         self._insertTaskLock = threading.Lock()
@@ -57,7 +60,7 @@ class TaskManager:
             self._tasks[task.id] = task
 
         try:
-            if not self.tp.queueTask(task.id, method):
+            if not self.tp.queueTask(task.id, method, kind=task.name):
                 self.log.error("unable to queue task: %s", task.dumpTask())
                 del self._tasks[task.id]
                 raise se.AddTaskError()
@@ -95,7 +98,7 @@ class TaskManager:
                 t.stop()
             self.log.info(str(t))
 
-        self.tp.joinAll(waitForTasks=False, waitForThreads=False)
+        self.tp.stop(wait=False)
 
     def getTaskStatus(self, taskID):
         """ Internal return Task status for a given task.
@@ -206,8 +209,22 @@ class TaskManager:
         if not os.path.exists(store):
             self.log.debug("task dump path %s does not exist.", store)
             return
-        # taskID is the root part of each (root.ext) entry in the dump task dir
-        tasksIDs = set(os.path.splitext(tid)[0] for tid in os.listdir(store))
+        entries = os.listdir(store)
+        # A temporary task file is left by a save interrupted before renaming
+        # it to the task file. It is never newer than the task file, and no
+        # task is saved while loading.
+        tempFiles = [e for e in entries if e.endswith(TASK_EXT + TEMP_EXT)]
+        for name in tempFiles:
+            path = os.path.join(store, name)
+            self.log.warning("Removing stale task file %s", path)
+            try:
+                os.unlink(path)
+            except OSError:
+                self.log.error("Cannot remove %s", path, exc_info=True)
+        # taskID is the root part of each (root.ext[.ext]) entry in the dump
+        # task dir. Task IDs cannot contain ".".
+        tasksIDs = set(tid.split(".", 1)[0] for tid in entries
+                       if tid not in tempFiles)
         for taskID in tasksIDs:
             self.log.debug("Loading dumped task %s", taskID)
             try:
@@ -1,288 +1,194 @@
 #
-# Adapted by Red Hat from
-# http://code.activestate.com/recipes/203871-a-generic-programming-thread-pool/
-# Author: Tim Lesher
-# License: PSF License
-# http://wiki.python.org/moin/PythonSoftwareFoundationLicenseV2Easy
+# Copyright 2009-2019 Red Hat, Inc.
 #
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Thread pool running storage tasks and mailbox messages.
+
+The pool is built on vdsm.executor.Executor. Queued tasks are handed to an
+idle worker without polling. If the pool has a timeout, a worker running a
+task longer than the timeout is replaced by a new worker, up to max_workers
+threads. The replaced worker exits when its task finishes, so the pool grows
+while long tasks are running, and shrinks back when they finish.
+
+The pool keeps histograms of the time tasks waited in the queue and the
+time they were running, keyed by task kind, and the number of tasks dropped
+because the queue was full, reported by stats().
+"""
 
 from __future__ import absolute_import
-from __future__ import print_function
+from __future__ import division
 
-import itertools
+import functools
 import logging
 import threading
+import weakref
 
-from six.moves import queue
-from time import sleep
-
-from vdsm.common import concurrent
+from vdsm import executor
+from vdsm import schedule
+from vdsm.common import exception
+from vdsm.common import latency
+from vdsm.common.time import monotonic_time
 
+# Live pools, reported by stats().
+_pools = weakref.WeakSet()
 
-class ThreadPool:
 
-    """Flexible thread pool class.  Creates a pool of threads, then
-    accepts tasks that will be dispatched to the next available
-    thread."""
+def stats():
+    """
+    Return dict of stats of all live pools, keyed by pool name.
+    """
+    return {pool.name: pool.stats() for pool in list(_pools)}
 
-    log = logging.getLogger('storage.ThreadPool')
 
-    def __init__(self, name, numThreads, waitTimeout=3, maxTasks=100):
+class ThreadPool(object):
 
-        """Initialize the thread pool with numThreads workers."""
+    log = logging.getLogger('storage.ThreadPool')
 
-        self.log.debug("Enter - name: %s, numThreads: %s, waitTimeout: %s, "
-                       "maxTasks: %s",
-                       name, numThreads, waitTimeout, maxTasks)
+    def __init__(self, name, workers, max_tasks, max_workers=None,
+                 timeout=None):
+        """
+        Arguments:
+            name (str): Name of the pool, used for worker thread names.
+            workers (int): Number of workers ready to run tasks.
+            max_tasks (int): Maximum number of queued tasks.
+            max_workers (int): Maximum number of workers, including workers
+                replaced while running long tasks. If None, the number of
+                workers is not limited.
+            timeout (float): Replace a worker running a task longer than
+                timeout seconds. If None, workers are never replaced.
+        """
+        self.log.debug("Enter - name: %s, workers: %s, max_tasks: %s, "
+                       "max_workers: %s, timeout: %s",
+                       name, workers, max_tasks, max_workers, timeout)
         self._name = name
-        self._count = itertools.count()
-        self.__threads = []
-        self._taskThread = {}
-        self.__resizeLock = threading.Condition(threading.Lock())
-        self.__runningTasksLock = threading.Condition(threading.Lock())
-        self.__tasks = queue.Queue(maxTasks)
-        self.__isJoining = False
-        self.__runningTasks = 0
-        self.__waitTimeout = waitTimeout
-        self.setThreadCount(numThreads)
-
-    def setRunningTask(self, addTask):
-
-        """ Internal method to increase or decrease a counter of current
-        executing tasks."""
-
-        self.__runningTasksLock.acquire()
-        try:
-            if addTask:
-                self.__runningTasks += 1
-            else:
-                self.__runningTasks -= 1
-            self.log.debug("Number of running tasks: %s", self.__runningTasks)
-        finally:
-            self.__runningTasksLock.release()
-
-    def getRunningTasks(self):
-        return self.__runningTasks
-
-    def setThreadCount(self, newNumThreads):
-
-        """ External method to set the current pool size.  Acquires
-        the resizing lock, then calls the internal version to do real
-        work."""
-
-        # Can't change the thread count if we're shutting down the pool!
-        if self.__isJoining:
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._dropped = 0
+        self._stopped = False
+        self._wait_time = latency.Registry()
+        self._run_time = latency.Registry()
+        self._scheduler = schedule.Scheduler(name=name + "/sched",
+                                             clock=monotonic_time)
+        self._executor = executor.Executor(
+            name=name,
+            workers_count=workers,
+            max_tasks=max_tasks,
+            scheduler=self._scheduler,
+            max_workers=max_workers)
+        self._scheduler.start()
+        self._executor.start()
+        _pools.add(self)
+
+    @property
+    def name(self):
+        return self._name
+
+    def queueTask(self, id, task, args=None, taskCallback=None, kind="task"):
+        """
+        Queue task for running in the pool. task is called with args, and if
+        taskCallback is not None, it is called with task result.
+
+        kind is used to group tasks in the pool stats.
+
+        Returns False if the task could not be queued.
+        """
+        if not callable(task):
             return False
 
-        self.__resizeLock.acquire()
+        with self._lock:
+            self._queued += 1
         try:
-            self.__setThreadCountNolock(newNumThreads)
-        finally:
-            self.__resizeLock.release()
-        return True
-
-    def __setThreadCountNolock(self, newNumThreads):
-
-        """Set the current pool size, spawning or terminating threads
-        if necessary.  Internal use only; assumes the resizing lock is
-        held."""
-
-        # If we need to grow the pool, do so
-        while newNumThreads > len(self.__threads):
-            name = "%s/%d" % (self._name, next(self._count))
-            newThread = WorkerThread(self, name)
-            self.__threads.append(newThread)
-            newThread.start()
-        # If we need to shrink the pool, do so
-        while newNumThreads < len(self.__threads):
-            self.__threads[0].goAway()
-            del self.__threads[0]
-
-    def getThreadCount(self):
-
-        """Return the number of threads in the pool."""
-
-        self.__resizeLock.acquire()
-        try:
-            return len(self.__threads)
-        finally:
-            self.__resizeLock.release()
-
-    def queueTask(self, id, task, args=None, taskCallback=None):
-
-        """Insert a task into the queue.  task must be callable;
-        args and taskCallback can be None."""
-
-        if self.__isJoining:
+            self._executor.dispatch(
+                functools.partial(self._run, id, kind, task, args,
+                                  taskCallback, monotonic_time()),
+                timeout=self._timeout)
+        except executor.NotRunning:
+            self._dequeued()
             return False
-        if not callable(task):
+        except exception.ResourceExhausted:
+            with self._lock:
+                self._queued -= 1
+                self._dropped += 1
+            self.log.warning("Too many queued tasks, cannot queue task %s",
+                             id)
             return False
 
-        self.__tasks.put((id, task, args, taskCallback))
-
         return True
 
-    def getNextTask(self):
-
-        """ Retrieve the next task from the task queue.  For use
-        only by WorkerThread objects contained in the pool."""
-        id = None
-        cmd = None
-        args = None
-        callback = None
-
-        try:
-            id, cmd, args, callback = self.__tasks.get(True,
-                                                       self.__waitTimeout)
-        except queue.Empty:
-            pass
-
-        return id, cmd, args, callback
-
-    def stopThread(self):
-        return self.__tasks.put((None, None, None, None))
-
-    def joinAll(self, waitForTasks=True, waitForThreads=True):
-
-        """ Clear the task queue and terminate all pooled threads,
-        optionally allowing the tasks and threads to finish."""
-
-        # Mark the pool as joining to prevent any more task queuing
-        self.__isJoining = True
-
-        # Wait for tasks to finish
-        if waitForTasks:
-            while not self.__tasks.empty():
-                sleep(0.1)
-
-        # Tell all the threads to quit
-        self.__resizeLock.acquire()
+    def stop(self, wait=True):
+        """
+        Drop queued tasks and stop the workers. If wait is True, wait until
+        running tasks are finished.
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        self.log.debug("Stopping pool %s", self._name)
+        self._executor.stop(wait=wait)
+        self._scheduler.stop(wait=wait)
+        _pools.discard(self)
+
+    def stats(self):
+        """
+        Return dict with the current number of queued and running tasks,
+        the number of tasks dropped because the queue was full, and
+        histograms of wait and run time in seconds keyed by task kind.
+        """
+        with self._lock:
+            queued = self._queued
+            running = self._running
+            dropped = self._dropped
+        return {
+            "queued": queued,
+            "running": running,
+            "dropped": dropped,
+            "wait": self._wait_time.info(),
+            "run": self._run_time.info(),
+        }
+
+    def _dequeued(self):
+        with self._lock:
+            self._queued -= 1
+
+    def _run(self, id, kind, cmd, args, callback, queued):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        self._wait_time.add(kind, monotonic_time() - queued)
         try:
-            # Wait until all threads have exited
-            if waitForThreads:
-                for t in self.__threads:
-                    t.goAway()
-                for t in self.__threads:
-                    t.join()
-#                    print t,"joined"
-                    del t
-            self.__setThreadCountNolock(0)
-            self.__isJoining = True
-
-            # Reset the pool for potential reuse
-            self.__isJoining = False
-        finally:
-            self.__resizeLock.release()
-
-
-class WorkerThread(object):
-
-    """ Pooled thread class. """
-
-    log = logging.getLogger('storage.ThreadPool.WorkerThread')
-
-    def __init__(self, pool, name):
-
-        """ Initialize the thread and remember the pool. """
-        self._thread = concurrent.thread(self.run, name=name)
-        self.__pool = pool
-        self.__isDying = False
-
-    def start(self):
-        self._thread.start()
-
-    def join(self):
-        self._thread.join()
-
-    def _processNextTask(self):
-        id, cmd, args, callback = self.__pool.getNextTask()
-        try:
-            if id is None:  # should retry.
-                pass
-            elif self.__isDying:
-                # return the task into the queue, since we abort.
-                self.__pool.__tasks.put((id, cmd, args, callback))
-            elif callback is None:
-                self.__pool.setRunningTask(True)
-                self.log.info("START task %s (cmd=%r, args=%r)",
-                              id, cmd, args)
-                cmd(args)
-                self.log.info("FINISH task %s", id)
-                self.__pool.setRunningTask(False)
-            else:
-                self.__pool.setRunningTask(True)
-                self.log.info("START task %s (callback=%r, cmd=%r, args=%r)",
-                              id, callback, cmd, args)
-                callback(cmd(args))
-                self.log.info("FINISH task %s", id)
-                self.__pool.setRunningTask(False)
+            with self._run_time.timer(kind):
+                if callback is None:
+                    self.log.info("START task %s (cmd=%r, args=%r)",
+                                  id, cmd, args)
+                    cmd(args)
+                else:
+                    self.log.info("START task %s (callback=%r, cmd=%r, "
+                                  "args=%r)", id, callback, cmd, args)
+                    callback(cmd(args))
+            self.log.info("FINISH task %s", id)
         except Exception:
             self.log.exception("FINISH task %s failed (callback=%r, "
                                "cmd=%r, args=%r)",
                                id, callback, cmd, args)
-
-    def run(self):
-
-        """ Until told to quit, retrieve the next task and execute
-        it, calling the callback if any.  """
-
-        while not self.__isDying:
-            self._processNextTask()
-
-    def goAway(self):
-
-        """ Exit the run loop next time through."""
-
-        self.__isDying = True
-
-
-# Usage example
-if __name__ == "__main__":
-
-    from random import randrange
-
-    # Sample task 1: given a start and end value, shuffle integers,
-    # then sort them
-
-    def sortTask(data):
-        print("SortTask starting for ", data)
-        numbers = list(range(data[0], data[1]))
-        for a in numbers:
-            rnd = randrange(0, len(numbers) - 1)
-            a, numbers[rnd] = numbers[rnd], a
-        print("SortTask sorting for ", data)
-        numbers.sort()
-        print("SortTask done for ", data)
-        return "Sorter ", data
-
-    # Sample task 2: just sleep for a number of seconds.
-
-    def waitTask(data):
-        print("WaitTask starting for ", data)
-        print("WaitTask sleeping for %d seconds" % data)
-        sleep(data)
-        return "Waiter ", data
-
-    # Both tasks use the same callback
-
-    def taskCallback(data):
-        print("Callback called for", data)
-
-    # Create a pool with three worker threads
-
-    pool = ThreadPool("work", 100)
-
-    # Insert tasks into the queue and let them run
-    print("Running tasks: ", pool.getRunningTasks(), "\n")
-    pool.queueTask(sortTask, (1000, 100000), taskCallback)
-    print("Running tasks: ", pool.getRunningTasks(), "\n")
-    pool.queueTask(waitTask, 5, taskCallback)
-    pool.queueTask(sortTask, (200, 200000), taskCallback)
-    pool.queueTask(waitTask, 2, taskCallback)
-    print("Running tasks: ", pool.getRunningTasks(), "\n")
-    pool.queueTask(sortTask, (3, 30000), taskCallback)
-    pool.queueTask(waitTask, 7, taskCallback)
-
-    # When all tasks are finished, allow the threads to terminate
-    pool.joinAll()
-    print("ThreadPool sample done.\n")
+        finally:
+            with self._lock:
+                self._running -= 1
@@ -34,6 +34,7 @@ MultipathEvent = namedtuple("MultipathEvent",
                             "type, mpath_uuid, path, valid_paths, dm_seqnum")
 
 MPATH_REMOVED = "removed"
+MPATH_CHANGED = "changed"
 PATH_FAILED = "failed"
 PATH_REINSTATED = "reinstated"
 
@@ -232,7 +233,7 @@ class MultipathListener(object):
             return None
         mpath_uuid = mpath_uuid[6:]
 
-        if device["ACTION"] == "change":
+        if device["ACTION"] == "change" and "DM_ACTION" in device:
             dm_action = device.get("DM_ACTION")
             if dm_action == "PATH_FAILED":
                 event_type = PATH_FAILED
@@ -244,6 +245,18 @@ class MultipathListener(object):
             valid_paths = int(device.get("DM_NR_VALID_PATHS"))
             dm_seqnum = int(device.get("DM_SEQNUM"))
             path = devicemapper.device_name(device.get("DM_PATH"))
+        elif device["ACTION"] == "add" or (
+                device["ACTION"] == "change" and "DM_ACTION" not in device):
+            # Multipath device was created, or its map was reloaded, for
+            # example after adding or removing a path, or resizing.
+            event_type = MPATH_CHANGED
+            valid_paths = device.get("DM_NR_VALID_PATHS")
+            if valid_paths is not None:
+                valid_paths = int(valid_paths)
+            dm_seqnum = device.get("DM_SEQNUM")
+            if dm_seqnum is not None:
+                dm_seqnum = int(dm_seqnum)
+            path = None
         elif device["ACTION"] == "remove":
             event_type = MPATH_REMOVED
             valid_paths = None
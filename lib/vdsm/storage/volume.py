@@ -232,12 +232,16 @@ class VolumeManifest(object):
             "generation": meta.get(sc.GENERATION, sc.DEFAULT_GENERATION)
         }
 
-    def getInfo(self):
+    def getInfo(self, log_level=logging.INFO):
         """
         Get volume info
+
+        Callers getting the info of many volumes may use a lower log_level,
+        to avoid logging every volume at INFO level.
         """
-        self.log.info("Info request: sdUUID=%s imgUUID=%s volUUID = %s ",
-                      self.sdUUID, self.imgUUID, self.volUUID)
+        self.log.log(log_level,
+                     "Info request: sdUUID=%s imgUUID=%s volUUID = %s ",
+                     self.sdUUID, self.imgUUID, self.volUUID)
         info = {}
         try:
             meta = self.getMetadata()
@@ -277,8 +281,8 @@ class VolumeManifest(object):
         # (because of VDC constraints)
         if info.get('legality', None) == sc.ILLEGAL_VOL:
             info['status'] = sc.ILLEGAL_VOL
-        self.log.info("%s/%s/%s info is %s",
-                      self.sdUUID, self.imgUUID, self.volUUID, str(info))
+        self.log.log(log_level, "%s/%s/%s info is %s",
+                     self.sdUUID, self.imgUUID, self.volUUID, str(info))
         return info
 
     def getQemuImageInfo(self):
@@ -42,6 +42,7 @@ from vdsm.common import concurrent
 from vdsm.common import constants
 from vdsm.common import fileutils
 from vdsm.common import lockfile
+from vdsm.common import muxrpc
 from vdsm.common import sigutils
 from vdsm.common import time
 from vdsm.common import zombiereaper
@@ -306,6 +307,7 @@ def main(args):
 
         log.debug("Setting up keep alive thread")
 
+        channel = None
         try:
             signal.signal(signal.SIGTERM, terminate)
             signal.signal(signal.SIGINT, terminate)
@@ -320,6 +322,16 @@ def main(args):
 
             chown(address, args.sock_user, args.sock_group)
 
+            if args.mux_sockfile:
+                log.debug("Starting multiplexed channel at %s",
+                          args.mux_sockfile)
+                channel = muxrpc.Server(
+                    args.mux_sockfile,
+                    _SuperVdsm(),
+                    workers=config.getint('supervdsm', 'workers'))
+                channel.start()
+                chown(args.mux_sockfile, args.sock_user, args.sock_group)
+
             if args.enable_network:
                 init_privileged_network_components()
 
@@ -330,6 +342,8 @@ def main(args):
 
             log.debug("Terminated normally")
         finally:
+            if channel is not None:
+                channel.stop()
             if os.path.exists(address):
                 fileutils.rm_file(address)
 
@@ -346,6 +360,10 @@ def option_parser():
         dest='sockfile',
         required=True,
         help="socket file path")
+    parser.add_argument(
+        '--mux-sockfile',
+        default=None,
+        help="multiplexed channel socket file path (default disabled)")
     parser.add_argument(
         '--pidfile',
         default=None,
@@ -29,6 +29,8 @@ import sys
 
 import six
 
+from yajsonrpc.exception import JsonRpcMethodNotFoundError
+
 from . import expose
 
 from vdsm import client
@@ -171,6 +173,22 @@ def _iter_volumes_info(volumes_info):
 
 
 def _get_volumes_info(cli, sd_uuid):
+    """
+    Return the info of all volumes of storage domain sd_uuid, keyed by image
+    and volume UUIDs, using one StorageDomain.dumpVolumeChains call.
+
+    If vdsm does not support StorageDomain.dumpVolumeChains, fall back to
+    getting the info of every volume.
+    """
+    try:
+        return cli.StorageDomain.dumpVolumeChains(storagedomainID=sd_uuid)
+    except client.ServerError as e:
+        if e.code != JsonRpcMethodNotFoundError.code:
+            raise
+    return _get_volumes_info_legacy(cli, sd_uuid)
+
+
+def _get_volumes_info_legacy(cli, sd_uuid):
     """there can be only one storage pool in a single VDSM context"""
     pools = cli.Host.getConnectedStoragePools()
     if not pools:
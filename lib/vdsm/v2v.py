@@ -27,7 +27,7 @@ status is a way to feedback information on the job (init, error etc)
 from __future__ import absolute_import
 from __future__ import division
 
-from collections import namedtuple
+from collections import deque, namedtuple
 from contextlib import closing, contextmanager
 import errno
 import io
@@ -56,7 +56,6 @@ from vdsm.common.define import errCode, doneCode
 from vdsm.common.logutils import traceback
 from vdsm.common.time import monotonic_time
 from vdsm.constants import P_VDSM_LOG, P_VDSM_RUN, EXT_KVM_2_OVIRT
-from vdsm.utils import NICENESS, IOCLASS
 
 try:
     import ovirt_imageio_common
@@ -92,6 +91,7 @@ _RASD_NS = 'http://schemas.dmtf.org/wbem/wscim/1/cim-schema/2/' \
 ImportProgress = namedtuple('ImportProgress',
                             ['current_disk', 'disk_count', 'description'])
 DiskProgress = namedtuple('DiskProgress', ['progress'])
+CopyThroughput = namedtuple('CopyThroughput', ['mib_per_sec'])
 
 
 class STATUS:
@@ -155,6 +155,10 @@ class V2VProcessError(V2VError):
     ''' virt-v2v process had error in execution '''
 
 
+class JobAborted(V2VError):
+    ''' Job was aborted while waiting to start '''
+
+
 class InvalidInputError(ClientError):
     ''' Invalid input received '''
 
@@ -287,8 +291,12 @@ def get_jobs_status():
         ret[job_id] = {
             'status': job.status,
             'description': job.description,
-            'progress': job.progress
+            'progress': job.progress,
+            'waitTime': int(job.wait_time),
+            'runTime': int(job.run_time),
         }
+        if job.throughput is not None:
+            ret[job_id]['throughput'] = job.throughput
     return ret
 
 
@@ -433,15 +441,17 @@ class V2VCommand(object):
         log = os.path.join(_LOG_DIR,
                            "import-%s-%s.log" % (self._vmid, timestamp))
         logging.info("Storing import log at: %r", log)
+        nice = config.getint('v2v', 'import_niceness')
+        ioclass = config.getint('v2v', 'import_ioclass')
         v2v = _simple_exec_cmd(self._command(),
-                               nice=NICENESS.HIGH,
-                               ioclass=IOCLASS.IDLE,
+                               nice=nice,
+                               ioclass=ioclass,
                                env=self._environment(),
                                stdout=subprocess.PIPE,
                                stderr=subprocess.STDOUT)
         tee = _simple_exec_cmd(['tee', log],
-                               nice=NICENESS.HIGH,
-                               ioclass=IOCLASS.IDLE,
+                               nice=nice,
+                               ioclass=ioclass,
                                stdin=v2v.stdout,
                                stdout=subprocess.PIPE)
 
@@ -676,7 +686,9 @@ class KVMCommand(V2VCommand):
         cmd = [EXT_KVM_2_OVIRT,
                '--uri', self._uri,
                '--bufsize',
-               str(config.getint('v2v', 'kvm2ovirt_buffer_size'))]
+               str(config.getint('v2v', 'kvm2ovirt_buffer_size')),
+               '--jobs',
+               str(config.getint('v2v', 'kvm2ovirt_jobs'))]
         if self._username is not None:
             cmd.extend([
                 '--username', self._username,
@@ -806,6 +818,69 @@ class PipelineProc(object):
         return True
 
 
+class JobScheduler(object):
+    """
+    Limit the number of import jobs running concurrently.
+
+    Jobs wait for a free slot in the order they were queued, so a large
+    batch of imports does not overload the host, and does not need to be
+    throttled by the caller.
+    """
+
+    def __init__(self, max_jobs):
+        """
+        Arguments:
+            max_jobs (int): Maximum number of running jobs, 0 means no
+                limit.
+        """
+        self._max_jobs = max_jobs
+        self._cond = threading.Condition(threading.Lock())
+        self._running = 0
+        self._queue = deque()
+
+    def acquire(self, job):
+        """
+        Wait until job can run.
+
+        Raises JobAborted if job was aborted while waiting.
+        """
+        with self._cond:
+            self._queue.append(job)
+            try:
+                while True:
+                    if job.aborted:
+                        raise JobAborted("Job %r aborted while waiting"
+                                         % job.id)
+                    if self._can_run(job):
+                        break
+                    self._cond.wait()
+            finally:
+                self._queue.remove(job)
+                # The next job in the queue may be able to run now.
+                self._cond.notify_all()
+            self._running += 1
+
+    def release(self):
+        with self._cond:
+            self._running -= 1
+            self._cond.notify_all()
+
+    def wakeup(self):
+        """
+        Wake up waiting jobs, so aborted jobs stop waiting.
+        """
+        with self._cond:
+            self._cond.notify_all()
+
+    def _can_run(self, job):
+        if self._queue[0] is not job:
+            return False
+        return self._max_jobs == 0 or self._running < self._max_jobs
+
+
+_scheduler = JobScheduler(config.getint('v2v', 'max_concurrent_imports'))
+
+
 class ImportVm(object):
     TERM_DELAY = 30
     PROC_WAIT_TIMEOUT = 30
@@ -820,10 +895,15 @@ class ImportVm(object):
         self._disk_progress = 0
         self._disk_count = 1
         self._current_disk = 1
+        self._throughput = None
         self._aborted = False
         self._proc = None
+        self._queued = None
+        self._started = None
+        self._finished = None
 
     def start(self):
+        self._queued = monotonic_time()
         self._thread = concurrent.thread(self._run, name="v2v/" + self._id[:8])
         self._thread.start()
 
@@ -843,6 +923,35 @@ class ImportVm(object):
     def description(self):
         return self._description
 
+    @property
+    def aborted(self):
+        return self._aborted
+
+    @property
+    def wait_time(self):
+        """
+        Seconds the job waited for other jobs before it started.
+        """
+        if self._queued is None:
+            return 0
+        end = self._started or self._finished or monotonic_time()
+        return end - self._queued
+
+    @property
+    def run_time(self):
+        if self._started is None:
+            return 0
+        end = self._finished or monotonic_time()
+        return end - self._started
+
+    @property
+    def throughput(self):
+        """
+        Throughput of copying the disks in MiB/s, if reported by the import
+        command.
+        """
+        return self._throughput
+
     @property
     def progress(self):
         '''
@@ -857,7 +966,7 @@ class ImportVm(object):
     @traceback(msg="Error importing vm")
     def _run(self):
         try:
-            self._import()
+            self._run_scheduled()
         except Exception as ex:
             if self._aborted:
                 logging.debug("Job %r was aborted", self._id)
@@ -872,6 +981,26 @@ class ImportVm(object):
                     logging.exception('Job %r, error trying to abort: %r',
                                       self._id, e)
 
+    def _run_scheduled(self):
+        self._description = 'Waiting for other imports'
+        try:
+            _scheduler.acquire(self)
+        except JobAborted:
+            self._finished = monotonic_time()
+            raise
+        finally:
+            self._description = ''
+        self._started = monotonic_time()
+        try:
+            # The job may be aborted after getting a slot, before it was
+            # marked as started.
+            if self._aborted:
+                raise JobAborted("Job %r aborted before starting" % self._id)
+            self._import()
+        finally:
+            self._finished = monotonic_time()
+            _scheduler.release()
+
     def _import(self):
         logging.info('Job %r starting import', self._id)
 
@@ -913,8 +1042,17 @@ class ImportVm(object):
             elif isinstance(event, DiskProgress):
                 self._disk_progress = event.progress
                 if event.progress % 10 == 0:
-                    logging.info("Job %r copy disk %d progress %d/100",
-                                 self._id, self._current_disk, event.progress)
+                    if self._throughput is None:
+                        logging.info("Job %r copy disk %d progress %d/100",
+                                     self._id, self._current_disk,
+                                     event.progress)
+                    else:
+                        logging.info("Job %r copy disk %d progress %d/100, "
+                                     "copying all disks at %.1f MiB/s",
+                                     self._id, self._current_disk,
+                                     event.progress, self._throughput)
+            elif isinstance(event, CopyThroughput):
+                self._throughput = event.mib_per_sec
             else:
                 raise RuntimeError("Job %r got unexpected parser event: %s" %
                                    (self._id, event))
@@ -926,6 +1064,11 @@ class ImportVm(object):
 
     def _abort(self):
         self._aborted = True
+        if self._started is None:
+            logging.info('Job %r aborted before starting', self._id)
+            self._finished = monotonic_time()
+            _scheduler.wakeup()
+            return
         if self._proc is None:
             logging.warning(
                 'Ignoring request to abort job %r; the job failed to start',
@@ -950,7 +1093,10 @@ class ImportVm(object):
 
 class OutputParser(object):
     COPY_DISK_RE = re.compile(br'.*(Copying disk (\d+)/(\d+)).*')
-    DISK_PROGRESS_RE = re.compile(br'\s+\((\d+).*')
+    # kvm2ovirt reports also the throughput of all disks copied
+    # concurrently: "    (50/100%, 120.5 MiB/s)".
+    DISK_PROGRESS_RE = re.compile(
+        br'\s+\((\d+)[^,)]*(?:, (\d+(?:\.\d+)?) MiB/s)?.*')
 
     def parse(self, stream):
         for line in stream:
@@ -959,6 +1105,9 @@ class OutputParser(object):
                 yield ImportProgress(int(current_disk), int(disk_count),
                                      description)
                 for chunk in self._iter_progress(stream):
+                    throughput = self._parse_throughput(chunk)
+                    if throughput is not None:
+                        yield CopyThroughput(throughput)
                     progress = self._parse_progress(chunk)
                     if progress is not None:
                         yield DiskProgress(progress)
@@ -993,6 +1142,12 @@ class OutputParser(object):
             raise OutputParserError('error parsing progress regex: %r'
                                     % m.groups)
 
+    def _parse_throughput(self, chunk):
+        m = self.DISK_PROGRESS_RE.match(chunk)
+        if m is None or m.group(2) is None:
+            return None
+        return float(m.group(2))
+
 
 def _mem_to_mib(size, unit):
     lunit = unit.lower()
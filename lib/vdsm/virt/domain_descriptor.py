@@ -22,6 +22,7 @@ from __future__ import absolute_import
 from __future__ import division
 
 from contextlib import contextmanager
+import threading
 import xml.etree.ElementTree as etree
 
 from vdsm.common import xmlutils
@@ -89,7 +90,9 @@ class MutableDomainDescriptor(object):
     @property
     def devices_hash(self):
         devices = self.devices
-        return hash(xmlutils.tostring(devices) if devices is not None else '')
+        if devices is None:
+            return hash('')
+        return hash(tuple(_device_hash(dev) for dev in devices))
 
     def all_channels(self):
         if self.devices is not None:
@@ -126,25 +129,133 @@ class MutableDomainDescriptor(object):
 
 
 class DomainDescriptor(MutableDomainDescriptor):
+    """
+    Read only domain descriptor.
+
+    The descriptor is replaced after most changes to the domain, often before
+    it is used, so the XML is parsed only when needed. The devices hash is
+    combined from the hashes of the single devices, so a descriptor derived
+    from this one by without_device() does not hash the other devices again.
+    """
 
     def __init__(self, xmlStr):
-        super(DomainDescriptor, self).__init__(xmlStr)
         self._xml = xmlStr
-        self._devices = super(DomainDescriptor, self).devices
-        self._devices_hash = super(DomainDescriptor, self).devices_hash
+        self._lock = threading.Lock()
+        self._tree = None
+        self._device_hashes = None
+
+    @classmethod
+    def _from_tree(cls, dom, devices, device_hashes):
+        desc = cls(None)
+        desc._id = dom.findtext('uuid')
+        desc._name = dom.findtext('name')
+        desc._devices = devices
+        desc._device_hashes = device_hashes
+        desc._tree = dom
+        return desc
+
+    @property
+    def _dom(self):
+        self._parse()
+        return self._tree
+
+    def _parse(self):
+        with self._lock:
+            if self._tree is not None:
+                return
+            dom = xmlutils.fromstring(self._xml)
+            self._id = dom.findtext('uuid')
+            self._name = dom.findtext('name')
+            self._devices = vmxml.find_first(dom, 'devices', None)
+            self._tree = dom
 
     @property
     def xml(self):
+        if self._xml is None:
+            self._xml = xmlutils.tostring(self._tree, pretty=True)
         return self._xml
 
+    @property
+    def id(self):
+        self._parse()
+        return self._id
+
+    @property
+    def name(self):
+        self._parse()
+        return self._name
+
     @property
     def devices(self):
+        self._parse()
         return self._devices
 
     @property
     def devices_hash(self):
-        return self._devices_hash
+        devices = self.devices
+        if devices is None:
+            return hash('')
+        if self._device_hashes is None:
+            self._device_hashes = [_device_hash(dev) for dev in devices]
+        return hash(tuple(self._device_hashes))
+
+    def has_device(self, alias):
+        return self._find_device(alias) is not None
+
+    def without_device(self, alias):
+        """
+        Return a new descriptor without the device with the given alias.
+
+        The new descriptor shares the unchanged elements and device hashes
+        with this descriptor, so removing a device does not require fetching
+        and parsing the domain XML again.
+
+        Raises LookupError if there is no such device.
+        """
+        index = self._find_device(alias)
+        if index is None:
+            raise LookupError("No such device: %s" % alias)
+        devices = self.devices
+        children = list(devices)
+        del children[index]
+        new_devices = _copy_element(devices, children)
+        dom = self._dom
+        new_dom = _copy_element(
+            dom, [new_devices if child is devices else child for child in dom])
+        device_hashes = None
+        if self._device_hashes is not None:
+            device_hashes = (self._device_hashes[:index] +
+                             self._device_hashes[index + 1:])
+        return self._from_tree(new_dom, new_devices, device_hashes)
+
+    def _find_device(self, alias):
+        devices = self.devices
+        if devices is not None:
+            for index, dev in enumerate(devices):
+                if vmxml.find_attr(dev, 'alias', 'name') == alias:
+                    return index
+        return None
 
     @contextmanager
     def metadata_descriptor(self):
         yield metadata.Descriptor.from_tree(self._dom)
+
+
+def _copy_element(element, children):
+    """
+    Return a copy of element with the given children, sharing the children
+    elements instead of copying them.
+    """
+    new = etree.Element(element.tag, element.attrib)
+    new.text = element.text
+    new.tail = element.tail
+    new.extend(children)
+    return new
+
+
+def _device_hash(element):
+    # The tail is the whitespace before the next element, which depends on
+    # the position of the device, not on the device.
+    element = _copy_element(element, list(element))
+    element.tail = None
+    return hash(xmlutils.tostring(element))
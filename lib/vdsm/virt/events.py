@@ -32,7 +32,8 @@ LIBVIRT_EVENTS = {
     libvirt.VIR_DOMAIN_EVENT_GRAPHICS_INITIALIZE: 'GRAPHICS_INITIALIZE',
     libvirt.VIR_DOMAIN_EVENT_GRAPHICS_DISCONNECT: 'GRAPHICS_DISCONNECT',
     libvirt.VIR_DOMAIN_EVENT_ID_WATCHDOG: 'WATCHDOG',
-    libvirt.VIR_DOMAIN_EVENT_ID_JOB_COMPLETED: 'JOB_COMPLETED'
+    libvirt.VIR_DOMAIN_EVENT_ID_JOB_COMPLETED: 'JOB_COMPLETED',
+    libvirt.VIR_DOMAIN_EVENT_ID_MIGRATION_ITERATION: 'MIGRATION_ITERATION',
 }
 
 
@@ -33,7 +33,6 @@ import weakref
 
 import six
 
-from vdsm import utils
 from vdsm.common import filecontrol
 from vdsm.common import supervdsm
 from vdsm.config import config
@@ -49,6 +48,10 @@ _MESSAGE_API_VERSION_LOOKUP = {
 
 _REPLACEMENT_CHAR = u'\ufffd'
 
+# Guest info changing on every heartbeat, not counted in the guest info
+# version.
+_VOLATILE_GUEST_INFO = frozenset(['memUsage', 'memoryStats'])
+
 # The set of characters allowed in XML documents is described in
 # http://www.w3.org/TR/xml11/#charsets
 #
@@ -80,6 +83,12 @@ _FILTERED_CHARS = (
 )
 
 _filter_chars_re = re.compile(u'[%s]' % _FILTERED_CHARS)
+
+# Matches a decoded JSON message that may contain filtered characters, either
+# literally or as JSON escape sequences. Escaped backslashes followed by "b",
+# "f" or "u" also match, filtering messages that cannot contain filtered
+# characters, which is harmless.
+_unfiltered_re = re.compile(u'[%s]|\\\\[bfu]' % _FILTERED_CHARS)
 _qga_re = re.compile(r'\bqemu[ -](guest[ -]agent|ga)\b', re.IGNORECASE)
 
 
@@ -181,6 +190,16 @@ class GuestAgent(object):
             'disksUsage': [],
             'netIfaces': [],
             'memoryStats': {}}
+        # Increased when guest info other than _VOLATILE_GUEST_INFO changes.
+        # guestInfo values are replaced, never modified, so getGuestInfo()
+        # can share them with the callers.
+        self._guestInfoVersion = 0
+        # Reported with the version, so the version of a new agent, for
+        # example after restarting vdsm, never matches a version reported by
+        # a previous agent of the VM.
+        self._guestInfoEpoch = int(time.time() * 1000)
+        self._guestInfoLock = threading.Lock()
+        self._reportedInfo = None
         self._agentTimestamp = 0
         self._channelListener = channelListener
         self._messageState = MessageState.NORMAL
@@ -251,6 +270,26 @@ class GuestAgent(object):
     def diskMappingHash(self):
         return self._diskMappingHash
 
+    @property
+    def guestInfoVersion(self):
+        with self._guestInfoLock:
+            return self._versionToken()
+
+    def _versionToken(self):
+        return "%d-%d" % (self._guestInfoEpoch, self._guestInfoVersion)
+
+    def _updateGuestInfo(self, key, value):
+        """
+        Set guestInfo[key] to value if it changed, increasing the guest info
+        version unless key is volatile.
+        """
+        if key in self.guestInfo and self.guestInfo[key] == value:
+            return
+        self.guestInfo[key] = value
+        if key not in _VOLATILE_GUEST_INFO:
+            with self._guestInfoLock:
+                self._guestInfoVersion += 1
+
     def start(self):
         self.log.info("Starting connection")
         self._prepare_socket()
@@ -343,8 +382,9 @@ class GuestAgent(object):
     def _handleMessage(self, message, args):
         self.log.debug("Guest's message %s: %s", message, args)
         if message == 'heartbeat':
-            self.guestInfo['memUsage'] = int(args['free-ram'])
+            self._updateGuestInfo('memUsage', int(args['free-ram']))
             if 'memory-stat' in args:
+                memoryStats = dict(self.guestInfo['memoryStats'])
                 for k in ('mem_total', 'mem_unused', 'mem_buffers',
                           'mem_cached', 'swap_in', 'swap_out', 'pageflt',
                           'majflt'):
@@ -352,11 +392,11 @@ class GuestAgent(object):
                         continue
                     # Convert the value to string since 64-bit integer is not
                     # supported in XMLRPC
-                    self.guestInfo['memoryStats'][k] = str(
-                        args['memory-stat'][k])
+                    memoryStats[k] = str(args['memory-stat'][k])
                     if k == 'mem_unused':
-                        self.guestInfo['memoryStats']['mem_free'] = str(
+                        memoryStats['mem_free'] = str(
                             args['memory-stat']['mem_unused'])
+                self._updateGuestInfo('memoryStats', memoryStats)
 
             if 'apiVersion' in args:
                 # The guest agent supports API Versioning
@@ -374,13 +414,13 @@ class GuestAgent(object):
             if self._seen_shutdown:
                 self._seen_shutdown = False
         elif message == 'host-name':
-            self.guestInfo['guestName'] = args['name']
+            self._updateGuestInfo('guestName', args['name'])
         elif message == 'os-version':
-            self.guestInfo['guestOs'] = args['version']
+            self._updateGuestInfo('guestOs', args['version'])
         elif message == 'os-info':
-            self.guestInfo['guestOsInfo'] = args
+            self._updateGuestInfo('guestOsInfo', args)
         elif message == 'timezone':
-            self.guestInfo['guestTimezone'] = args
+            self._updateGuestInfo('guestTimezone', args)
         elif message == 'network-interfaces':
             interfaces = []
             old_ips = ''
@@ -391,48 +431,46 @@ class GuestAgent(object):
                 # Provide the old information which includes
                 # only the IP addresses.
                 old_ips += ' '.join(iface['inet']) + ' '
-            self.guestInfo['netIfaces'] = interfaces
-            self.guestInfo['guestIPs'] = old_ips.strip()
+            self._updateGuestInfo('netIfaces', interfaces)
+            self._updateGuestInfo('guestIPs', old_ips.strip())
         elif message == 'applications':
-            self.guestInfo['appsList'] = tuple(args['applications'])
+            appsList = tuple(args['applications'])
             # Fake QEMU-GA if it is not reported
-            if not any(bool(_qga_re.match(x))
-                       for x in self.guestInfo['appsList']):
+            if not any(bool(_qga_re.match(x)) for x in appsList):
                 qga_caps = self._qgaCaps()
                 if qga_caps is not None and qga_caps['version'] is not None:
                     # NOTE: this is a tuple
-                    self.guestInfo['appsList'] = \
-                        self.guestInfo['appsList'] + \
-                        ('qemu-guest-agent-%s' % qga_caps['version'],)
+                    appsList += ('qemu-guest-agent-%s' % qga_caps['version'],)
+            self._updateGuestInfo('appsList', appsList)
         elif message == 'active-user':
             currentUser = args['name']
             if ((currentUser != self.guestInfo['username']) and
                 not (currentUser == 'Unknown' and
                      self.guestInfo['username'] == 'None')):
-                self.guestInfo['username'] = currentUser
-                self.guestInfo['lastLogin'] = time.time()
+                self._updateGuestInfo('username', currentUser)
+                self._updateGuestInfo('lastLogin', time.time())
             self.log.debug("username: %s", repr(self.guestInfo['username']))
         elif message == 'session-logon':
-            self.guestInfo['session'] = "UserLoggedOn"
+            self._updateGuestInfo('session', "UserLoggedOn")
         elif message == 'session-lock':
-            self.guestInfo['session'] = "Locked"
+            self._updateGuestInfo('session', "Locked")
         elif message == 'session-unlock':
-            self.guestInfo['session'] = "Active"
+            self._updateGuestInfo('session', "Active")
         elif message == 'session-logoff':
-            self.guestInfo['session'] = "LoggedOff"
+            self._updateGuestInfo('session', "LoggedOff")
         elif message == 'uninstalled':
             self.log.debug("guest agent was uninstalled.")
-            self.guestInfo['appsList'] = ()
+            self._updateGuestInfo('appsList', ())
         elif message == 'session-startup':
             self._seen_shutdown = False
             self.log.debug("Guest system is started or restarted.")
         elif message == 'fqdn':
-            self.guestInfo['guestFQDN'] = args['fqdn']
+            self._updateGuestInfo('guestFQDN', args['fqdn'])
         elif message == 'session-shutdown':
             self._seen_shutdown = True
             self.log.debug("Guest system shuts down.")
         elif message == 'containers':
-            self.guestInfo['guestContainers'] = args['list']
+            self._updateGuestInfo('guestContainers', args['list'])
         elif message == 'disks-usage':
             disks = []
             for disk in args['disks']:
@@ -441,10 +479,12 @@ class GuestAgent(object):
                 disk['total'] = str(disk['total'])
                 disk['used'] = str(disk['used'])
                 disks.append(disk)
-            self.guestInfo['disksUsage'] = disks
-            self.guestDiskMapping = args.get('mapping', {})
+            self._updateGuestInfo('disksUsage', disks)
+            mapping = args.get('mapping', {})
+            if mapping != self.guestDiskMapping:
+                self.guestDiskMapping = mapping
         elif message == 'number-of-cpus':
-            self.guestInfo['guestCPUCount'] = int(args['count'])
+            self._updateGuestInfo('guestCPUCount', int(args['count']))
         elif message == 'completion':
             self._on_completion(args.pop('reply_id', None))
         else:
@@ -481,10 +521,12 @@ class GuestAgent(object):
             'appsList': (),
             'guestIPs': '',
             'guestFQDN': ''}
+        # QEMU-GA info is a copy owned by the caller.
         qga = self._qgaGuestInfo()
         if qga is not None:
             info.update(qga)
-        if self.isResponsive():
+        responsive = self.isResponsive()
+        if responsive:
             info.update(self.guestInfo)
         else:
             if len(self.guestInfo['appsList']) > 0:
@@ -493,13 +535,33 @@ class GuestAgent(object):
                 info['guestIPs'] = self.guestInfo['guestIPs']
             if len(self.guestInfo['guestFQDN']) > 0:
                 info['guestFQDN'] = self.guestInfo['guestFQDN']
-        return utils.picklecopy(info)
+        # guestInfo values are replaced when they change, so sharing them is
+        # safe, but memoryStats is modified by Vm.getStats().
+        if 'memoryStats' in info:
+            info['memoryStats'] = dict(info['memoryStats'])
+        info['guestInfoVersion'] = self._reportedVersion(responsive, qga)
+        return info
+
+    def _reportedVersion(self, responsive, qga):
+        """
+        Return the version of the guest info reported by getGuestInfo(),
+        increased when the oVirt GA info changes, when QEMU-GA info changes,
+        or when the agent responsiveness changes.
+        """
+        if qga is not None:
+            qga = {k: v for k, v in six.iteritems(qga)
+                   if k not in _VOLATILE_GUEST_INFO}
+        with self._guestInfoLock:
+            if self._reportedInfo != (responsive, qga):
+                self._reportedInfo = (responsive, qga)
+                self._guestInfoVersion += 1
+            return self._versionToken()
 
     def onReboot(self):
         self.guestStatus = vmstatus.REBOOT_IN_PROGRESS
-        self.guestInfo['lastUser'] = '' + self.guestInfo['username']
-        self.guestInfo['username'] = 'Unknown'
-        self.guestInfo['lastLogout'] = time.time()
+        self._updateGuestInfo('lastUser', '' + self.guestInfo['username'])
+        self._updateGuestInfo('username', 'Unknown')
+        self._updateGuestInfo('lastLogout', time.time())
 
     def desktopLock(self):
         try:
@@ -563,7 +625,7 @@ class GuestAgent(object):
             self.log.debug("Failed to forward lifecycle-event: %s", e)
 
     def _onChannelTimeout(self):
-        self.guestInfo['memUsage'] = 0
+        self._updateGuestInfo('memUsage', 0)
         if self.guestStatus not in (vmstatus.POWERING_DOWN,
                                     vmstatus.REBOOT_IN_PROGRESS):
             self.log.debug("Guest connection timed out")
@@ -582,10 +644,19 @@ class GuestAgent(object):
             self.log.error("%s: %s" % (err, repr(line)))
 
     def _handleData(self, data):
-        while (not self._stopped) and b'\n' in data:
-            line, data = data.split(b'\n', 1)
-            line = b''.join(self._buffer) + line
-            self._clearReadBuffer()
+        # Look up message ends from the previous message end, so every byte
+        # is scanned once, and data is not copied for every message.
+        start = 0
+        while not self._stopped:
+            end = data.find(b'\n', start)
+            if end == -1:
+                break
+            line = data[start:end]
+            start = end + 1
+            if self._buffer:
+                self._buffer.append(line)
+                line = b''.join(self._buffer)
+                self._clearReadBuffer()
             if self._messageState is MessageState.TOO_BIG:
                 self._messageState = MessageState.NORMAL
                 self.log.warning("Not processing current message because it "
@@ -593,8 +664,10 @@ class GuestAgent(object):
             else:
                 self._processMessage(line)
 
-        self._buffer.append(data)
-        self._bufferSize += len(data)
+        if start < len(data):
+            data = data[start:]
+            self._buffer.append(data)
+            self._bufferSize += len(data)
 
         if self._bufferSize >= self.MAX_MESSAGE_SIZE:
             self.log.warning("Discarding buffer with size: %d because the "
@@ -631,8 +704,11 @@ class GuestAgent(object):
         # Filter out any characters in the untrusted guest response
         # that aren't permitted in XML.  This must be done _after_ the
         # JSON decoding, since otherwise JSON's \u escape decoding
-        # could be used to generate the bad characters
-        args = _filterObject(args)
+        # could be used to generate the bad characters. Most messages
+        # have no such characters nor escape sequences, so we filter only
+        # messages that may have them.
+        if _unfiltered_re.search(uniline):
+            args = _filterObject(args)
         name = args['__name__']
         del args['__name__']
         return (name, args)
@@ -23,6 +23,7 @@ from __future__ import division
 
 import io
 import collections
+import logging
 import re
 import threading
 import time
@@ -30,20 +31,24 @@ import libvirt
 
 from vdsm.common import concurrent
 from vdsm.common import conv
-from vdsm.common import logutils
+from vdsm.common import exception
 from vdsm.common import response
+from vdsm import executor
+from vdsm import schedule
 from vdsm import sslutils
 from vdsm import utils
 from vdsm import jsonrpcvdscli
 from vdsm.config import config
 from vdsm.common.compat import pickle
 from vdsm.common.define import NORMAL, Mbytes
+from vdsm.common.time import monotonic_time
 from vdsm.common.network.address import normalize_literal_addr
 from vdsm.virt.utils import DynamicBoundedSemaphore
 
 from vdsm.virt import virdomain
 from vdsm.virt import vmexitreason
 from vdsm.virt import vmstatus
+import six
 from six.moves import range
 
 
@@ -65,6 +70,14 @@ CONVERGENCE_SCHEDULE_SET_ABORT = "abort"
 
 _MiB_IN_GiB = 1024
 
+# The migration supervisor executor, running the monitor and downtime
+# schedule of all outgoing migrations.
+_SUPERVISOR_WORKERS = 2
+_SUPERVISOR_MAX_WORKERS = 10
+_SUPERVISOR_MAX_TASKS = 100
+_SUPERVISOR_TASK_TIMEOUT = 10  # seconds
+_SUPERVISOR_RETRY_DELAY = 1  # seconds
+
 
 ADDRESS = '0'
 PORT = 54321
@@ -121,6 +134,10 @@ class SourceThread(object):
             kwargs.get('maxBandwidth') or
             config.getint('vars', 'migration_max_bandwidth')
         )
+        # Bandwidth used by libvirt, may be lower than the maximum when the
+        # host migration bandwidth is shared.
+        self._bandwidth = self._maxBandwidth
+        self._priority = max(1, int(kwargs.get('priority') or 1))
         self._incomingLimit = kwargs.get('incomingLimit')
         self._outgoingLimit = kwargs.get('outgoingLimit')
         self.status = {
@@ -134,7 +151,7 @@ class SourceThread(object):
             self.run, name='migsrc/' + self._vm.id[:8])
         self._preparingMigrationEvt = True
         self._migrationCanceledEvt = threading.Event()
-        self._monitorThread = None
+        self._monitor = None
         self._destServer = None
         self._convergence_schedule = {
             'init': [],
@@ -169,9 +186,9 @@ class SourceThread(object):
         Return whether the thread currently manages a migration.
 
         That can be a migration directly supervised by the source thread and
-        other threads (such as the downtime thread) or just an indirectly
-        managed migration (detected on Vdsm recovery) without the threads
-        actually running.
+        the migration monitor or just an indirectly managed migration
+        (detected on Vdsm recovery) without the source thread actually
+        running.
         """
         return ((self.is_alive() and not self._failed) or
                 (self._recovery and
@@ -181,17 +198,29 @@ class SourceThread(object):
     def started(self):
         return self._started
 
+    @property
+    def vm_id(self):
+        return self._vm.id
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @property
+    def max_bandwidth(self):
+        return self._maxBandwidth
+
     @property
     def hibernating(self):
         return self._mode == MODE_FILE
 
     def _update_progress(self):
-        if self._monitorThread is None:
+        if self._monitor is None:
             return
 
-        # fetch migration status from the monitor thread
-        if self._monitorThread.progress is not None:
-            progress = self._monitorThread.progress.percentage
+        # fetch migration status from the monitor
+        if self._monitor.progress is not None:
+            progress = self._monitor.progress.percentage
         else:
             progress = 0
 
@@ -497,14 +526,18 @@ class SourceThread(object):
             self._vm.log.info('starting migration to %s '
                               'with miguri %s', duri, muri)
 
-            self._monitorThread = MonitorThread(self._vm, startTime,
-                                                self._convergence_schedule,
-                                                self._use_convergence_schedule)
+            self._monitor = MigrationMonitor(self._vm, startTime,
+                                             self._convergence_schedule,
+                                             self._use_convergence_schedule)
 
-            if self._use_convergence_schedule:
-                self._perform_with_conv_schedule(duri, muri)
-            else:
-                self._perform_with_downtime_thread(duri, muri)
+            bandwidth_allocator.add(self)
+            try:
+                if self._use_convergence_schedule:
+                    self._perform_with_conv_schedule(duri, muri)
+                else:
+                    self._perform_with_downtime_schedule(duri, muri)
+            finally:
+                bandwidth_allocator.remove(self)
 
             self.log.info("migration took %d seconds to complete",
                           (time.time() - startTime) + destCreationTime)
@@ -518,16 +551,19 @@ class SourceThread(object):
         # if we call stop() and libvirt migrateToURI3 didn't start
         # we may return migration stop but it will start at libvirt
         # side
-        self._preparingMigrationEvt = False
+        with self._lock:
+            # Bandwidth changes from now on are set in libvirt.
+            self._preparingMigrationEvt = False
+            params = self._migration_params(muri)
         if not self._migrationCanceledEvt.is_set():
             self._vm._dom.migrateToURI3(duri,
-                                        self._migration_params(muri),
+                                        params,
                                         self._migration_flags)
         else:
             self._raiseAbortError()
 
     def _migration_params(self, muri):
-        params = {libvirt.VIR_MIGRATE_PARAM_BANDWIDTH: self._maxBandwidth}
+        params = {libvirt.VIR_MIGRATE_PARAM_BANDWIDTH: self._bandwidth}
         if not self.tunneled:
             params[libvirt.VIR_MIGRATE_PARAM_URI] = str(muri)
         if self._consoleAddress:
@@ -572,28 +608,50 @@ class SourceThread(object):
                 break
         return flags
 
-    def _perform_with_downtime_thread(self, duri, muri):
-        self._vm.log.debug('performing migration with downtime thread')
-        self._monitorThread.downtime_thread = DowntimeThread(
+    def _perform_with_downtime_schedule(self, duri, muri):
+        self._vm.log.debug('performing migration with downtime schedule')
+        self._monitor.downtime_schedule = DowntimeSchedule(
             self._vm,
             int(self._downtime),
             config.getint('vars', 'migration_downtime_steps')
         )
 
-        with utils.running(self._monitorThread):
+        with utils.running(self._monitor):
             self._perform_migration(duri, muri)
 
-        self._monitorThread.join()
+        self._monitor.join()
 
     def _perform_with_conv_schedule(self, duri, muri):
         self._vm.log.debug('performing migration with conv schedule')
-        with utils.running(self._monitorThread):
+        with utils.running(self._monitor):
             self._perform_migration(duri, muri)
-        self._monitorThread.join()
+        self._monitor.join()
+
+    def on_iteration(self, iteration):
+        """
+        Called when libvirt reports that migration iteration started.
+        """
+        monitor = self._monitor
+        if monitor is not None:
+            monitor.on_iteration(iteration)
 
     def set_max_bandwidth(self, bandwidth):
         self._vm.log.debug('setting migration max bandwidth to %d', bandwidth)
         self._maxBandwidth = bandwidth
+        if bandwidth_allocator.enabled:
+            bandwidth_allocator.reallocate()
+        else:
+            self.set_bandwidth(bandwidth)
+
+    def set_bandwidth(self, bandwidth):
+        """
+        Set the bandwidth used by libvirt, up to the maximum bandwidth.
+        """
+        with self._lock:
+            self._bandwidth = bandwidth
+            if self._preparingMigrationEvt:
+                # Will be used when starting the migration.
+                return
         self._vm._dom.migrateSetMaxSpeed(bandwidth)
 
     def stop(self):
@@ -647,7 +705,232 @@ def exponential_downtime(downtime, steps):
         yield downtime
 
 
-class DowntimeThread(object):
+class _Supervisor(object):
+    """
+    Run the periodic work of all outgoing migrations, using one scheduler
+    thread and a small executor, instead of threads per migration.
+
+    Work blocked in libvirt longer than _SUPERVISOR_TASK_TIMEOUT seconds
+    does not delay other migrations; the executor replaces the blocked
+    worker.
+    """
+
+    log = logging.getLogger('virt.migration.supervisor')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scheduler = None
+        self._executor = None
+
+    def schedule(self, delay, func):
+        """
+        Run func on the executor after delay seconds, and return the
+        scheduled call.
+        """
+        self._start()
+        return self._scheduler.schedule(delay, lambda: self.dispatch(func))
+
+    def dispatch(self, func):
+        """
+        Run func on the executor as soon as possible. If the executor queue
+        is full, try again after _SUPERVISOR_RETRY_DELAY seconds, so
+        migrations are not left without a monitor.
+        """
+        self._start()
+        try:
+            self._executor.dispatch(func, timeout=_SUPERVISOR_TASK_TIMEOUT)
+        except exception.ResourceExhausted:
+            self.log.warning('Too many migration tasks, retrying %s in %s '
+                             'seconds', func, _SUPERVISOR_RETRY_DELAY)
+            self._scheduler.schedule(_SUPERVISOR_RETRY_DELAY,
+                                     lambda: self.dispatch(func))
+
+    def _start(self):
+        with self._lock:
+            if self._scheduler is not None:
+                return
+            self.log.debug('Starting migration supervisor')
+            scheduler = schedule.Scheduler(name='migsup/sched',
+                                           clock=monotonic_time)
+            self._executor = executor.Executor(
+                name='migsup',
+                workers_count=_SUPERVISOR_WORKERS,
+                max_tasks=_SUPERVISOR_MAX_TASKS,
+                scheduler=scheduler,
+                max_workers=_SUPERVISOR_MAX_WORKERS)
+            scheduler.start()
+            self._executor.start()
+            self._scheduler = scheduler
+
+
+_supervisor = _Supervisor()
+
+
+def allocate_bandwidth(budget, demands):
+    """
+    Split budget MiBps among migrations in proportion to their weights,
+    without giving a migration more than its cap. Bandwidth left over by
+    capped migrations is split among the others.
+
+    demands is a list of (weight, cap) tuples. Return a list of bandwidths
+    in MiBps, in the same order.
+    """
+    bandwidths = [None] * len(demands)
+    pending = list(range(len(demands)))
+    remaining = budget
+    while pending:
+        total_weight = sum(demands[i][0] for i in pending)
+        capped = [i for i in pending
+                  if demands[i][1] * total_weight <=
+                  remaining * demands[i][0]]
+        if not capped:
+            for i in pending:
+                bandwidths[i] = remaining * demands[i][0] / total_weight
+            break
+        for i in capped:
+            bandwidths[i] = demands[i][1]
+            remaining -= demands[i][1]
+            pending.remove(i)
+    # 0 means unlimited bandwidth in libvirt.
+    return [max(1, int(bw)) for bw in bandwidths]
+
+
+class _Allocation(object):
+
+    def __init__(self, source):
+        self.source = source
+        self.dirty_rate = 0  # MiBps
+        self.bandwidth = None  # MiBps
+
+
+class BandwidthAllocator(object):
+    """
+    Share the host migration bandwidth among the outgoing migrations.
+
+    Without a host budget every migration uses its maximum bandwidth, so
+    parallel migrations saturate the migration network and all converge
+    slowly. With a budget, every migration gets a share of the budget
+    weighted by its priority and by its memory dirty rate, since a
+    migration dirtying memory faster needs more bandwidth to converge.
+
+    The allocation is recomputed when a migration starts or ends, and when
+    the migration monitor reports a new dirty rate.
+    """
+
+    log = logging.getLogger('virt.migration.bandwidth')
+
+    def __init__(self, budget):
+        self._budget = budget
+        self._lock = threading.Lock()
+        self._allocations = {}
+
+    @property
+    def enabled(self):
+        return self._budget > 0
+
+    def add(self, source):
+        """
+        Start managing source migration bandwidth.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._allocations[source.vm_id] = _Allocation(source)
+            changes = self._allocate()
+        self._apply(changes)
+
+    def remove(self, source):
+        with self._lock:
+            if self._allocations.pop(source.vm_id, None) is None:
+                return
+            changes = self._allocate()
+        self._apply(changes)
+
+    def update(self, vm_id, dirty_rate):
+        """
+        Called when the migration monitor measured vm_id memory dirty rate
+        in MiBps.
+        """
+        with self._lock:
+            allocation = self._allocations.get(vm_id)
+            if allocation is None or allocation.dirty_rate == dirty_rate:
+                return
+            allocation.dirty_rate = dirty_rate
+            changes = self._allocate()
+        self._apply(changes)
+
+    def reallocate(self):
+        """
+        Called when the priority or the maximum bandwidth of a migration
+        changed.
+        """
+        with self._lock:
+            changes = self._allocate()
+        self._apply(changes)
+
+    def stats(self):
+        with self._lock:
+            migrations = {
+                vm_id: {
+                    'bandwidth': a.bandwidth,
+                    'priority': a.source.priority,
+                    'dirtyRate': a.dirty_rate,
+                }
+                for vm_id, a in six.iteritems(self._allocations)
+            }
+        return {'budget': self._budget, 'migrations': migrations}
+
+    def _allocate(self):
+        """
+        Must be called with self._lock held. Return list of (source,
+        bandwidth) tuples for the changed allocations.
+        """
+        allocations = list(self._allocations.values())
+        if not allocations:
+            return []
+        fair_share = self._budget / len(allocations)
+        demands = []
+        for a in allocations:
+            weight = a.source.priority * (fair_share + a.dirty_rate)
+            cap = a.source.max_bandwidth or self._budget
+            demands.append((weight, min(cap, self._budget)))
+        bandwidths = allocate_bandwidth(self._budget, demands)
+
+        changes = []
+        for a, bandwidth in zip(allocations, bandwidths):
+            if bandwidth != a.bandwidth:
+                a.bandwidth = bandwidth
+                changes.append((a.source, bandwidth))
+        if changes:
+            self.log.info(
+                'Migration bandwidth allocation (budget %d MiBps): %s',
+                self._budget,
+                ', '.join('%s: %d MiBps (priority %d, dirty rate %d MiBps)'
+                          % (a.source.vm_id, a.bandwidth, a.source.priority,
+                             a.dirty_rate)
+                          for a in allocations))
+        return changes
+
+    def _apply(self, changes):
+        for source, bandwidth in changes:
+            try:
+                source.set_bandwidth(bandwidth)
+            except (libvirt.libvirtError, virdomain.NotConnectedError) as e:
+                # The migration has ended, and will be removed soon.
+                self.log.debug('Cannot set bandwidth of %s migration: %s',
+                               source.vm_id, e)
+
+
+bandwidth_allocator = BandwidthAllocator(
+    config.getint('vars', 'migration_host_max_bandwidth'))
+
+
+class DowntimeSchedule(object):
+    """
+    Increase the migration downtime in steps, up to the requested downtime.
+
+    Steps are run by the migration supervisor.
+    """
 
     # avoid grow too large for large VMs
     _WAIT_STEP_LIMIT = 60  # seconds
@@ -656,7 +939,11 @@ class DowntimeThread(object):
         self._vm = vm
         self._downtime = downtime
         self._steps = steps
-        self._stop = threading.Event()
+        self._lock = threading.RLock()
+        self._done = threading.Event()
+        self._stopped = False
+        self._call = None
+        self.current = None
 
         delay_per_gib = config.getint('vars', 'migration_downtime_delay')
         memSize = vm.mem_size_mb()
@@ -668,48 +955,59 @@ class DowntimeThread(object):
         # we need the first value to support set_initial_downtime
         self._initial_downtime = next(self._downtimes)
 
-        self._thread = concurrent.thread(
-            self.run, name='migdwn/' + self._vm.id[:8])
-
     def start(self):
-        self._thread.start()
-
-    def join(self):
-        self._thread.join()
-
-    def is_alive(self):
-        return self._thread.is_alive()
-
-    @logutils.traceback()
-    def run(self):
-        self._vm.log.debug('migration downtime thread started (%i steps)',
+        self._vm.log.debug('migration downtime schedule started (%i steps)',
                            self._steps)
+        _supervisor.dispatch(self._step)
 
-        for downtime in self._downtimes:
-            if self._stop.is_set():
-                break
-
-            self._set_downtime(downtime)
-
-            self._stop.wait(self._wait)
-
-        self._vm.log.debug('migration downtime thread exiting')
+    def join(self):
+        self._done.wait()
 
     def set_initial_downtime(self):
         self._set_downtime(self._initial_downtime)
 
     def stop(self):
-        self._vm.log.debug('stopping migration downtime thread')
-        self._stop.set()
+        with self._lock:
+            if self._stopped:
+                return
+            self._vm.log.debug('stopping migration downtime schedule')
+            self._finish()
+
+    def _step(self):
+        with self._lock:
+            if self._stopped:
+                return
+            try:
+                downtime = next(self._downtimes, None)
+                if downtime is None:
+                    self._vm.log.debug('migration downtime schedule '
+                                       'finished')
+                    self._finish()
+                    return
+                self._set_downtime(downtime)
+            except Exception:
+                self._vm.log.exception('Setting migration downtime failed')
+                self._finish()
+                return
+            self._call = _supervisor.schedule(self._wait, self._step)
+
+    def _finish(self):
+        self._stopped = True
+        if self._call is not None:
+            self._call.cancel()
+        self._done.set()
 
     def _set_downtime(self, downtime):
         self._vm.log.debug('setting migration downtime to %d', downtime)
         self._vm._dom.migrateSetMaxDowntime(downtime, 0)
+        self.current = downtime
 
 
 # we introduce this empty fake so the monitoring code doesn't have
-# to distinguish between no DowntimeThread and DowntimeThread present.
-class _FakeThreadInterface(object):
+# to distinguish between no DowntimeSchedule and DowntimeSchedule present.
+class _NoDowntimeSchedule(object):
+
+    current = None
 
     def start(self):
         pass
@@ -720,167 +1018,285 @@ class _FakeThreadInterface(object):
     def join(self):
         pass
 
-    def is_alive(self):
-        return False
-
     def set_initial_downtime(self):
         pass
 
 
-class MonitorThread(object):
+Sample = collections.namedtuple('Sample', [
+    'time', 'data_remaining', 'dirty_rate', 'downtime', 'iteration'
+])
+
+
+def _samples_summary(samples):
+    """
+    Return a one line summary of migration samples, for logging.
+    """
+    first = samples[0]
+    last = samples[-1]
+    remaining = [s.data_remaining // Mbytes for s in samples]
+    return ('%d samples from %d to %d seconds, remaining MiB %d-%d '
+            '(last %d), max dirty rate %d, downtime %s, iteration %d' % (
+                len(samples), first.time, last.time, min(remaining),
+                max(remaining), remaining[-1],
+                max(s.dirty_rate for s in samples), last.downtime,
+                last.iteration))
+
+
+class MigrationMonitor(object):
+    """
+    Monitor an outgoing migration, applying the convergence schedule or the
+    downtime schedule, and aborting a migration taking too long or not
+    progressing.
+
+    Checks are run by the migration supervisor, more often when the
+    migration is about to complete, and immediately when libvirt reports a
+    new migration iteration.
+
+    Every check records a Sample, kept in samples and logged when the
+    migration ends.
+    """
+
     _MIGRATION_MONITOR_INTERVAL = config.getint(
         'vars', 'migration_monitor_interval')  # seconds
 
+    _MIN_INTERVAL = 1  # seconds
+
+    _MAX_SAMPLES = 1000
+
     def __init__(self, vm, startTime, conv_schedule, use_conv_schedule):
-        super(MonitorThread, self).__init__()
-        self._stop = threading.Event()
         self._vm = vm
         self._startTime = startTime
-        self.daemon = True
         self.progress = None
         self._conv_schedule = conv_schedule
         self._use_conv_schedule = use_conv_schedule
-        self.downtime_thread = _FakeThreadInterface()
-        self._thread = concurrent.thread(
-            self.run, name='migmon/' + self._vm.id[:8])
+        self.downtime_schedule = _NoDowntimeSchedule()
+        self.samples = collections.deque(maxlen=self._MAX_SAMPLES)
+        self._lock = threading.RLock()
+        self._done = threading.Event()
+        self._stopped = False
+        self._call = None
+        self._reported_iteration = None
+        self._iterationCount = 0
+        self._lowmark = None
+        self._lastDataRemaining = None
+        self._lastProgressTime = time.time()
+        memSize = self._vm.mem_size_mb()
+        maxTimePerGiB = config.getint('vars',
+                                      'migration_max_time_per_gib_mem')
+        self._migrationMaxTime = (maxTimePerGiB * memSize + 1023) // 1024
+        self._progress_timeout = config.getint(
+            'vars', 'migration_progress_timeout')
 
     def start(self):
-        self._thread.start()
+        if not self.enabled:
+            self._vm.log.info('migration monitor disabled'
+                              ' (monitoring interval set to 0)')
+            self._done.set()
+            return
+        self._vm.log.debug('starting migration monitor')
+        _supervisor.dispatch(self._start)
 
     def join(self):
-        self._thread.join()
+        self._done.wait()
 
     @property
     def enabled(self):
-        return MonitorThread._MIGRATION_MONITOR_INTERVAL > 0
+        return MigrationMonitor._MIGRATION_MONITOR_INTERVAL > 0
 
-    @logutils.traceback()
-    def run(self):
-        if self.enabled:
-            self._vm.log.debug('starting migration monitor thread')
-            try:
-                self.monitor_migration()
-            except virdomain.NotConnectedError as e:
-                # In case the VM is stopped during migration, there is a race
-                # between domain disconnection and stopping the monitoring
-                # thread. Then the domain may no longer be connected when
-                # monitor_migration loop tries to access it. That's harmless
-                # and shouldn't bubble up, let's just finish the thread.
-                self._vm.log.debug('domain disconnected in monitor thread: %s',
-                                   e)
-            finally:
-                self.downtime_thread.stop()
-            if self.downtime_thread.is_alive():
-                # on very short migrations, the downtime thread
-                # may not be started at all.
-                self.downtime_thread.join()
-            self._vm.log.debug('stopped migration monitor thread')
-        else:
-            self._vm.log.info('migration monitor thread disabled'
-                              ' (monitoring interval set to 0)')
+    def stop(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._vm.log.debug('stopping migration monitor')
+            self._finish()
 
-    def monitor_migration(self):
-        memSize = self._vm.mem_size_mb()
-        maxTimePerGiB = config.getint('vars',
-                                      'migration_max_time_per_gib_mem')
-        migrationMaxTime = (maxTimePerGiB * memSize + 1023) // 1024
-        progress_timeout = config.getint('vars', 'migration_progress_timeout')
-        lastProgressTime = time.time()
-        lowmark = None
-        lastDataRemaining = None
-        iterationCount = 0
+    def on_iteration(self, iteration):
+        """
+        Called when libvirt reports that migration iteration started.
+
+        Called from the libvirt event loop, so it must not block.
+        """
+        self._vm.log.debug('migration iteration %d started', iteration)
+        self._reported_iteration = iteration
+        if not self._stopped:
+            _supervisor.dispatch(self._check)
 
+    def _start(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._run(self._start_migration)
+
+    def _start_migration(self):
         self._execute_init(self._conv_schedule['init'])
         if not self._use_conv_schedule:
             self._vm.log.debug('setting initial migration downtime')
-            self.downtime_thread.set_initial_downtime()
+            self.downtime_schedule.set_initial_downtime()
+        return self._MIGRATION_MONITOR_INTERVAL
 
-        while not self._stop.isSet():
-            stopped = self._stop.wait(self._MIGRATION_MONITOR_INTERVAL)
-            if stopped:
-                break
+    def _check(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._run(self.monitor_migration)
 
-            job_stats = self._vm._dom.jobStats()
-            # It may happen that the migration did not start yet
-            # so we'll keep waiting
-            if not ongoing(job_stats):
-                continue
-
-            progress = Progress.from_job_stats(job_stats)
-            self._vm.send_migration_status_event()
-
-            now = time.time()
-            if self._vm.post_copy != PostCopyPhase.NONE:
-                # Post-copy mode is a final state of a migration -- it either
-                # completes or fails and stops the VM, there is no way to
-                # continue with the migration in either case.  So we won't
-                # handle any further schedule actions once post-copy is
-                # successfully started.  It's still recommended to put the
-                # abort action after the post-copy action in the schedule, for
-                # the case when it's not possible to switch to the post-copy
-                # mode for some reason.
-                if self._vm.post_copy == PostCopyPhase.RUNNING:
-                    # If post-copy is not RUNNING then we are in the interim
-                    # phase (which should be short) between initiating the
-                    # post-copy migration and the actual start of the post-copy
-                    # migration.  Nothing needs to be done in that case.
-                    self._vm.log.debug(
-                        'Post-copy migration still in progress: %d',
-                        progress.data_remaining
-                    )
-            elif not self._use_conv_schedule and\
-                    (0 < migrationMaxTime < now - self._startTime):
-                self._vm.log.warn('The migration took %d seconds which is '
-                                  'exceeding the configured maximum time '
-                                  'for migrations of %d seconds. The '
-                                  'migration will be aborted.',
-                                  now - self._startTime,
-                                  migrationMaxTime)
-                self._vm._dom.abortJob()
-                self.stop()
-                break
-            elif (lowmark is None) or (lowmark > progress.data_remaining):
-                lowmark = progress.data_remaining
-                lastProgressTime = now
-            else:
-                self._vm.log.warn(
-                    'Migration stalling: remaining (%sMiB)'
-                    ' > lowmark (%sMiB).',
-                    progress.data_remaining // Mbytes, lowmark // Mbytes)
-
-            if not self._vm.post_copy and\
-                    lastDataRemaining is not None and\
-                    lastDataRemaining < progress.data_remaining:
-                iterationCount += 1
+    def _run(self, func):
+        try:
+            interval = func()
+        except virdomain.NotConnectedError as e:
+            # In case the VM is stopped during migration, there is a race
+            # between domain disconnection and stopping the monitor. Then the
+            # domain may no longer be connected when we try to access it.
+            # That's harmless and shouldn't bubble up, let's just finish.
+            self._vm.log.debug('domain disconnected in migration monitor: %s',
+                               e)
+            self._finish()
+        except Exception:
+            self._vm.log.exception('Migration monitor failed')
+            self._finish()
+        else:
+            if not self._stopped:
+                self._schedule(interval)
+
+    def _schedule(self, delay):
+        if self._call is not None:
+            self._call.cancel()
+        self._call = _supervisor.schedule(delay, self._check)
+
+    def _finish(self):
+        self._stopped = True
+        if self._call is not None:
+            self._call.cancel()
+        self.downtime_schedule.stop()
+        if self.samples:
+            self._vm.log.info('Migration samples: %s',
+                              _samples_summary(self.samples))
+        self._vm.log.debug('stopped migration monitor')
+        self._done.set()
+
+    def monitor_migration(self):
+        """
+        Check the migration progress, and return the number of seconds until
+        the next check.
+        """
+        job_stats = self._vm._dom.jobStats()
+        # It may happen that the migration did not start yet
+        # so we'll keep waiting
+        if not ongoing(job_stats):
+            return self._MIGRATION_MONITOR_INTERVAL
+
+        progress = Progress.from_job_stats(job_stats)
+        self._vm.send_migration_status_event()
+
+        if progress.dirty_rate >= 0:
+            page_size = job_stats.get('memory_page_size', 4096)
+            bandwidth_allocator.update(
+                self._vm.id, progress.dirty_rate * page_size // Mbytes)
+
+        now = time.time()
+        iteration = self._iteration(progress)
+        self.samples.append(Sample(
+            int(now - self._startTime), progress.data_remaining,
+            progress.dirty_rate, self.downtime_schedule.current, iteration))
+
+        if self._vm.post_copy != PostCopyPhase.NONE:
+            # Post-copy mode is a final state of a migration -- it either
+            # completes or fails and stops the VM, there is no way to
+            # continue with the migration in either case.  So we won't
+            # handle any further schedule actions once post-copy is
+            # successfully started.  It's still recommended to put the
+            # abort action after the post-copy action in the schedule, for
+            # the case when it's not possible to switch to the post-copy
+            # mode for some reason.
+            if self._vm.post_copy == PostCopyPhase.RUNNING:
+                # If post-copy is not RUNNING then we are in the interim
+                # phase (which should be short) between initiating the
+                # post-copy migration and the actual start of the post-copy
+                # migration.  Nothing needs to be done in that case.
+                self._vm.log.debug(
+                    'Post-copy migration still in progress: %d',
+                    progress.data_remaining
+                )
+        elif not self._use_conv_schedule and\
+                (0 < self._migrationMaxTime < now - self._startTime):
+            self._vm.log.warn('The migration took %d seconds which is '
+                              'exceeding the configured maximum time '
+                              'for migrations of %d seconds. The '
+                              'migration will be aborted.',
+                              now - self._startTime,
+                              self._migrationMaxTime)
+            self._vm._dom.abortJob()
+            self.stop()
+            return None
+        elif (self._lowmark is None or
+              self._lowmark > progress.data_remaining):
+            self._lowmark = progress.data_remaining
+            self._lastProgressTime = now
+        else:
+            self._vm.log.warn(
+                'Migration stalling: remaining (%sMiB)'
+                ' > lowmark (%sMiB).',
+                progress.data_remaining // Mbytes, self._lowmark // Mbytes)
+
+        if not self._vm.post_copy:
+            while self._iterationCount < iteration:
+                self._iterationCount += 1
                 self._vm.log.debug('new iteration detected: %i',
-                                   iterationCount)
+                                   self._iterationCount)
                 if self._use_conv_schedule:
-                    self._next_action(iterationCount)
-                elif iterationCount == 1:
+                    self._next_action(self._iterationCount)
+                elif self._iterationCount == 1:
                     # it does not make sense to do any adjustments before
                     # first iteration.
-                    self.downtime_thread.start()
+                    self.downtime_schedule.start()
+                if self._stopped:
+                    break
 
-            lastDataRemaining = progress.data_remaining
+        self._lastDataRemaining = progress.data_remaining
+
+        if not self._use_conv_schedule and\
+                (now - self._lastProgressTime) > self._progress_timeout:
+            # Migration is stuck, abort
+            self._vm.log.warn(
+                'Migration is stuck: Hasn\'t progressed in %s seconds. '
+                'Aborting.' % (now - self._lastProgressTime))
+            self._vm._dom.abortJob()
+            self.stop()
 
-            if not self._use_conv_schedule and\
-                    (now - lastProgressTime) > progress_timeout:
-                # Migration is stuck, abort
-                self._vm.log.warn(
-                    'Migration is stuck: Hasn\'t progressed in %s seconds. '
-                    'Aborting.' % (now - lastProgressTime))
-                self._vm._dom.abortJob()
-                self.stop()
+        if self._stopped:
+            return None
 
-            if self._stop.isSet():
-                break
+        self.progress = progress
+        self._vm.log.info('%s', progress)
+        return self._next_interval(progress)
 
-            self.progress = progress
-            self._vm.log.info('%s', progress)
+    def _iteration(self, progress):
+        """
+        Return the number of completed iterations, counting from the end of
+        the first iteration, copying all the memory.
 
-    def stop(self):
-        self._vm.log.debug('stopping migration monitor thread')
-        self._stop.set()
+        Use the iteration reported by libvirt if available, otherwise
+        assume a new iteration started when the remaining data increased.
+        """
+        reported = self._reported_iteration
+        if reported is None or progress.mem_iteration > reported:
+            reported = progress.mem_iteration
+        if reported >= 0:
+            return max(self._iterationCount, reported - 1)
+        if (self._lastDataRemaining is not None and
+                self._lastDataRemaining < progress.data_remaining):
+            return self._iterationCount + 1
+        return self._iterationCount
+
+    def _next_interval(self, progress):
+        # Check more often when the migration is about to complete, to
+        # report accurate progress and apply the next schedule actions in
+        # time.
+        interval = self._MIGRATION_MONITOR_INTERVAL
+        if progress.mem_bps > 0:
+            eta = progress.data_remaining / progress.mem_bps
+            interval = min(interval, max(self._MIN_INTERVAL, eta / 2))
+        return interval
 
     def _next_action(self, stalling):
         head = self._conv_schedule['stalling'][0]
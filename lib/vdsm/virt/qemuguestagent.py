@@ -23,6 +23,13 @@ from __future__ import division
 
 """
 Periodic scheduler that polls QEMU Guest Agent for information.
+
+Polling operations run on a dedicated executor, using at most max_workers
+threads. When a call to the agent of a VM fails, the VM is throttled: no
+operation is run on the VM, and commands of running operations are skipped,
+until the throttling interval expires. The interval is doubled after every
+consecutive failure, up to _MAX_THROTTLING_INTERVAL, and reset when a call
+succeeds, so few unresponsive agents do not occupy the workers.
 """
 
 from collections import defaultdict
@@ -49,6 +56,7 @@ import threading
 
 from vdsm import utils
 from vdsm import executor
+from vdsm.common import latency
 from vdsm.common.time import monotonic_time
 from vdsm.config import config
 from vdsm.virt import periodic
@@ -77,6 +85,7 @@ _MAX_WORKERS = config.getint('guest_agent', 'max_workers')
 _COMMAND_TIMEOUT = config.getint('guest_agent', 'qga_command_timeout')
 _TASK_TIMEOUT = config.getint('guest_agent', 'qga_task_timeout')
 _THROTTLING_INTERVAL = 60
+_MAX_THROTTLING_INTERVAL = 960
 
 
 class QemuGuestAgentPoller(object):
@@ -95,8 +104,10 @@ class QemuGuestAgentPoller(object):
         self._capabilities = {}
         self._guest_info_lock = threading.Lock()
         self._guest_info = defaultdict(dict)
-        self._last_failure_lock = threading.Lock()
-        self._last_failure = {}
+        # Consecutive failures and last failure time, keyed by vm_id.
+        self._failures_lock = threading.Lock()
+        self._failures = {}
+        self._command_latency = latency.Registry()
 
     def start(self):
         if not config.getboolean('guest_agent', 'enable_qga_poller'):
@@ -173,11 +184,56 @@ class QemuGuestAgentPoller(object):
             self._guest_info[vm_id].update(info)
 
     def last_failure(self, vm_id):
-        return self._last_failure.get(vm_id, None)
+        with self._failures_lock:
+            count, last = self._failures.get(vm_id, (0, None))
+        return last
 
     def set_failure(self, vm_id):
-        with self._last_failure_lock:
-            self._last_failure[vm_id] = monotonic_time()
+        now = monotonic_time()
+        with self._failures_lock:
+            count, last = self._failures.get(vm_id, (0, None))
+            # Failures while the VM is throttled, from operations started
+            # before the first failure, do not increase the interval.
+            if last is None or now - last >= _throttling_interval(count):
+                count += 1
+                self.log.debug(
+                    'Throttling QEMU-GA calls to vm_id=%s for %d seconds',
+                    vm_id, _throttling_interval(count))
+            self._failures[vm_id] = (count, now)
+
+    def clear_failure(self, vm_id):
+        with self._failures_lock:
+            if self._failures.pop(vm_id, None) is not None:
+                self.log.debug('QEMU-GA of vm_id=%s is responsive', vm_id)
+
+    def throttled(self, vm_id):
+        """
+        Return True if calls to QEMU-GA of vm_id should not be made, since
+        the last call failed recently.
+        """
+        with self._failures_lock:
+            count, last = self._failures.get(vm_id, (0, None))
+        if last is None:
+            return False
+        return monotonic_time() - last < _throttling_interval(count)
+
+    def command_timer(self, command):
+        """
+        Time a QEMU-GA call, counting an error if it raises.
+        """
+        return self._command_latency.timer(command)
+
+    def stats(self):
+        """
+        Return dict with the number of throttled VMs, and histograms of
+        QEMU-GA calls duration keyed by command.
+        """
+        with self._failures_lock:
+            vm_ids = list(self._failures)
+        return {
+            'throttled': sum(1 for vm_id in vm_ids if self.throttled(vm_id)),
+            'commands': self._command_latency.info(),
+        }
 
     def call_qga_command(self, vm, command, args=None):
         """
@@ -186,6 +242,13 @@ class QemuGuestAgentPoller(object):
         command   the command to execute (string)
         args      arguments to the command (dict) or None
         """
+        # Skip the command if a previous command of this operation failed
+        if self.throttled(vm.id):
+            self.log.debug(
+                'Not sending QEMU-GA command \'%s\' to vm_id=\'%s\','
+                ' the agent is throttled', command, vm.id)
+            return None
+
         # First make sure the command is supported by QEMU-GA
         if command != _QEMU_GUEST_INFO_COMMAND:
             caps = self.get_caps(vm.id)
@@ -203,13 +266,15 @@ class QemuGuestAgentPoller(object):
             self.log.debug(
                 'Calling QEMU-GA command for vm_id=\'%s\', command: %s',
                 vm.id, cmd)
-            ret = libvirt_qemu.qemuAgentCommand(vm._dom, cmd,
-                                                _COMMAND_TIMEOUT, 0)
+            with self._command_latency.timer(command):
+                ret = libvirt_qemu.qemuAgentCommand(vm._dom, cmd,
+                                                    _COMMAND_TIMEOUT, 0)
             self.log.debug('Call returned: %r', ret)
         except libvirt.libvirtError:
             # Most likely the QEMU-GA is not installed or is unresponsive
             self.set_failure(vm.id)
             return None
+        self.clear_failure(vm.id)
 
         try:
             parsed = json.loads(ret)
@@ -271,14 +336,19 @@ class QemuGuestAgentPoller(object):
                 if vm_id not in vm_container:
                     del self._guest_info[vm_id]
                     removed.add(vm_id)
-        with self._last_failure_lock:
-            for vm_id in copy.copy(self._last_failure):
+        with self._failures_lock:
+            for vm_id in copy.copy(self._failures):
                 if vm_id not in vm_container:
-                    del self._last_failure[vm_id]
+                    del self._failures[vm_id]
                     removed.add(vm_id)
         self.log.debug('Cleaned up old data for VMs: %s', removed)
 
 
+def _throttling_interval(failures):
+    return min(_THROTTLING_INTERVAL * 2 ** (failures - 1),
+               _MAX_THROTTLING_INTERVAL)
+
+
 class _RunnableOnVmGuestAgent(periodic._RunnableOnVm):
     def __init__(self, vm, qga_poller):
         super(_RunnableOnVmGuestAgent, self).__init__(vm)
@@ -288,11 +358,7 @@ class _RunnableOnVmGuestAgent(periodic._RunnableOnVm):
     def runnable(self):
         if not self._vm.isDomainReadyForCommands():
             return False
-        last_failure = self._qga_poller.last_failure(self._vm.id)
-        if last_failure is not None and \
-                (monotonic_time() - last_failure) < _THROTTLING_INTERVAL:
-            return False
-        return True
+        return not self._qga_poller.throttled(self._vm.id)
 
 
 class ActiveUsersCheck(_RunnableOnVmGuestAgent):
@@ -420,11 +486,14 @@ class NetworkInterfacesCheck(_RunnableOnVmGuestAgent):
         guest_info = {'netIfaces': [], 'guestIPs': ''}
         interfaces = {}
         try:
-            interfaces = self._vm._dom.interfaceAddresses(
-                libvirt.VIR_DOMAIN_INTERFACE_ADDRESSES_SRC_AGENT)
+            with self._qga_poller.command_timer(
+                    _QEMU_NETWORK_INTERFACES_COMMAND):
+                interfaces = self._vm._dom.interfaceAddresses(
+                    libvirt.VIR_DOMAIN_INTERFACE_ADDRESSES_SRC_AGENT)
         except libvirt.libvirtError:
             self._qga_poller.set_failure(self._vm.id)
             return
+        self._qga_poller.clear_failure(self._vm.id)
 
         for ifname, ifparams in six.iteritems(interfaces):
             iface = {
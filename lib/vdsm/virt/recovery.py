@@ -25,8 +25,11 @@ import logging
 
 import libvirt
 
+from vdsm.common import concurrent
 from vdsm.common import libvirtconnection
 from vdsm.common import response
+from vdsm.common import time
+from vdsm.config import config
 from vdsm.virt import vmchannels
 from vdsm.virt import vmstatus
 from vdsm.virt import vmxml
@@ -60,27 +63,41 @@ def _is_ignored_vm(dom_uuid, dom_obj, dom_xml):
     return False
 
 
-def _list_domains():
+def _list_domains(workers):
     conn = libvirtconnection.get()
+    dom_objs = conn.listAllDomains()
+    # Fetching the XML of hundreds of domains one by one is slow, so we fetch
+    # them concurrently.
+    results = concurrent.tmap(_domain_info, dom_objs, max_workers=workers)
     domains = []
-    for dom_obj in conn.listAllDomains():
-        dom_uuid = 'unknown'
-        try:
-            dom_uuid = dom_obj.UUIDString()
-            logging.debug("Found domain %s", dom_uuid)
-            dom_xml = dom_obj.XMLDesc(0)
-        except libvirt.libvirtError as e:
-            if e.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
-                logging.exception("domain %s is dead", dom_uuid)
-            else:
-                raise
-        else:
-            if _is_ignored_vm(dom_uuid, dom_obj, dom_xml):
-                continue
-            domains.append((dom_obj, dom_xml, _is_external_vm(dom_xml),))
+    for res in results:
+        if not res.succeeded:
+            raise res.value
+        if res.value is not None:
+            domains.append(res.value)
     return domains
 
 
+def _domain_info(dom_obj):
+    """
+    Return a tuple (dom_obj, dom_xml, external) for domains that should be
+    recovered, or None if the domain should be ignored.
+    """
+    dom_uuid = 'unknown'
+    try:
+        dom_uuid = dom_obj.UUIDString()
+        logging.debug("Found domain %s", dom_uuid)
+        dom_xml = dom_obj.XMLDesc(0)
+    except libvirt.libvirtError as e:
+        if e.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
+            logging.exception("domain %s is dead", dom_uuid)
+            return None
+        raise
+    if _is_ignored_vm(dom_uuid, dom_obj, dom_xml):
+        return None
+    return dom_obj, dom_xml, _is_external_vm(dom_xml)
+
+
 def _recover_domain(cif, vm_id, dom_xml, external):
     external_str = " (external)" if external else ""
     cif.log.debug("recovery: trying with VM%s %s", external_str, vm_id)
@@ -112,27 +129,59 @@ def _recovery_params(vm_id, dom_xml, external):
     return params
 
 
-def all_domains(cif):
-    doms = _list_domains()
+def all_domains(cif, workers=None, on_listed=None):
+    """
+    Recover all the domains running on this host, using up to workers
+    threads. If on_listed is specified, it is called once all the domains
+    were found, before they are recovered.
+    """
+    if workers is None:
+        workers = config.getint('vars', 'vm_recovery_workers')
+    if workers < 1:
+        cif.log.warning('recovery: invalid number of workers %d, using 1',
+                        workers)
+        workers = 1
+
+    start = time.monotonic_time()
+    doms = _list_domains(workers)
+    listed = time.monotonic_time()
+    cif.log.info('recovery: found %d domains in %.2f seconds',
+                 len(doms), listed - start)
+    if on_listed is not None:
+        on_listed()
+
     num_doms = len(doms)
-    for idx, (dom_obj, dom_xml, external) in enumerate(doms):
-        vm_id = dom_obj.UUIDString()
-        if _recover_domain(cif, vm_id, dom_xml, external):
-            cif.log.info(
-                'recovery [1:%d/%d]: recovered domain %s',
-                idx + 1, num_doms, vm_id)
-        elif external:
-            cif.log.info("Failed to recover external domain: %s" % (vm_id,))
-        else:
-            cif.log.info(
-                'recovery [1:%d/%d]: loose domain %s found, killing it.',
+
+    def recover(item):
+        idx, (dom_obj, dom_xml, external) = item
+        _recover_or_destroy(cif, idx, num_doms, dom_obj, dom_xml, external)
+
+    results = concurrent.tmap(recover, enumerate(doms), max_workers=workers)
+    cif.log.info('recovery: recovered %d domains in %.2f seconds',
+                 num_doms, time.monotonic_time() - listed)
+    for res in results:
+        if not res.succeeded:
+            raise res.value
+
+
+def _recover_or_destroy(cif, idx, num_doms, dom_obj, dom_xml, external):
+    vm_id = dom_obj.UUIDString()
+    if _recover_domain(cif, vm_id, dom_xml, external):
+        cif.log.info(
+            'recovery [1:%d/%d]: recovered domain %s',
+            idx + 1, num_doms, vm_id)
+    elif external:
+        cif.log.info("Failed to recover external domain: %s" % (vm_id,))
+    else:
+        cif.log.info(
+            'recovery [1:%d/%d]: loose domain %s found, killing it.',
+            idx + 1, num_doms, vm_id)
+        try:
+            dom_obj.destroy()
+        except libvirt.libvirtError:
+            cif.log.exception(
+                'recovery [1:%d/%d]: failed to kill loose domain %s',
                 idx + 1, num_doms, vm_id)
-            try:
-                dom_obj.destroy()
-            except libvirt.libvirtError:
-                cif.log.exception(
-                    'recovery [1:%d/%d]: failed to kill loose domain %s',
-                    idx + 1, num_doms, vm_id)
 
 
 def lookup_external_vms(cif):
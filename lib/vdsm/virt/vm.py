@@ -2042,6 +2042,9 @@ class Vm(object):
             status['progress'] = 100
         return status
 
+    def onMigrationIteration(self, iteration):
+        self._migrationSourceThread.on_iteration(iteration)
+
     def onJobCompleted(self, args):
         if (not self._migrationSourceThread.started and
             not self._migrationSourceThread.recovery) or \
@@ -5064,7 +5067,10 @@ class Vm(object):
 
     def _updateDomainDescriptor(self, xml=None):
         domxml = self._dom.XMLDesc(0) if xml is None else xml
-        self._domain = DomainDescriptor(domxml)
+        # Many operations do not change the domain xml, keep the parsed
+        # descriptor in this case.
+        if domxml != self._domain.xml:
+            self._domain = DomainDescriptor(domxml)
 
     def _updateMetadataDescriptor(self):
         # load will overwrite any existing content, as per doc.
@@ -6025,6 +6031,7 @@ class Vm(object):
                              device_alias)
             return
         self._devices[device_hwclass].remove(device)
+        self._remove_domain_device(device_alias)
         try:
             device.teardown()
         except libvirt.libvirtError as e:
@@ -6041,7 +6048,21 @@ class Vm(object):
                 raise
         finally:
             device.hotunplug_event.set()
-        self._updateDomainDescriptor()
+
+    def onDeviceAdded(self, device_alias):
+        self.log.debug("Device addition reported: %s", device_alias)
+        # Devices hotplugged by vdsm are already in the descriptor, refresh
+        # it only for devices added by someone else.
+        if not self._domain.has_device(device_alias):
+            self._updateDomainDescriptor()
+
+    def _remove_domain_device(self, device_alias):
+        try:
+            self._domain = self._domain.without_device(device_alias)
+        except LookupError:
+            self.log.warning("Removed device not found in domain xml: %s",
+                             device_alias)
+            self._updateDomainDescriptor()
 
     # Accessing storage
 
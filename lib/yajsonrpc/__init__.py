@@ -319,7 +319,8 @@ class JsonRpcServer(object):
 
         # VDSM should never respond to any request before all information about
         # running VMs is recovered, see https://bugzilla.redhat.com/1339291
-        if not self._cif.ready:
+        # Lightweight verbs are served once all the running VMs were found.
+        if not (self._cif.ready or self._cif.serves_in_recovery(req.method)):
             self.log.info("In recovery, ignoring '%s' in bridge with %s",
                           req.method, req.params)
             return JsonRpcResponse(
@@ -63,6 +63,8 @@ class FakeClientIF(clientIF.clientIF):
         self.vmRequests = {}
         self.servers = {}
         self._recovery = False
+        self._vm_list_known = False
+        self._vms_registered = False
 
     def createVm(self, vmParams, vmRecover=False):
         self.vmRequests[vmParams['vmId']] = (vmParams, vmRecover)
@@ -294,6 +296,29 @@ class TestNotification(TestCaseBase):
         self.assertEqual(ev["method"], method)
 
 
+class TestServesInRecovery(TestCaseBase):
+
+    def setUp(self):
+        self.cif = FakeClientIF()
+        self.cif._recovery = True
+
+    def test_vm_list_unknown(self):
+        self.assertFalse(self.cif.serves_in_recovery('Host.ping2'))
+        self.assertFalse(self.cif.serves_in_recovery('Host.getVMList'))
+
+    def test_vm_list_known(self):
+        self.cif._domains_listed()
+        self.assertTrue(self.cif.serves_in_recovery('Host.ping2'))
+        self.assertFalse(self.cif.serves_in_recovery('Host.getVMList'))
+        self.assertFalse(self.cif.serves_in_recovery('VM.create'))
+
+    def test_vms_registered(self):
+        self.cif._domains_listed()
+        self.cif._vms_registered = True
+        self.assertTrue(self.cif.serves_in_recovery('Host.getVMList'))
+        self.assertFalse(self.cif.serves_in_recovery('VM.create'))
+
+
 class TestPrepareNetworkDrive(TestCaseBase):
 
     def test_path_replacement(self):
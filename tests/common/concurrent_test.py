@@ -214,6 +214,39 @@ class TMapTests(VdsmTestCase):
         self.assertGreater(elapsed, 0.5)
         self.assertLess(elapsed, 1.0)
 
+    def test_max_workers(self):
+        start = time.time()
+        concurrent.tmap(time.sleep, [0.2] * 10, max_workers=5)
+        elapsed = time.time() - start
+        self.assertGreater(elapsed, 0.4)
+        self.assertLess(elapsed, 0.6)
+
+    def test_max_workers_results_order(self):
+        def func(x):
+            time.sleep(x)
+            return x
+        values = tuple(random.random() * 0.1 for x in range(10))
+        results = concurrent.tmap(func, values, max_workers=3)
+        expected = [concurrent.Result(True, x) for x in values]
+        self.assertEqual(results, expected)
+
+    def test_max_workers_threads(self):
+        lock = threading.Lock()
+        threads = set()
+
+        def func(x):
+            with lock:
+                threads.add(threading.current_thread())
+            time.sleep(0.05)
+
+        # pylint: disable=range-builtin-not-iterating
+        concurrent.tmap(func, range(10), max_workers=3)
+        self.assertEqual(len(threads), 3)
+
+    def test_invalid_max_workers(self):
+        with self.assertRaises(ValueError):
+            concurrent.tmap(lambda x: x, [1, 2], max_workers=0)
+
     def test_error(self):
         error = RuntimeError("No result for you!")
 
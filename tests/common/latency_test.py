@@ -0,0 +1,72 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import pytest
+
+from vdsm.common import latency
+
+
+def test_histogram_empty():
+    info = latency.Histogram().info()
+    assert info["count"] == 0
+    assert info["avg"] == 0.0
+    assert sum(info["buckets"].values()) == 0
+
+
+def test_histogram_buckets():
+    hist = latency.Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        hist.add(value)
+    info = hist.info()
+    assert info["count"] == 4
+    assert info["max"] == 2.0
+    assert info["total"] == pytest.approx(2.65)
+    assert info["buckets"] == {"0.1": 2, "1.0": 1, "inf": 1}
+
+
+def test_histogram_errors():
+    hist = latency.Histogram()
+    hist.add(0.1)
+    hist.add(0.1, error=True)
+    assert hist.info()["errors"] == 1
+
+
+def test_registry_timer():
+    timings = latency.Registry()
+    with timings.timer("ok"):
+        pass
+    with pytest.raises(RuntimeError):
+        with timings.timer("fail"):
+            raise RuntimeError
+    info = timings.info()
+    assert info["ok"]["count"] == 1
+    assert info["ok"]["errors"] == 0
+    assert info["fail"]["count"] == 1
+    assert info["fail"]["errors"] == 1
+
+
+def test_registry_clear():
+    timings = latency.Registry()
+    timings.add("op", 1.0)
+    timings.clear()
+    assert timings.info() == {}
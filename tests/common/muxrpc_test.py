@@ -0,0 +1,185 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import threading
+
+import pytest
+
+from vdsm.common import concurrent
+from vdsm.common import muxrpc
+
+
+class Service(object):
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def echo(self, value, suffix=""):
+        return value + suffix
+
+    def fail(self, message):
+        raise ValueError(message)
+
+    def block(self):
+        if not self.release.wait(5):
+            raise RuntimeError("Timeout waiting for release")
+        return "released"
+
+    def unpicklable(self):
+        return threading.Lock()
+
+    def _private(self):
+        return "private"
+
+
+@pytest.fixture
+def service():
+    return Service()
+
+
+@pytest.fixture
+def server(tmpdir, service):
+    server = muxrpc.Server(str(tmpdir.join("mux.sock")), service, workers=4)
+    server.start()
+    yield server
+    service.release.set()
+    server.stop()
+
+
+@pytest.fixture
+def client(server):
+    client = muxrpc.Client(server.address)
+    client.connect()
+    yield client
+    client.close()
+
+
+def test_call(client):
+    assert client.call("echo", ("hello",)) == "hello"
+
+
+def test_call_kwargs(client):
+    assert client.call("echo", ("hello",), {"suffix": "!"}) == "hello!"
+
+
+def test_remote_exception(client):
+    with pytest.raises(ValueError) as e:
+        client.call("fail", ("oops",))
+    assert str(e.value) == "oops"
+
+
+def test_private_method(client):
+    with pytest.raises(AttributeError):
+        client.call("_private")
+
+
+def test_missing_method(client):
+    with pytest.raises(AttributeError):
+        client.call("no_such_method")
+
+
+def test_unpicklable_result(client):
+    with pytest.raises(muxrpc.RemoteError):
+        client.call("unpicklable")
+    # The connection is still usable.
+    assert client.call("echo", ("hello",)) == "hello"
+
+
+def test_slow_call_does_not_block_others(client, service):
+    results = []
+
+    def slow():
+        results.append(client.call("block"))
+
+    t = concurrent.thread(slow)
+    t.start()
+    try:
+        for i in range(10):
+            assert client.call("echo", (str(i),)) == str(i)
+        assert results == []
+    finally:
+        service.release.set()
+        t.join()
+    assert results == ["released"]
+
+
+def test_concurrent_calls(client):
+    def call(i):
+        return client.call("echo", (str(i),))
+
+    results = concurrent.tmap(call, range(50))
+    assert [r.value for r in results] == [str(i) for i in range(50)]
+
+
+def test_timeout(client):
+    with pytest.raises(muxrpc.Timeout):
+        client.call("block", timeout=0.2)
+
+
+def test_server_stopped(tmpdir, service):
+    server = muxrpc.Server(str(tmpdir.join("mux.sock")), service)
+    server.start()
+    client = muxrpc.Client(server.address)
+    client.connect()
+    results = []
+
+    def blocked():
+        try:
+            client.call("block")
+        except Exception as e:
+            results.append(e)
+
+    t = concurrent.thread(blocked)
+    t.start()
+    try:
+        server.stop()
+    finally:
+        service.release.set()
+        t.join()
+    assert isinstance(results[0], muxrpc.ConnectionClosed)
+    assert client.closed
+    with pytest.raises(muxrpc.ConnectionClosed):
+        client.call("echo", ("hello",))
+    client.close()
+
+
+def test_call_after_close(client):
+    client.close()
+    with pytest.raises(muxrpc.ConnectionClosed):
+        client.call("echo", ("hello",))
+
+
+def test_timings(client, server):
+    client.call("echo", ("hello",))
+    with pytest.raises(ValueError):
+        client.call("fail", ("oops",))
+
+    timings = client.timings.info()
+    assert timings["echo"]["count"] == 1
+    assert timings["echo"]["errors"] == 0
+    assert timings["fail"]["count"] == 1
+    assert timings["fail"]["errors"] == 1
+
+    timings = server.timings.info()
+    assert timings["echo"]["count"] == 1
+    assert timings["fail"]["count"] == 1
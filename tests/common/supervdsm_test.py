@@ -0,0 +1,99 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import threading
+
+import pytest
+
+from vdsm.common import concurrent
+from vdsm.common import muxrpc
+from vdsm.common import supervdsm
+
+
+class ClosedChannel(object):
+
+    def __init__(self, barrier):
+        self.barrier = barrier
+        self.closed = False
+
+    def call(self, name, args, kwargs):
+        # Fail all callers together, like a disconnect with calls in flight.
+        self.barrier.wait(timeout=5)
+        raise muxrpc.ConnectionClosed()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeProxy(supervdsm.SuperVdsmProxy):
+
+    def __init__(self, channel):
+        self._lock = threading.Lock()
+        self._channel = channel
+        self.connects = 0
+
+    def _connect(self):
+        if self._channel is not None:
+            self._channel.close()
+        self.connects += 1
+        self._channel = object()
+
+
+def test_reconnect_once_on_concurrent_disconnect():
+    callers = 4
+    old = ClosedChannel(concurrent.Barrier(callers))
+    proxy = FakeProxy(old)
+    errors = []
+
+    def call():
+        try:
+            proxy.getPathsStatus()
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [concurrent.thread(call) for _ in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == callers
+    assert proxy.connects == 1
+    assert old.closed
+    assert proxy._channel is not old
+
+
+def test_reconnect_stale_channel():
+    proxy = FakeProxy(None)
+    proxy._connect()
+    current = proxy._channel
+    proxy._reconnect(ClosedChannel(None))
+    assert proxy.connects == 1
+    assert proxy._channel is current
+
+
+def test_call_fails_after_disconnect():
+    proxy = FakeProxy(ClosedChannel(concurrent.Barrier(1)))
+    with pytest.raises(RuntimeError):
+        proxy.getPathsStatus()
+    assert proxy.connects == 1
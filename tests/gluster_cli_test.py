@@ -21,10 +21,15 @@
 from __future__ import absolute_import
 from __future__ import division
 
+import io
+import threading
+
 import six
 
+from monkeypatch import MonkeyPatchScope
 from testlib import VdsmTestCase as TestCaseBase
 from testValidation import skipif
+from vdsm.common import latency
 from vdsm.gluster import cli as gcli
 from vdsm.gluster import exception
 import xml.etree.cElementTree as etree
@@ -1263,3 +1268,317 @@ class GlusterCliTests(TestCaseBase):
     def test_execGlusterXmlWithTimeoutFail(self):
         with self.assertRaises(exception.GlusterCommandTimeoutException):
             gcli._execGlusterXmlWithTimeout(["./slow-gluster-cli"], timeout=5)
+
+
+_VOLUME_STATUS_TEMPLATE = """\
+<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cliOutput>
+  <opRet>0</opRet>
+  <opErrno>0</opErrno>
+  <opErrstr/>
+  <volStatus>
+    <volumes>
+%s
+    </volumes>
+  </volStatus>
+</cliOutput>
+"""
+
+_VOLUME_TEMPLATE = """\
+      <volume>
+        <volName>%(name)s</volName>
+        <nodeCount>1</nodeCount>
+        <node>
+          <hostname>192.168.122.2</hostname>
+          <path>/bricks/%(name)s</path>
+          <peerid>f06b108e-a780-4519-bb22-c3083a1e3f8a</peerid>
+          <port>49152</port>
+          <ports>
+            <tcp>49152</tcp>
+            <rdma>N/A</rdma>
+          </ports>
+          <status>1</status>
+          <pid>1313</pid>
+        </node>
+      </volume>"""
+
+
+def _volumeStatusXml(*names):
+    volumes = "\n".join(_VOLUME_TEMPLATE % {"name": name} for name in names)
+    return (_VOLUME_STATUS_TEMPLATE % volumes).encode("utf-8")
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCommandPath(object):
+
+    cmd = "/usr/sbin/gluster"
+
+
+class FakeGluster(object):
+    """
+    Fake gluster command, returning output keyed by the command arguments,
+    without the command path and options. Replaces both commands.execCmd()
+    and subprocess.Popen().
+    """
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.calls = []
+
+    def execCmd(self, cmd, raw=False):
+        return 0, self._output(cmd), b""
+
+    def popen(self, cmd, stdout=None, stderr=None):
+        return FakeProcess(self._output(cmd))
+
+    def _output(self, cmd):
+        # The command may be wrapped, e.g. with taskset.
+        cmd = cmd[cmd.index(FakeCommandPath.cmd) + 1:]
+        args = tuple(w for w in cmd if not w.startswith("--"))
+        self.calls.append(args)
+        return self.outputs[args]
+
+
+class FakeProcess(object):
+
+    pid = 42
+    returncode = 0
+
+    def __init__(self, out):
+        self.stdout = io.BytesIO(out)
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        return self.returncode
+
+
+class GlusterCliCacheTests(TestCaseBase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.gluster = FakeGluster({
+            ("volume", "status", "all"): _volumeStatusXml("music", "movies"),
+            ("volume", "status", "stopped"): _volumeStatusXml("stopped"),
+            ("volume", "status", "music"): _volumeStatusXml("music"),
+            ("volume", "status", "all", "tasks"): _volumeStatusXml("music"),
+            ("volume", "set", "music", "opt", "val"): _volumeStatusXml(),
+        })
+        self.patch = MonkeyPatchScope([
+            (gcli, "_cache", gcli._QueryCache(5, clock=self.clock)),
+            (gcli, "_commandTime", latency.Registry()),
+            (gcli, "_parseTime", latency.Registry()),
+            (gcli, "_glusterCommandPath", FakeCommandPath()),
+            (gcli.commands, "execCmd", self.gluster.execCmd),
+            (gcli.subprocess, "Popen", self.gluster.popen),
+            (gcli, "_getLocalIpAddress", lambda: "192.168.122.2"),
+        ])
+        self.patch.__enter__()
+
+    def tearDown(self):
+        self.patch.__exit__(None, None, None)
+
+    def test_cached(self):
+        for i in range(3):
+            self.assertEqual(gcli.volumeTasks(), {})
+        self.assertEqual(self.gluster.calls, [
+            ("volume", "status", "all", "tasks"),
+        ])
+        self.assertEqual(gcli.cliStats()["hits"], {"volume status": 2})
+
+    def test_expired(self):
+        gcli.volumeTasks()
+        self.clock.now += 5
+        gcli.volumeTasks()
+        self.assertEqual(len(self.gluster.calls), 2)
+
+    def test_invalidated_by_other_commands(self):
+        gcli.volumeTasks()
+        gcli.volumeSet("music", "opt", "val")
+        gcli.volumeTasks()
+        self.assertEqual(self.gluster.calls, [
+            ("volume", "status", "all", "tasks"),
+            ("volume", "set", "music", "opt", "val"),
+            ("volume", "status", "all", "tasks"),
+        ])
+
+    def test_volume_status_from_all_volumes(self):
+        music = gcli.volumeStatus("music")
+        movies = gcli.volumeStatus("movies")
+        self.assertEqual(music["name"], "music")
+        self.assertEqual(music["bricks"][0]["brick"],
+                         "192.168.122.2:/bricks/music")
+        self.assertEqual(movies["name"], "movies")
+        self.assertEqual(self.gluster.calls, [
+            ("volume", "status", "all"),
+        ])
+        stats = gcli.cliStats()
+        self.assertEqual(stats["commands"]["volume status"]["count"], 1)
+
+    def test_volume_status_returns_copy(self):
+        gcli.volumeStatus("music")["bricks"] = []
+        self.assertEqual(len(gcli.volumeStatus("music")["bricks"]), 1)
+
+    def test_volume_status_not_in_all_volumes(self):
+        status = gcli.volumeStatus("stopped")
+        self.assertEqual(status["name"], "stopped")
+        self.assertEqual(self.gluster.calls, [
+            ("volume", "status", "all"),
+            ("volume", "status", "stopped"),
+        ])
+
+    def test_all_volumes_status_failure_cached(self):
+        self.gluster.outputs[("volume", "status", "all")] = b"""\
+<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cliOutput>
+  <opRet>-1</opRet>
+  <opErrno>30800</opErrno>
+  <opErrstr>Another transaction is in progress</opErrstr>
+</cliOutput>
+"""
+        gcli.volumeStatus("stopped")
+        gcli.volumeStatus("music")
+        self.assertEqual(self.gluster.calls, [
+            ("volume", "status", "all"),
+            ("volume", "status", "stopped"),
+            ("volume", "status", "music"),
+        ])
+
+        # The failure expires like a result.
+        self.clock.now += 5
+        gcli.volumeStatus("music")
+        self.assertEqual(self.gluster.calls[3:], [
+            ("volume", "status", "all"),
+            ("volume", "status", "music"),
+        ])
+
+
+class GlusterCliStreamTests(TestCaseBase):
+
+    def test_stream_profile_info(self):
+        with open("glusterVolumeProfileInfo.xml", "rb") as f:
+            out = f.read()
+        elements = gcli._volumeProfileInfo(nfs=False)
+        status = elements.stream(io.BytesIO(out))
+        self.assertEqual(status, glusterTestData.PROFILE_INFO)
+        self.assertEqual(status, elements(etree.fromstring(out)))
+
+    def test_stream_volume_status_clients(self):
+        out = _volumeStatusXml("music", "movies")
+        status = gcli._parseVolumeStatusClients.stream(io.BytesIO(out))
+        # Only the first volume name is used, like parsing the tree.
+        self.assertEqual(status, {
+            'name': 'music',
+            'bricks': [
+                {'brick': '192.168.122.2:/bricks/music',
+                 'hostuuid': 'f06b108e-a780-4519-bb22-c3083a1e3f8a',
+                 'clientsStatus': []},
+                {'brick': '192.168.122.2:/bricks/movies',
+                 'hostuuid': 'f06b108e-a780-4519-bb22-c3083a1e3f8a',
+                 'clientsStatus': []},
+            ]
+        })
+
+    def test_stream_command_failed(self):
+        out = b"""\
+<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cliOutput>
+  <opRet>-1</opRet>
+  <opErrno>2</opErrno>
+  <opErrstr>Volume music does not exist</opErrstr>
+</cliOutput>
+"""
+        elements = gcli._volumeProfileInfo(nfs=False)
+        with self.assertRaises(exception.GlusterCmdFailedException) as ctx:
+            elements.stream(io.BytesIO(out))
+        self.assertEqual(ctx.exception.rc, 2)
+        self.assertEqual(ctx.exception.err, ["Volume music does not exist"])
+
+    def test_stream_gluster_xml(self):
+        cmd = ["sh", "-c", "cat glusterVolumeProfileInfo.xml"]
+        status = gcli._streamGlusterXml(
+            cmd, gcli._volumeProfileInfo(nfs=False))
+        self.assertEqual(status, glusterTestData.PROFILE_INFO)
+
+    def test_stream_gluster_xml_exec_failed(self):
+        cmd = ["sh", "-c", "echo error >&2; exit 1"]
+        with self.assertRaises(exception.GlusterCmdExecFailedException) as ctx:
+            gcli._streamGlusterXml(cmd, gcli._volumeProfileInfo(nfs=False))
+        self.assertEqual(ctx.exception.rc, 1)
+        self.assertEqual(ctx.exception.err, ["error"])
+
+    def test_stream_gluster_xml_invalid(self):
+        cmd = ["sh", "-c", "echo '<cliOutput>'"]
+        with self.assertRaises(exception.GlusterXmlErrorException):
+            gcli._streamGlusterXml(cmd, gcli._volumeProfileInfo(nfs=False))
+
+
+class QueryCacheTests(TestCaseBase):
+
+    def test_coalesce(self):
+        cache = gcli._QueryCache(5)
+        started = threading.Event()
+        done = threading.Event()
+        calls = []
+        results = []
+
+        def query():
+            calls.append(1)
+            started.set()
+            done.wait()
+            return "result"
+
+        t = threading.Thread(
+            target=lambda: results.append(cache.get("name", "key", query)))
+        t.start()
+        try:
+            started.wait()
+            waiter = threading.Thread(
+                target=lambda: results.append(cache.get("name", "key", query)))
+            waiter.start()
+            while not cache.stats()["coalesced"]:
+                waiter.join(0.01)
+        finally:
+            done.set()
+            t.join()
+        waiter.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ["result", "result"])
+        self.assertEqual(cache.stats()["coalesced"], {"name": 1})
+
+    def test_errors_not_cached(self):
+        cache = gcli._QueryCache(5)
+        calls = []
+
+        def query():
+            calls.append(1)
+            raise exception.GlusterCmdFailedException(rc=1)
+
+        for i in range(2):
+            with self.assertRaises(exception.GlusterCmdFailedException):
+                cache.get("name", "key", query)
+        self.assertEqual(len(calls), 2)
+
+    def test_invalidated_while_running(self):
+        cache = gcli._QueryCache(5)
+
+        def query():
+            cache.invalidate()
+            return "old"
+
+        self.assertEqual(cache.get("name", "key", query), "old")
+        self.assertEqual(cache.get("name", "key", lambda: "new"), "new")
+
+    def test_disabled(self):
+        cache = gcli._QueryCache(0)
+        self.assertEqual(cache.get("name", "key", lambda: 1), 1)
+        self.assertEqual(cache.get("name", "key", lambda: 2), 2)
@@ -38,6 +38,34 @@ class FakeContext(object):
         return self._res
 
 
+class FakeRequestContext(object):
+
+    context = None
+    server_address = None
+
+
+class FakeBridge(object):
+
+    def dispatch(self, method):
+        return lambda: "result"
+
+    def register_server_address(self, server_address):
+        pass
+
+    def unregister_server_address(self):
+        pass
+
+
+class FakeClientIF(object):
+
+    def __init__(self, ready=False, recovery_verbs=()):
+        self.ready = ready
+        self._recovery_verbs = recovery_verbs
+
+    def serves_in_recovery(self, method):
+        return method in self._recovery_verbs
+
+
 class ServerTests(VdsmTestCase):
 
     def test_full_pool(self):
@@ -63,3 +91,19 @@ class ServerTests(VdsmTestCase):
         self.assertEqual({"reason": "Too many tasks",
                           "resource": "test",
                           "current_tasks": 0}, reason)
+
+    def test_in_recovery(self):
+        request = JsonRpcRequest.decode(
+            '{"jsonrpc":"2.0","method":"Host.ping2","params":{},"id":"943"}')
+        server = JsonRpcServer(FakeBridge(), 0, FakeClientIF())
+        res = server._handle_request(request, FakeRequestContext())
+        error = res.toDict().get('error')
+        self.assertEqual(exception.RecoveryInProgress.code, error.get('code'))
+
+    def test_served_in_recovery(self):
+        request = JsonRpcRequest.decode(
+            '{"jsonrpc":"2.0","method":"Host.ping2","params":{},"id":"943"}')
+        cif = FakeClientIF(recovery_verbs=("Host.ping2",))
+        server = JsonRpcServer(FakeBridge(), 0, cif)
+        res = server._handle_request(request, FakeRequestContext())
+        self.assertEqual("result", res.toDict().get('result'))
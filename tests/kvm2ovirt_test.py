@@ -23,6 +23,11 @@ from __future__ import division
 from collections import namedtuple
 from contextlib import contextmanager
 from monkeypatch import MonkeyPatchScope
+import io
+import sys
+
+import six
+
 from vdsm.common import libvirtconnection
 from vdsm import v2v
 
@@ -138,3 +143,58 @@ class TestKvm2Ovirt(TestCaseBase):
             with open(env.destination) as f:
                 actual = f.read()
             self.assertEqual(actual, FakeVolume().data())
+
+    def test_download_concurrently(self):
+        conn = MockVirConnect(vms=self._vms)
+        conn.storageVolLookupByPath = lambda name: FakeVolume()
+
+        def connect(uri, username, password):
+            return conn
+
+        out = six.StringIO()
+        with MonkeyPatchScope([
+            (libvirtconnection, 'open_connection', connect),
+            (sys, 'stdout', out),
+        ]), make_env() as env:
+            dests = [env.destination + str(i) for i in range(3)]
+            for path in dests:
+                open(path, 'wb').close()
+            args = ['kvm2ovirt', '--uri', 'qemu+tcp://domain']
+            args.append('--source')
+            args.extend(['/fake/source'] * 3)
+            args.append('--dest')
+            args.extend(dests)
+            args.append('--storage-type')
+            args.extend(['volume'] * 3)
+            args.extend(['--vm-name', self._vms[0].name(),
+                         '--allocation', 'preallocated',
+                         '--jobs', '2'])
+
+            kvm2ovirt.main(args)
+
+            for path in dests:
+                with open(path) as f:
+                    self.assertEqual(f.read(), FakeVolume().data())
+
+        output = io.BytesIO(out.getvalue().encode('utf-8'))
+        events = list(v2v.OutputParser().parse(output))
+        disks = [e for e in events if isinstance(e, v2v.ImportProgress)]
+        self.assertEqual([(e.current_disk, e.disk_count) for e in disks],
+                         [(1, 3), (2, 3), (3, 3)])
+        progress = [e for e in events if isinstance(e, v2v.DiskProgress)]
+        self.assertEqual([e.progress for e in progress], [100, 100, 100])
+        self.assertTrue(any(isinstance(e, v2v.CopyThroughput)
+                            for e in events))
+
+    @permutations([
+        # bufsize, size, expected
+        [1024**2, None, 1024**2],
+        [1024**2, 1024, 4096],
+        [1024**2, 1024**3, 1024**2],
+        [1024**2, 3 * 1024**3, 3 * 1024**2],
+        [1024**2, 100 * 1024**3, kvm2ovirt.MAX_BUFFER_SIZE],
+        [8 * 1024**2, 100 * 1024**3, 8 * 1024**2],
+        [1000000, None, 1003520],
+    ])
+    def test_buffer_size(self, bufsize, size, expected):
+        self.assertEqual(kvm2ovirt.buffer_size(bufsize, size), expected)
@@ -584,6 +584,43 @@ class TestBufferedReader(VdsmTestCase):
         self.assertEqual(complete_calls[0], 1)
 
 
+@expandPermutations
+class TestLineReader(VdsmTestCase):
+
+    def setUp(self):
+        self.loop = asyncevent.EventLoop()
+        self.lines = []
+        self.remaining = None
+
+    def tearDown(self):
+        self.loop.close()
+
+    def complete(self, data):
+        self.remaining = data
+        self.loop.stop()
+
+    @permutations([
+        # data, bufsize
+        (b"", 1),
+        (b"line 1\n", 1),
+        (b"line 1\nline 2\n", 3),
+        (b"line 1\nline 2\n", 4096),
+        (b"line 1\n\nline 3\npartial", 5),
+    ])
+    def test_read(self, data, bufsize):
+        r, w = os.pipe()
+        reader = self.loop.create_dispatcher(
+            asyncevent.LineReader, r, self.lines.append, self.complete,
+            bufsize=bufsize)
+        with closing(reader):
+            os.close(r)  # Dupped by LineReader
+            Sender(self.loop, w, data, bufsize)
+            self.loop.run_forever()
+        expected = data.split(b"\n")
+        self.assertEqual(self.lines, expected[:-1])
+        self.assertEqual(self.remaining, expected[-1])
+
+
 class Sender(object):
 
     def __init__(self, loop, fd, data, bufsize):
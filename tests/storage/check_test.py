@@ -26,6 +26,7 @@ import logging
 import os
 import pprint
 import re
+import signal
 import threading
 import time
 from contextlib import contextmanager
@@ -38,6 +39,7 @@ from monkeypatch import MonkeyPatchScope
 from testlib import VdsmTestCase
 from testlib import expandPermutations, permutations
 from testlib import start_thread
+from testlib import namedTemporaryDir
 from testlib import temporaryPath
 
 from vdsm.common import concurrent
@@ -353,6 +355,134 @@ class TestDirectioCheckerTimings(VdsmTestCase):
             self.assertRaises(exception.MiscFileReadException, res.delay)
 
 
+class TestHelperChecker(VdsmTestCase):
+
+    def setUp(self):
+        self.loop = asyncevent.EventLoop()
+        self.helper = check.CheckHelper(self.loop)
+        self.results = []
+        self.checks = 1
+
+    def tearDown(self):
+        self.helper.stop()
+        self.loop.close()
+
+    def complete(self, result):
+        self.results.append(result)
+        if len(self.results) == self.checks:
+            self.loop.stop()
+
+    def test_path_missing(self):
+        checker = check.HelperChecker(self.loop, self.helper, "/no/such/path",
+                                      self.complete)
+        checker.start()
+        self.loop.run_forever()
+        result = self.results[0]
+        self.assertNotEqual(result.rc, 0)
+        self.assertRaises(exception.MiscFileReadException, result.delay)
+
+    def test_path_ok(self):
+        with temporaryPath(data=b"blah") as path:
+            checker = check.HelperChecker(self.loop, self.helper, path,
+                                          self.complete)
+            checker.start()
+            self.loop.run_forever()
+            delay = self.results[0].delay()
+            self.assertEqual(type(delay), float)
+
+    def test_many_checkers_one_helper(self):
+        self.checks = 10
+        with temporaryPath(data=b"blah") as path:
+            for i in range(self.checks):
+                checker = check.HelperChecker(self.loop, self.helper, path,
+                                              self.complete, interval=0.2)
+                checker.start()
+            pid = self.helper._proc.pid
+            self.loop.run_forever()
+            for result in self.results:
+                result.delay()
+            self.assertEqual(self.helper._proc.pid, pid)
+
+    def test_blocked_path_does_not_delay_others(self):
+        with namedTemporaryDir() as tmpdir, \
+                temporaryPath(data=b"blah") as path:
+            # Opening a fifo blocks until the other side is opened,
+            # simulating inaccessible storage.
+            fifo = os.path.join(tmpdir, "fifo")
+            os.mkfifo(fifo)
+            blocked = check.HelperChecker(self.loop, self.helper, fifo,
+                                          self.complete, interval=5)
+            blocked.start()
+            checker = check.HelperChecker(self.loop, self.helper, path,
+                                          self.complete, interval=5)
+            checker.start()
+            self.loop.run_forever()
+            self.assertEqual(self.results[0].path, path)
+            self.results[0].delay()
+
+    def test_timeout(self):
+        def complete(result):
+            self.results.append(result)
+            self.loop.stop()
+
+        with namedTemporaryDir() as tmpdir:
+            fifo = os.path.join(tmpdir, "fifo")
+            os.mkfifo(fifo)
+            checker = check.HelperChecker(self.loop, self.helper, fifo,
+                                          complete, interval=0.2)
+            checker.start()
+            self.loop.run_forever()
+
+        with self.assertRaises(exception.MiscFileReadException) as e:
+            self.results[0].delay()
+        self.assertIn("Read timeout", str(e.exception))
+
+    def test_helper_terminated(self):
+        replies = []
+
+        def complete(rc, err):
+            replies.append((rc, err))
+            self.loop.stop()
+
+        with namedTemporaryDir() as tmpdir, \
+                temporaryPath(data=b"blah") as path:
+            fifo = os.path.join(tmpdir, "fifo")
+            os.mkfifo(fifo)
+            self.helper.submit(fifo, complete)
+            pid = self.helper._proc.pid
+            os.kill(pid, signal.SIGKILL)
+            self.loop.run_forever()
+            self.assertEqual(replies, [(check.EXEC_ERROR,
+                                        b"Check helper terminated")])
+
+            # The next request starts a new helper.
+            checker = check.HelperChecker(self.loop, self.helper, path,
+                                          self.complete)
+            checker.start()
+            self.loop.run_forever()
+            self.results[0].delay()
+            self.assertNotEqual(self.helper._proc.pid, pid)
+
+    def test_helper_stopped(self):
+        with namedTemporaryDir() as tmpdir:
+            fifo = os.path.join(tmpdir, "fifo")
+            os.mkfifo(fifo)
+            checker = check.HelperChecker(self.loop, self.helper, fifo,
+                                          self.complete, interval=5)
+            checker.start()
+            # Run the first check, blocked on the fifo.
+            self.loop.call_soon(self.loop.stop)
+            self.loop.run_forever()
+            checker.stop()
+            self.assertFalse(checker.wait(0))
+
+            # Stopping the helper completes the pending check.
+            self.helper.stop()
+            self.assertTrue(checker.wait(0))
+            self.assertFalse(checker.is_running())
+            self.assertEqual(self.results, [])
+
+
 @expandPermutations
 class TestCheckResult(VdsmTestCase):
 
@@ -458,6 +588,35 @@ class TestCheckService(VdsmTestCase):
             self.assertFalse(self.service.is_checking("/path"))
 
 
+class TestCheckServiceHelper(VdsmTestCase):
+
+    def setUp(self):
+        self.service = check.CheckService(use_helper=True)
+        self.service.start()
+        self.result = None
+        self.completed = threading.Event()
+
+    def tearDown(self):
+        self.service.stop()
+
+    def complete(self, result):
+        self.result = result
+        self.completed.set()
+
+    def test_start_checking(self):
+        with temporaryPath(data=b"blah") as path:
+            self.service.start_checking(path, self.complete)
+            self.assertTrue(self.completed.wait(5.0))
+            self.assertEqual(self.result.rc, 0)
+            self.result.delay()
+
+    def test_stop_checking_and_wait(self):
+        with temporaryPath(data=b"blah") as path:
+            self.service.start_checking(path, self.complete)
+            self.assertTrue(self.service.stop_checking(path, timeout=5.0))
+            self.assertFalse(self.service.is_checking(path))
+
+
 @contextmanager
 def fake_dd(delay):
     """
@@ -0,0 +1,105 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import pytest
+
+from vdsm.storage import convertprofile
+from vdsm.storage import sd
+
+from testlib import make_config
+
+
+class FakeDomain(object):
+
+    def __init__(self, dom_type):
+        self._dom_type = dom_type
+
+    def getStorageType(self):
+        return self._dom_type
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("", convertprofile.DEFAULT),
+    ("coroutines=4",
+     convertprofile.Profile(4, "none", "none", None)),
+    (" coroutines = 16 , cache=writeback,",
+     convertprofile.Profile(16, "writeback", "none", None)),
+    ("src_cache=writethrough,sparse_size=64k",
+     convertprofile.Profile(None, "none", "writethrough", "64k")),
+])
+def test_parse(value, expected):
+    assert convertprofile.parse(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    "coroutines",
+    "coroutines=",
+    "coroutines=0",
+    "coroutines=17",
+    "coroutines=many",
+    "cache=fast",
+    "sparse_size=4x",
+    "buffer_size=1m",
+])
+def test_parse_invalid(value):
+    with pytest.raises(ValueError):
+        convertprofile.parse(value)
+
+
+@pytest.mark.parametrize("dom_type,kind", [
+    (sd.ISCSI_DOMAIN, convertprofile.BLOCK),
+    (sd.FCP_DOMAIN, convertprofile.BLOCK),
+    (sd.NFS_DOMAIN, convertprofile.NFS),
+    (sd.GLUSTERFS_DOMAIN, convertprofile.GLUSTER),
+    (sd.LOCALFS_DOMAIN, convertprofile.LOCAL),
+    (sd.POSIXFS_DOMAIN, convertprofile.POSIX),
+    (sd.CIFS_DOMAIN, convertprofile.POSIX),
+])
+def test_domain_kind(dom_type, kind):
+    assert convertprofile.domain_kind(FakeDomain(dom_type)) == kind
+
+
+def test_invalid_config_uses_default(monkeypatch):
+    cfg = make_config([("irs", "convert_profile_nfs", "coroutines=100")])
+    monkeypatch.setattr(convertprofile, "config", cfg)
+    assert convertprofile.profile(convertprofile.NFS) == \
+        convertprofile.DEFAULT
+
+
+def test_convert_options(monkeypatch):
+    cfg = make_config([
+        ("irs", "convert_profile_nfs",
+         "coroutines=4,cache=writeback,src_cache=writethrough,"
+         "sparse_size=8k"),
+        ("irs", "convert_profile_block",
+         "coroutines=16,src_cache=directsync"),
+    ])
+    monkeypatch.setattr(convertprofile, "config", cfg)
+    options = convertprofile.convert_options(
+        FakeDomain(sd.NFS_DOMAIN), FakeDomain(sd.ISCSI_DOMAIN))
+    assert options == {
+        "coroutines": 16,
+        "cache": "none",
+        "src_cache": "writethrough",
+        "sparse_size": None,
+    }
@@ -0,0 +1,242 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import threading
+import time
+
+import pytest
+
+from vdsm.common import concurrent
+from vdsm.common import exception
+from vdsm.storage import copyscheduler
+
+MiB = 1024**2
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeOperation(object):
+    """
+    Simulate qemuimg.ProgressCommand, reporting progress in steps, and
+    advancing the clock while the operation is not paused.
+    """
+
+    def __init__(self, clock, steps, step_time):
+        self.clock = clock
+        self.steps = steps
+        self.step_time = step_time
+        self.running = True
+        self.paused = False
+        self.pauses = 0
+
+    def run(self, on_progress=None):
+        for i in range(1, self.steps + 1):
+            self.clock.now += self.step_time
+            on_progress(self, 100.0 * i / self.steps)
+        self.running = False
+
+    def pause(self):
+        assert not self.paused
+        self.paused = True
+        self.pauses += 1
+
+    def resume(self):
+        assert self.paused
+        self.paused = False
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def sleep(monkeypatch, clock):
+    calls = []
+
+    def fake_sleep(seconds):
+        calls.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(copyscheduler.time, "sleep", fake_sleep)
+    return calls
+
+
+def test_slots():
+    s = copyscheduler.Scheduler(2)
+    done = threading.Event()
+
+    def copy():
+        with s.copy("copy", MiB):
+            done.wait()
+
+    threads = [concurrent.thread(copy) for i in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        wait_for(lambda: s.stats()["active"] == 2)
+        wait_for(lambda: s.stats()["waiting"] == 1)
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+    stats = s.stats()
+    assert stats["active"] == 0
+    assert stats["waiting"] == 0
+
+
+def test_abort_waiting():
+    s = copyscheduler.Scheduler(1)
+    aborted = threading.Event()
+    errors = []
+
+    def copy():
+        try:
+            with s.copy("waiting", MiB, aborted=aborted.is_set):
+                pass
+        except exception.ActionStopped as e:
+            errors.append(e)
+
+    with s.copy("running", MiB):
+        t = concurrent.thread(copy)
+        t.start()
+        try:
+            wait_for(lambda: s.stats()["waiting"] == 1)
+            aborted.set()
+            s.wakeup()
+        finally:
+            t.join(timeout=1)
+        assert not t.is_alive()
+        assert len(errors) == 1
+        assert s.stats()["waiting"] == 0
+
+
+def test_abort_before_waiting():
+    s = copyscheduler.Scheduler(1)
+    with s.copy("running", MiB):
+        with pytest.raises(exception.ActionStopped):
+            with s.copy("waiting", MiB, aborted=lambda: True):
+                pass
+
+
+def test_aborted_not_waiting():
+    s = copyscheduler.Scheduler(1)
+    with s.copy("a", MiB, aborted=lambda: True):
+        assert s.stats()["active"] == 1
+
+
+def test_weight_uses_slots():
+    s = copyscheduler.Scheduler(3)
+    started = threading.Event()
+
+    def copy():
+        with s.copy("light", MiB, weight=2):
+            started.set()
+
+    with s.copy("heavy", MiB, weight=2):
+        t = concurrent.thread(copy)
+        t.start()
+        wait_for(lambda: s.stats()["waiting"] == 1)
+        assert not started.is_set()
+    t.join()
+    assert started.is_set()
+
+
+def test_weight_limited_to_max_slots():
+    s = copyscheduler.Scheduler(2)
+    with s.copy("huge", MiB, weight=10) as c:
+        assert c.weight == 2
+
+
+def test_unlimited_slots():
+    s = copyscheduler.Scheduler(0)
+    with s.copy("a", MiB, weight=100):
+        with s.copy("b", MiB, weight=100):
+            assert s.stats()["active"] == 2
+
+
+def test_unlimited_bandwidth(clock, sleep):
+    s = copyscheduler.Scheduler(0, clock=clock)
+    op = FakeOperation(clock, steps=10, step_time=0.1)
+    with s.copy("a", 100 * MiB) as c:
+        c.run(op)
+    assert op.pauses == 0
+    assert sleep == []
+
+
+def test_bandwidth_limit(clock, sleep):
+    # Copying 100 MiB at 10 MiB/s must take 10 seconds.
+    s = copyscheduler.Scheduler(0, bandwidth=10 * MiB, clock=clock)
+    op = FakeOperation(clock, steps=10, step_time=0.1)
+    with s.copy("a", 100 * MiB) as c:
+        c.run(op)
+    assert op.pauses == 10
+    assert not op.paused
+    assert clock.now == pytest.approx(10.0)
+
+
+def test_bandwidth_not_reached(clock, sleep):
+    s = copyscheduler.Scheduler(0, bandwidth=10 * MiB, clock=clock)
+    op = FakeOperation(clock, steps=10, step_time=1.0)
+    with s.copy("a", 10 * MiB) as c:
+        c.run(op)
+    assert op.pauses == 0
+
+
+def test_bandwidth_share(clock):
+    s = copyscheduler.Scheduler(0, bandwidth=30 * MiB, clock=clock)
+    with s.copy("light", 100 * MiB, weight=1) as light:
+        with s.copy("heavy", 100 * MiB, weight=2) as heavy:
+            light.done = 10 * MiB
+            heavy.done = 10 * MiB
+            # light share is 10 MiB/s, heavy share is 20 MiB/s.
+            assert light.delay() == copyscheduler.MAX_PAUSE
+            assert heavy.delay() == pytest.approx(0.5)
+
+
+def test_stats_throughput(clock):
+    s = copyscheduler.Scheduler(0, clock=clock)
+    with s.copy("a", 100 * MiB) as a:
+        with s.copy("b", 100 * MiB) as b:
+            clock.now += 2
+            a.done = 20 * MiB
+            b.done = 40 * MiB
+            stats = s.stats()
+            assert stats["throughput"] == 30 * MiB
+            assert stats["copied"] == 60 * MiB
+    assert s.stats()["copied"] == 60 * MiB
+
+
+def wait_for(predicate, timeout=1.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise RuntimeError("Timeout waiting for condition")
+        time.sleep(0.01)
@@ -97,3 +97,59 @@ class TestDirectFile(VdsmTestCase):
                 directio.DirectFile(srcPath, "r") as direct_file, \
                 io.open(srcPath, "rb") as buffered_file:
             self.assertEqual(direct_file.read(), buffered_file.read())
+
+    def test_readinto(self):
+        with temporaryPath(data=self.DATA) as srcPath, \
+                directio.DirectFile(srcPath, "r") as f, \
+                directio.aligned_buffer(2 * BLOCK_SIZE) as buf:
+            self.assertEqual(f.readinto(buf), 2 * BLOCK_SIZE)
+            self.assertEqual(buf[:], self.DATA[:2 * BLOCK_SIZE])
+            f.seek(len(self.DATA) - BLOCK_SIZE)
+            self.assertEqual(f.readinto(buf), BLOCK_SIZE)
+            self.assertEqual(buf[:BLOCK_SIZE], self.DATA[-BLOCK_SIZE:])
+            self.assertEqual(f.readinto(buf), 0)
+
+    def test_writefrom(self):
+        with temporaryPath() as srcPath, \
+                directio.DirectFile(srcPath, "w") as f, \
+                directio.aligned_buffer(len(self.DATA)) as buf:
+            buf[:] = self.DATA
+            self.assertEqual(f.writefrom(buf, BLOCK_SIZE), BLOCK_SIZE)
+            self.assertEqual(f.writefrom(buf), len(self.DATA))
+            with io.open(srcPath, "rb") as f:
+                self.assertEqual(f.read(),
+                                 self.DATA[:BLOCK_SIZE] + self.DATA)
+
+    def test_writefrom_unaligned(self):
+        with temporaryPath() as srcPath, \
+                directio.DirectFile(srcPath, "w") as f, \
+                directio.aligned_buffer(BLOCK_SIZE) as buf:
+            self.assertRaises(ValueError, f.writefrom, buf, 511)
+            self.assertRaises(ValueError, f.writefrom, buf, 2 * BLOCK_SIZE)
+
+
+class TestBufferPool(VdsmTestCase):
+
+    def test_reuse(self):
+        pool = directio.BufferPool()
+        with pool.buffer(BLOCK_SIZE) as buf1:
+            pass
+        with pool.buffer(BLOCK_SIZE) as buf2:
+            self.assertIs(buf2, buf1)
+            with pool.buffer(BLOCK_SIZE) as buf3:
+                self.assertIsNot(buf3, buf1)
+        with pool.buffer(2 * BLOCK_SIZE) as buf4:
+            self.assertEqual(len(buf4), 2 * BLOCK_SIZE)
+        pool.clear()
+
+    def test_max_buffers(self):
+        pool = directio.BufferPool(max_buffers=1)
+        with pool.buffer(BLOCK_SIZE) as buf1, \
+                pool.buffer(BLOCK_SIZE) as buf2:
+            pass
+        # buf2 was returned first, and closed when buf1 was returned.
+        self.assertRaises(ValueError, len, buf2)
+        with pool.buffer(BLOCK_SIZE) as buf:
+            self.assertIs(buf, buf1)
+        pool.clear()
+        self.assertRaises(ValueError, len, buf1)
@@ -0,0 +1,153 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import threading
+
+import pytest
+
+from vdsm.storage import constants as sc
+from vdsm.storage import mdcache
+from vdsm.storage import misc
+
+SD_UUID = "sd-uuid"
+SLOTS_PER_REGION = mdcache.REGION_SIZE // sc.METADATA_SIZE
+
+
+class FakeStorage(object):
+    """
+    Metadata LV with 2 regions, counting reads.
+    """
+
+    def __init__(self):
+        self.data = bytearray(2 * mdcache.REGION_SIZE)
+        self.reads = []
+
+    def write_slot(self, slot, text):
+        offset = slot * sc.METADATA_SIZE
+        data = text.ljust(sc.METADATA_SIZE, "\0").encode("ascii")
+        self.data[offset:offset + sc.METADATA_SIZE] = data
+        mdcache.invalidate(SD_UUID, slot)
+
+    def read(self, path, offset, size):
+        self.reads.append((offset, size))
+        return bytes(self.data[offset:offset + size])
+
+    def readblock(self, path, offset, size):
+        return self.read(path, offset, size).splitlines()
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    fake = FakeStorage()
+    monkeypatch.setattr(mdcache, "_read", fake.read)
+    monkeypatch.setattr(misc, "readblock", fake.readblock)
+    monkeypatch.setattr(mdcache, "_generations", {})
+    return fake
+
+
+def read_slot(slot):
+    return mdcache.read_slot(SD_UUID, "/metadata", slot)
+
+
+def test_uncached(storage):
+    storage.write_slot(1, "slot=1\n")
+    storage.write_slot(2, "slot=2\n")
+    assert read_slot(1)[0] == b"slot=1"
+    assert read_slot(2)[0] == b"slot=2"
+    assert storage.reads == [
+        (sc.METADATA_SIZE, sc.METADATA_SIZE),
+        (2 * sc.METADATA_SIZE, sc.METADATA_SIZE),
+    ]
+
+
+def test_cached_region(storage):
+    storage.write_slot(1, "slot=1\n")
+    storage.write_slot(2, "slot=2\n")
+    with mdcache.cached(SD_UUID):
+        for i in range(3):
+            assert read_slot(1)[0] == b"slot=1"
+            assert read_slot(2)[0] == b"slot=2"
+    assert storage.reads == [(0, mdcache.REGION_SIZE)]
+
+
+def test_cached_multiple_regions(storage):
+    last = 2 * SLOTS_PER_REGION - 1
+    storage.write_slot(0, "slot=first\n")
+    storage.write_slot(1, "slot=second\n")
+    storage.write_slot(last, "slot=last\n")
+    with mdcache.cached(SD_UUID):
+        assert read_slot(0)[0] == b"slot=first"
+        assert read_slot(last)[0] == b"slot=last"
+        assert read_slot(1)[0] == b"slot=second"
+    assert storage.reads == [
+        (0, mdcache.REGION_SIZE),
+        (mdcache.REGION_SIZE, mdcache.REGION_SIZE),
+    ]
+
+
+def test_cached_reads_written_region(storage):
+    with mdcache.cached(SD_UUID):
+        read_slot(1)
+        read_slot(SLOTS_PER_REGION)
+        storage.write_slot(2, "slot=2\n")
+        assert read_slot(2)[0] == b"slot=2"
+        read_slot(SLOTS_PER_REGION + 1)
+    # Only the written region is read again.
+    assert storage.reads == [
+        (0, mdcache.REGION_SIZE),
+        (mdcache.REGION_SIZE, mdcache.REGION_SIZE),
+        (0, mdcache.REGION_SIZE),
+    ]
+
+
+def test_cached_write_by_other_thread(storage):
+    with mdcache.cached(SD_UUID):
+        read_slot(1)
+        t = threading.Thread(target=storage.write_slot, args=(1, "new\n"))
+        t.start()
+        t.join()
+        assert read_slot(1)[0] == b"new"
+
+
+def test_cached_nested(storage):
+    with mdcache.cached(SD_UUID):
+        read_slot(1)
+        with mdcache.cached(SD_UUID):
+            read_slot(2)
+        read_slot(3)
+    assert len(storage.reads) == 1
+
+
+def test_cached_other_domain(storage):
+    with mdcache.cached("other-sd-uuid"):
+        read_slot(1)
+        read_slot(1)
+    assert len(storage.reads) == 2
+
+
+def test_cache_dropped_on_exit(storage):
+    with mdcache.cached(SD_UUID):
+        read_slot(1)
+    with mdcache.cached(SD_UUID):
+        read_slot(1)
+    assert len(storage.reads) == 2
@@ -29,6 +29,9 @@ from contextlib import contextmanager
 
 from six.moves import queue
 
+from vdsm import executor
+from vdsm import schedule
+from vdsm.common.time import monotonic_time
 from vdsm.storage import exception as se
 from vdsm.storage import monitor
 
@@ -181,12 +184,12 @@ class FakeCheckResult(object):
 
 class MonitorEnv(object):
 
-    def __init__(self, thread, event, checker):
-        self.thread = thread
+    def __init__(self, monitor, event, checker):
+        self.monitor = monitor
         self.event = event
         self.checker = checker
         self.queue = queue.Queue()
-        self.thread.cycleCallback = self._callback
+        self.monitor.cycleCallback = self._callback
 
     def wait_for_cycle(self):
         try:
@@ -198,6 +201,21 @@ class MonitorEnv(object):
         self.queue.put(None)
 
 
+@contextmanager
+def scheduler_env(workers=2, max_workers=4):
+    scheduler = schedule.Scheduler(clock=monotonic_time)
+    scheduler.start()
+    pool = executor.Executor(name="monitor", workers_count=workers,
+                             max_tasks=100, scheduler=scheduler,
+                             max_workers=max_workers)
+    pool.start()
+    try:
+        yield scheduler, pool
+    finally:
+        pool.stop(wait=False)
+        scheduler.stop()
+
+
 @contextmanager
 def monitor_env(shutdown=False, refresh=300):
     config = make_config([
@@ -206,32 +224,30 @@ def monitor_env(shutdown=False, refresh=300):
     with MonkeyPatchScope([
         (monitor, "sdCache", FakeStorageDomainCache()),
         (monitor, 'config', config),
-    ]):
+    ]), scheduler_env() as (scheduler, pool):
         event = FakeEvent()
         checker = FakeCheckService()
-        thread = monitor.MonitorThread('uuid', 'host_id', MONITOR_INTERVAL,
-                                       event, checker)
+        task = monitor.MonitorTask('uuid', 'host_id', MONITOR_INTERVAL,
+                                   event, checker, scheduler, pool)
         try:
-            yield MonitorEnv(thread, event, checker)
+            yield MonitorEnv(task, event, checker)
         finally:
-            thread.stop(shutdown=shutdown)
-            try:
-                thread.join()
-            except RuntimeError as e:
-                log.error("Error joining thread: %s", e)
+            task.stop(shutdown=shutdown)
+            task.join()
 
 
-class TestMonitorThreadIdle(VdsmTestCase):
+class TestMonitorTaskIdle(VdsmTestCase):
 
     def test_initial_status(self):
-        thread = monitor.MonitorThread('uuid', 'host_id', 0.2, None, None)
-        status = thread.getStatus()
+        task = monitor.MonitorTask('uuid', 'host_id', 0.2, None, None, None,
+                                   None)
+        status = task.getStatus()
         self.assertFalse(status.actual)
         self.assertTrue(status.valid)
 
 
 @expandPermutations
-class TestMonitorThreadSetup(VdsmTestCase):
+class TestMonitorTaskSetup(VdsmTestCase):
 
     # in this state we do:
     # 1. If refresh timeout has expired, remove the domain from the cache
@@ -250,18 +266,18 @@ class TestMonitorThreadSetup(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
             env.wait_for_cycle()
             _, interval = env.checker.checkers[domain.getMonitoringPath()]
             self.assertEqual(interval, MONITOR_INTERVAL)
 
     def test_produce_retry(self):
         with monitor_env() as env:
-            env.thread.start()
+            env.monitor.start()
 
             # First cycle will fail since domain does not exist
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.actual)
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, se.StorageDomainDoesNotExist)
@@ -270,7 +286,7 @@ class TestMonitorThreadSetup(VdsmTestCase):
 
             # Second cycle will fail but no event should be emitted
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, se.StorageDomainDoesNotExist)
             self.assertEqual(env.event.received, [])
@@ -280,13 +296,13 @@ class TestMonitorThreadSetup(VdsmTestCase):
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [])
 
             # When path status is available, emit event
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
 
@@ -297,11 +313,11 @@ class TestMonitorThreadSetup(VdsmTestCase):
             domain = FakeDomain("uuid", iso_dir="/path")
             domain.errors["isISO"] = exception
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # First cycle will fail in domain.isISO
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.actual)
             self.assertIsNone(status.isoPrefix)
             self.assertFalse(status.valid)
@@ -311,7 +327,7 @@ class TestMonitorThreadSetup(VdsmTestCase):
 
             # Second cycle will fail but no event should be emitted
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
             self.assertEqual(env.event.received, [])
@@ -320,14 +336,14 @@ class TestMonitorThreadSetup(VdsmTestCase):
             # we don't have path status yet.
             del domain.errors["isISO"]
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertEqual(status.isoPrefix, domain.iso_dir)
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [])
 
             # When path status is available, emit event
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
 
@@ -337,7 +353,7 @@ class TestMonitorThreadSetup(VdsmTestCase):
             domain = FakeDomain("uuid", iso_dir="/path")
             domain.errors["isISO"] = OSError
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # Domain will be removed after the refresh timeout
             env.wait_for_cycle()
@@ -349,7 +365,7 @@ class TestMonitorThreadSetup(VdsmTestCase):
 
 
 @expandPermutations
-class TestMonitorThreadMonitoring(VdsmTestCase):
+class TestMonitorTaskMonitoring(VdsmTestCase):
 
     # In this state we do:
     # 1. If refresh timeout has expired, remove the domain from the cache
@@ -373,21 +389,35 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # First cycle suceeds, but path status is not avialale yet
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertFalse(status.actual)
             self.assertEqual(env.event.received, [])
 
             # When path succeeds, emit VALID event
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.actual)
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
 
+    def test_check_delay(self):
+        with monitor_env() as env:
+            domain = FakeDomain("uuid")
+
+            def slow_selftest():
+                time.sleep(0.05)
+
+            domain.selftest = slow_selftest
+            monitor.sdCache.domains["uuid"] = domain
+            env.monitor.start()
+            env.wait_for_cycle()
+            status = env.monitor.getStatus()
+            self.assertGreaterEqual(status.checkDelay, 0.05)
+
     @permutations([
         ("selftest", OSError),
         ("selftest", UnexpectedError),
@@ -404,11 +434,11 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors[method] = exception
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # First cycle fail, emit event without waiting for path status
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.actual)
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
@@ -419,18 +449,18 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # First cycle succeed, but path status is not available yet
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertFalse(status.actual)
             self.assertEqual(env.event.received, [])
 
             # When path fail, emit INVALID event
             env.checker.complete(domain.getMonitoringPath(),
                                  FakeCheckResult(exception))
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.actual)
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
@@ -452,7 +482,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors[method] = exception
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # First cycle fail, and emit INVALID event
             env.wait_for_cycle()
@@ -462,7 +492,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # is emitted.
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.actual)
             self.assertFalse(status.valid)
             self.assertEqual(env.event.received, [])
@@ -470,7 +500,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # When next cycle succeeds, emit VALID event
             del domain.errors[method]
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
 
@@ -479,7 +509,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # First cycle succeed, but path status fail, emit INVALID event
             env.wait_for_cycle()
@@ -490,7 +520,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # Both domain status and pass status succeed, emit VALID event
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
 
@@ -498,7 +528,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # Both domain status and path status succeed and emit VALID event
             env.wait_for_cycle()
@@ -509,7 +539,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # not change (valid -> valid)
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [])
 
@@ -528,7 +558,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # Both domain status and path status succeed and emit VALID event
             env.wait_for_cycle()
@@ -538,7 +568,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # Domain status fail, emit INVALID event
             domain.errors[method] = exception
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
             self.assertEqual(env.event.received, [(('uuid', False), {})])
@@ -548,7 +578,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # Both domain status and path status succeed and emit VALID event
             env.wait_for_cycle()
@@ -558,7 +588,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(),
                                  FakeCheckResult(exception))
-            status = env.thread.getStatus()
+            status = env.monitor.getStatus()
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
             self.assertEqual(env.event.received, [(('uuid', False), {})])
@@ -567,7 +597,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # Both domain status and path status succeed
             env.wait_for_cycle()
@@ -583,7 +613,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors["selftest"] = OSError
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # Domain status fail, emit INVALID event
             env.wait_for_cycle()
@@ -602,7 +632,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # Both domain status and path status succeed
             env.wait_for_cycle()
@@ -622,7 +652,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid", iso_dir="/path")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
             self.assertFalse(domain.acquired)
@@ -632,7 +662,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors["selftest"] = OSError
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
             self.assertFalse(domain.acquired)
@@ -643,7 +673,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors['acquireHostId'] = exception
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
             env.wait_for_cycle()
             self.assertFalse(domain.acquired)
             del domain.errors["acquireHostId"]
@@ -658,7 +688,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env(refresh=MONITOR_INTERVAL * 1.5) as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
 
             # Domain will be removed after the refresh timeout
             env.wait_for_cycle()
@@ -669,7 +699,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             self.assertNotIn(domain.sdUUID, monitor.sdCache.domains)
 
 
-class TestMonitorThreadStopping(VdsmTestCase):
+class TestMonitorTaskStopping(VdsmTestCase):
 
     # Here we release the host id if we acquired it, and the monitor was
     # stopped with shutdown=False.
@@ -678,7 +708,7 @@ class TestMonitorThreadStopping(VdsmTestCase):
         with monitor_env(shutdown=False) as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
         self.assertFalse(domain.acquired)
@@ -687,7 +717,7 @@ class TestMonitorThreadStopping(VdsmTestCase):
         with monitor_env(shutdown=True) as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
             # Acquire on next cycle
@@ -705,11 +735,11 @@ class TestMonitorThreadStopping(VdsmTestCase):
 
             domain.selftest = block
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
             if not blocked.wait(CYCLE_TIMEOUT):
                 raise RuntimeError("Timeout waiting for calling getReadDelay")
 
-        status = env.thread.getStatus()
+        status = env.monitor.getStatus()
         self.assertFalse(status.actual)
         self.assertFalse(domain.acquired)
 
@@ -717,11 +747,53 @@ class TestMonitorThreadStopping(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.monitor.start()
             env.wait_for_cycle()
         self.assertFalse(domain.acquired)
         self.assertNotIn(domain.getMonitoringPath(), env.checker.checkers)
 
+    def test_stop_before_start(self):
+        with monitor_env():
+            pass
+
+
+class TestMonitorTaskSharedPool(VdsmTestCase):
+
+    def test_blocked_domain_does_not_delay_others(self):
+        config = make_config([
+            ("irs", "repo_stats_cache_refresh_timeout", "300")
+        ])
+        with MonkeyPatchScope([
+            (monitor, "sdCache", FakeStorageDomainCache()),
+            (monitor, 'config', config),
+        ]), scheduler_env(workers=1, max_workers=2) as (scheduler, pool):
+            release = threading.Event()
+            blocked = FakeDomain("blocked")
+            blocked.selftest = lambda: release.wait(CYCLE_TIMEOUT)
+            monitor.sdCache.domains["blocked"] = blocked
+            monitor.sdCache.domains["ok"] = FakeDomain("ok")
+
+            tasks = []
+            for sdUUID in ("blocked", "ok"):
+                task = monitor.MonitorTask(
+                    sdUUID, 'host_id', MONITOR_INTERVAL, FakeEvent(),
+                    FakeCheckService(), scheduler, pool)
+                tasks.append(task)
+            env = MonitorEnv(tasks[1], None, None)
+            try:
+                tasks[0].start()
+                tasks[1].start()
+                # The blocked worker is replaced, and the other domain is
+                # checked on time.
+                for i in range(3):
+                    env.wait_for_cycle()
+            finally:
+                release.set()
+                for task in tasks:
+                    task.stop()
+                for task in tasks:
+                    task.join()
+
 
 @expandPermutations
 class TestStatus(VdsmTestCase):
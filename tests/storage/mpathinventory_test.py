@@ -0,0 +1,309 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import collections
+
+import pytest
+
+from vdsm.storage import devicemapper
+from vdsm.storage import iscsi
+from vdsm.storage import mpathinventory
+from vdsm.storage import multipath
+from vdsm.storage import udev
+
+Session = collections.namedtuple("Session", "target, iface, credentials")
+Target = collections.namedtuple("Target", "portal, iqn, tpgt")
+Portal = collections.namedtuple("Portal", "hostname, port")
+Iface = collections.namedtuple("Iface", "name")
+
+
+class FakeSupervdsm(object):
+
+    def __init__(self):
+        self.serial_calls = []
+
+    def getScsiSerial(self, dmId):
+        self.serial_calls.append(dmId)
+        return "serial-" + dmId
+
+
+class FakeSysfs(object):
+
+    def __init__(self, tmpdir):
+        self.block = tmpdir.mkdir("block")
+        self.scsi_device = tmpdir.mkdir("scsi_device")
+
+    def add_device(self, dm_id, guid, paths):
+        dm = self.block.mkdir(dm_id)
+        dm.mkdir("dm")
+        dm.join("dm", "uuid").write("mpath-%s\n" % guid)
+        dm.join("dm", "name").write("%s\n" % guid)
+        dm.join("size").write("2048\n")
+        self._add_queue(dm)
+        dm.mkdir("slaves")
+        for name, hbtl in paths:
+            dm.join("slaves").mkdir(name)
+            self.add_path(name, hbtl)
+
+    def add_path(self, name, hbtl):
+        path = self.block.ensure_dir(name)
+        path.join("size").write("2048\n")
+        self._add_queue(path)
+        device = path.ensure_dir("device")
+        device.join("vendor").write("VENDOR  \n")
+        device.join("model").write("MODEL   \n")
+        device.join("rev").write("1.0 \n")
+        self.scsi_device.ensure_dir(hbtl, "device", "block", name)
+
+    def remove_device(self, dm_id):
+        self.block.join(dm_id).remove()
+
+    def _add_queue(self, dev):
+        queue = dev.mkdir("queue")
+        queue.join("logical_block_size").write("512\n")
+        queue.join("physical_block_size").write("4096\n")
+        queue.join("discard_max_bytes").write("0\n")
+
+
+@pytest.fixture
+def svdsm(monkeypatch):
+    svdsm = FakeSupervdsm()
+    monkeypatch.setattr(multipath.supervdsm, "getProxy", lambda: svdsm)
+    return svdsm
+
+
+@pytest.fixture
+def sysfs(tmpdir, monkeypatch):
+    sysfs = FakeSysfs(tmpdir)
+    monkeypatch.setattr(multipath, "SYS_BLOCK", str(sysfs.block))
+    monkeypatch.setattr(multipath, "SCSI_DEVICE", str(sysfs.scsi_device))
+    monkeypatch.setattr(iscsi, "devIsiSCSI", lambda dev: dev == "sdc")
+    monkeypatch.setattr(iscsi, "getiScsiSession", lambda dev: 7)
+    monkeypatch.setattr(
+        iscsi, "getSessionInfo",
+        lambda sid: Session(
+            target=Target(Portal("host", 3260), "iqn.target", 1),
+            iface=Iface("default"),
+            credentials=None))
+    monkeypatch.setattr(
+        devicemapper, "getPathsStatus",
+        lambda: {"sda": "active", "sdb": "failed", "sdc": "active"})
+    return sysfs
+
+
+def test_scan(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0",
+                     [("sda", "1:0:0:3"), ("sdb", "2:0:0:3")])
+    devices = multipath.scan()
+    assert devices == {
+        "guid-0": {
+            "guid": "guid-0",
+            "uuid": "guid-0",
+            "dm": "dm-0",
+            "capacity": str(2048 * 512),
+            "serial": "serial-dm-0",
+            "vendor": "VENDOR",
+            "product": "MODEL",
+            "fwrev": "1.0",
+            "logicalblocksize": "512",
+            "physicalblocksize": "4096",
+            "discard_max_bytes": 0,
+            "paths": [
+                {
+                    "physdev": "sda",
+                    "capacity": str(2048 * 512),
+                    "lun": "3",
+                    "type": multipath.DEV_FCP,
+                },
+                {
+                    "physdev": "sdb",
+                    "capacity": str(2048 * 512),
+                    "lun": "3",
+                    "type": multipath.DEV_FCP,
+                },
+            ],
+        }
+    }
+
+
+def test_scan_reuse_serials(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    sysfs.add_device("dm-1", "guid-1", [("sdb", "1:0:0:4")])
+    devices = multipath.scan(serials={"guid-0": "known"})
+    assert devices["guid-0"]["serial"] == "known"
+    assert devices["guid-1"]["serial"] == "serial-dm-1"
+    assert svdsm.serial_calls == ["dm-1"]
+
+
+def test_scan_filter(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    sysfs.add_device("dm-1", "guid-1", [("sdb", "1:0:0:4")])
+    assert list(multipath.scan(guids=["guid-1"])) == ["guid-1"]
+    assert list(multipath.scan(uuids=["guid-0"])) == ["guid-0"]
+
+
+def test_scan_no_hbtl(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    sysfs.scsi_device.join("1:0:0:3").remove()
+    devices = multipath.scan()
+    assert devices["guid-0"]["paths"][0]["lun"] == 0
+
+
+def test_path_list(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0",
+                     [("sda", "1:0:0:3"), ("sdb", "2:0:0:3")])
+    sysfs.add_device("dm-1", "guid-1", [("sdc", "3:0:0:1")])
+
+    devices = {dev["guid"]: dev for dev in multipath.pathListIter()}
+
+    fc = devices["guid-0"]
+    assert fc["devtype"] == multipath.DEV_FCP
+    assert fc["devtypes"] == [multipath.DEV_FCP, multipath.DEV_FCP]
+    assert fc["connections"] == []
+    assert [(p["physdev"], p["state"]) for p in fc["paths"]] == [
+        ("sda", "active"), ("sdb", "failed")]
+    assert "uuid" not in fc
+
+    iscsi_dev = devices["guid-1"]
+    assert iscsi_dev["devtype"] == multipath.DEV_ISCSI
+    assert iscsi_dev["connections"] == [{
+        "connection": "host",
+        "port": "3260",
+        "iqn": "iqn.target",
+        "portal": "1",
+        "initiatorname": "default",
+    }]
+
+
+def test_path_list_cached_devices(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    devices = multipath.scan()
+    sysfs.remove_device("dm-0")
+    guids = [dev["guid"] for dev in multipath.pathListIter(devices=devices)]
+    assert guids == ["guid-0"]
+
+
+def test_inventory_initial_scan(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    inventory = mpathinventory.Inventory()
+    inventory.start()
+    assert list(inventory.devices()) == ["guid-0"]
+
+
+def test_inventory_cached(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    inventory = mpathinventory.Inventory()
+    inventory.devices()
+    # Devices added without udev events are not seen.
+    sysfs.add_device("dm-1", "guid-1", [("sdb", "1:0:0:4")])
+    assert list(inventory.devices()) == ["guid-0"]
+    assert svdsm.serial_calls == ["dm-0"]
+
+
+def test_inventory_rescan(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    inventory = mpathinventory.Inventory()
+    inventory.devices()
+    sysfs.add_device("dm-1", "guid-1", [("sdb", "1:0:0:4")])
+    assert sorted(inventory.devices(rescan=True)) == ["guid-0", "guid-1"]
+    # Serial of known devices are not read again.
+    assert svdsm.serial_calls == ["dm-0", "dm-1"]
+
+
+def test_inventory_rescan_guids(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    sysfs.add_device("dm-1", "guid-1", [("sdb", "1:0:0:4")])
+    inventory = mpathinventory.Inventory()
+    inventory.devices()
+
+    # Only the requested devices are scanned.
+    sysfs.block.join("dm-0", "slaves").mkdir("sdc")
+    sysfs.add_path("sdc", "2:0:0:3")
+    sysfs.add_device("dm-2", "guid-2", [("sdd", "1:0:0:5")])
+    sysfs.remove_device("dm-1")
+    devices = inventory.devices(["guid-0"], rescan=True)
+    assert list(devices) == ["guid-0"]
+    paths = devices["guid-0"]["paths"]
+    assert [p["physdev"] for p in paths] == ["sda", "sdc"]
+    assert sorted(inventory.devices()) == ["guid-0", "guid-1"]
+
+    # A requested device removed since the last scan is dropped.
+    assert inventory.devices(["guid-1"], rescan=True) == {}
+    assert list(inventory.devices()) == ["guid-0"]
+    assert svdsm.serial_calls == ["dm-0", "dm-1"]
+
+
+def test_inventory_invalidate(sysfs, svdsm):
+    inventory = mpathinventory.Inventory()
+    assert inventory.devices() == {}
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    inventory.invalidate()
+    assert list(inventory.devices()) == ["guid-0"]
+
+
+def test_inventory_changed_event(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    inventory = mpathinventory.Inventory()
+    inventory.devices()
+
+    sysfs.add_device("dm-1", "guid-1", [("sdb", "1:0:0:4")])
+    inventory.handle(udev.MultipathEvent(
+        udev.MPATH_CHANGED, "guid-1", None, None, None))
+    assert sorted(inventory.devices()) == ["guid-0", "guid-1"]
+
+    # Path added to existing device.
+    sysfs.block.join("dm-0", "slaves").mkdir("sdc")
+    sysfs.add_path("sdc", "2:0:0:3")
+    inventory.handle(udev.MultipathEvent(
+        udev.MPATH_CHANGED, "guid-0", None, 2, 1))
+    paths = inventory.devices()["guid-0"]["paths"]
+    assert [p["physdev"] for p in paths] == ["sda", "sdc"]
+
+
+def test_inventory_removed_event(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    sysfs.add_device("dm-1", "guid-1", [("sdb", "1:0:0:4")])
+    inventory = mpathinventory.Inventory()
+    inventory.devices()
+
+    sysfs.remove_device("dm-0")
+    inventory.handle(udev.MultipathEvent(
+        udev.MPATH_REMOVED, "guid-0", None, None, None))
+    assert list(inventory.devices()) == ["guid-1"]
+
+
+def test_inventory_path_events_ignored(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    inventory = mpathinventory.Inventory()
+    inventory.devices()
+    inventory.handle(udev.MultipathEvent(
+        udev.PATH_FAILED, "guid-0", "sda", 0, 1))
+    sysfs.remove_device("dm-0")
+    assert list(inventory.devices()) == ["guid-0"]
+
+
+def test_inventory_filter(sysfs, svdsm):
+    sysfs.add_device("dm-0", "guid-0", [("sda", "1:0:0:3")])
+    sysfs.add_device("dm-1", "guid-1", [("sdb", "1:0:0:4")])
+    inventory = mpathinventory.Inventory()
+    assert list(inventory.devices(["guid-1"])) == ["guid-1"]
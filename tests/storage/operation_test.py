@@ -65,7 +65,9 @@ class TestCommandRun(VdsmTestCase):
 
     def test_abort_created(self):
         op = operation.Command(["sleep", "5"])
+        self.assertFalse(op.aborted)
         op.abort()
+        self.assertTrue(op.aborted)
         with self.assertRaises(exception.ActionStopped):
             op.run()
 
@@ -161,3 +163,64 @@ class TestCommandWatch(VdsmTestCase):
         op = operation.Command(["true"])
         list(op.watch())
         op.abort()
+
+
+class TestCommandPause(VdsmTestCase):
+
+    def test_pause_created(self):
+        op = operation.Command(["true"])
+        op.pause()
+        op.resume()
+        op.run()
+
+    def test_pause_resume(self):
+        op = operation.Command(["sleep", "0.5"])
+        t = concurrent.thread(op.run)
+        t.start()
+        try:
+            # TODO: add way to wait until operation is stated?
+            time.sleep(0.2)
+            pid = op._proc.pid
+            op.pause()
+            self.assertTrue(wait_for_state(pid, "T"))
+            op.resume()
+            self.assertTrue(wait_for_state(pid, "S"))
+        finally:
+            t.join()
+        self.assertFalse(op.running)
+
+    def test_abort_paused(self):
+        op = operation.Command(["sleep", "5"])
+        aborted = threading.Event()
+
+        def run():
+            try:
+                op.run()
+            except exception.ActionStopped:
+                aborted.set()
+
+        t = concurrent.thread(run)
+        t.start()
+        try:
+            time.sleep(0.2)
+            op.pause()
+            op.abort()
+        finally:
+            t.join()
+        self.assertTrue(aborted.is_set())
+
+    def test_pause_terminated(self):
+        op = operation.Command(["true"])
+        op.run()
+        op.pause()
+        op.resume()
+
+
+def wait_for_state(pid, state, timeout=1.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with open("/proc/%d/stat" % pid) as f:
+            if f.read().rsplit(")", 1)[1].split()[0] == state:
+                return True
+        time.sleep(0.01)
+    return False
@@ -303,6 +303,26 @@ class TestConvert:
         with MonkeyPatchScope([(qemuimg, 'ProgressCommand', convert)]):
             qemuimg.convert('src', 'dst', create=False)
 
+    def test_cache_modes(self):
+        def convert(cmd, **kw):
+            expected = [QEMU_IMG, 'convert', '-p', '-t', 'writeback',
+                        '-T', 'writethrough', 'src', 'dst']
+            assert cmd == expected
+
+        with MonkeyPatchScope([(qemuimg, 'ProgressCommand', convert)]):
+            qemuimg.convert('src', 'dst', cache='writeback',
+                            src_cache='writethrough')
+
+    def test_coroutines_and_sparse_size(self):
+        def convert(cmd, **kw):
+            expected = [QEMU_IMG, 'convert', '-p', '-t', 'none', '-T', 'none',
+                        '-m', '16', '-S', '64k', '-n', 'src', 'dst']
+            assert cmd == expected
+
+        with MonkeyPatchScope([(qemuimg, 'ProgressCommand', convert)]):
+            qemuimg.convert('src', 'dst', create=False, coroutines=16,
+                            sparse_size='64k')
+
     def test_qcow2_compat(self):
         def convert(cmd, **kw):
             expected = [QEMU_IMG, 'convert', '-p', '-t', 'none', '-T', 'none',
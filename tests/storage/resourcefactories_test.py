@@ -0,0 +1,166 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import threading
+
+import pytest
+
+from vdsm.storage import lvm
+from vdsm.storage import resourceFactories
+from vdsm.storage.resourceFactories import LvmActivation
+
+
+class FakeLVM(object):
+
+    def __init__(self, active=()):
+        self.active = set(active)
+        self.calls = []
+
+    def activateLVs(self, vg, lvs, refresh=True):
+        self.calls.append(("activate", vg, list(lvs)))
+        inactive = [lv for lv in lvs if lv not in self.active]
+        self.active.update(lvs)
+        return inactive
+
+    def deactivateLVs(self, vg, lvs):
+        self.calls.append(("deactivate", vg, list(lvs)))
+        self.active.difference_update(lvs)
+
+
+@pytest.fixture
+def fake_lvm(monkeypatch):
+    fake = FakeLVM(active=["base"])
+    monkeypatch.setattr(lvm, "activateLVs", fake.activateLVs)
+    monkeypatch.setattr(lvm, "deactivateLVs", fake.deactivateLVs)
+    return fake
+
+
+def test_activation_unbatched(fake_lvm):
+    res = LvmActivation("vg", "top", None)
+    res.close()
+    assert fake_lvm.calls == [
+        ("activate", "vg", ["top"]),
+        ("deactivate", "vg", ["top"]),
+    ]
+
+
+def test_activation_batch(fake_lvm):
+    with resourceFactories.activation_batch("vg"):
+        resources = [LvmActivation("vg", lv, None)
+                     for lv in ("top", "mid", "base")]
+        assert fake_lvm.calls == []
+    assert fake_lvm.calls == [
+        ("activate", "vg", ["top", "mid", "base"]),
+    ]
+    assert fake_lvm.active == {"top", "mid", "base"}
+    assert all(res.active for res in resources)
+
+
+def test_activation_batch_other_vg(fake_lvm):
+    with resourceFactories.activation_batch("vg"):
+        LvmActivation("vg", "top", None)
+        LvmActivation("other-vg", "top", None)
+    assert fake_lvm.calls == [
+        ("activate", "other-vg", ["top"]),
+        ("activate", "vg", ["top"]),
+    ]
+
+
+def test_activation_batch_activate_pending(fake_lvm):
+    with resourceFactories.activation_batch("vg"):
+        LvmActivation("vg", "top", None)
+        resourceFactories.activate_pending("vg")
+        LvmActivation("vg", "base", None)
+    assert fake_lvm.calls == [
+        ("activate", "vg", ["top"]),
+        ("activate", "vg", ["base"]),
+    ]
+
+
+def test_activation_batch_error(fake_lvm):
+    # Resources released before the batch ends are not activated, and LVs
+    # not owned by the batch are never deactivated.
+    with pytest.raises(RuntimeError):
+        with resourceFactories.activation_batch("vg"):
+            top = LvmActivation("vg", "top", None)
+            LvmActivation("vg", "mid", None)
+            top.close()
+            raise RuntimeError
+    assert fake_lvm.calls == [
+        ("deactivate", "vg", ["top"]),
+    ]
+    assert fake_lvm.active == {"base"}
+
+
+def test_activation_batch_nested(fake_lvm):
+    with resourceFactories.activation_batch("vg"):
+        LvmActivation("vg", "top", None)
+        with resourceFactories.activation_batch("vg"):
+            LvmActivation("vg", "mid", None)
+        assert fake_lvm.calls == []
+    assert fake_lvm.calls == [
+        ("activate", "vg", ["top", "mid"]),
+    ]
+
+
+def test_activate_pending_other_thread(fake_lvm):
+    # A resource created by another thread batch is activated by the holder
+    # acquiring it.
+    with resourceFactories.activation_batch("vg"):
+        res = LvmActivation("vg", "top", None)
+        res.activate()
+        assert fake_lvm.calls == []
+
+        t = threading.Thread(target=res.activate)
+        t.start()
+        t.join()
+        assert fake_lvm.calls == [
+            ("activate", "vg", ["top"]),
+        ]
+        assert res.active
+    # Activated LVs are not activated again by the batch.
+    assert len(fake_lvm.calls) == 1
+
+
+def test_deactivation_batch(fake_lvm):
+    resources = [LvmActivation("vg", lv, None) for lv in ("top", "mid")]
+    del fake_lvm.calls[:]
+    with resourceFactories.deactivation_batch("vg"):
+        for res in resources:
+            with resourceFactories.deactivation_batch("vg"):
+                res.close()
+        assert fake_lvm.calls == []
+    assert fake_lvm.calls == [
+        ("deactivate", "vg", ["top", "mid"]),
+    ]
+
+
+def test_deactivation_batch_error(fake_lvm, monkeypatch):
+    def fail(vg, lvs):
+        raise RuntimeError
+
+    monkeypatch.setattr(lvm, "deactivateLVs", fail)
+    res = LvmActivation("vg", "top", None)
+    # Deactivation errors are logged, so the resources can be released.
+    with resourceFactories.deactivation_batch("vg"):
+        res.close()
@@ -35,6 +35,7 @@ import pytest
 from vdsm.storage import resourceManager as rm
 
 from monkeypatch import MonkeyPatch
+from monkeypatch import MonkeyPatchScope
 from storage.storagefakelib import FakeResourceManager
 from testlib import expandPermutations, permutations
 from testlib import VdsmTestCase
@@ -474,6 +475,56 @@ class TestResourceManager(VdsmTestCase):
         res1.release()
         res2.release()
 
+    @MonkeyPatch(rm, "_manager", manager())
+    def test_acquire_shared_fast_path(self):
+        def no_requests(*args, **kwargs):
+            raise AssertionError("Request created for uncontended lock")
+
+        with MonkeyPatchScope([(rm, "Request", no_requests)]):
+            res1 = rm.acquireResource("string", "resource", rm.SHARED)
+            res2 = rm.acquireResource("string", "resource", rm.SHARED)
+            # Wrapped object is available in the fast path.
+            self.assertEqual(res1.read(), "resource:shared")
+            res1.release()
+            res2.release()
+        self.assertEqual(rm._getResourceStatus("string", "resource"),
+                         rm.LockState.free)
+
+    @MonkeyPatch(rm, "_manager", manager())
+    def test_acquire_shared_waits_for_exclusive_request(self):
+        resources = []
+
+        def callback(req, res):
+            resources.append(res)
+
+        shared1 = rm.acquireResource("storage", "resource", rm.SHARED)
+        rm._registerResource("storage", "resource", rm.EXCLUSIVE, callback)
+
+        # Shared lock must not jump over the waiting exclusive request.
+        with self.assertRaises(rm.RequestTimedOutError):
+            rm.acquireResource("storage", "resource", rm.SHARED, timeout=0.1)
+
+        shared1.release()
+        exclusive = resources.pop()
+        self.assertEqual(rm._getResourceStatus("storage", "resource"),
+                         rm.LockState.locked)
+        exclusive.release()
+
+    @MonkeyPatch(rm, "_manager", manager())
+    def test_acquire_shared_fast_path_factory_error(self):
+        with self.assertRaises(rm.se.ResourceAcqusitionFailed):
+            rm.acquireResource("error", "resource", rm.SHARED)
+        self.assertEqual(rm._getResourceStatus("error", "resource"),
+                         rm.LockState.free)
+
+    @MonkeyPatch(rm, "_manager", manager())
+    def test_unregister_namespace_with_shared_resource(self):
+        res = rm.acquireResource("storage", "resource", rm.SHARED)
+        with self.assertRaises(rm.ResourceManagerError):
+            rm.unregisterNamespace("storage")
+        res.release()
+        rm.unregisterNamespace("storage")
+
     @MonkeyPatch(rm, "_manager", manager())
     def testResourceStatuses(self):
         self.assertEqual(rm._getResourceStatus("storage", "resource"),
@@ -657,6 +708,42 @@ class TestResourceManager(VdsmTestCase):
         for t in releaseThreads:
             t.join()
 
+    @MonkeyPatch(rm, "_manager", manager())
+    @pytest.mark.slow
+    @pytest.mark.stress
+    def test_shared_acquire_release_throughput(self):
+        """
+        Microbenchmark for acquiring and releasing shared locks from many
+        threads, the common case of verbs taking a shared lock on a storage
+        domain.
+        """
+        threads_count = 64
+        iterations = 1000
+        # One resource used by all threads, and one resource per thread.
+        names = ["shared"] + ["resource%d" % i for i in range(8)]
+
+        def worker(i):
+            name = names[i % len(names)]
+            for _ in range(iterations):
+                res = rm.acquireResource("storage", name, rm.SHARED)
+                res.release()
+
+        threads = [threading.Thread(target=worker, args=(i,))
+                   for i in range(threads_count)]
+        start = time.time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - start
+
+        ops = threads_count * iterations
+        print("%d threads, %d acquire/release: %.2f seconds (%d ops/s)"
+              % (threads_count, ops, elapsed, ops / elapsed))
+        for name in names:
+            self.assertEqual(rm._getResourceStatus("storage", name),
+                             rm.LockState.free)
+
 
 @expandPermutations
 class TestResourceManagerLock(VdsmTestCase):
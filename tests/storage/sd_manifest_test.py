@@ -35,10 +35,13 @@ from testlib import expandPermutations, permutations
 
 from storage.storagetestlib import (
     fake_block_env,
+    fake_env,
     fake_file_env,
     make_file_volume,
 )
 
+from .fakesanlock import FakeSanlock
+
 MB = 1048576
 
 # We want to create volumes larger than the minimum block volume size
@@ -211,6 +214,45 @@ class TestBlockDomainMetadataSlot(VdsmTestCase):
                 self.assertFalse(acquired)
 
 
+@expandPermutations
+class TestDumpVolumeChains(VdsmTestCase):
+
+    @permutations([("file",), ("block",)])
+    def test_dump_volume_chains(self, storage_type):
+        fake_sanlock = FakeSanlock()
+        with fake_env(storage_type) as env, \
+                MonkeyPatchScope([(clusterlock, "sanlock", fake_sanlock)]):
+            sd_id = env.sd_manifest.sdUUID
+            fake_sanlock.add_lockspace(
+                sd_id, 1, env.sd_manifest.getIdsFilePath())
+            chains = {
+                make_uuid(): [make_uuid(), make_uuid(), make_uuid()],
+                make_uuid(): [make_uuid()],
+            }
+            for img_id, vol_ids in chains.items():
+                parent_vol_id = sc.BLANK_UUID
+                for vol_id in vol_ids:
+                    vol_type = (sc.LEAF_VOL if vol_id == vol_ids[-1]
+                                else sc.INTERNAL_VOL)
+                    env.make_volume(VOLSIZE, img_id, vol_id,
+                                    parent_vol_id=parent_vol_id,
+                                    vol_type=vol_type)
+                    lease = env.sd_manifest.getVolumeLease(img_id, vol_id)
+                    fake_sanlock.write_resource(
+                        sd_id, lease.name, [(lease.path, lease.offset)])
+                    parent_vol_id = vol_id
+
+            expected = {}
+            for img_id, vol_ids in chains.items():
+                expected[img_id] = {
+                    vol_id: env.sd_manifest.produceVolume(
+                        img_id, vol_id).getInfo()
+                    for vol_id in vol_ids
+                }
+
+            self.assertEqual(expected, env.sd_manifest.dumpVolumeChains())
+
+
 class StorageDomainManifest(sd.StorageDomainManifest):
     def __init__(self):
         pass
@@ -0,0 +1,210 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import threading
+
+import pytest
+
+from vdsm.storage import exception as se
+from vdsm.storage import sdc
+
+from testlib import make_config
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDomain(object):
+
+    def __init__(self, sdUUID):
+        self.sdUUID = sdUUID
+
+
+class Finder(object):
+
+    def __init__(self, domains=(), event=None):
+        self.domains = set(domains)
+        self.event = event
+        self.calls = 0
+
+    def __call__(self, sdUUID):
+        self.calls += 1
+        if self.event is not None:
+            self.event.wait()
+        if sdUUID not in self.domains:
+            raise se.StorageDomainDoesNotExist(sdUUID)
+        return FakeDomain(sdUUID)
+
+
+class FailingFinder(object):
+
+    def __call__(self, sdUUID):
+        raise RuntimeError("Finder failed")
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    monkeypatch.setattr(sdc, "config", make_config(
+        [("irs", "sd_cache_negative_ttl", "30")]))
+    monkeypatch.setattr(sdc.multipath, "rescan", lambda: None)
+    monkeypatch.setattr(sdc.multipath, "resize_devices", lambda: None)
+    monkeypatch.setattr(sdc.lvm, "invalidateCache", lambda: None)
+    return sdc.StorageDomainCache("/repo", clock=clock)
+
+
+def use_finders(monkeypatch, cache, *finders):
+    monkeypatch.setattr(cache, "_finders", lambda: list(finders))
+
+
+def test_produce_cached(monkeypatch, cache):
+    finder = Finder(["sd-1"])
+    use_finders(monkeypatch, cache, finder)
+    dom = cache.produce("sd-1")
+    assert dom.getRealDomain() is cache.produce("sd-1").getRealDomain()
+    assert finder.calls == 1
+    stats = cache.stats()
+    assert stats["lookups"] == 1
+    assert stats["hits"] >= 1
+    assert stats["missing"] == 0
+
+
+def test_find_concurrently(monkeypatch, cache):
+    # A stuck finder does not delay other finders.
+    stuck = threading.Event()
+    try:
+        use_finders(monkeypatch, cache,
+                    Finder(["sd-1"], event=stuck),
+                    FailingFinder(),
+                    Finder(["sd-2"]))
+        dom = cache.produce("sd-2")
+        assert dom.sdUUID == "sd-2"
+    finally:
+        stuck.set()
+
+
+def test_missing_domain_cached(monkeypatch, cache, clock):
+    finder = Finder()
+    use_finders(monkeypatch, cache, finder)
+    for i in range(3):
+        with pytest.raises(se.StorageDomainDoesNotExist):
+            cache.produce("sd-1")
+    assert finder.calls == 1
+    stats = cache.stats()
+    assert stats["lookups"] == 1
+    assert stats["produce"]["lookup"]["errors"] == 1
+    assert stats["missing"] == 2
+
+
+def test_finder_error_not_cached(monkeypatch, cache):
+    finder = Finder()
+    use_finders(monkeypatch, cache, FailingFinder(), finder)
+    for i in range(2):
+        with pytest.raises(se.StorageDomainDoesNotExist):
+            cache.produce("sd-1")
+    assert finder.calls == 2
+    stats = cache.stats()
+    assert stats["produce"]["lookup"]["errors"] == 2
+    assert stats["missing"] == 0
+
+
+def test_stuck_finder_threads_limited(monkeypatch, cache):
+    monkeypatch.setattr(cache, "MAX_FINDER_THREADS", 2)
+    stuck = threading.Event()
+    stuck_finder = Finder(event=stuck)
+    finder = Finder(["sd-1", "sd-2", "sd-3"])
+    try:
+        use_finders(monkeypatch, cache, stuck_finder, finder)
+        for sdUUID in ("sd-1", "sd-2", "sd-3"):
+            assert cache.produce(sdUUID).sdUUID == sdUUID
+        assert stuck_finder.calls == 2
+
+        # The stuck finder was skipped, so the domain may exist.
+        for i in range(2):
+            with pytest.raises(se.StorageDomainDoesNotExist):
+                cache.produce("sd-4")
+        assert finder.calls == 5
+        assert stuck_finder.calls == 2
+    finally:
+        stuck.set()
+
+
+def test_missing_domain_expires(monkeypatch, cache, clock):
+    finder = Finder()
+    use_finders(monkeypatch, cache, finder)
+    with pytest.raises(se.StorageDomainDoesNotExist):
+        cache.produce("sd-1")
+
+    clock.now += 30
+    finder.domains.add("sd-1")
+    assert cache.produce("sd-1").sdUUID == "sd-1"
+    assert finder.calls == 2
+
+
+@pytest.mark.parametrize("forget", [
+    lambda cache: cache.invalidateStorage(),
+    lambda cache: cache.refreshStorage(),
+    lambda cache: cache.refresh(),
+])
+def test_missing_domain_forgotten(monkeypatch, cache, forget):
+    finder = Finder()
+    use_finders(monkeypatch, cache, finder)
+    with pytest.raises(se.StorageDomainDoesNotExist):
+        cache.produce("sd-1")
+
+    forget(cache)
+    finder.domains.add("sd-1")
+    assert cache.produce("sd-1").sdUUID == "sd-1"
+
+
+def test_manually_add_missing_domain(monkeypatch, cache):
+    use_finders(monkeypatch, cache, Finder())
+    with pytest.raises(se.StorageDomainDoesNotExist):
+        cache.produce("sd-1")
+
+    dom = FakeDomain("sd-1")
+    cache.manuallyAddDomain(dom)
+    assert cache.produce("sd-1").getRealDomain() is dom
+
+
+def test_prefetch(monkeypatch, cache):
+    finder = Finder(["sd-1", "sd-2"])
+    use_finders(monkeypatch, cache, finder)
+    cache.prefetch(["sd-1", "sd-2", "sd-3"])
+    assert finder.calls == 3
+
+    cache.produce("sd-1")
+    cache.produce("sd-2")
+    with pytest.raises(se.StorageDomainDoesNotExist):
+        cache.produce("sd-3")
+    assert finder.calls == 3
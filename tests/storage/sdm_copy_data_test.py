@@ -379,7 +379,7 @@ class FakeQemuImgOperation(object):
     def abort(self):
         self.abort_event.set()
 
-    def run(self):
+    def run(self, on_progress=None):
         self.ready_event.set()
         if self.error:
             raise self.error()
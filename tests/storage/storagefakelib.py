@@ -340,18 +340,37 @@ def fake_lvm_uuid():
     return '-'.join(part(size) for size in [6, 4, 4, 4, 4, 6])
 
 
+class FakeResourceRef(object):
+    """
+    Reference to a resource acquired from FakeResourceManager, released when
+    exiting the context.
+    """
+
+    def __init__(self, manager, args, kwargs):
+        self._manager = manager
+        self._args = args
+        self._kwargs = kwargs
+        self.autoRelease = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, v, tb):
+        self._manager.releaseResource(*self._args, **self._kwargs)
+
+    def activate(self):
+        # Used by LvmActivation resources holders.
+        pass
+
+
 class FakeResourceManager(object):
 
     SHARED = rm.SHARED
     EXCLUSIVE = rm.EXCLUSIVE
 
     @recorded
-    @contextmanager
     def acquireResource(self, *args, **kwargs):
-        try:
-            yield
-        finally:
-            self.releaseResource(*args, **kwargs)
+        return FakeResourceRef(self, args, kwargs)
 
     @recorded
     def releaseResource(self, *args, **kwargs):
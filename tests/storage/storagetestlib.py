@@ -194,11 +194,13 @@ class FakeSD(object):
             self.lvm.extendLV(self._manifest.sdUUID, volumeUUID, size)
 
 
-def make_sd_metadata(sduuid, version=3, dom_class=sd.DATA_DOMAIN, pools=None):
+def make_sd_metadata(sduuid, version=3, dom_class=sd.DATA_DOMAIN, pools=None,
+                     storage_type=sd.NFS_DOMAIN):
     md = FakeMetadata()
     md[sd.DMDK_SDUUID] = sduuid
     md[sd.DMDK_VERSION] = version
     md[sd.DMDK_CLASS] = dom_class
+    md[sd.DMDK_TYPE] = storage_type
     md[sd.DMDK_POOLS] = pools if pools is not None else [make_uuid()]
     return md
 
@@ -224,7 +226,8 @@ def make_blocksd_manifest(tmpdir, fake_lvm, sduuid=None, devices=None,
     fake_lvm.createLV(sduuid, blockSD.MASTERLV, blockSD.MASTERLV_SIZE)
 
     # We'll store the domain metadata in the VG's tags
-    metadata = make_sd_metadata(sduuid, version=sd_version, pools=[spuuid])
+    metadata = make_sd_metadata(sduuid, version=sd_version, pools=[spuuid],
+                                storage_type=sd.ISCSI_DOMAIN)
     assert(metadata[sd.DMDK_VERSION] >= 3)  # Tag based MD is V3 and above
     tag_md = blockSD.TagBasedSDMetadata(sduuid)
     tag_md.update(metadata)
@@ -0,0 +1,262 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import errno
+import glob
+import io
+import os
+import shutil
+
+import pytest
+
+from vdsm.storage import task
+from vdsm.storage import taskManager
+
+from testlib import make_config
+
+
+class FakeFileUtils(object):
+
+    def cleanupdir(self, path):
+        shutil.rmtree(path, ignore_errors=True)
+
+    def createdir(self, path):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def fsyncPath(self, path):
+        pass
+
+
+class FakeUtils(object):
+
+    def rmFile(self, path):
+        try:
+            os.unlink(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+
+class FakeProcPool(object):
+    """
+    Process pool running file operations in the current process.
+    """
+
+    os = os
+    glob = glob
+    fileUtils = FakeFileUtils()
+    utils = FakeUtils()
+
+    def readLines(self, path):
+        with io.open(path, encoding="utf8") as f:
+            return f.readlines()
+
+    def writeLines(self, path, lines):
+        self.writeFile(path, "".join(lines))
+
+    def writeFile(self, path, data):
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+@pytest.fixture
+def store(tmpdir, monkeypatch):
+    pool = FakeProcPool()
+    monkeypatch.setattr(task, "getProcPool", lambda: pool)
+    return str(tmpdir)
+
+
+def use_format(monkeypatch, fmt):
+    cfg = make_config([("irs", "task_store_format", fmt)])
+    monkeypatch.setattr(task, "config", cfg)
+
+
+def create_task(store):
+    t = task.Task(None, name="copyImage", tag="tag")
+    t.jobs.append(task.Job("job", dir, "arg"))
+    t.recoveries.append(
+        task.Recovery("rec1", "image", "Image", "createImageRollback",
+                      ["pool-id", "image-id"]))
+    t.recoveries.append(
+        task.Recovery("rec2", "image", "Image", "createImageRollback",
+                      []))
+    t.setPersistence(store, cleanPolicy=task.TaskCleanType.manual)
+    t.state.moveto(task.State.preparing)
+    t.persist()
+    return t
+
+
+def check_loaded(t, loaded):
+    assert loaded.id == t.id
+    assert loaded.name == t.name
+    assert loaded.tag == t.tag
+    assert loaded.state == str(t.state)
+    assert loaded.cleanPolicy == str(t.cleanPolicy)
+    assert [j.runcmd for j in loaded.jobs] == [j.runcmd for j in t.jobs]
+    assert ([str(r) for r in loaded.recoveries] ==
+            [str(r) for r in t.recoveries])
+
+
+@pytest.mark.parametrize("fmt", [task.STORE_FORMAT_FILE,
+                                 task.STORE_FORMAT_DIR])
+def test_persist_and_load(store, monkeypatch, fmt):
+    use_format(monkeypatch, fmt)
+    t = create_task(store)
+    loaded = task.Task.loadTask(store, t.id)
+    check_loaded(t, loaded)
+    t.state.moveto(task.State.finished)
+
+
+def test_file_format_layout(store, monkeypatch):
+    use_format(monkeypatch, task.STORE_FORMAT_FILE)
+    t = create_task(store)
+    assert os.listdir(store) == [t.id + task.TASK_EXT]
+    t.state.moveto(task.State.finished)
+
+
+def test_finished_task_result(store, monkeypatch):
+    use_format(monkeypatch, task.STORE_FORMAT_FILE)
+    t = create_task(store)
+    t._updateResult(0, "OK", "result")
+    t.state.moveto(task.State.finished)
+    t.persist()
+    loaded = task.Task.loadTask(store, t.id)
+    assert loaded.result.code == 0
+    assert loaded.result.message == "OK"
+    assert loaded.result.result == "result"
+
+
+def test_convert_dir_to_file(store, monkeypatch):
+    use_format(monkeypatch, task.STORE_FORMAT_DIR)
+    t = create_task(store)
+    t.state.moveto(task.State.finished)
+
+    use_format(monkeypatch, task.STORE_FORMAT_FILE)
+    loaded = task.Task.loadTask(store, t.id)
+    loaded.setPersistence(store, cleanPolicy=task.TaskCleanType.manual)
+    loaded.persist()
+    assert os.listdir(store) == [t.id + task.TASK_EXT]
+    check_loaded(loaded, task.Task.loadTask(store, t.id))
+
+
+def test_convert_file_to_dir(store, monkeypatch):
+    use_format(monkeypatch, task.STORE_FORMAT_FILE)
+    t = create_task(store)
+    t.state.moveto(task.State.finished)
+
+    use_format(monkeypatch, task.STORE_FORMAT_DIR)
+    loaded = task.Task.loadTask(store, t.id)
+    loaded.setPersistence(store, cleanPolicy=task.TaskCleanType.manual)
+    loaded.persist()
+    assert os.listdir(store) == [t.id]
+    check_loaded(loaded, task.Task.loadTask(store, t.id))
+
+
+@pytest.mark.parametrize("ext", [task.TEMP_EXT, task.BACKUP_EXT])
+def test_convert_dir_variant_to_file(store, monkeypatch, ext):
+    use_format(monkeypatch, task.STORE_FORMAT_DIR)
+    t = create_task(store)
+    t.state.moveto(task.State.finished)
+    # Simulate a save interrupted after the task dir was moved away, leaving
+    # the temporary and backup dirs.
+    task_dir = os.path.join(store, t.id)
+    shutil.copytree(task_dir, task_dir + task.TEMP_EXT)
+    os.rename(task_dir, task_dir + task.BACKUP_EXT)
+    if ext == task.BACKUP_EXT:
+        shutil.rmtree(task_dir + task.TEMP_EXT)
+
+    use_format(monkeypatch, task.STORE_FORMAT_FILE)
+    loaded = task.Task.loadTask(store, t.id)
+    loaded.setPersistence(store, cleanPolicy=task.TaskCleanType.manual)
+    loaded.persist()
+    assert os.listdir(store) == [t.id + task.TASK_EXT]
+
+
+@pytest.mark.parametrize("fmt", [task.STORE_FORMAT_FILE,
+                                 task.STORE_FORMAT_DIR])
+def test_clean(store, monkeypatch, fmt):
+    use_format(monkeypatch, fmt)
+    t = create_task(store)
+    t.state.moveto(task.State.finished)
+    t.clean()
+    assert os.listdir(store) == []
+
+
+def test_clean_temp_file(store, monkeypatch):
+    use_format(monkeypatch, task.STORE_FORMAT_FILE)
+    t = create_task(store)
+    t.state.moveto(task.State.finished)
+    # Simulate a save interrupted before renaming the temporary file.
+    task_file = os.path.join(store, t.id + task.TASK_EXT)
+    shutil.copyfile(task_file, task_file + task.TEMP_EXT)
+    t.clean()
+    assert os.listdir(store) == []
+
+
+def test_load_dumped_tasks_stale_temp_file(store, monkeypatch):
+    use_format(monkeypatch, task.STORE_FORMAT_FILE)
+    t = create_task(store)
+    t.state.moveto(task.State.finished)
+    task_file = os.path.join(store, t.id + task.TASK_EXT)
+    shutil.copyfile(task_file, task_file + task.TEMP_EXT)
+    # A task whose first save was interrupted.
+    orphan = os.path.join(store, "orphan" + task.TASK_EXT + task.TEMP_EXT)
+    shutil.copyfile(task_file, orphan)
+
+    tm = taskManager.TaskManager(tpSize=1, maxTasks=1, tpMaxSize=1,
+                                 taskTimeout=0)
+    try:
+        tm.loadDumpedTasks(store)
+    finally:
+        tm.prepareForShutdown()
+    assert [loaded.id for loaded in tm._unqueuedTasks] == [t.id]
+    assert os.listdir(store) == [t.id + task.TASK_EXT]
+
+
+def test_invalid_format(store, monkeypatch):
+    use_format(monkeypatch, "bad")
+    t = task.Task(None)
+    with pytest.raises(task.se.TaskPersistError):
+        t.setPersistence(store)
+
+
+def test_default_format(store):
+    t = create_task(store)
+    t.state.moveto(task.State.finished)
+    assert os.listdir(store) == [t.id]
+
+
+def test_load_missing_section(store, monkeypatch):
+    use_format(monkeypatch, task.STORE_FORMAT_FILE)
+    t = create_task(store)
+    t.state.moveto(task.State.finished)
+    path = os.path.join(store, t.id + task.TASK_EXT)
+    with io.open(path, encoding="utf8") as f:
+        data = f.read()
+    # Drop the last recovery section.
+    data = data[:data.index("[recover.1]")]
+    with io.open(path, "w", encoding="utf8") as f:
+        f.write(data)
+    with pytest.raises(task.se.TaskMetaDataLoadError):
+        task.Task.loadTask(store, t.id)
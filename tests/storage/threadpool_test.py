@@ -0,0 +1,143 @@
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import threading
+
+import pytest
+
+from vdsm.storage import threadPool
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def pool():
+    p = threadPool.ThreadPool("test", 1, 3, max_workers=2, timeout=0.2)
+    yield p
+    p.stop()
+
+
+def test_run_task(pool):
+    done = threading.Event()
+    result = []
+
+    def task(args):
+        result.append(args)
+        done.set()
+
+    assert pool.queueTask("id", task, "args")
+    assert done.wait(TIMEOUT)
+    assert result == ["args"]
+
+
+def test_run_task_callback(pool):
+    done = threading.Event()
+    result = []
+
+    def callback(value):
+        result.append(value)
+        done.set()
+
+    assert pool.queueTask("id", lambda args: args * 2, 21, callback)
+    assert done.wait(TIMEOUT)
+    assert result == [42]
+
+
+def test_not_callable(pool):
+    assert not pool.queueTask("id", "not callable")
+
+
+def test_queue_full(pool):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocked(args):
+        started.set()
+        release.wait(TIMEOUT)
+
+    try:
+        # The only worker is blocked, and the queue can hold 3 tasks.
+        assert pool.queueTask("blocked", blocked)
+        assert started.wait(TIMEOUT)
+        for i in range(3):
+            assert pool.queueTask(str(i), blocked)
+        assert not pool.queueTask("3", blocked)
+        assert pool.stats()["dropped"] == 1
+    finally:
+        release.set()
+
+
+def test_stopped(pool):
+    pool.stop()
+    assert not pool.queueTask("id", lambda args: None)
+
+
+def test_stop_wait():
+    threads = set(threading.enumerate())
+    p = threadPool.ThreadPool("test", 2, 3)
+    p.stop()
+    assert set(threading.enumerate()) == threads
+
+
+def test_long_task_replaced(pool):
+    release = threading.Event()
+    done = threading.Event()
+    try:
+        assert pool.queueTask("long", lambda args: release.wait(TIMEOUT))
+        # The blocked worker is replaced after the timeout, and the new
+        # worker runs the next task.
+        assert pool.queueTask("short", lambda args: done.set())
+        assert done.wait(TIMEOUT)
+    finally:
+        release.set()
+
+
+def test_stats(pool):
+    done = threading.Event()
+
+    def fail(args):
+        raise RuntimeError("failed")
+
+    assert pool.queueTask("1", lambda args: None, kind="a")
+    assert pool.queueTask("2", fail, kind="b")
+    assert pool.queueTask("3", lambda args: done.set(), kind="a")
+    assert done.wait(TIMEOUT)
+
+    # The last task may be still running.
+    pool.stop()
+    stats = pool.stats()
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+    assert stats["dropped"] == 0
+    assert stats["wait"]["a"]["count"] == 2
+    assert stats["wait"]["b"]["count"] == 1
+    assert stats["run"]["a"]["count"] == 2
+    assert stats["run"]["a"]["errors"] == 0
+    assert stats["run"]["b"]["count"] == 1
+    assert stats["run"]["b"]["errors"] == 1
+
+
+def test_module_stats(pool):
+    assert "test" in threadPool.stats()
+    pool.stop()
+    assert "test" not in threadPool.stats()
@@ -284,6 +284,32 @@ def test_hotunplug_monitor():
             valid_paths=None,
             dm_seqnum=None)
     ),
+    (
+        # Multipath device was created
+        FakeDevice(
+            ACTION="add",
+            DM_UUID="mpath-fake-uuid-4"),
+        udev.MultipathEvent(
+            type=udev.MPATH_CHANGED,
+            mpath_uuid="fake-uuid-4",
+            path=None,
+            valid_paths=None,
+            dm_seqnum=None)
+    ),
+    (
+        # Multipath device map was reloaded
+        FakeDevice(
+            ACTION="change",
+            DM_UUID="mpath-fake-uuid-5",
+            DM_NR_VALID_PATHS="2",
+            DM_SEQNUM="12"),
+        udev.MultipathEvent(
+            type=udev.MPATH_CHANGED,
+            mpath_uuid="fake-uuid-5",
+            path=None,
+            valid_paths=2,
+            dm_seqnum=12)
+    ),
 ])
 def test_report_events(monkeypatch, device, expected):
     # Avoid accessing non-existing devices
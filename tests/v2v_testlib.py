@@ -279,3 +279,7 @@ class MockVirConnect(object):
 
     def newStream(self):
         return FakeStream()
+
+    def getLibVersion(self):
+        # Before sparse streams
+        return 3000000
@@ -20,10 +20,15 @@
 from __future__ import absolute_import
 from __future__ import division
 
+import copy
+
 from testlib import VdsmTestCase as TestCaseBase
+from vdsm import client
 from vdsm.tool.dump_volume_chains import (_build_volume_chain, _BLANK_UUID,
                                           OrphanVolumes, ChainLoopError,
-                                          NoBaseVolume, DuplicateParentError)
+                                          NoBaseVolume, DuplicateParentError,
+                                          _get_volumes_info)
+from yajsonrpc.exception import JsonRpcMethodNotFoundError
 
 
 class GetVolumeChainTests(TestCaseBase):
@@ -57,3 +62,67 @@ class GetVolumeChainTests(TestCaseBase):
         with self.assertRaises(DuplicateParentError):
             _build_volume_chain(
                 [(_BLANK_UUID, 'a'), ('a', 'b'), ('a', 'c')])
+
+
+class FakeClient(object):
+    """
+    Client of a host connected to pool "sp", with one image with 2 volumes
+    in domain "sd".
+    """
+
+    VOLUMES = {
+        "img": {
+            "base": {"voltype": "INTERNAL", "parent": _BLANK_UUID},
+            "top": {"voltype": "LEAF", "parent": "base"},
+        },
+    }
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+        self.Host = self
+        self.StorageDomain = self
+        self.Volume = self
+
+    def dumpVolumeChains(self, storagedomainID):
+        self.calls.append("dumpVolumeChains")
+        if self.error is not None:
+            raise client.ServerError(
+                "StorageDomain.dumpVolumeChains",
+                {"storagedomainID": storagedomainID},
+                self.error, "Error")
+        return copy.deepcopy(self.VOLUMES)
+
+    def getConnectedStoragePools(self):
+        self.calls.append("getConnectedStoragePools")
+        return ["sp"]
+
+    def getImages(self, storagedomainID):
+        self.calls.append("getImages")
+        return list(self.VOLUMES)
+
+    def getVolumes(self, storagedomainID, storagepoolID, imageID):
+        self.calls.append("getVolumes")
+        return list(self.VOLUMES[imageID])
+
+    def getInfo(self, volumeID, storagepoolID, storagedomainID, imageID):
+        self.calls.append("getInfo")
+        return dict(self.VOLUMES[imageID][volumeID])
+
+
+class GetVolumesInfoTests(TestCaseBase):
+
+    def test_bulk(self):
+        cli = FakeClient()
+        self.assertEqual(_get_volumes_info(cli, "sd"), FakeClient.VOLUMES)
+        self.assertEqual(cli.calls, ["dumpVolumeChains"])
+
+    def test_legacy_fallback(self):
+        cli = FakeClient(error=JsonRpcMethodNotFoundError.code)
+        self.assertEqual(_get_volumes_info(cli, "sd"), FakeClient.VOLUMES)
+        self.assertEqual(cli.calls.count("getInfo"), 2)
+
+    def test_other_error(self):
+        cli = FakeClient(error=358)
+        with self.assertRaises(client.ServerError):
+            _get_volumes_info(cli, "sd")
@@ -113,7 +113,29 @@ NO_REBOOT = """
 </domain>
 """
 
+ALIASED_DEVICES = """
+<domain>
+    <uuid>xyz</uuid>
+    <devices>
+        <disk device="disk"><alias name="ua-disk"/></disk>
+        <interface type="bridge"><alias name="ua-nic"/></interface>
+        <memballoon model="none"/>
+    </devices>
+</domain>
+"""
+
+ALIASED_DEVICES_WITHOUT_NIC = """
+<domain>
+    <uuid>xyz</uuid>
+    <devices>
+        <disk device="disk"><alias name="ua-disk"/></disk>
+        <memballoon model="none"/>
+    </devices>
+</domain>
+"""
+
 
+@expandPermutations
 class DevicesHashTests(VdsmTestCase):
 
     def test_no_devices(self):
@@ -136,6 +158,41 @@ class DevicesHashTests(VdsmTestCase):
         desc2 = DomainDescriptor(SOME_DEVICES)
         self.assertEqual(desc1.devices_hash, desc2.devices_hash)
 
+    def test_other_changes(self):
+        desc1 = DomainDescriptor(SOME_DEVICES)
+        desc2 = DomainDescriptor(SOME_DEVICES.replace('xyz', 'abc'))
+        self.assertEqual(desc1.devices_hash, desc2.devices_hash)
+
+    def test_devices_in_metadata(self):
+        metadata = ('<metadata><![CDATA[<devices><a/></devices>]]>'
+                    '</metadata>')
+        desc1 = DomainDescriptor(SOME_DEVICES)
+        desc2 = DomainDescriptor(
+            SOME_DEVICES.replace('<domain>', '<domain>' + metadata))
+        self.assertEqual(desc1.devices_hash, desc2.devices_hash)
+
+    def test_device_attribute_change(self):
+        desc1 = DomainDescriptor(SOME_DEVICES)
+        desc2 = DomainDescriptor(SOME_DEVICES.replace('bar', 'baz'))
+        self.assertNotEqual(desc1.devices_hash, desc2.devices_hash)
+
+    @permutations([[DomainDescriptor], [MutableDomainDescriptor]])
+    def test_indentation_change(self, descriptor):
+        desc1 = descriptor(SOME_DEVICES)
+        desc2 = descriptor(SOME_DEVICES.replace('\n        ', '\n'))
+        self.assertEqual(desc1.devices_hash, desc2.devices_hash)
+
+    @permutations([[True], [False]])
+    def test_without_device(self, hashed):
+        desc = DomainDescriptor(ALIASED_DEVICES)
+        if hashed:
+            # The new descriptor reuses the hashes of the other devices.
+            desc.devices_hash
+        desc2 = desc.without_device('ua-nic')
+        expected = DomainDescriptor(ALIASED_DEVICES_WITHOUT_NIC)
+        self.assertEqual(desc2.devices_hash, expected.devices_hash)
+        self.assertNotEqual(desc2.devices_hash, desc.devices_hash)
+
 
 @expandPermutations
 class DomainDescriptorTests(XMLTestCase):
@@ -147,6 +204,31 @@ class DomainDescriptorTests(XMLTestCase):
         desc = DomainDescriptor(domain_xml)
         self.assertEqual(desc.get_memory_size(), result)
 
+    def test_without_device(self):
+        desc = DomainDescriptor(ALIASED_DEVICES)
+        desc2 = desc.without_device('ua-nic')
+        self.assertXMLEqual(desc2.xml, ALIASED_DEVICES_WITHOUT_NIC)
+        self.assertEqual(desc2.id, 'xyz')
+        self.assertFalse(desc2.has_device('ua-nic'))
+        self.assertTrue(desc2.has_device('ua-disk'))
+        # The original descriptor is not modified.
+        self.assertEqual(desc.xml, ALIASED_DEVICES)
+        self.assertTrue(desc.has_device('ua-nic'))
+
+    @permutations([[ALIASED_DEVICES, 'ua-missing'], [NO_DEVICES, 'ua-nic']])
+    def test_without_missing_device(self, domain_xml, alias):
+        desc = DomainDescriptor(domain_xml)
+        self.assertFalse(desc.has_device(alias))
+        with self.assertRaises(LookupError):
+            desc.without_device(alias)
+
+    def test_parse_on_access(self):
+        desc = DomainDescriptor(SOME_DEVICES)
+        self.assertEqual(desc.xml, SOME_DEVICES)
+        self.assertIsNone(desc._tree)
+        self.assertEqual(desc.id, 'xyz')
+        self.assertIsNotNone(desc._tree)
+
     @permutations([[DomainDescriptor], [MutableDomainDescriptor]])
     def test_xml(self, descriptor):
         desc = descriptor(SOME_DEVICES)
@@ -194,6 +194,29 @@ d = {u'netIfaces': [
         elapsed = timeit.timeit('_filterObject(d)', setup=setup, number=1000)
         print(elapsed, "seconds")
 
+    def test_parse_line_escaped(self):
+        agent = guestagent.GuestAgent(None, None, self.log, lambda: None,
+                                      lambda: None, lambda: None)
+        for line in [
+            b'{"__name__": "host-name", "name": "a\\u0001b"}',
+            b'{"__name__": "host-name", "name": "a\\bb"}',
+            b'{"__name__": "host-name", "name": "a\\fb"}',
+        ]:
+            name, args = agent._parseLine(line)
+            self.assertEqual(args, {u"name": u"a\ufffdb"})
+
+    def test_parse_line_not_filtered(self):
+        agent = guestagent.GuestAgent(None, None, self.log, lambda: None,
+                                      lambda: None, lambda: None)
+
+        def fail(obj):
+            raise AssertionError("Unexpected filtering")
+
+        line = b'{"__name__": "host-name", "name": "C:\\\\Temp\\n"}'
+        with MonkeyPatchScope([(guestagent, "_filterObject", fail)]):
+            name, args = agent._parseLine(line)
+        self.assertEqual(args, {u"name": u"C:\\Temp\n"})
+
 
 class TestGuestIF(TestCaseBase):
 
@@ -231,6 +254,66 @@ class TestGuestIF(TestCaseBase):
             for (k, v) in six.iteritems(_OUTPUTS[0]):
                 self.assertEqual(guest_info[k], v)
 
+    def test_guestinfo_version_unchanged(self):
+        agent = guestagent.GuestAgent(None, None, self.log, lambda: None,
+                                      lambda: None, lambda: None)
+        for t in zip(_MSG_TYPES, _INPUTS):
+            agent._handleMessage(*t)
+        netIfaces = agent.guestInfo['netIfaces']
+        version = agent.guestInfoVersion
+        for t in zip(_MSG_TYPES, _INPUTS):
+            agent._handleMessage(*t)
+        self.assertEqual(agent.guestInfoVersion, version)
+        self.assertIs(agent.guestInfo['netIfaces'], netIfaces)
+
+    def test_guestinfo_version_changed(self):
+        agent = guestagent.GuestAgent(None, None, self.log, lambda: None,
+                                      lambda: None, lambda: None)
+        agent._handleMessage('host-name', {'name': 'a.example.com'})
+        version = agent.guestInfoVersion
+        agent._handleMessage('host-name', {'name': 'b.example.com'})
+        self.assertNotEqual(agent.guestInfoVersion, version)
+        self.assertEqual(agent.guestInfo['guestName'], 'b.example.com')
+
+    def test_guestinfo_version_volatile(self):
+        agent = guestagent.GuestAgent(None, None, self.log, lambda: None,
+                                      lambda: None, lambda: None)
+        version = agent.guestInfoVersion
+        for free in (1024, 2048):
+            agent._handleMessage('heartbeat', {
+                'free-ram': free, 'memory-stat': {'mem_unused': free}})
+        self.assertEqual(agent.guestInfoVersion, version)
+        self.assertEqual(agent.guestInfo['memUsage'], 2048)
+        self.assertEqual(agent.guestInfo['memoryStats']['mem_free'], '2048')
+
+    def test_reported_version(self):
+        qga_info = {'guestTimezone': {'offset': 0}}
+        agent = guestagent.GuestAgent(None, None, self.log, lambda: None,
+                                      lambda: None, lambda: dict(qga_info))
+        with MonkeyPatchScope([(agent, 'isResponsive', lambda: True)]):
+            version = agent.getGuestInfo()['guestInfoVersion']
+            self.assertEqual(
+                agent.getGuestInfo()['guestInfoVersion'], version)
+            qga_info['guestTimezone'] = {'offset': 60}
+            qga_version = agent.getGuestInfo()['guestInfoVersion']
+            self.assertNotEqual(qga_version, version)
+            agent._handleMessage('fqdn', {'fqdn': 'a.example.com'})
+            self.assertNotIn(agent.getGuestInfo()['guestInfoVersion'],
+                             (version, qga_version))
+
+    def test_version_unique_per_agent(self):
+        def create_agent():
+            return guestagent.GuestAgent(None, None, self.log, lambda: None,
+                                         lambda: None, lambda: None)
+
+        with MonkeyPatchScope([(guestagent.time, 'time', lambda: 1000.0)]):
+            old = create_agent()
+        old._handleMessage('host-name', {'name': 'a.example.com'})
+        with MonkeyPatchScope([(guestagent.time, 'time', lambda: 1001.0)]):
+            new = create_agent()
+        new._handleMessage('host-name', {'name': 'a.example.com'})
+        self.assertNotEqual(new.guestInfoVersion, old.guestInfoVersion)
+
 
 class TestGuestIFHandleData(TestCaseBase):
     # helper for chunking messages
@@ -281,6 +364,21 @@ class TestGuestIFHandleData(TestCaseBase):
         for (k, v) in six.iteritems(expected):
             self.assertEqual(self.fakeGuestAgent.guestInfo[k], expected[k])
 
+    def testManyMessages(self):
+        messages = [self.dataToMessage("host-name", {"name": "host-%d" % i})
+                    for i in range(1000)]
+        handled = []
+        with MonkeyPatchScope([(self.fakeGuestAgent, "_handleMessage",
+                                lambda name, args: handled.append(args))]):
+            self.fakeGuestAgent._handleData(
+                "".join(messages).encode("utf-8") + b'{"__na')
+            self.fakeGuestAgent._handleData(b'me__": "fqdn", ')
+            self.fakeGuestAgent._handleData(b'"fqdn": "fqdn"}\n')
+        self.assertEqual(handled[:-1],
+                         [{"name": "host-%d" % i} for i in range(1000)])
+        self.assertEqual(handled[-1], {"fqdn": "fqdn"})
+        self.assertEqual(self.fakeGuestAgent._buffer, [])
+
     def testMixed(self):
         testCase = namedtuple('testCase', 'msgType, message, assertDict')
         for t in zip(_MSG_TYPES, _INPUTS, _OUTPUTS):
@@ -178,6 +178,64 @@ class QemuGuestAgentTests(TestCaseBase):
         self.assertIsNotNone(now)
         self.assertNotEqual(last, now)
 
+    def test_throttling(self):
+        now = [1000.0]
+        with MonkeyPatchScope([
+                (qemuguestagent, "monotonic_time", lambda: now[0])]):
+            self.assertFalse(self.qga_poller.throttled(self.vm.id))
+            # The interval is doubled after every failure.
+            for interval in (60, 120, 240, 480, 960, 960):
+                self.qga_poller.set_failure(self.vm.id)
+                now[0] += interval - 1
+                self.assertTrue(self.qga_poller.throttled(self.vm.id))
+                now[0] += 1
+                self.assertFalse(self.qga_poller.throttled(self.vm.id))
+
+    def test_throttling_concurrent_failures(self):
+        now = [1000.0]
+        with MonkeyPatchScope([
+                (qemuguestagent, "monotonic_time", lambda: now[0])]):
+            self.qga_poller.set_failure(self.vm.id)
+            # Failure of an operation started before the first failure.
+            now[0] += 1
+            self.qga_poller.set_failure(self.vm.id)
+            now[0] += 60
+            self.assertFalse(self.qga_poller.throttled(self.vm.id))
+
+    def test_throttling_reset(self):
+        self.qga_poller.set_failure(self.vm.id)
+        self.assertTrue(self.qga_poller.throttled(self.vm.id))
+        self.qga_poller.clear_failure(self.vm.id)
+        self.assertFalse(self.qga_poller.throttled(self.vm.id))
+        self.assertIsNone(self.qga_poller.last_failure(self.vm.id))
+
+    def test_throttled_skips_commands(self):
+        calls = []
+
+        def _qga_command_fail(*args, **kwargs):
+            calls.append(args)
+            raise libvirt.libvirtError("Some error!")
+
+        with MonkeyPatchScope([
+                (libvirt_qemu, "qemuAgentCommand", _qga_command_fail)]):
+            c = qemuguestagent.SystemInfoCheck(self.vm, self.qga_poller)
+            c._execute()
+        self.assertEqual(len(calls), 1)
+        stats = self.qga_poller.stats()
+        self.assertEqual(stats['throttled'], 1)
+        self.assertEqual(
+            stats['commands'][qemuguestagent._QEMU_HOST_NAME_COMMAND][
+                'errors'], 1)
+
+    def test_stats(self):
+        c = qemuguestagent.ActiveUsersCheck(self.vm, self.qga_poller)
+        c._execute()
+        stats = self.qga_poller.stats()
+        self.assertEqual(stats['throttled'], 0)
+        users = stats['commands'][qemuguestagent._QEMU_ACTIVE_USERS_COMMAND]
+        self.assertEqual(users['count'], 1)
+        self.assertEqual(users['errors'], 0)
+
     def test_guest_info(self):
         """ Set and read guest info. """
         self.qga_poller.update_guest_info(
@@ -24,6 +24,7 @@ from contextlib import contextmanager
 import io
 import subprocess
 import tarfile
+import threading
 import time
 import uuid
 import zipfile
@@ -336,6 +337,22 @@ class v2vTests(TestCaseBase):
             (v2v.DiskProgress(50)),
             (v2v.DiskProgress(100))])
 
+    def testOutputParserThroughput(self):
+        output = (b'[   0.0] preparing for copy\n'
+                  b'[   0.0] Copying disk 1/1 to /tmp/v2v/0000000...\n'
+                  b'    (50/100%, 120.5 MiB/s)\r'
+                  b'    (100/100%, 98.0 MiB/s)\r'
+                  b'[  10.0] Finishing off')
+
+        parser = v2v.OutputParser()
+        events = list(parser.parse(io.BytesIO(output)))
+        self.assertEqual(events, [
+            (v2v.ImportProgress(1, 1, b'Copying disk 1/1')),
+            (v2v.CopyThroughput(120.5)),
+            (v2v.DiskProgress(50)),
+            (v2v.CopyThroughput(98.0)),
+            (v2v.DiskProgress(100))])
+
     def testGetExternalVMsWithoutDisksInfo(self):
         def internal_error(name):
             raise fake.Error(libvirt.VIR_ERR_INTERNAL_ERROR)
@@ -448,6 +465,19 @@ class v2vTests(TestCaseBase):
 
             self.assertEqual(job.status, v2v.STATUS.DONE)
 
+    def testJobsStatus(self):
+        job = v2v.ImportVm(self.job_id, None)
+        v2v._add_job(self.job_id, job)
+        self.assertEqual(v2v.get_jobs_status(), {
+            self.job_id: {
+                'status': v2v.STATUS.STARTING,
+                'description': '',
+                'progress': 0,
+                'waitTime': 0,
+                'runTime': 0,
+            }
+        })
+
     def testV2VOutput(self):
         cmd = [FAKE_VIRT_V2V.cmd,
                '-v',
@@ -628,6 +658,114 @@ class PipelineProcTests(TestCaseBase):
                 self.assertEqual(ret, True)
 
 
+class FakeJob(object):
+
+    def __init__(self, id):
+        self.id = id
+        self.aborted = False
+
+
+def wait_for(predicate, timeout=2):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise RuntimeError("Timeout waiting for %s" % predicate)
+        time.sleep(0.01)
+
+
+class JobSchedulerTests(TestCaseBase):
+
+    def start_job(self, scheduler, job, started, errors):
+        def run():
+            try:
+                scheduler.acquire(job)
+            except Exception as e:
+                errors.append(e)
+            else:
+                started.append(job.id)
+
+        t = threading.Thread(target=run)
+        t.daemon = True
+        t.start()
+        return t
+
+    def test_unlimited(self):
+        scheduler = v2v.JobScheduler(0)
+        for i in range(10):
+            scheduler.acquire(FakeJob(i))
+
+    def test_queue(self):
+        scheduler = v2v.JobScheduler(1)
+        scheduler.acquire(FakeJob(1))
+        started = []
+        errors = []
+        threads = []
+        for i in (2, 3):
+            threads.append(self.start_job(scheduler, FakeJob(i), started,
+                                          errors))
+            wait_for(lambda: len(scheduler._queue) == i - 1)
+        self.assertEqual(started, [])
+
+        scheduler.release()
+        wait_for(lambda: started == [2])
+        scheduler.release()
+        wait_for(lambda: started == [2, 3])
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+    def test_abort_waiting(self):
+        scheduler = v2v.JobScheduler(1)
+        scheduler.acquire(FakeJob(1))
+        job = FakeJob(2)
+        started = []
+        errors = []
+        t = self.start_job(scheduler, job, started, errors)
+        wait_for(lambda: len(scheduler._queue) == 1)
+
+        job.aborted = True
+        scheduler.wakeup()
+        t.join()
+        self.assertEqual(started, [])
+        self.assertIsInstance(errors[0], v2v.JobAborted)
+        self.assertEqual(len(scheduler._queue), 0)
+
+    def test_abort_before_waiting(self):
+        scheduler = v2v.JobScheduler(1)
+        job = FakeJob(1)
+        job.aborted = True
+        with self.assertRaises(v2v.JobAborted):
+            scheduler.acquire(job)
+        # The slot is still free.
+        scheduler.acquire(FakeJob(2))
+
+
+class ImportVmWaitTimeTests(TestCaseBase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.scheduler = v2v.JobScheduler(1)
+        # Keep the only slot, so the job waits.
+        self.scheduler.acquire(FakeJob("other"))
+
+    def clock(self):
+        return self.now
+
+    def test_abort_waiting(self):
+        job = v2v.ImportVm("job", None)
+        with MonkeyPatchScope([(v2v, '_scheduler', self.scheduler),
+                               (v2v, 'monotonic_time', self.clock)]):
+            job.start()
+            wait_for(lambda: len(self.scheduler._queue) == 1)
+            self.now += 10
+            job.abort()
+            job.wait()
+            self.now += 10
+        self.assertEqual(job.wait_time, 10)
+        self.assertEqual(job.run_time, 0)
+        self.assertEqual(job.status, v2v.STATUS.ABORTED)
+
+
 class MockVirConnectTests(TestCaseBase):
     def setUp(self):
         self._vms = [MockVirDomain(*spec) for spec in VM_SPECS]
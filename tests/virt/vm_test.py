@@ -1256,6 +1256,36 @@ class TestLibVirtCallbacks(TestCaseBase):
                      for d in group]),
                 kept_aliases)
 
+    def test_onDeviceRemoved_updates_descriptor(self):
+        devices = [{'alias': 'dimm0', 'type': hwclass.MEMORY, 'size': 1024}]
+        with fake.VM(_VM_PARAMS, devices=devices,
+                     create_device_objects=True) as testvm:
+            testvm._domain = DomainDescriptor(
+                '<domain><devices><memory><alias name="dimm0"/></memory>'
+                '</devices></domain>')
+            refreshed = []
+            testvm._updateDomainDescriptor = lambda: refreshed.append(True)
+            testvm.onDeviceRemoved('dimm0')
+            # The device is removed from the current descriptor, without
+            # fetching the domain xml.
+            self.assertFalse(testvm._domain.has_device('dimm0'))
+            self.assertEqual(refreshed, [])
+
+    @permutations([
+        # alias, refreshed
+        ['ua-known', []],
+        ['ua-unknown', [True]],
+    ])
+    def test_onDeviceAdded(self, alias, refreshed):
+        with fake.VM(_VM_PARAMS) as testvm:
+            testvm._domain = DomainDescriptor(
+                '<domain><devices><disk><alias name="ua-known"/></disk>'
+                '</devices></domain>')
+            calls = []
+            testvm._updateDomainDescriptor = lambda: calls.append(True)
+            testvm.onDeviceAdded(alias)
+            self.assertEqual(calls, refreshed)
+
 
 class TestVmStatusTransitions(TestCaseBase):
     @slowtest
@@ -26,6 +26,7 @@ from itertools import tee, product
 import logging
 import socket
 import threading
+import time
 import uuid
 
 import libvirt
@@ -62,7 +63,7 @@ _PARAMS = tuple(product((_DOWNTIME_MIN, _DOWNTIME, _DOWNTIME_HUGE),
 
 
 @expandPermutations
-class DowntimeThreadTests(TestCaseBase):
+class DowntimeScheduleTests(TestCaseBase):
 
     # No special meaning, But steps just need to be >= 2
     DOWNTIME = 1000
@@ -370,6 +371,9 @@ class FakeVM(object):
     def prepare_migration(self):
         pass
 
+    def send_migration_status_event(self):
+        pass
+
     def isPersistent(self):
         return True
 
@@ -380,7 +384,7 @@ class FakeProgress(object):
         self.percentage = 0
 
 
-class FakeMonitorThread(object):
+class FakeMonitor(object):
 
     def __init__(self, prog):
         self.progress = prog
@@ -390,7 +394,7 @@ def make_env(mode=migration.MODE_REMOTE):
     dom = FakeMigratingDomain()
     src = migration.SourceThread(FakeVM(dom), mode=mode)
     src.remoteHost = '127.0.0.1'
-    src._monitorThread = FakeMonitorThread(FakeProgress())
+    src._monitor = FakeMonitor(FakeProgress())
     src._setupVdsConnection = lambda: None
     src._setupRemoteMachineParams = lambda: None
     return dom, src
@@ -414,7 +418,7 @@ class SourceThreadTests(TestCaseBase):
         vm = FakeVM()
         src = migration.SourceThread(vm)
         prog = FakeProgress()
-        src._monitorThread = FakeMonitorThread(prog)
+        src._monitor = FakeMonitor(prog)
 
         for step in steps:
             prog.percentage = step
@@ -428,7 +432,7 @@ class SourceThreadTests(TestCaseBase):
         vm = FakeVM()
         src = migration.SourceThread(vm)
         prog = FakeProgress()
-        src._monitorThread = FakeMonitorThread(prog)
+        src._monitor = FakeMonitor(prog)
 
         for step in steps:
             prog.percentage = step
@@ -507,6 +511,277 @@ class SourceThreadTests(TestCaseBase):
         self.assertTrue(src.tunneled)
 
 
+class FakeMonitoredDomain(object):
+
+    def __init__(self):
+        self.job_stats = {}
+        self.downtimes = []
+        self.aborted = False
+
+    def jobStats(self):
+        return self.job_stats
+
+    def migrateSetMaxDowntime(self, downtime, flags):
+        self.downtimes.append(downtime)
+
+    def abortJob(self):
+        self.aborted = True
+
+
+class FakeDowntimeSchedule(object):
+
+    current = 100
+
+    def __init__(self):
+        self.started = 0
+
+    def set_initial_downtime(self):
+        pass
+
+    def start(self):
+        self.started += 1
+
+    def stop(self):
+        pass
+
+
+def _job_stats(remaining, iteration=-1, bps=0, dirty_rate=-1):
+    stats = {
+        'type': libvirt.VIR_DOMAIN_JOB_UNBOUNDED,
+        'operation': libvirt.VIR_DOMAIN_JOB_OPERATION_MIGRATION_OUT,
+        libvirt.VIR_DOMAIN_JOB_TIME_ELAPSED: 1000,
+        libvirt.VIR_DOMAIN_JOB_DATA_TOTAL: 1024 * 1024**2,
+        libvirt.VIR_DOMAIN_JOB_DATA_PROCESSED: 0,
+        libvirt.VIR_DOMAIN_JOB_DATA_REMAINING: remaining,
+        libvirt.VIR_DOMAIN_JOB_MEMORY_TOTAL: 1024 * 1024**2,
+        libvirt.VIR_DOMAIN_JOB_MEMORY_PROCESSED: 0,
+        libvirt.VIR_DOMAIN_JOB_MEMORY_REMAINING: remaining,
+        libvirt.VIR_DOMAIN_JOB_MEMORY_BPS: bps,
+        'memory_dirty_rate': dirty_rate,
+    }
+    if iteration >= 0:
+        stats['memory_iteration'] = iteration
+    return stats
+
+
+def make_monitor():
+    dom = FakeMonitoredDomain()
+    vm = FakeVM(dom)
+    monitor = migration.MigrationMonitor(
+        vm, time.time(), {'init': [], 'stalling': []}, False)
+    monitor.downtime_schedule = FakeDowntimeSchedule()
+    return dom, monitor
+
+
+class MigrationMonitorTests(TestCaseBase):
+
+    def test_iteration_from_remaining_data(self):
+        dom, monitor = make_monitor()
+        for remaining in (500, 400, 450, 300, 350):
+            dom.job_stats = _job_stats(remaining * 1024**2)
+            monitor.monitor_migration()
+        self.assertEqual(monitor._iterationCount, 2)
+        self.assertEqual(monitor.downtime_schedule.started, 1)
+
+    def test_iteration_from_job_stats(self):
+        dom, monitor = make_monitor()
+        # Remaining data is ignored when libvirt reports iterations.
+        for remaining, iteration in ((500, 1), (600, 1), (300, 3)):
+            dom.job_stats = _job_stats(remaining * 1024**2, iteration)
+            monitor.monitor_migration()
+        self.assertEqual(monitor._iterationCount, 2)
+        self.assertEqual(monitor.downtime_schedule.started, 1)
+
+    def test_iteration_event(self):
+        dom, monitor = make_monitor()
+        monitor._stopped = True  # do not dispatch checks
+        monitor.on_iteration(2)
+        dom.job_stats = _job_stats(500 * 1024**2, 1)
+        monitor.monitor_migration()
+        self.assertEqual(monitor._iterationCount, 1)
+
+    def test_conv_schedule_actions(self):
+        dom, monitor = make_monitor()
+        monitor._use_conv_schedule = True
+        monitor._conv_schedule = {'init': [], 'stalling': [
+            {'limit': 0, 'action': {'name': 'setDowntime',
+                                    'params': ['200']}},
+            {'limit': 1, 'action': {'name': 'setDowntime',
+                                    'params': ['400']}},
+        ]}
+        # 2 iterations reported in one check run 2 actions.
+        dom.job_stats = _job_stats(500 * 1024**2, 3)
+        monitor.monitor_migration()
+        self.assertEqual(dom.downtimes, [200, 400])
+
+    def test_samples(self):
+        dom, monitor = make_monitor()
+        dom.job_stats = _job_stats(500 * 1024**2, 1, dirty_rate=42)
+        monitor.monitor_migration()
+        sample, = monitor.samples
+        self.assertEqual(sample.data_remaining, 500 * 1024**2)
+        self.assertEqual(sample.dirty_rate, 42)
+        self.assertEqual(sample.downtime, 100)
+        self.assertEqual(sample.iteration, 0)
+
+    def test_interval(self):
+        dom, monitor = make_monitor()
+        interval = migration.MigrationMonitor._MIGRATION_MONITOR_INTERVAL
+        # Far from completion
+        dom.job_stats = _job_stats(1000 * 1024**2, bps=1024**2)
+        self.assertEqual(monitor.monitor_migration(), interval)
+        # About to complete
+        dom.job_stats = _job_stats(4 * 1024**2, bps=1024**2)
+        self.assertEqual(monitor.monitor_migration(), 2)
+        dom.job_stats = _job_stats(1024**2, bps=1024**2)
+        self.assertEqual(monitor.monitor_migration(),
+                         migration.MigrationMonitor._MIN_INTERVAL)
+
+    def test_stop(self):
+        dom, monitor = make_monitor()
+        monitor.start()
+        monitor.stop()
+        monitor.join()
+        self.assertTrue(monitor._stopped)
+
+    def test_samples_summary(self):
+        samples = [
+            migration.Sample(1, 500 * 1024**2, 10, 100, 0),
+            migration.Sample(2, 300 * 1024**2, 40, 200, 1),
+            migration.Sample(3, 400 * 1024**2, 20, 300, 2),
+        ]
+        self.assertEqual(
+            migration._samples_summary(samples),
+            '3 samples from 1 to 3 seconds, remaining MiB 300-500 '
+            '(last 400), max dirty rate 40, downtime 300, iteration 2')
+
+
+class FakeExecutor(object):
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    def dispatch(self, func, timeout=None):
+        if self.failures:
+            self.failures -= 1
+            raise exception.ResourceExhausted("Too many tasks",
+                                              current_tasks=100)
+        func()
+
+
+class SupervisorTests(TestCaseBase):
+
+    def test_dispatch_retry(self):
+        supervisor = migration._Supervisor()
+        supervisor._start()
+        executor = supervisor._executor
+        supervisor._executor = FakeExecutor(failures=2)
+        try:
+            done = threading.Event()
+            with MonkeyPatchScope([
+                (migration, '_SUPERVISOR_RETRY_DELAY', 0.01),
+            ]):
+                supervisor.dispatch(done.set)
+                self.assertTrue(done.wait(1))
+            self.assertEqual(supervisor._executor.failures, 0)
+        finally:
+            executor.stop()
+            supervisor._scheduler.stop()
+
+
+class FakeSource(object):
+
+    def __init__(self, vm_id, priority=1, max_bandwidth=0):
+        self.vm_id = vm_id
+        self.priority = priority
+        self.max_bandwidth = max_bandwidth
+        self.bandwidths = []
+
+    def set_bandwidth(self, bandwidth):
+        self.bandwidths.append(bandwidth)
+
+
+@expandPermutations
+class BandwidthAllocatorTests(TestCaseBase):
+
+    @permutations([
+        # budget, demands, bandwidths
+        (100, [(1, 100)], [100]),
+        (100, [(1, 100), (1, 100)], [50, 50]),
+        (100, [(3, 100), (1, 100)], [75, 25]),
+        # Bandwidth not used by capped migrations is shared.
+        (100, [(1, 10), (1, 100), (2, 100)], [10, 30, 60]),
+        (100, [(1, 10), (1, 20)], [10, 20]),
+        # Never 0, meaning unlimited in libvirt.
+        (1, [(1, 100), (1, 100)], [1, 1]),
+    ])
+    def test_allocate_bandwidth(self, budget, demands, bandwidths):
+        self.assertEqual(migration.allocate_bandwidth(budget, demands),
+                         bandwidths)
+
+    def test_disabled(self):
+        allocator = migration.BandwidthAllocator(0)
+        source = FakeSource('vm-1')
+        allocator.add(source)
+        self.assertEqual(source.bandwidths, [])
+        self.assertEqual(allocator.stats(), {'budget': 0, 'migrations': {}})
+
+    def test_share(self):
+        allocator = migration.BandwidthAllocator(100)
+        src1 = FakeSource('vm-1')
+        src2 = FakeSource('vm-2', max_bandwidth=200)
+        allocator.add(src1)
+        allocator.add(src2)
+        self.assertEqual(src1.bandwidths, [100, 50])
+        self.assertEqual(src2.bandwidths, [50])
+        allocator.remove(src1)
+        self.assertEqual(src2.bandwidths, [50, 100])
+        allocator.remove(src2)
+        self.assertEqual(allocator.stats()['migrations'], {})
+
+    def test_priority(self):
+        allocator = migration.BandwidthAllocator(100)
+        src1 = FakeSource('vm-1', priority=3)
+        src2 = FakeSource('vm-2')
+        allocator.add(src1)
+        allocator.add(src2)
+        self.assertEqual(src1.bandwidths[-1], 75)
+        self.assertEqual(src2.bandwidths[-1], 25)
+
+    def test_dirty_rate(self):
+        allocator = migration.BandwidthAllocator(100)
+        src1 = FakeSource('vm-1')
+        src2 = FakeSource('vm-2')
+        allocator.add(src1)
+        allocator.add(src2)
+        # vm-1 weight: 50 + 50, vm-2 weight: 50 + 0
+        allocator.update('vm-1', 50)
+        self.assertEqual(src1.bandwidths[-1], 66)
+        self.assertEqual(src2.bandwidths[-1], 33)
+        self.assertEqual(allocator.stats(), {
+            'budget': 100,
+            'migrations': {
+                'vm-1': {'bandwidth': 66, 'priority': 1, 'dirtyRate': 50},
+                'vm-2': {'bandwidth': 33, 'priority': 1, 'dirtyRate': 0},
+            }
+        })
+
+    def test_unchanged_not_set(self):
+        allocator = migration.BandwidthAllocator(100)
+        src1 = FakeSource('vm-1', max_bandwidth=10)
+        src2 = FakeSource('vm-2', max_bandwidth=10)
+        allocator.add(src1)
+        allocator.add(src2)
+        allocator.update('vm-1', 50)
+        self.assertEqual(src1.bandwidths, [10])
+        self.assertEqual(src2.bandwidths, [10])
+
+    def test_update_unknown(self):
+        allocator = migration.BandwidthAllocator(100)
+        allocator.update('vm-1', 50)
+        self.assertEqual(allocator.stats()['migrations'], {})
+
+
 # stolen^Wborrowed from itertools recipes
 def pairwise(iterable):
     "s -> (s0,s1), (s1,s2), (s2, s3), ..."
@@ -531,7 +806,7 @@ def _update_downtime_repeatedly(downtime, steps):
 
             cfg = make_config([('vars', 'migration_downtime_delay', '0')])
             with MonkeyPatchScope([(migration, 'config', cfg)]):
-                dt = migration.DowntimeThread(testvm, downtime, steps)
+                dt = migration.DowntimeSchedule(testvm, downtime, steps)
                 dt.set_initial_downtime()
                 dt.start()
                 dt.join()
@@ -21,6 +21,9 @@
 from __future__ import absolute_import
 from __future__ import division
 
+import threading
+import time
+
 import libvirt
 
 from vdsm.common import libvirtconnection
@@ -217,6 +220,52 @@ class TestAllDomains(TestCaseBase):
             expect_destroy = not vm_is_ext
             self.assertEqual(vm_obj.destroyed, expect_destroy)
 
+    def test_recover_concurrently(self):
+        lock = threading.Lock()
+        threads = set()
+        create_vm = self.cif.createVm
+
+        def create_fn(vmParams, vmRecover=False):
+            with lock:
+                threads.add(threading.current_thread())
+            time.sleep(0.05)
+            return create_vm(vmParams, vmRecover=vmRecover)
+
+        vm_uuids = [str(i) for i in range(10)]
+        self.conn.domains = _make_domains_collection(
+            [(vm_uuid, False) for vm_uuid in vm_uuids])
+        with MonkeyPatchScope([
+            (self.cif, 'createVm', create_fn)
+        ]):
+            recovery.all_domains(self.cif, workers=3)
+        self.assertEqual(set(self.cif.vmRequests), set(vm_uuids))
+        self.assertEqual(len(threads), 3)
+
+    def test_invalid_workers(self):
+        recovery.all_domains(self.cif, workers=0)
+        self.assertEqual(set(self.cif.vmRequests), set(self.vm_uuids))
+
+    def test_on_listed(self):
+        listed = []
+
+        def on_listed():
+            listed.append(dict(self.cif.vmRequests))
+
+        recovery.all_domains(self.cif, on_listed=on_listed)
+        self.assertEqual(listed, [{}])
+        self.assertEqual(set(self.cif.vmRequests), set(self.vm_uuids))
+
+    def test_libvirt_error(self):
+        """
+        Unexpected libvirt error fails the recovery, so it will be retried.
+        """
+        def fail(*args):
+            raise libvirt.libvirtError("Internal error")
+
+        self.conn.domains['a'].XMLDesc = fail
+        self.assertRaises(libvirt.libvirtError,
+                          recovery.all_domains, self.cif)
+
     def test_lookup_external_vms(self):
         vm_ext = [True] * len(self.vm_uuids)
         self.conn.domains = _make_domains_collection(
@@ -287,7 +287,8 @@ class GuestAgent(object):
             'disksUsage': [],
             'netIfaces': [],
             'memoryStats': {},
-            'guestCPUCount': -1}
+            'guestCPUCount': -1,
+            'guestInfoVersion': '0-0'}
 
     def stop(self):
         pass